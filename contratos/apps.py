@@ -5,3 +5,6 @@ class ContratosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'contratos'
     verbose_name = 'Gestão de Contratos'
+
+    def ready(self):
+        from contratos import signals  # noqa: F401 — registra os receivers
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.6 on 2026-10-17 00:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contratos', '0015_contrato_metodo_cobranca'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contrato',
+            name='bloqueio_calculado_em',
+            field=models.DateField(blank=True, null=True, verbose_name='Bloqueio Calculado em'),
+        ),
+        migrations.AddField(
+            model_name='contrato',
+            name='bloqueio_valido_ate',
+            field=models.DateField(blank=True, db_index=True, help_text='Data do próximo aniversário de ciclo, quando o bloqueio precisa ser recalculado', null=True, verbose_name='Bloqueio Válido até'),
+        ),
+        migrations.AddField(
+            model_name='contrato',
+            name='ciclo_bloqueado_reajuste',
+            field=models.PositiveIntegerField(blank=True, help_text='Primeiro ciclo com reajuste vencido e não aplicado (vazio = sem bloqueio)', null=True, verbose_name='Primeiro Ciclo Bloqueado'),
+        ),
+        migrations.AddField(
+            model_name='contrato',
+            name='parcela_bloqueada_a_partir',
+            field=models.PositiveIntegerField(blank=True, db_index=True, help_text='Parcelas com número a partir deste ficam bloqueadas (vazio = sem bloqueio)', null=True, verbose_name='Bloqueado a partir da Parcela'),
+        ),
+    ]
@@ -148,45 +148,13 @@ class IndiceReajuste(TimeStampedModel):
 
         Método 2 — produto das variações mensais (fallback):
             Usado quando o número-índice não está disponível para os meses extremos.
-        """
-        from datetime import date
-        from dateutil.relativedelta import relativedelta
-
-        # ── Método 1: número-índice publicado ────────────────────────────────
-        # "MesInicial" da fórmula = mês anterior ao início do período
-        data_inicio = date(ano_inicio, mes_inicio, 1)
-        mes_base = data_inicio - relativedelta(months=1)
-
-        ci = cls.objects.filter(
-            tipo_indice=tipo_indice, ano=mes_base.year, mes=mes_base.month,
-        ).values_list('numero_indice', flat=True).first()
-
-        cf = cls.objects.filter(
-            tipo_indice=tipo_indice, ano=ano_fim, mes=mes_fim,
-        ).values_list('numero_indice', flat=True).first()
 
-        if ci and cf:
-            return (Decimal(str(cf)) / Decimal(str(ci)) - 1) * 100
-
-        # ── Método 2: produto das variações mensais (fallback) ────────────────
-        indices = cls.objects.filter(
-            tipo_indice=tipo_indice
-        ).filter(
-            models.Q(ano__gt=ano_inicio) |
-            models.Q(ano=ano_inicio, mes__gte=mes_inicio)
-        ).filter(
-            models.Q(ano__lt=ano_fim) |
-            models.Q(ano=ano_fim, mes__lte=mes_fim)
-        ).order_by('ano', 'mes')
-
-        if not indices.exists():
-            return None
-
-        acumulado = Decimal('1')
-        for indice in indices:
-            acumulado *= (1 + indice.valor / 100)
+        Calculado sobre a série do tipo em cache (contratos.series_indices):
+        sem consultas quando a série já está carregada e atualizada.
+        """
+        from contratos.series_indices import serie_indice
 
-        return (acumulado - 1) * 100
+        return serie_indice(tipo_indice).acumulado(ano_inicio, mes_inicio, ano_fim, mes_fim)
 
 
 class StatusContrato(models.TextChoices):
@@ -320,6 +288,33 @@ class Contrato(TimeStampedModel):
         verbose_name='Boleto Bloqueado por Reajuste',
         help_text='Se True, a geração de boletos está bloqueada até aplicar o reajuste'
     )
+    # Bloqueio por reajuste materializado (atualizar_bloqueio_reajuste): evita
+    # percorrer os ciclos e consultar Reajuste a cada pode_gerar_boleto
+    ciclo_bloqueado_reajuste = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Primeiro Ciclo Bloqueado',
+        help_text='Primeiro ciclo com reajuste vencido e não aplicado (vazio = sem bloqueio)'
+    )
+    parcela_bloqueada_a_partir = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name='Bloqueado a partir da Parcela',
+        help_text='Parcelas com número a partir deste ficam bloqueadas (vazio = sem bloqueio)'
+    )
+    bloqueio_calculado_em = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name='Bloqueio Calculado em',
+    )
+    bloqueio_valido_ate = models.DateField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name='Bloqueio Válido até',
+        help_text='Data do próximo aniversário de ciclo, quando o bloqueio precisa ser recalculado'
+    )
 
     # Juros e Multa
     percentual_juros_mora = models.DecimalField(
@@ -797,6 +792,14 @@ class Contrato(TimeStampedModel):
         if self.numero_parcelas > 0:
             self.valor_parcela_original = (self.valor_financiado / self.numero_parcelas).quantize(Decimal('0.01'))
 
+        # Bloqueio por reajuste materializado: recalcula quando o save pode alterá-lo
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(update_fields) & set(self.CAMPOS_BLOQUEIO_REAJUSTE):
+            from django.utils import timezone as tz
+            campos = self._definir_bloqueio(tz.now().date(), self._ciclos_aplicados())
+            if update_fields is not None:
+                kwargs['update_fields'] = list(update_fields) + campos
+
         super().save(*args, **kwargs)
 
         # Gerar parcelas se ainda não foram geradas
@@ -811,7 +814,7 @@ class Contrato(TimeStampedModel):
         Args:
             ate_mes_atual: Se True, gera parcelas apenas até o mês atual (útil para dados de teste)
         """
-        from financeiro.models import Parcela
+        from financeiro.models import Parcela, ResumoRecebiveisMensal
         from django.utils import timezone
 
         data_vencimento = self.data_primeiro_vencimento
@@ -827,7 +830,9 @@ class Contrato(TimeStampedModel):
 
         prazo_ciclo = self.prazo_reajuste_meses or 12
 
-        from contratos.utils import ajustar_data_vencimento
+        from contratos.utils import ajustar_data_vencimento, calendario_padrao
+
+        calendario = calendario_padrao()
 
         for numero in range(1, self.numero_parcelas + 1):
             # Se ate_mes_atual=True, parar quando vencimento ultrapassar o mês atual
@@ -855,12 +860,14 @@ class Contrato(TimeStampedModel):
                 mes=proximo_mes.month,
                 ano=proximo_mes.year,
                 ajustar_feriado=True,
-                ajustar_fim_semana=False  # Boletos podem vencer em fins de semana
+                ajustar_fim_semana=False,  # Boletos podem vencer em fins de semana
+                calendario=calendario,
             )
 
         # bulk_create: contratos de 360 meses geravam 360 INSERTs individuais —
         # em banco remoto (Supabase) isso domina o tempo de criação do contrato
         Parcela.objects.bulk_create(parcelas_criadas, batch_size=500)
+        ResumoRecebiveisMensal.atualizar_parcelas(parcelas_criadas)
 
         return parcelas_criadas
 
@@ -875,7 +882,9 @@ class Contrato(TimeStampedModel):
             list[int]: Números das parcelas criadas
         """
         from financeiro.models import Parcela
-        from contratos.utils import ajustar_data_vencimento
+        from contratos.utils import ajustar_data_vencimento, calendario_padrao
+
+        calendario = calendario_padrao()
 
         existentes = set(self.parcelas.values_list('numero_parcela', flat=True))
         if len(existentes) >= self.numero_parcelas:
@@ -906,6 +915,7 @@ class Contrato(TimeStampedModel):
                 ano=proximo_mes.year,
                 ajustar_feriado=True,
                 ajustar_fim_semana=False,
+                calendario=calendario,
             )
 
         return criados
@@ -922,7 +932,7 @@ class Contrato(TimeStampedModel):
         Args:
             base_pv: Valor presente base. Se None, usa valor_financiado.
         """
-        from financeiro.models import Parcela as ParcelaModel, Reajuste, TipoParcela
+        from financeiro.models import Parcela as ParcelaModel, Reajuste, ResumoRecebiveisMensal, TipoParcela
 
         pv = base_pv if base_pv is not None else self.valor_financiado
         if pv <= 0 or self.numero_parcelas <= 0:
@@ -956,6 +966,7 @@ class Contrato(TimeStampedModel):
         ParcelaModel.objects.bulk_update(
             updates, ['valor_original', 'valor_atual', 'amortizacao', 'juros_embutido']
         )
+        ResumoRecebiveisMensal.atualizar_parcelas(updates)
 
         # Atualizar valor_parcela_original no contrato
         if updates:
@@ -1118,10 +1129,155 @@ class Contrato(TimeStampedModel):
         """
         return ((numero_parcela - 1) // self.prazo_reajuste_meses) + 1
 
+    # Campos cujo save recalcula o bloqueio por reajuste (ciclo_reajuste_atual
+    # acompanha a aplicação/desfazimento de reajustes)
+    CAMPOS_BLOQUEIO_REAJUSTE = (
+        'data_contrato', 'prazo_reajuste_meses', 'numero_parcelas', 'tipo_correcao', 'ciclo_reajuste_atual',
+    )
+
+    def _calcular_bloqueio(self, hoje, ciclos_aplicados):
+        """
+        Bloqueio por reajuste na data: (ciclo_bloqueado, valido_ate).
+
+        ciclo_bloqueado: primeiro ciclo vencido (hoje >= aniversário) e não
+        aplicado, ou None. valido_ate: próximo aniversário ainda não vencido,
+        a partir do qual o resultado pode mudar (None = só muda com um novo
+        Reajuste aplicado/removido).
+        """
+        if self.tipo_correcao == TipoCorrecao.FIXO:
+            return None, None
+
+        prazo = self.prazo_reajuste_meses or 12
+        total_ciclos = (self.numero_parcelas - 1) // prazo + 1
+        for ciclo in range(2, total_ciclos + 1):
+            data_reajuste = self.data_contrato + relativedelta(months=(ciclo - 1) * prazo)
+            if hoje < data_reajuste:
+                return None, data_reajuste
+            if ciclo not in ciclos_aplicados:
+                return ciclo, None
+        return None, None
+
+    def _definir_bloqueio(self, hoje, ciclos_aplicados):
+        """Preenche os campos de bloqueio materializado (sem salvar); retorna os campos alterados."""
+        ciclo, valido_ate = self._calcular_bloqueio(hoje, ciclos_aplicados)
+        prazo = self.prazo_reajuste_meses or 12
+        self.ciclo_bloqueado_reajuste = ciclo
+        self.parcela_bloqueada_a_partir = (ciclo - 1) * prazo + 1 if ciclo else None
+        self.bloqueio_calculado_em = hoje
+        self.bloqueio_valido_ate = valido_ate
+        return ['ciclo_bloqueado_reajuste', 'parcela_bloqueada_a_partir',
+                'bloqueio_calculado_em', 'bloqueio_valido_ate']
+
+    def atualizar_bloqueio_reajuste(self, ciclos_aplicados=None):
+        """
+        Recalcula e grava o bloqueio por reajuste materializado.
+
+        Chamado ao aplicar/remover um Reajuste (contratos.signals), ao salvar
+        o contrato e pela tarefa diária atualizar_bloqueios_reajuste (virada de
+        data). Grava com update() — não passa por save()/full_clean().
+        """
+        from django.utils import timezone as tz
+
+        if ciclos_aplicados is None:
+            ciclos_aplicados = self._ciclos_aplicados()
+        campos = self._definir_bloqueio(tz.now().date(), ciclos_aplicados)
+        type(self).objects.filter(pk=self.pk).update(**{campo: getattr(self, campo) for campo in campos})
+
+    @classmethod
+    def atualizar_bloqueios_reajuste(cls, contratos=None, lote=500):
+        """
+        Recalcula o bloqueio materializado em lote: contratos nunca calculados
+        ou cuja validade venceu (virada de data), ou os informados.
+
+        Uma consulta de contratos e uma de Reajustes aplicados por lote.
+
+        Returns:
+            int: quantidade de contratos recalculados.
+        """
+        from django.utils import timezone as tz
+        from financeiro.models import Reajuste
+
+        hoje = tz.now().date()
+        if contratos is None:
+            contratos = cls.objects.filter(cls._q_bloqueio_desatualizado(hoje))
+        if isinstance(contratos, models.QuerySet):
+            contratos = contratos.only(
+                'id', 'tipo_correcao', 'prazo_reajuste_meses', 'numero_parcelas', 'data_contrato',
+            ).order_by('pk')
+
+        total = 0
+        contratos = iter(contratos)
+        while True:
+            bloco = [c for _, c in zip(range(lote), contratos)]
+            if not bloco:
+                break
+            aplicados = {}
+            for contrato_id, ciclo in Reajuste.objects.filter(
+                contrato_id__in=[c.pk for c in bloco], aplicado=True,
+            ).values_list('contrato_id', 'ciclo'):
+                aplicados.setdefault(contrato_id, set()).add(ciclo)
+            campos = None
+            for contrato in bloco:
+                campos = contrato._definir_bloqueio(hoje, aplicados.get(contrato.pk, set()))
+            cls.objects.bulk_update(bloco, campos)
+            total += len(bloco)
+        return total
+
+    @staticmethod
+    def _q_bloqueio_desatualizado(hoje):
+        """Contratos cujo bloqueio materializado não vale para a data."""
+        return (
+            models.Q(bloqueio_calculado_em__isnull=True)
+            | models.Q(bloqueio_calculado_em__gt=hoje)
+            | models.Q(bloqueio_valido_ate__lte=hoje)
+        )
+
+    @classmethod
+    def garantir_bloqueios_reajuste(cls, contratos):
+        """
+        Recalcula só os contratos do queryset `contratos` com o bloqueio
+        materializado desatualizado — chamado antes de filtrar parcelas por
+        Parcela.objects.liberadas_reajuste(). Uma consulta quando está tudo em dia.
+        """
+        from django.utils import timezone as tz
+
+        return cls.atualizar_bloqueios_reajuste(
+            contratos.filter(cls._q_bloqueio_desatualizado(tz.now().date()))
+        )
+
+    def motivo_bloqueio_reajuste(self):
+        """Mensagem do bloqueio materializado (ciclo_bloqueado_reajuste), ou '' se não há."""
+        ciclo = self.ciclo_bloqueado_reajuste
+        if not ciclo:
+            return ''
+        prazo = self.prazo_reajuste_meses or 12
+        data_reajuste = self.data_contrato + relativedelta(months=(ciclo - 1) * prazo)
+        return (
+            f"Reajuste do ciclo {ciclo} pendente desde "
+            f"{data_reajuste.strftime('%d/%m/%Y')}. "
+            f"Execute o reajuste antes de gerar boletos."
+        )
+
+    def _ciclos_aplicados(self):
+        if not self.pk:
+            return set()
+        from financeiro.models import Reajuste
+        return set(Reajuste.objects.filter(contrato=self, aplicado=True).values_list('ciclo', flat=True))
+
+    def _bloqueio_vigente(self, hoje):
+        """True se o bloqueio materializado vale para a data (calculado e não vencido)."""
+        calculado_em = self.bloqueio_calculado_em
+        return (
+            calculado_em is not None and calculado_em <= hoje
+            and (self.bloqueio_valido_ate is None or hoje < self.bloqueio_valido_ate)
+        )
+
     def get_primeiro_ciclo_bloqueado(self):
         """
         Retorna o número do primeiro ciclo cujo reajuste já venceu mas não foi aplicado.
 
+        Usa o bloqueio materializado quando vigente; senão percorre os ciclos.
+
         Returns:
             int | None: número do ciclo bloqueado, ou None se não há bloqueio.
         """
@@ -1132,6 +1288,8 @@ class Contrato(TimeStampedModel):
         from django.utils import timezone as tz
 
         hoje = tz.now().date()
+        if self._bloqueio_vigente(hoje):
+            return self.ciclo_bloqueado_reajuste
         total_ciclos = (self.numero_parcelas - 1) // prazo + 1
 
         for ciclo in range(2, total_ciclos + 1):
@@ -1178,6 +1336,13 @@ class Contrato(TimeStampedModel):
 
         hoje = tz.now().date()
 
+        if ciclos_aplicados is None and self._bloqueio_vigente(hoje):
+            # Bloqueio materializado: bloqueada a partir do primeiro ciclo pendente
+            ciclo_bloqueado = self.ciclo_bloqueado_reajuste
+            if ciclo_bloqueado and ciclo_parcela >= ciclo_bloqueado:
+                return False, self.motivo_bloqueio_reajuste()
+            return True, f"Reajuste do ciclo {ciclo_parcela} aplicado."
+
         # Verifica em cascata do ciclo 2 até o ciclo desta parcela
         for ciclo_check in range(2, ciclo_parcela + 1):
             data_reajuste = self.data_contrato + relativedelta(months=(ciclo_check - 1) * prazo)
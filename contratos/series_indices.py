@@ -0,0 +1,172 @@
+"""
+Cache em processo das séries de índices econômicos (IndiceReajuste).
+
+Cada tipo de índice (IPCA, IGPM, ...) vira uma SerieIndice com arrays mensais
+densos — variação, número-índice, produto acumulado dos fatores e contagem
+acumulada de meses presentes. Com isso acumulado de período e checagem de
+meses faltantes são aritmética O(1), sem consulta por mês.
+
+Versionamento: a versão de cada tipo fica no cache do Django e é trocada
+pelos signals de IndiceReajuste (save/delete) e por invalidar_serie_indice,
+chamado pelas importações em lote (bulk_create/bulk_update não disparam
+signals). Uma série local com versão diferente é recarregada (1 consulta).
+INDICES_SERIE_CACHE_TTL limita a idade da série quando o cache do Django não é
+compartilhado entre processos (LocMem).
+
+Desenvolvedor: Maxwell da Silva Oliveira
+"""
+import time
+import uuid
+from decimal import Decimal, localcontext
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Precisão dos produtos acumulados: cada fator mensal tem até 6 casas, então o
+# produto de décadas de meses é exato e a razão entre dois acumulados é o
+# produto exato dos meses do intervalo.
+_PRECISAO_PRODUTO = 10_000
+
+_SERIES = {}
+
+
+def _chave_versao(tipo_indice: str) -> str:
+    return f'indices:serie:versao:{tipo_indice}'
+
+
+def _ttl() -> int:
+    try:
+        return max(int(getattr(settings, 'INDICES_SERIE_CACHE_TTL', 300)), 0)
+    except (TypeError, ValueError):
+        return 300
+
+
+def _mes_ordinal(ano: int, mes: int) -> int:
+    return ano * 12 + mes - 1
+
+
+class SerieIndice:
+    """Série mensal de um tipo de índice, em arrays densos a partir do 1º mês cadastrado."""
+
+    def __init__(self, tipo_indice: str, registros, versao=None):
+        """
+        Args:
+            tipo_indice: Tipo do índice
+            registros: (ano, mes, valor, numero_indice) em ordem cronológica
+            versao: Versão do cache no momento da leitura
+        """
+        self.tipo_indice = tipo_indice
+        self.versao = versao
+        self.carregada_em = time.monotonic()
+
+        registros = list(registros)
+        self.inicio = _mes_ordinal(registros[0][0], registros[0][1]) if registros else 0
+        tamanho = (_mes_ordinal(registros[-1][0], registros[-1][1]) - self.inicio + 1) if registros else 0
+
+        self._valores = [None] * tamanho
+        self._numeros = [None] * tamanho
+        for ano, mes, valor, numero_indice in registros:
+            posicao = _mes_ordinal(ano, mes) - self.inicio
+            self._valores[posicao] = valor
+            self._numeros[posicao] = numero_indice
+
+        # _produtos[i] = produto de (1 + v/100) dos i primeiros meses (ausente = 1)
+        # _presentes[i] = meses com valor entre os i primeiros
+        self._produtos = [Decimal(1)]
+        self._presentes = [0]
+        with localcontext(prec=_PRECISAO_PRODUTO):
+            for valor in self._valores:
+                fator = 1 + valor / 100 if valor is not None else 1
+                self._produtos.append(self._produtos[-1] * fator)
+                self._presentes.append(self._presentes[-1] + (valor is not None))
+
+    def _faixa(self, ano_inicio, mes_inicio, ano_fim, mes_fim) -> Tuple[int, int]:
+        """Posições [ini, fim) do período recortadas aos limites da série."""
+        tamanho = len(self._valores)
+        ini = min(max(_mes_ordinal(ano_inicio, mes_inicio) - self.inicio, 0), tamanho)
+        fim = min(max(_mes_ordinal(ano_fim, mes_fim) - self.inicio + 1, 0), tamanho)
+        return ini, max(fim, ini)
+
+    def _posicao(self, ano: int, mes: int) -> Optional[int]:
+        posicao = _mes_ordinal(ano, mes) - self.inicio
+        return posicao if 0 <= posicao < len(self._valores) else None
+
+    def valor(self, ano: int, mes: int) -> Optional[Decimal]:
+        """Variação do mês (%), ou None se não cadastrada."""
+        posicao = self._posicao(ano, mes)
+        return self._valores[posicao] if posicao is not None else None
+
+    def numero_indice(self, ano: int, mes: int) -> Optional[Decimal]:
+        posicao = self._posicao(ano, mes)
+        return self._numeros[posicao] if posicao is not None else None
+
+    def meses_presentes(self, ano_inicio, mes_inicio, ano_fim, mes_fim) -> int:
+        ini, fim = self._faixa(ano_inicio, mes_inicio, ano_fim, mes_fim)
+        return self._presentes[fim] - self._presentes[ini]
+
+    def meses_faltantes(self, ano_inicio, mes_inicio, ano_fim, mes_fim) -> List[Tuple[int, int]]:
+        """(ano, mes) sem índice no período; O(1) quando o período está completo."""
+        total = _mes_ordinal(ano_fim, mes_fim) - _mes_ordinal(ano_inicio, mes_inicio) + 1
+        if total <= 0 or self.meses_presentes(ano_inicio, mes_inicio, ano_fim, mes_fim) == total:
+            return []
+        faltantes = []
+        for ordinal in range(_mes_ordinal(ano_inicio, mes_inicio), _mes_ordinal(ano_fim, mes_fim) + 1):
+            ano, mes = divmod(ordinal, 12)
+            if self.valor(ano, mes + 1) is None:
+                faltantes.append((ano, mes + 1))
+        return faltantes
+
+    def acumulado(self, ano_inicio, mes_inicio, ano_fim, mes_fim) -> Optional[Decimal]:
+        """
+        Acumulado do período (%), com as regras de IndiceReajuste.get_acumulado_periodo:
+        número-índice C(fim) / C(mês anterior ao início) − 1 quando os dois
+        existem; senão o produto das variações dos meses cadastrados no período
+        (None se não houver nenhum).
+        """
+        base_ano, base_mes = divmod(_mes_ordinal(ano_inicio, mes_inicio) - 1, 12)
+        ci = self.numero_indice(base_ano, base_mes + 1)
+        cf = self.numero_indice(ano_fim, mes_fim)
+        if ci and cf:
+            return (Decimal(str(cf)) / Decimal(str(ci)) - 1) * 100
+
+        ini, fim = self._faixa(ano_inicio, mes_inicio, ano_fim, mes_fim)
+        if self._presentes[fim] == self._presentes[ini]:
+            return None
+        with localcontext(prec=_PRECISAO_PRODUTO):
+            fator = self._produtos[fim] / self._produtos[ini]
+        return (fator - 1) * 100
+
+
+def serie_indice(tipo_indice: str) -> SerieIndice:
+    """
+    Série do tipo de índice, do cache do processo; recarrega do banco se a
+    versão mudou ou se passou de INDICES_SERIE_CACHE_TTL segundos.
+    """
+    from contratos.models import IndiceReajuste
+
+    versao = cache.get(_chave_versao(tipo_indice))
+    serie = _SERIES.get(tipo_indice)
+    if (serie is not None and serie.versao == versao
+            and time.monotonic() - serie.carregada_em < _ttl()):
+        return serie
+
+    registros = IndiceReajuste.objects.filter(tipo_indice=tipo_indice).order_by(
+        'ano', 'mes'
+    ).values_list('ano', 'mes', 'valor', 'numero_indice')
+    serie = SerieIndice(tipo_indice, registros, versao=versao)
+    _SERIES[tipo_indice] = serie
+    return serie
+
+
+def invalidar_serie_indice(tipo_indice: str):
+    """Descarta a série do tipo neste processo e troca a versão para os demais."""
+    _SERIES.pop(tipo_indice, None)
+    # Versão aleatória (não contador): se a chave for despejada do cache, a
+    # versão lida passa a ser None e nenhuma série antiga coincide com ela
+    cache.set(_chave_versao(tipo_indice), uuid.uuid4().hex, timeout=None)
+
+
+def limpar_series_indices():
+    """Descarta todas as séries carregadas neste processo."""
+    _SERIES.clear()
@@ -0,0 +1,35 @@
+"""
+Signals do app contratos.
+
+Gravação/remoção de IndiceReajuste invalida a série em cache do tipo
+(contratos.series_indices) — já na hora, para a própria transação, e de novo
+no commit, para quem recarregou a série antes de os dados ficarem visíveis.
+
+Gravação/remoção de Reajuste recalcula o bloqueio por reajuste materializado
+do contrato (Contrato.atualizar_bloqueio_reajuste).
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from contratos.models import Contrato, IndiceReajuste
+from contratos.series_indices import invalidar_serie_indice
+
+
+@receiver(post_save, sender=IndiceReajuste)
+@receiver(post_delete, sender=IndiceReajuste)
+def invalidar_serie_ao_gravar_indice(sender, instance, **kwargs):
+    invalidar_serie_indice(instance.tipo_indice)
+    transaction.on_commit(lambda: invalidar_serie_indice(instance.tipo_indice))
+
+
+@receiver(post_save, sender='financeiro.Reajuste')
+@receiver(post_delete, sender='financeiro.Reajuste')
+def atualizar_bloqueio_ao_gravar_reajuste(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    try:
+        contrato = instance.contrato
+    except Contrato.DoesNotExist:
+        return  # contrato removido em cascata
+    contrato.atualizar_bloqueio_reajuste()
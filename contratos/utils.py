@@ -1,13 +1,19 @@
 """
 Utilitarios para o app contratos
 
+Calendario de dias uteis: CalendarioDiasUteis precomputa, por ano, o conjunto
+de feriados e um acumulado de dias uteis — eh_dia_util em O(1) e contagem de
+dias uteis entre duas datas por subtracao. calendario_padrao() devolve a
+instancia compartilhada (feriados nacionais + settings.FERIADOS_LOCAIS).
+
 Desenvolvedor: Maxwell da Silva Oliveira
 Email: maxwbh@gmail.com
 Empresa: M&S do Brasil LTDA
 """
 from datetime import date, timedelta
-from calendar import monthrange
-from typing import Optional, List, Tuple
+from calendar import isleap, monthrange
+from functools import lru_cache
+from typing import Iterable, Optional, List, Tuple
 
 
 # Feriados nacionais fixos (dia, mes)
@@ -51,16 +57,9 @@ def calcular_pascoa(ano: int) -> date:
     return date(ano, mes, dia)
 
 
-def obter_feriados_ano(ano: int) -> List[date]:
-    """
-    Retorna lista de feriados nacionais de um ano.
-
-    Args:
-        ano: Ano para obter feriados
-
-    Returns:
-        Lista de datas de feriados
-    """
+@lru_cache(maxsize=256)
+def _feriados_nacionais(ano: int) -> Tuple[date, ...]:
+    """Feriados nacionais do ano, ordenados (calculados uma vez por ano)."""
     feriados = []
 
     # Feriados fixos
@@ -83,7 +82,118 @@ def obter_feriados_ano(ano: int) -> List[date]:
     corpus_christi = pascoa + timedelta(days=60)
     feriados.append(corpus_christi)
 
-    return sorted(feriados)
+    return tuple(sorted(feriados))
+
+
+def obter_feriados_ano(ano: int) -> List[date]:
+    """
+    Retorna lista de feriados nacionais de um ano.
+
+    Args:
+        ano: Ano para obter feriados
+
+    Returns:
+        Lista de datas de feriados
+    """
+    return list(_feriados_nacionais(ano))
+
+
+class CalendarioDiasUteis:
+    """
+    Calendario de dias uteis (seg-sex, exceto feriados) com dados precomputados.
+
+    Por ano, calculados na primeira consulta e reaproveitados:
+      - conjunto de feriados (nacionais + extras) -> eh_feriado/eh_dia_util em O(1)
+      - acumulado[i] = dias uteis nos i primeiros dias do ano -> dias_uteis_entre
+        por subtracao, sem percorrer o intervalo dia a dia
+
+    Args:
+        feriados_extras: Feriados estaduais/municipais. Aceita date (data
+            unica), tupla (dia, mes) ou texto 'DD/MM' (todo ano) e 'AAAA-MM-DD'.
+    """
+
+    def __init__(self, feriados_extras: Iterable = ()):
+        self._fixos_extras = set()
+        self._datas_extras = set()
+        for feriado in feriados_extras:
+            if isinstance(feriado, date):
+                self._datas_extras.add(feriado)
+            elif isinstance(feriado, str):
+                texto = feriado.strip()
+                if not texto:
+                    continue
+                if '/' in texto:
+                    dia, mes = texto.split('/')
+                    self._fixos_extras.add((int(dia), int(mes)))
+                else:
+                    self._datas_extras.add(date.fromisoformat(texto))
+            else:
+                dia, mes = feriado
+                self._fixos_extras.add((int(dia), int(mes)))
+        self._anos = {}
+
+    def _dados_ano(self, ano: int):
+        """(feriados, acumulado) do ano, calculados na primeira consulta."""
+        dados = self._anos.get(ano)
+        if dados is None:
+            feriados = set(_feriados_nacionais(ano))
+            for dia, mes in self._fixos_extras:
+                if dia <= monthrange(ano, mes)[1]:
+                    feriados.add(date(ano, mes, dia))
+            feriados.update(d for d in self._datas_extras if d.year == ano)
+
+            primeiro = date(ano, 1, 1)
+            acumulado = [0]
+            for i in range(366 if isleap(ano) else 365):
+                dia = primeiro + timedelta(days=i)
+                util = dia.weekday() < 5 and dia not in feriados
+                acumulado.append(acumulado[-1] + util)
+
+            dados = (frozenset(feriados), acumulado)
+            self._anos[ano] = dados
+        return dados
+
+    def feriados(self, ano: int) -> frozenset:
+        """Feriados (nacionais + extras) do ano."""
+        return self._dados_ano(ano)[0]
+
+    def eh_feriado(self, data: date) -> bool:
+        return data in self._dados_ano(data.year)[0]
+
+    def eh_dia_util(self, data: date) -> bool:
+        return data.weekday() < 5 and data not in self._dados_ano(data.year)[0]
+
+    def proximo_dia_util(self, data: date) -> date:
+        """A propria data, se for dia util; senao o primeiro dia util seguinte."""
+        while not self.eh_dia_util(data):
+            data += timedelta(days=1)
+        return data
+
+    def dias_uteis_entre(self, data_inicio: date, data_fim: date) -> int:
+        """Dias uteis de `data_inicio` a `data_fim`, inclusive as duas; 0 se invertidas."""
+        if data_inicio > data_fim:
+            return 0
+        # acumulado[n] = dias uteis do ano ate o n-esimo dia (inclusive)
+        total = -self._dados_ano(data_inicio.year)[1][data_inicio.timetuple().tm_yday - 1]
+        for ano in range(data_inicio.year, data_fim.year):
+            total += self._dados_ano(ano)[1][-1]
+        return total + self._dados_ano(data_fim.year)[1][data_fim.timetuple().tm_yday]
+
+
+@lru_cache(maxsize=32)
+def _calendario(feriados_extras: Tuple) -> CalendarioDiasUteis:
+    return CalendarioDiasUteis(feriados_extras)
+
+
+def calendario_padrao() -> CalendarioDiasUteis:
+    """
+    Calendario compartilhado do sistema: feriados nacionais mais os de
+    settings.FERIADOS_LOCAIS (estaduais/municipais). Uma instancia por
+    configuracao, reaproveitada entre chamadas.
+    """
+    from django.conf import settings
+
+    return _calendario(tuple(getattr(settings, 'FERIADOS_LOCAIS', None) or ()))
 
 
 def eh_dia_util(data: date, feriados: Optional[List[date]] = None) -> bool:
@@ -92,19 +202,18 @@ def eh_dia_util(data: date, feriados: Optional[List[date]] = None) -> bool:
 
     Args:
         data: Data a verificar
-        feriados: Lista de feriados (opcional, calcula se nao informado)
+        feriados: Lista de feriados (opcional, usa calendario_padrao se nao informado)
 
     Returns:
         True se for dia util
     """
+    if feriados is None:
+        return calendario_padrao().eh_dia_util(data)
+
     # Fim de semana (sabado=5, domingo=6)
     if data.weekday() >= 5:
         return False
 
-    # Feriados
-    if feriados is None:
-        feriados = obter_feriados_ano(data.year)
-
     return data not in feriados
 
 
@@ -113,12 +222,13 @@ def ajustar_data_vencimento(
     mes: int,
     ano: int,
     ajustar_feriado: bool = True,
-    ajustar_fim_semana: bool = True
+    ajustar_fim_semana: bool = True,
+    calendario: Optional[CalendarioDiasUteis] = None,
 ) -> Tuple[date, str]:
     """
     Ajusta a data de vencimento considerando:
     - Meses com menos dias que o dia desejado
-    - Feriados nacionais
+    - Feriados nacionais (e locais do calendario)
     - Fins de semana
 
     Item 2.3 do Roadmap: Ajuste de vencimento para meses com menos dias + feriados.
@@ -129,10 +239,13 @@ def ajustar_data_vencimento(
         ano: Ano
         ajustar_feriado: Se True, ajusta para proximo dia util se cair em feriado
         ajustar_fim_semana: Se True, ajusta para proximo dia util se cair em fim de semana
+        calendario: Calendario de dias uteis (padrao: calendario_padrao())
 
     Returns:
         Tuple (data_ajustada, motivo_ajuste ou None)
     """
+    calendario = calendario or calendario_padrao()
+
     # Obter ultimo dia do mes
     ultimo_dia_mes = monthrange(ano, mes)[1]
 
@@ -145,34 +258,23 @@ def ajustar_data_vencimento(
 
     data_vencimento = date(ano, mes, dia_real)
 
-    # Obter feriados do ano
-    feriados = obter_feriados_ano(ano)
-
     # Ajustar para proximo dia util se necessario
     ajustes = []
     while True:
-        ajustado = False
-
         # Verificar fim de semana
         if ajustar_fim_semana and data_vencimento.weekday() >= 5:
             dia_semana = 'sabado' if data_vencimento.weekday() == 5 else 'domingo'
             ajustes.append(f'cai em {dia_semana}')
             data_vencimento += timedelta(days=1)
-            ajustado = True
             continue
 
         # Verificar feriado
-        if ajustar_feriado and data_vencimento in feriados:
+        if ajustar_feriado and calendario.eh_feriado(data_vencimento):
             ajustes.append('cai em feriado')
             data_vencimento += timedelta(days=1)
-            ajustado = True
-            # Atualizar feriados se mudou de ano
-            if data_vencimento.year != ano:
-                feriados = obter_feriados_ano(data_vencimento.year)
             continue
 
-        if not ajustado:
-            break
+        break
 
     if ajustes:
         motivo_ajuste = ', '.join(ajustes)
@@ -186,7 +288,7 @@ def ajustar_data_vencimento(
 
 def proximo_dia_util(data: date) -> date:
     """
-    Retorna o proximo dia util a partir de uma data.
+    Retorna o proximo dia util a partir de uma data (a propria, se for util).
 
     Args:
         data: Data inicial
@@ -194,17 +296,12 @@ def proximo_dia_util(data: date) -> date:
     Returns:
         Proximo dia util
     """
-    feriados = obter_feriados_ano(data.year)
-    while not eh_dia_util(data, feriados):
-        data += timedelta(days=1)
-        if data.year != data.year:
-            feriados = obter_feriados_ano(data.year)
-    return data
+    return calendario_padrao().proximo_dia_util(data)
 
 
 def dias_uteis_entre(data_inicio: date, data_fim: date) -> int:
     """
-    Conta os dias uteis entre duas datas.
+    Conta os dias uteis entre duas datas (inclusive).
 
     Args:
         data_inicio: Data inicial
@@ -213,18 +310,4 @@ def dias_uteis_entre(data_inicio: date, data_fim: date) -> int:
     Returns:
         Numero de dias uteis
     """
-    if data_inicio > data_fim:
-        return 0
-
-    feriados = set()
-    for ano in range(data_inicio.year, data_fim.year + 1):
-        feriados.update(obter_feriados_ano(ano))
-
-    dias = 0
-    data = data_inicio
-    while data <= data_fim:
-        if eh_dia_util(data, list(feriados)):
-            dias += 1
-        data += timedelta(days=1)
-
-    return dias
+    return calendario_padrao().dias_uteis_entre(data_inicio, data_fim)
@@ -1118,6 +1118,11 @@ def importar_indices_ibge(request):
                 batch_size=100
             )
 
+        # bulk_create/bulk_update não disparam signals: invalida a série em cache
+        if to_create or to_update:
+            from contratos.series_indices import invalidar_serie_indice
+            invalidar_serie_indice(tipo_indice)
+
         # Limpeza de itens inválidos após sobrescrita: numa importação completa,
         # qualquer registro NÃO atualizado por esta rodada (data_importacao != now)
         # que ainda seja fictício (teste) ou tenha valor zero é resíduo inválido
@@ -1915,10 +1920,16 @@ def api_preview_parcelas(request):
         preview_count = min(numero_parcelas, 24)
 
         if tipo_amortizacao == TipoAmortizacao.SAC:
-            # Pré-calcular tabela SAC completa para os primeiros 24
-            tabela_full = _P._calcular_sac_tabela(base_pmt, juros_ciclo1, numero_parcelas)
-            tabela_preview = tabela_full[:preview_count]
-            pmt_ref = tabela_full[0][0] if tabela_full else D('0')
+            # Tabela SAC completa em centavos; só as linhas exibidas viram Decimal
+            from financeiro.services.amortizacao import SAC, tabelas_em_lote
+            pmts, amorts, juros = tabelas_em_lote(
+                [(base_pmt, juros_ciclo1, numero_parcelas)], SAC, em_centavos=True
+            )[0]
+            tabela_preview = [
+                (D(pmt).scaleb(-2), D(amort).scaleb(-2), D(jur).scaleb(-2))
+                for pmt, amort, jur in zip(pmts, amorts, juros[:preview_count])
+            ]
+            pmt_ref = tabela_preview[0][0] if tabela_preview else D('0')
         else:
             # Price: PMT constante para ciclo 1
             pmt_ref = _P._calcular_pmt(base_pmt, juros_ciclo1, numero_parcelas)
@@ -2262,10 +2273,13 @@ class ContratoWizardView(LoginRequiredMixin, View):
         if numero_parcelas > 0:
             from financeiro.models import Reajuste as _P
             if tipo_amortizacao == TipoAmortizacao.SAC:
-                # PMT do primeiro período SAC (o maior)
-                tabela = _P._calcular_sac_tabela(base_pmt, taxa_ciclo1, numero_parcelas)
-                pmt_ciclo1 = tabela[0][0] if tabela else D('0')
-                pmt_ultimo = tabela[-1][0] if tabela else D('0')
+                # PMT do primeiro período SAC (o maior) e do último, direto em centavos
+                from financeiro.services.amortizacao import SAC, tabelas_em_lote
+                pmts, _, _ = tabelas_em_lote(
+                    [(base_pmt, taxa_ciclo1, numero_parcelas)], SAC, em_centavos=True
+                )[0]
+                pmt_ciclo1 = D(pmts[0]).scaleb(-2) if pmts else D('0')
+                pmt_ultimo = D(pmts[-1]).scaleb(-2) if pmts else D('0')
             else:
                 pmt_ciclo1 = _P._calcular_pmt(base_pmt, taxa_ciclo1, numero_parcelas)
                 pmt_ultimo = pmt_ciclo1  # Price: PMT constante por ciclo
@@ -0,0 +1,240 @@
+"""
+Índice da busca global (core.views.api_busca_global).
+
+A busca fazia icontains com OR sobre Contrato, Comprador e Imovel (mais os
+joins com comprador e imóvel); LIKE '%termo%' não usa índice, então cada
+tecla na caixa de busca eram três varreduras completas.
+
+IndiceBusca guarda, por objeto, o texto pesquisável já normalizado —
+minúsculas, sem acentos, CPF/CNPJ e número do contrato também só com
+dígitos. Os candidatos saem de um índice:
+
+- PostgreSQL (BUSCA_GLOBAL_PG_TRGM): índice GIN gin_trgm_ops em
+  IndiceBusca.texto, usado pelo próprio LIKE; a similaridade de trigramas
+  entra no ranking.
+- Demais bancos: TrigramaBusca (trigrama → entrada), mantida junto com o
+  índice; só entram as entradas que têm todos os trigramas do termo.
+
+O LIKE sobre o texto normalizado confirma o casamento. O índice é mantido
+pelos signals de core.signals; `reconstruir_indice_busca` refaz tudo.
+
+Desenvolvedor: Maxwell da Silva Oliveira
+"""
+import re
+import unicodedata
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Count, FloatField, Func, IntegerField, Q, Value, When
+
+CONTRATO = 'contrato'
+COMPRADOR = 'comprador'
+IMOVEL = 'imovel'
+
+# tipo: (app, modelo, campos lidos com values())
+FONTES = {
+    CONTRATO: ('contratos', 'Contrato', (
+        'numero_contrato', 'data_contrato', 'comprador__nome',
+        'imovel__identificacao', 'imovel__loteamento',
+    )),
+    COMPRADOR: ('core', 'Comprador', ('nome', 'cpf', 'cnpj', 'email')),
+    IMOVEL: ('core', 'Imovel', ('identificacao', 'loteamento', 'cidade')),
+}
+
+# Campos cuja alteração muda o texto indexado de cada modelo
+CAMPOS_INDEXADOS = {
+    CONTRATO: {'numero_contrato', 'data_contrato', 'comprador', 'comprador_id', 'imovel', 'imovel_id'},
+    COMPRADOR: {'nome', 'cpf', 'cnpj', 'email'},
+    IMOVEL: {'identificacao', 'loteamento', 'cidade'},
+}
+
+_LOTE = 1000
+_RE_ESPACOS = re.compile(r'\s+')
+_RE_DOCUMENTO = re.compile(r'^[\d\s./-]+$')
+_RE_NAO_DIGITO = re.compile(r'\D')
+
+
+def normalizar(texto):
+    """Minúsculas, sem acentos e com espaços colapsados."""
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return _RE_ESPACOS.sub(' ', texto).strip().lower()
+
+
+def _digitos(texto):
+    return _RE_NAO_DIGITO.sub('', texto or '')
+
+
+def termo_busca(q):
+    """
+    Termo normalizado da consulta. Números digitados com pontuação
+    (123.456.789-00, 001/2024) viram só os dígitos, que também estão no índice.
+    """
+    termo = normalizar(q)
+    if _RE_DOCUMENTO.match(termo):
+        digitos = _digitos(termo)
+        if len(digitos) >= 2:
+            return digitos
+    return termo
+
+
+def trigramas(texto):
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def trigrama_nativo():
+    """True quando a busca usa o índice pg_trgm em vez de TrigramaBusca."""
+    return connection.vendor == 'postgresql' and getattr(settings, 'BUSCA_GLOBAL_PG_TRGM', True)
+
+
+def _documento(tipo, row):
+    """(titulo, texto, data) de uma linha de values() de FONTES[tipo]."""
+    data = None
+    if tipo == CONTRATO:
+        numero = row['numero_contrato']
+        titulo, data = numero, row['data_contrato']
+        partes = [numero, _digitos(numero), row['comprador__nome'],
+                  row['imovel__identificacao'], row['imovel__loteamento']]
+    elif tipo == COMPRADOR:
+        titulo = row['nome']
+        partes = [row['nome'], row['cpf'], _digitos(row['cpf']),
+                  row['cnpj'], _digitos(row['cnpj']), row['email']]
+    else:
+        titulo = row['identificacao']
+        partes = [row['identificacao'], row['loteamento'], row['cidade']]
+    texto = ' | '.join(p for p in (normalizar(p) for p in partes) if p)
+    return normalizar(titulo)[:255], texto, data
+
+
+def indexar(tipo, ids, apps=django_apps):
+    """
+    Atualiza as entradas de `tipo` para os objetos `ids`: grava só as que
+    mudaram e remove as de objetos que não existem mais.
+
+    `apps` permite o uso em migrações (modelos históricos).
+    """
+    app_label, modelo, campos = FONTES[tipo]
+    Modelo = apps.get_model(app_label, modelo)
+    IndiceBusca = apps.get_model('core', 'IndiceBusca')
+    TrigramaBusca = apps.get_model('core', 'TrigramaBusca')
+    nativo = trigrama_nativo()
+
+    ids = list(dict.fromkeys(ids))
+    for inicio in range(0, len(ids), _LOTE):
+        lote = ids[inicio:inicio + _LOTE]
+        novos = {
+            row['pk']: _documento(tipo, row)
+            for row in Modelo.objects.filter(pk__in=lote).values('pk', *campos)
+        }
+        atuais = {
+            objeto_id: (titulo, texto, data)
+            for objeto_id, titulo, texto, data in IndiceBusca.objects.filter(
+                tipo=tipo, objeto_id__in=lote
+            ).values_list('objeto_id', 'titulo', 'texto', 'data')
+        }
+        alterados = {pk: doc for pk, doc in novos.items() if atuais.get(pk) != doc}
+        removidos = set(atuais) - set(novos)
+
+        with transaction.atomic():
+            if removidos:
+                IndiceBusca.objects.filter(tipo=tipo, objeto_id__in=removidos).delete()
+            if not alterados:
+                continue
+            IndiceBusca.objects.bulk_create(
+                [
+                    IndiceBusca(tipo=tipo, objeto_id=pk, titulo=titulo, texto=texto, data=data)
+                    for pk, (titulo, texto, data) in alterados.items()
+                ],
+                update_conflicts=True, unique_fields=['tipo', 'objeto_id'],
+                update_fields=['titulo', 'texto', 'data', 'atualizado_em'],
+            )
+            if nativo:
+                continue
+            entradas = dict(
+                IndiceBusca.objects.filter(tipo=tipo, objeto_id__in=alterados)
+                .values_list('objeto_id', 'id')
+            )
+            TrigramaBusca.objects.filter(entrada_id__in=entradas.values()).delete()
+            TrigramaBusca.objects.bulk_create(
+                [
+                    TrigramaBusca(entrada_id=entradas[pk], trigrama=tri)
+                    for pk, (_, texto, _) in alterados.items()
+                    for tri in trigramas(texto)
+                ],
+                batch_size=5000,
+            )
+
+
+def remover(tipo, ids, apps=django_apps):
+    apps.get_model('core', 'IndiceBusca').objects.filter(tipo=tipo, objeto_id__in=list(ids)).delete()
+
+
+def indexar_contratos(apps=django_apps, **filtros):
+    """Reindexa os contratos filtrados (ex.: comprador_id=..., imovel_id=...)."""
+    Contrato = apps.get_model('contratos', 'Contrato')
+    indexar(CONTRATO, Contrato.objects.filter(**filtros).values_list('pk', flat=True), apps=apps)
+
+
+def reconstruir(apps=django_apps):
+    """
+    Refaz o índice inteiro, numa transação (a busca segue com o índice
+    anterior até o fim).
+
+    Returns:
+        dict: {tipo: entradas}
+    """
+    IndiceBusca = apps.get_model('core', 'IndiceBusca')
+    TrigramaBusca = apps.get_model('core', 'TrigramaBusca')
+    resultado = {}
+    with transaction.atomic():
+        TrigramaBusca.objects.all().delete()
+        IndiceBusca.objects.all().delete()
+        for tipo, (app_label, modelo, _) in FONTES.items():
+            ids = list(apps.get_model(app_label, modelo).objects.values_list('pk', flat=True))
+            indexar(tipo, ids, apps=apps)
+            resultado[tipo] = len(ids)
+    return resultado
+
+
+def buscar(tipo, q, limite):
+    """
+    IDs dos objetos de `tipo` que casam com `q`, do mais relevante ao menos:
+    título igual ao termo, título começando com ele, alguma palavra começando
+    com ele, demais. Empates: contratos mais recentes primeiro, demais por
+    título.
+    """
+    from core.models import IndiceBusca, TrigramaBusca
+
+    termo = termo_busca(q)
+    if not termo:
+        return []
+
+    entradas = IndiceBusca.objects.filter(tipo=tipo, texto__contains=termo)
+    nativo = trigrama_nativo()
+    tris = trigramas(termo)
+    if tris and not nativo:
+        entradas = entradas.filter(id__in=(
+            TrigramaBusca.objects.filter(trigrama__in=tris)
+            .values('entrada_id').annotate(n=Count('id')).filter(n=len(tris))
+            .values('entrada_id')
+        ))
+
+    ordem = [Case(
+        When(titulo=termo, then=Value(3)),
+        When(titulo__startswith=termo, then=Value(2)),
+        When(Q(texto__startswith=termo) | Q(texto__contains=f' {termo}'), then=Value(1)),
+        default=Value(0), output_field=IntegerField(),
+    ).desc()]
+    if nativo:
+        ordem.append(Func('texto', Value(termo), function='similarity', output_field=FloatField()).desc())
+    ordem += ['-data', 'objeto_id'] if tipo == CONTRATO else ['titulo', 'objeto_id']
+    return list(entradas.order_by(*ordem).values_list('objeto_id', flat=True)[:limite])
+
+
+def em_ordem(queryset, ids):
+    """Objetos de `queryset` com os `ids`, na ordem de `ids`."""
+    objetos = queryset.in_bulk(ids)
+    return [objetos[pk] for pk in ids if pk in objetos]
@@ -21,7 +21,7 @@ from faker import Faker
 
 from core.models import Contabilidade, Imobiliaria, Imovel, Comprador, TipoImovel, ContaBancaria
 from contratos.models import Contrato, TipoCorrecao, TipoAmortizacao, StatusContrato, IndiceReajuste, PrestacaoIntermediaria, TabelaJurosContrato
-from financeiro.models import Parcela, Reajuste
+from financeiro.models import Parcela, Reajuste, ResumoRecebiveisMensal
 from portal_comprador.models import AcessoComprador
 from django.contrib.auth.models import User
 
@@ -974,6 +974,7 @@ class Command(BaseCommand):
             ['pago', 'data_pagamento', 'valor_pago', 'valor_juros', 'valor_multa', 'observacoes'],
             batch_size=500,
         )
+        ResumoRecebiveisMensal.atualizar_parcelas(a_atualizar)
 
     def _executar_so_boletos(self):
         """Passo 2 do setup: gera (ou regenera) boletos para dados existentes no banco."""
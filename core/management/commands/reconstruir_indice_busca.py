@@ -0,0 +1,27 @@
+"""
+Management command: reconstruir_indice_busca
+
+Refaz o índice da busca global (IndiceBusca / TrigramaBusca) a partir de
+contratos, compradores e imóveis — após cargas em massa, correções feitas
+direto no banco ou mudança de BUSCA_GLOBAL_PG_TRGM.
+
+Uso:
+    python manage.py reconstruir_indice_busca
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import busca
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o índice da busca global (contratos, compradores e imóveis)'
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        resultado = busca.reconstruir()
+        resumo = ', '.join(f'{qtd} {tipo}(s)' for tipo, qtd in resultado.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'Índice de busca reconstruído: {resumo} em {time.monotonic() - inicio:.1f}s'
+        ))
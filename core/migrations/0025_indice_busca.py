@@ -0,0 +1,159 @@
+"""
+Índice da busca global (IndiceBusca / TrigramaBusca — ver core.busca).
+
+No PostgreSQL cria a extensão pg_trgm e o índice GIN de trigramas sobre
+IndiceBusca.texto (a menos que BUSCA_GLOBAL_PG_TRGM=False) e preenche o
+índice com os contratos, compradores e imóveis existentes.
+
+O preenchimento é uma cópia congelada da normalização de core.busca (a
+migração não importa o módulo vivo, que pode mudar depois) e lê o banco
+pelo schema_editor.connection.
+"""
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+_LOTE = 1000
+_RE_ESPACOS = re.compile(r'\s+')
+_RE_NAO_DIGITO = re.compile(r'\D')
+
+# tipo: (app, modelo, campos lidos com values())
+_FONTES = {
+    'contrato': ('contratos', 'Contrato', (
+        'numero_contrato', 'data_contrato', 'comprador__nome',
+        'imovel__identificacao', 'imovel__loteamento',
+    )),
+    'comprador': ('core', 'Comprador', ('nome', 'cpf', 'cnpj', 'email')),
+    'imovel': ('core', 'Imovel', ('identificacao', 'loteamento', 'cidade')),
+}
+
+
+def _indice_pg_trgm(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    if not getattr(settings, 'BUSCA_GLOBAL_PG_TRGM', True):
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS core_indicebusca_texto_trgm '
+        'ON core_indicebusca USING gin (texto gin_trgm_ops)'
+    )
+
+
+def _remover_indice_pg_trgm(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS core_indicebusca_texto_trgm')
+
+
+def _normalizar(texto):
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return _RE_ESPACOS.sub(' ', texto).strip().lower()
+
+
+def _digitos(texto):
+    return _RE_NAO_DIGITO.sub('', texto or '')
+
+
+def _documento(tipo, row):
+    """(titulo, texto, data) de uma linha de values() de _FONTES[tipo]."""
+    data = None
+    if tipo == 'contrato':
+        numero = row['numero_contrato']
+        titulo, data = numero, row['data_contrato']
+        partes = [numero, _digitos(numero), row['comprador__nome'],
+                  row['imovel__identificacao'], row['imovel__loteamento']]
+    elif tipo == 'comprador':
+        titulo = row['nome']
+        partes = [row['nome'], row['cpf'], _digitos(row['cpf']),
+                  row['cnpj'], _digitos(row['cnpj']), row['email']]
+    else:
+        titulo = row['identificacao']
+        partes = [row['identificacao'], row['loteamento'], row['cidade']]
+    texto = ' | '.join(p for p in (_normalizar(p) for p in partes) if p)
+    return _normalizar(titulo)[:255], texto, data
+
+
+def _preencher_indice(apps, schema_editor):
+    conexao = schema_editor.connection
+    alias = conexao.alias
+    # Mesma condição do índice GIN acima: com pg_trgm não há TrigramaBusca
+    nativo = conexao.vendor == 'postgresql' and getattr(settings, 'BUSCA_GLOBAL_PG_TRGM', True)
+    IndiceBusca = apps.get_model('core', 'IndiceBusca')
+    TrigramaBusca = apps.get_model('core', 'TrigramaBusca')
+
+    for tipo, (app_label, modelo, campos) in _FONTES.items():
+        linhas = list(
+            apps.get_model(app_label, modelo).objects.using(alias)
+            .order_by('pk').values('pk', *campos)
+        )
+        for inicio in range(0, len(linhas), _LOTE):
+            documentos = {
+                row['pk']: _documento(tipo, row) for row in linhas[inicio:inicio + _LOTE]
+            }
+            IndiceBusca.objects.using(alias).bulk_create([
+                IndiceBusca(tipo=tipo, objeto_id=pk, titulo=titulo, texto=texto, data=data)
+                for pk, (titulo, texto, data) in documentos.items()
+            ])
+            if nativo:
+                continue
+            entradas = dict(
+                IndiceBusca.objects.using(alias).filter(tipo=tipo, objeto_id__in=documentos)
+                .values_list('objeto_id', 'id')
+            )
+            TrigramaBusca.objects.using(alias).bulk_create(
+                [
+                    TrigramaBusca(entrada_id=entradas[pk], trigrama=tri)
+                    for pk, (_, texto, _) in documentos.items()
+                    for tri in {texto[i:i + 3] for i in range(len(texto) - 2)}
+                ],
+                batch_size=5000,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_backfill_perfis_usuario'),
+        ('contratos', '0016_contrato_bloqueio_reajuste_materializado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndiceBusca',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('contrato', 'Contrato'), ('comprador', 'Comprador'), ('imovel', 'Imóvel')], max_length=10, verbose_name='Tipo')),
+                ('objeto_id', models.BigIntegerField(verbose_name='ID do objeto')),
+                ('titulo', models.CharField(blank=True, help_text='Campo principal normalizado (número do contrato, nome, identificação)', max_length=255, verbose_name='Título')),
+                ('texto', models.TextField(verbose_name='Texto pesquisável')),
+                ('data', models.DateField(blank=True, null=True, verbose_name='Data de referência')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Índice de Busca',
+                'verbose_name_plural': 'Índice de Busca',
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'objeto_id'), name='unique_indice_busca_objeto')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TrigramaBusca',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigrama', models.CharField(max_length=3)),
+                ('entrada', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigramas', to='core.indicebusca')),
+            ],
+            options={
+                'verbose_name': 'Trigrama de Busca',
+                'verbose_name_plural': 'Trigramas de Busca',
+                'constraints': [models.UniqueConstraint(fields=('trigrama', 'entrada'), name='unique_trigrama_busca')],
+            },
+        ),
+        migrations.RunPython(_indice_pg_trgm, _remover_indice_pg_trgm),
+        migrations.RunPython(_preencher_indice, migrations.RunPython.noop),
+    ]
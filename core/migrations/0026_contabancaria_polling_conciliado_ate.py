@@ -0,0 +1,18 @@
+# Generated by Django 6.0.6 on 2026-10-17 02:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_indice_busca'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contabancaria',
+            name='polling_conciliado_ate',
+            field=models.DateField(blank=True, help_text='Cursor do polling Sicoob: data até a qual GET /conciliacao já foi processado.', null=True, verbose_name='Polling: conciliação lida até'),
+        ),
+    ]
@@ -692,6 +692,12 @@ class ContaBancaria(TimeStampedModel):
         blank=True,
         verbose_name='Token Boleto-API criado em',
     )
+    polling_conciliado_ate = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name='Polling: conciliação lida até',
+        help_text='Cursor do polling Sicoob: data até a qual GET /conciliacao já foi processado.',
+    )
 
     ativo = models.BooleanField(default=True, verbose_name='Ativo')
 
@@ -718,6 +724,47 @@ class ContaBancaria(TimeStampedModel):
         """Retorna o nome completo do banco"""
         return self.get_banco_display() if self.banco else ''
 
+    def reservar_nossos_numeros(self, quantidade=1):
+        """
+        Reserva `quantidade` nossos números consecutivos desta conta.
+
+        Um único UPDATE por bloco (RETURNING no PostgreSQL/SQLite; F() + releitura
+        na mesma transação nos demais bancos). O lock de linha do UPDATE serializa
+        reservas concorrentes: nenhum número é entregue duas vezes nem pulado.
+        Atualiza self.nosso_numero_atual com o último número reservado.
+
+        Returns:
+            range: números reservados, em ordem
+        """
+        from django.db import connection, transaction
+        from django.db.models import F
+
+        quantidade = int(quantidade)
+        if quantidade < 1:
+            raise ValueError('quantidade deve ser >= 1')
+
+        if connection.vendor in ('postgresql', 'sqlite'):
+            qn = connection.ops.quote_name
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {qn(self._meta.db_table)} '
+                    f'SET nosso_numero_atual = nosso_numero_atual + %s '
+                    f'WHERE id = %s RETURNING nosso_numero_atual',
+                    [quantidade, self.pk],
+                )
+                ultimo = cursor.fetchone()[0]
+        else:
+            with transaction.atomic():
+                ContaBancaria.objects.filter(pk=self.pk).update(
+                    nosso_numero_atual=F('nosso_numero_atual') + quantidade
+                )
+                ultimo = ContaBancaria.objects.values_list(
+                    'nosso_numero_atual', flat=True
+                ).get(pk=self.pk)
+
+        self.nosso_numero_atual = ultimo
+        return range(ultimo - quantidade + 1, ultimo + 1)
+
     # ── Credenciais cifradas (Boleto-API) ──
     @property
     def credenciais(self) -> dict:
@@ -1939,3 +1986,60 @@ class WorkflowIATier(models.Model):
 
     def __str__(self):
         return f'{self.workflow.nome} — Tier {self.ordem}: {self.modelo}'
+
+
+# =============================================================================
+# ÍNDICE DA BUSCA GLOBAL
+# =============================================================================
+
+class IndiceBusca(models.Model):
+    """
+    Texto pesquisável (normalizado) de um contrato, comprador ou imóvel para
+    a busca global. Mantido por core.signals; ver core.busca.
+    """
+
+    TIPO_CHOICES = [
+        ('contrato', 'Contrato'),
+        ('comprador', 'Comprador'),
+        ('imovel', 'Imóvel'),
+    ]
+
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES, verbose_name='Tipo')
+    objeto_id = models.BigIntegerField(verbose_name='ID do objeto')
+    titulo = models.CharField(
+        max_length=255, blank=True, verbose_name='Título',
+        help_text='Campo principal normalizado (número do contrato, nome, identificação)'
+    )
+    texto = models.TextField(verbose_name='Texto pesquisável')
+    data = models.DateField(null=True, blank=True, verbose_name='Data de referência')
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name='Atualizado em')
+
+    class Meta:
+        verbose_name = 'Índice de Busca'
+        verbose_name_plural = 'Índice de Busca'
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'objeto_id'], name='unique_indice_busca_objeto'),
+        ]
+
+    def __str__(self):
+        return f'{self.tipo} #{self.objeto_id}: {self.titulo}'
+
+
+class TrigramaBusca(models.Model):
+    """
+    Trigramas do texto de cada IndiceBusca — índice invertido da busca global
+    nos bancos sem pg_trgm.
+    """
+
+    entrada = models.ForeignKey(IndiceBusca, on_delete=models.CASCADE, related_name='trigramas')
+    trigrama = models.CharField(max_length=3)
+
+    class Meta:
+        verbose_name = 'Trigrama de Busca'
+        verbose_name_plural = 'Trigramas de Busca'
+        constraints = [
+            models.UniqueConstraint(fields=['trigrama', 'entrada'], name='unique_trigrama_busca'),
+        ]
+
+    def __str__(self):
+        return f'{self.trigrama!r} → {self.entrada_id}'
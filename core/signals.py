@@ -4,7 +4,7 @@ Signals do app core.
 HU-28: garante que todo usuário tenha um PerfilUsuario (papel/troca de senha).
 """
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 
@@ -19,3 +19,50 @@ def criar_perfil_usuario(sender, instance, created, **kwargs):
         return
     from core.models import PerfilUsuario
     PerfilUsuario.objects.get_or_create(usuario=instance)
+
+
+# =============================================================================
+# Índice da busca global (core.busca)
+# =============================================================================
+
+def _alterou_indexados(tipo, update_fields):
+    from core.busca import CAMPOS_INDEXADOS
+    return update_fields is None or bool(CAMPOS_INDEXADOS[tipo] & set(update_fields))
+
+
+@receiver(post_save, sender='contratos.Contrato')
+def indexar_contrato(sender, instance, raw=False, update_fields=None, **kwargs):
+    from core import busca
+    if raw or not _alterou_indexados(busca.CONTRATO, update_fields):
+        return
+    busca.indexar(busca.CONTRATO, [instance.pk])
+
+
+@receiver(post_save, sender='core.Comprador')
+def indexar_comprador(sender, instance, raw=False, update_fields=None, created=False, **kwargs):
+    """O nome do comprador também está no texto dos contratos dele."""
+    from core import busca
+    if raw or not _alterou_indexados(busca.COMPRADOR, update_fields):
+        return
+    busca.indexar(busca.COMPRADOR, [instance.pk])
+    if not created:
+        busca.indexar_contratos(comprador_id=instance.pk)
+
+
+@receiver(post_save, sender='core.Imovel')
+def indexar_imovel(sender, instance, raw=False, update_fields=None, created=False, **kwargs):
+    """Identificação e loteamento do imóvel também estão no texto dos contratos."""
+    from core import busca
+    if raw or not _alterou_indexados(busca.IMOVEL, update_fields):
+        return
+    busca.indexar(busca.IMOVEL, [instance.pk])
+    if not created:
+        busca.indexar_contratos(imovel_id=instance.pk)
+
+
+@receiver(post_delete, sender='contratos.Contrato')
+@receiver(post_delete, sender='core.Comprador')
+@receiver(post_delete, sender='core.Imovel')
+def remover_do_indice(sender, instance, **kwargs):
+    from core import busca
+    busca.remover(sender._meta.model_name, [instance.pk])
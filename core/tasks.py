@@ -106,6 +106,29 @@ class TaskResult:
         }
 
 
+def _em_lote_email(funcao):
+    """
+    Executa a tarefa com um lote de e-mail ativo (DespachanteEmail): todos os
+    ServicoEmail.enviar da execução compartilham uma conexão SMTP. Resume
+    conexões e mensagens/s no TaskResult.
+    """
+    @wraps(funcao)
+    def executar(*args, **kwargs):
+        from notificacoes.services import DespachanteEmail
+
+        with DespachanteEmail() as lote:
+            result = funcao(*args, **kwargs)
+        if lote.enviadas or lote.erros:
+            resumo = lote.resumo()
+            result.add_message(
+                f"E-mails: {resumo['enviadas']} enviado(s), {resumo['erros']} erro(s) em "
+                f"{resumo['conexoes']} conexão(ões) SMTP ({resumo['reconexoes']} reconexão(ões)) — "
+                f"{resumo['mensagens_por_segundo']:.1f} msg/s"
+            )
+        return result
+    return executar
+
+
 def processar_reajustes_sync():
     """
     Processa reajustes pendentes de forma síncrona.
@@ -153,8 +176,9 @@ def processar_reajustes_sync():
                             parcela.valor_atual = ReajusteService.calcular_reajuste(
                                 parcela.valor_atual, percentual
                             )
-                        from financeiro.models import Parcela as _Parcela
+                        from financeiro.models import Parcela as _Parcela, ResumoRecebiveisMensal
                         _Parcela.objects.bulk_update(parcelas_pendentes, ['valor_atual'])
+                        ResumoRecebiveisMensal.atualizar_parcelas(parcelas_pendentes)
                         result.items_processed += len(parcelas_pendentes)
 
                     result.add_message(
@@ -419,7 +443,7 @@ def _processar_regra(regra, result):
                     'NUMEROCONTRATO': parcela.contrato.numero_contrato,
                     'NOMEIMOBILIARIA': imob_nome,
                 }
-                subj_r, body_r, _ = regra.template.renderizar(ctx)
+                subj_r, body_r, *_ = regra.template.renderizar(ctx)
                 if subj_r:
                     assunto = f"{PREFIXO} {subj_r}"
                 if body_r:
@@ -444,6 +468,7 @@ def _processar_regra(regra, result):
             result.add_error(f"Erro parcela {parcela.id}: {str(e)}")
 
 
+@_em_lote_email
 def enviar_notificacoes_sync():
     """
     N-01/N-03: Envia notificações de vencimento de forma síncrona.
@@ -569,6 +594,7 @@ def enviar_notificacoes_sync():
     return result
 
 
+@_em_lote_email
 def enviar_inadimplentes_sync():
     """
     N-02/N-03: Envia notificações de inadimplência de forma síncrona.
@@ -739,8 +765,9 @@ def _enviar_email_da_fila(notif):
     Despacha uma Notificacao do tipo EMAIL.
     Boleto (notif.parcela set) → EmailMultiAlternatives com HTML + PDF em anexo.
     Demais → ServicoEmail plain-text.
+    Dentro de um lote (DespachanteEmail), ambos usam a conexão SMTP do lote.
     """
-    from notificacoes.services import ServicoEmail
+    from notificacoes.services import ServicoEmail, lote_email_ativo
     from django.core.mail import EmailMultiAlternatives
     from django.conf import settings as _settings
 
@@ -766,9 +793,10 @@ def _enviar_email_da_fila(notif):
                     pdf_bytes = parcela.boleto_pdf.read()
         except Exception:
             pass
-        if not pdf_bytes and getattr(parcela, 'boleto_pdf_db', None):
+        if not pdf_bytes:
             try:
-                pdf_bytes = bytes(parcela.boleto_pdf_db)
+                from financeiro.services.pdf_store import pdf_da_parcela
+                pdf_bytes = pdf_da_parcela(parcela)
             except Exception:
                 pass
         if pdf_bytes:
@@ -776,7 +804,12 @@ def _enviar_email_da_fila(notif):
             nome = f"boleto_{contrato.numero_contrato}_{parcela.numero_parcela}.pdf"
             email_obj.attach(nome, pdf_bytes, 'application/pdf')
 
-        email_obj.send()
+        lote = lote_email_ativo()
+        if lote is not None:
+            email_obj.from_email = lote.from_email
+            lote.enviar_mensagem(email_obj)
+        else:
+            email_obj.send()
     else:
         ServicoEmail.enviar(
             destinatario=notif.destinatario,
@@ -785,57 +818,47 @@ def _enviar_email_da_fila(notif):
         )
 
 
+def _despachar_notificacao_da_fila(notif):
+    """Envia uma Notificacao da fila pelo canal dela; levanta exceção em caso de falha."""
+    from notificacoes.models import TipoNotificacao
+    from notificacoes.services import ServicoSMS, ServicoWhatsApp
+
+    if notif.tipo == TipoNotificacao.EMAIL:
+        _enviar_email_da_fila(notif)
+    elif notif.tipo == TipoNotificacao.SMS:
+        ServicoSMS.enviar(destinatario=notif.destinatario, mensagem=notif.mensagem)
+    elif notif.tipo == TipoNotificacao.WHATSAPP:
+        ServicoWhatsApp.enviar(destinatario=notif.destinatario, mensagem=notif.mensagem)
+    else:
+        raise ValueError(f"Tipo de notificação desconhecido: {notif.tipo}")
+
+
 def processar_fila_notificacoes():
     """
-    Processa todas as Notificacao com status=PENDENTE (Option B — fila no banco).
-    Retry automático: mantém PENDENTE até MAX_TENTATIVAS, depois marca ERRO.
+    Processa as Notificacao PENDENTE (Option B — fila no banco).
+
+    Consome a fila em lotes reservados (notificacoes.fila): vários workers/crons
+    podem rodar ao mesmo tempo sem envio duplicado. Falha reagenda com backoff
+    exponencial até NOTIFICACOES_MAX_TENTATIVAS, depois marca ERRO.
     Deve ser chamado pelo cron (task_run_all) ou endpoint dedicado.
     """
-    from notificacoes.models import Notificacao, TipoNotificacao, StatusNotificacao
-    from notificacoes.services import ServicoSMS, ServicoWhatsApp
+    from notificacoes.fila import consumir_fila
 
-    MAX_TENTATIVAS = 3
     result = TaskResult('processar_fila_notificacoes')
 
     try:
-        pendentes = list(
-            Notificacao.objects.filter(status=StatusNotificacao.PENDENTE)
-            .order_by('data_agendamento')
-            .select_related('parcela', 'parcela__contrato')
+        estatisticas = consumir_fila(_despachar_notificacao_da_fila)
+        result.items_processed = estatisticas['enviadas']
+        result.add_message(
+            f"{estatisticas['enviadas']} enviada(s), {estatisticas['reagendadas']} reagendada(s), "
+            f"{estatisticas['erros']} com erro em {estatisticas['lotes']} lote(s) — "
+            f"{estatisticas['por_segundo']:.1f} notificação(ões)/s"
         )
-        result.add_message(f"{len(pendentes)} notificação(ões) PENDENTE(s) na fila")
-
-        for notif in pendentes:
-            try:
-                if notif.tipo == TipoNotificacao.EMAIL:
-                    _enviar_email_da_fila(notif)
-                elif notif.tipo == TipoNotificacao.SMS:
-                    ServicoSMS.enviar(destinatario=notif.destinatario, mensagem=notif.mensagem)
-                elif notif.tipo == TipoNotificacao.WHATSAPP:
-                    ServicoWhatsApp.enviar(destinatario=notif.destinatario, mensagem=notif.mensagem)
-                else:
-                    raise ValueError(f"Tipo de notificação desconhecido: {notif.tipo}")
-
-                notif.marcar_como_enviada()
-                result.items_processed += 1
-                result.add_message(
-                    f"  ✓ {notif.get_tipo_display()} → {notif.destinatario} (notif {notif.id})"
-                )
-
-            except Exception as e:
-                proximas_tentativas = notif.tentativas + 1
-                if proximas_tentativas >= MAX_TENTATIVAS:
-                    notif.marcar_erro(str(e))
-                    result.add_error(
-                        f"Notif {notif.id} falhou {proximas_tentativas}x (ERRO definitivo): {e}"
-                    )
-                else:
-                    notif.tentativas = proximas_tentativas
-                    notif.save(update_fields=['tentativas'])
-                    result.add_message(
-                        f"  ↺ Notif {notif.id} tentativa {proximas_tentativas}/{MAX_TENTATIVAS}: {e}"
-                    )
-
+        for notif_id, tentativas, erro, definitiva in estatisticas['falhas']:
+            if definitiva:
+                result.add_error(f"Notif {notif_id} falhou {tentativas}x (ERRO definitivo): {erro}")
+            else:
+                result.add_message(f"  ↺ Notif {notif_id} tentativa {tentativas}: {erro}")
         result.finish()
 
     except Exception as e:
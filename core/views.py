@@ -2200,19 +2200,18 @@ def api_busca_global(request):
     if len(q) < 2:
         return JsonResponse({'results': [], 'q': q})
 
-    from django.db.models import Q as _Q
     from contratos.models import Contrato as _Contrato
+    from core import busca
     from core.models import Comprador as _Comprador, Imovel as _Imovel
 
     resultados = []
 
-    # Contratos
-    contratos = _Contrato.objects.filter(
-        _Q(numero_contrato__icontains=q) |
-        _Q(comprador__nome__icontains=q) |
-        _Q(imovel__identificacao__icontains=q) |
-        _Q(imovel__loteamento__icontains=q)
-    ).select_related('comprador', 'imovel', 'imobiliaria').order_by('-data_contrato')[:8]
+    # Candidatos e ordem vêm do índice de busca (core.busca); os objetos, de
+    # uma consulta por pk
+    contratos = busca.em_ordem(
+        _Contrato.objects.select_related('comprador', 'imovel', 'imobiliaria'),
+        busca.buscar(busca.CONTRATO, q, 8),
+    )
 
     for c in contratos:
         imovel_label = ''
@@ -2228,12 +2227,7 @@ def api_busca_global(request):
         })
 
     # Compradores
-    compradores = _Comprador.objects.filter(
-        _Q(nome__icontains=q) |
-        _Q(cpf__icontains=q) |
-        _Q(cnpj__icontains=q) |
-        _Q(email__icontains=q)
-    ).order_by('nome')[:6]
+    compradores = busca.em_ordem(_Comprador.objects.all(), busca.buscar(busca.COMPRADOR, q, 6))
 
     for cp in compradores:
         doc = cp.cpf or cp.cnpj or ''
@@ -2247,11 +2241,7 @@ def api_busca_global(request):
         })
 
     # Imóveis
-    imoveis = _Imovel.objects.filter(
-        _Q(identificacao__icontains=q) |
-        _Q(loteamento__icontains=q) |
-        _Q(cidade__icontains=q)
-    ).order_by('identificacao')[:6]
+    imoveis = busca.em_ordem(_Imovel.objects.all(), busca.buscar(busca.IMOVEL, q, 6))
 
     for im in imoveis:
         resultados.append({
@@ -7,7 +7,7 @@ Email: maxwbh@gmail.com
 from django.contrib import admin
 from django.utils.html import format_html
 from django.utils import timezone
-from .models import Parcela, Reajuste, HistoricoPagamento, AcessoBoletoPublico, EventoPIX
+from .models import Parcela, Reajuste, HistoricoPagamento, AcessoBoletoPublico, EventoPIX, WebhookInbox
 
 
 @admin.register(Parcela)
@@ -331,6 +331,23 @@ class AcessoBoletoPublicoAdmin(admin.ModelAdmin):
     user_agent_resumido.short_description = 'User-Agent'
 
 
+@admin.register(WebhookInbox)
+class WebhookInboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'origem', 'event_id', 'chave', 'status', 'resultado', 'tentativas',
+                    'recebido_em', 'processado_em']
+    list_filter = ['origem', 'status', 'resultado']
+    search_fields = ['event_id', 'chave']
+    readonly_fields = [f.name for f in WebhookInbox._meta.fields]
+    ordering = ['-id']
+    date_hierarchy = 'recebido_em'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(EventoPIX)
 class EventoPIXAdmin(admin.ModelAdmin):
     list_display = ['end_to_end_id_curto', 'txid', 'parcela', 'valor', 'status_badge', 'recebido_em']
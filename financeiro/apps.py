@@ -5,3 +5,6 @@ class FinanceiroConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'financeiro'
     verbose_name = 'Gestão Financeira'
+
+    def ready(self):
+        from financeiro import signals  # noqa: F401 — registra os receivers
@@ -0,0 +1,110 @@
+"""
+Management command: migrar_pdfs_boleto
+
+Move os PDFs gravados em Parcela.boleto_pdf_db para o store por conteúdo
+(financeiro.services.pdf_store): cada PDF distinto é gravado uma única vez no
+storage 'boleto_pdfs', a parcela passa a apontar para o ArquivoPdf e a coluna
+é esvaziada. Ao final informa quanto espaço foi liberado na tabela.
+
+Uso:
+    python manage.py migrar_pdfs_boleto
+    python manage.py migrar_pdfs_boleto --dry-run
+    python manage.py migrar_pdfs_boleto --lote 100
+
+Após migrar, ative BOLETO_PDF_BLOB_STORE para que os novos boletos já sejam
+gravados no store. No PostgreSQL o espaço em disco só volta após VACUUM.
+"""
+import hashlib
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from financeiro.models import ArquivoPdf, Parcela
+
+
+def _formatar_bytes(n):
+    if abs(n) < 1024:
+        return f'{n} B'
+    for unidade in ('KB', 'MB', 'GB'):
+        n /= 1024
+        if abs(n) < 1024 or unidade == 'GB':
+            return f'{n:.1f} {unidade}'
+
+
+class Command(BaseCommand):
+    help = 'Move os PDFs de Parcela.boleto_pdf_db para o store deduplicado por SHA-256'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas calcula quanto seria liberado, sem gravar nada',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=200,
+            help='Parcelas carregadas por vez (padrão 200 — cada uma traz o PDF inteiro)',
+        )
+
+    def handle(self, *args, **options):
+        from financeiro.services.pdf_store import guardar_pdf
+
+        dry_run = options['dry_run']
+        lote = max(options['lote'], 1)
+
+        pendentes = Parcela.objects.exclude(boleto_pdf_db=None)
+        ids = list(pendentes.order_by('id').values_list('id', flat=True))
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'=== Migração de PDFs de boleto ({len(ids)} parcelas com cópia em banco) ===\n'
+        ))
+
+        parcelas_migradas = 0
+        bytes_tabela = 0
+        bytes_store = 0
+        hashes = set()
+
+        for inicio in range(0, len(ids), lote):
+            faixa = ids[inicio:inicio + lote]
+            parcelas = list(
+                Parcela.objects.filter(id__in=faixa).only('id', 'boleto_pdf_db', 'boleto_pdf_blob')
+            )
+            conteudos = {p.pk: bytes(p.boleto_pdf_db or b'') for p in parcelas}
+            hashes_lote = {
+                pk: hashlib.sha256(conteudo).hexdigest()
+                for pk, conteudo in conteudos.items() if conteudo
+            }
+            # Hashes que já estavam no store não contam como gravados agora
+            ja_no_store = set(ArquivoPdf.objects.filter(
+                sha256__in=set(hashes_lote.values()),
+            ).values_list('sha256', flat=True))
+            a_atualizar = []
+            for parcela in parcelas:
+                conteudo = conteudos[parcela.pk]
+                bytes_tabela += len(conteudo)
+                if conteudo:
+                    sha256 = hashes_lote[parcela.pk]
+                    if sha256 not in hashes and sha256 not in ja_no_store:
+                        bytes_store += len(conteudo)
+                    hashes.add(sha256)
+                    if not dry_run:
+                        parcela.boleto_pdf_blob = guardar_pdf(conteudo)
+                parcela.boleto_pdf_db = None
+                a_atualizar.append(parcela)
+
+            if not dry_run:
+                with transaction.atomic():
+                    Parcela.objects.bulk_update(a_atualizar, ['boleto_pdf_db', 'boleto_pdf_blob'])
+            parcelas_migradas += len(a_atualizar)
+            self.stdout.write(f'  {parcelas_migradas}/{len(ids)} parcelas processadas')
+
+        liberado = bytes_tabela - bytes_store
+        prefixo = '[DRY-RUN] ' if dry_run else ''
+        self.stdout.write('')
+        self.stdout.write(f'{prefixo}Parcelas migradas: {parcelas_migradas}')
+        self.stdout.write(f'{prefixo}PDFs distintos: {len(hashes)}')
+        self.stdout.write(f'{prefixo}Removido da tabela de parcelas: {_formatar_bytes(bytes_tabela)}')
+        self.stdout.write(f'{prefixo}Gravado no store: {_formatar_bytes(bytes_store)}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefixo}Espaço liberado: {_formatar_bytes(liberado)}'
+        ))
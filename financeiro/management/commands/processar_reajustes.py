@@ -22,7 +22,7 @@ class Command(BaseCommand):
         ))
 
         try:
-            resultado = processar_reajustes_pendentes()
+            resultado = processar_reajustes_pendentes(distribuir=False)
 
             self.stdout.write(self.style.SUCCESS(
                 '\n✅ Processamento concluído!'
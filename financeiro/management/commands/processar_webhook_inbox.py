@@ -0,0 +1,47 @@
+"""
+Management command: processar_webhook_inbox
+
+Consome a caixa de entrada dos webhooks Boleto-API/PIX (WebhookInbox) gravada
+no modo fast-ack (WEBHOOK_INBOX). Vários processos podem rodar ao mesmo tempo.
+
+Uso:
+    python manage.py processar_webhook_inbox               # esvazia e sai
+    python manage.py processar_webhook_inbox --continuo    # worker permanente
+    python manage.py processar_webhook_inbox --continuo --intervalo 2
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from financeiro.services import webhook_inbox
+
+
+class Command(BaseCommand):
+    help = 'Processa os eventos de webhook pendentes na caixa de entrada (modo fast-ack)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Não sai ao esvaziar: volta a consultar a cada --intervalo segundos.',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=1.0,
+            help='Espera (s) entre consultas no modo contínuo. Padrão: 1.',
+        )
+
+    def handle(self, *args, **options):
+        worker = webhook_inbox.identificar_worker()
+        while True:
+            r = webhook_inbox.consumir(worker=worker)
+            if r['lotes'] or not options['continuo']:
+                self.stdout.write(
+                    f"{r['processados']} processado(s), {r['reagendados']} reagendado(s), "
+                    f"{r['erros']} erro(s) — lag médio {r['lag_medio_s']:.1f}s, "
+                    f"máx {r['lag_max_s']:.1f}s; {r['pendentes']} pendente(s)"
+                )
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
@@ -0,0 +1,37 @@
+"""
+Management command: reconstruir_resumo_recebiveis
+
+Refaz o resumo mensal de recebíveis por imobiliária (ResumoRecebiveisMensal)
+a partir das parcelas — após a migração inicial, cargas em massa ou
+correções feitas direto no banco.
+
+Uso:
+    python manage.py reconstruir_resumo_recebiveis
+    python manage.py reconstruir_resumo_recebiveis --imobiliaria 3 --imobiliaria 7
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from financeiro.models import ResumoRecebiveisMensal
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o resumo mensal de recebíveis (dashboards) a partir das parcelas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--imobiliaria',
+            type=int,
+            action='append',
+            dest='imobiliarias',
+            help='ID da imobiliária (repetível). Padrão: todas.',
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        linhas = ResumoRecebiveisMensal.reconstruir(options['imobiliarias'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Resumo de recebíveis reconstruído: {linhas} linha(s) em '
+            f'{time.monotonic() - inicio:.1f}s'
+        ))
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.6 on 2026-10-16 23:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("financeiro", "0023_recorrenciapix"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="parcela",
+            name="nosso_numero_chave",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=models.Func(
+                    models.F("nosso_numero"),
+                    models.Value("0"),
+                    function="LTRIM",
+                    output_field=models.CharField(max_length=30),
+                ),
+                output_field=models.CharField(max_length=30),
+                verbose_name="Chave do Nosso Número",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="parcela",
+            index=models.Index(
+                fields=["conta_bancaria", "nosso_numero_chave"],
+                name="fin_parcela_conta_nnchave_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="parcela",
+            index=models.Index(
+                fields=["nosso_numero_chave"], name="fin_parcela_nnchave_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 6.0.6 on 2026-10-16 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("financeiro", "0024_parcela_nosso_numero_chave"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArquivoPdf",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "sha256",
+                    models.CharField(max_length=64, unique=True, verbose_name="SHA-256"),
+                ),
+                (
+                    "tamanho",
+                    models.PositiveIntegerField(verbose_name="Tamanho (bytes)"),
+                ),
+                (
+                    "criado_em",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Criado em"),
+                ),
+            ],
+            options={
+                "verbose_name": "Arquivo PDF",
+                "verbose_name_plural": "Arquivos PDF",
+            },
+        ),
+        migrations.AddField(
+            model_name="parcela",
+            name="boleto_pdf_blob",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                help_text="PDF deduplicado por SHA-256 — substitui boleto_pdf_db (BOLETO_PDF_BLOB_STORE)",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="parcelas",
+                to="financeiro.arquivopdf",
+                verbose_name="PDF do boleto (armazenamento por conteúdo)",
+            ),
+        ),
+    ]
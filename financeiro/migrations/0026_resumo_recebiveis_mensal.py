@@ -0,0 +1,66 @@
+"""
+Cria o resumo mensal de recebíveis por imobiliária (ResumoRecebiveisMensal)
+e o preenche a partir das parcelas existentes.
+"""
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+
+def _preencher_resumo(apps, schema_editor):
+    Parcela = apps.get_model('financeiro', 'Parcela')
+    ResumoRecebiveisMensal = apps.get_model('financeiro', 'ResumoRecebiveisMensal')
+    linhas = [
+        ResumoRecebiveisMensal(
+            imobiliaria_id=row['contrato__imobiliaria_id'], mes=row['mes'],
+            qtd_parcelas=row['qtd_parcelas'], qtd_pagas=row['qtd_pagas'],
+            valor_previsto=row['valor_previsto'] or Decimal('0.00'),
+            valor_realizado=row['valor_realizado'] or Decimal('0.00'),
+            valor_aberto=row['valor_aberto'] or Decimal('0.00'),
+        )
+        for row in Parcela.objects.annotate(mes=TruncMonth('data_vencimento'))
+        .values('contrato__imobiliaria_id', 'mes').annotate(
+            qtd_parcelas=Count('id'),
+            qtd_pagas=Count('id', filter=Q(pago=True)),
+            valor_previsto=Sum('valor_atual'),
+            valor_realizado=Sum('valor_pago', filter=Q(pago=True)),
+            valor_aberto=Sum('valor_atual', filter=Q(pago=False)),
+        ).order_by()
+    ]
+    ResumoRecebiveisMensal.objects.bulk_create(linhas, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contratos', '0016_contrato_bloqueio_reajuste_materializado'),
+        ('core', '0024_backfill_perfis_usuario'),
+        ('financeiro', '0025_arquivopdf_parcela_boleto_pdf_blob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoRecebiveisMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primeiro dia do mês de vencimento', verbose_name='Mês')),
+                ('qtd_parcelas', models.PositiveIntegerField(default=0, verbose_name='Parcelas')),
+                ('qtd_pagas', models.PositiveIntegerField(default=0, verbose_name='Parcelas pagas')),
+                ('valor_previsto', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16, verbose_name='Previsto')),
+                ('valor_realizado', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16, verbose_name='Realizado')),
+                ('valor_aberto', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16, verbose_name='Em aberto')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('imobiliaria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_recebiveis', to='core.imobiliaria', verbose_name='Imobiliária')),
+            ],
+            options={
+                'verbose_name': 'Resumo Mensal de Recebíveis',
+                'verbose_name_plural': 'Resumos Mensais de Recebíveis',
+                'ordering': ['imobiliaria', 'mes'],
+                'indexes': [models.Index(fields=['mes'], name='fin_resumo_receb_mes_idx')],
+                'constraints': [models.UniqueConstraint(fields=('imobiliaria', 'mes'), name='unique_resumo_recebiveis_mes')],
+            },
+        ),
+        migrations.RunPython(_preencher_resumo, migrations.RunPython.noop),
+    ]
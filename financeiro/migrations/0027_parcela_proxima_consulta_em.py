@@ -0,0 +1,18 @@
+# Generated by Django 6.0.6 on 2026-10-17 02:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0026_resumo_recebiveis_mensal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parcela',
+            name='proxima_consulta_em',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Quando o polling volta a consultar esta cobrança no gateway. Vazio = na próxima execução.', null=True, verbose_name='Próxima Consulta (polling)'),
+        ),
+    ]
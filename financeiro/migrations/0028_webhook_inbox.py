@@ -0,0 +1,39 @@
+# Generated by Django 6.0.6 on 2026-10-17 02:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0027_parcela_proxima_consulta_em'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookInbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origem', models.CharField(choices=[('boleto_api', 'Boleto-API'), ('pix', 'PIX')], max_length=20, verbose_name='Origem')),
+                ('event_id', models.CharField(help_text='event_id do gateway / EndToEndId do PIX (ou hash do corpo, se ausente).', max_length=150, verbose_name='ID do Evento')),
+                ('chave', models.CharField(help_text='Cobrança do evento (cobranca_id/ext_ref/txid): processados em ordem por chave.', max_length=150, verbose_name='Chave de Ordenação')),
+                ('payload', models.TextField(verbose_name='Payload')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('processado', 'Processado'), ('erro', 'Erro (tentativas esgotadas)')], default='pendente', max_length=20, verbose_name='Status')),
+                ('resultado', models.CharField(blank=True, help_text='Status devolvido pelo processamento (baixado, duplicado, sem_parcela...).', max_length=20, verbose_name='Resultado')),
+                ('tentativas', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('erro', models.TextField(blank=True, verbose_name='Erro')),
+                ('proxima_tentativa_em', models.DateTimeField(blank=True, null=True, verbose_name='Próxima Tentativa em')),
+                ('reservada_por', models.CharField(blank=True, max_length=64, verbose_name='Reservada por')),
+                ('reservada_ate', models.DateTimeField(blank=True, null=True, verbose_name='Reservada até')),
+                ('recebido_em', models.DateTimeField(auto_now_add=True, verbose_name='Recebido em')),
+                ('processado_em', models.DateTimeField(blank=True, null=True, verbose_name='Processado em')),
+            ],
+            options={
+                'verbose_name': 'Webhook (caixa de entrada)',
+                'verbose_name_plural': 'Webhooks (caixa de entrada)',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'id'], name='fin_inbox_status_idx'), models.Index(fields=['chave', 'status'], name='fin_inbox_chave_status_idx')],
+                'constraints': [models.UniqueConstraint(fields=('origem', 'event_id'), name='unique_webhook_inbox_evento')],
+            },
+        ),
+    ]
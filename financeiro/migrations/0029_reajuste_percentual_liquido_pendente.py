@@ -0,0 +1,38 @@
+"""
+Converte para líquido o percentual dos reajustes pendentes gravados com o
+percentual bruto.
+
+Reajuste.percentual passou a ser sempre líquido do desconto em p.p.
+(percentual_liquido não subtrai mais desconto_percentual). Reajustes ainda não
+aplicados gravados pelo fluxo manual antigo — percentual igual ao
+percentual_bruto, ou sem percentual_bruto — perderiam o desconto ao serem
+aplicados; aqui recebem o mesmo valor que o cálculo antigo aplicaria.
+"""
+from decimal import Decimal
+from django.db import migrations
+from django.db.models import F, Q
+
+
+def _descontar_percentual_pendente(apps, schema_editor):
+    Reajuste = apps.get_model('financeiro', 'Reajuste')
+    pendentes = Reajuste.objects.filter(
+        Q(percentual_bruto__isnull=True) | Q(percentual=F('percentual_bruto')),
+        aplicado=False,
+        desconto_percentual__gt=0,
+    )
+    for reajuste in pendentes:
+        reajuste.percentual = max(
+            Decimal('0'), reajuste.percentual - reajuste.desconto_percentual
+        )
+        reajuste.save(update_fields=['percentual'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0028_webhook_inbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(_descontar_percentual_pendente, migrations.RunPython.noop),
+    ]
@@ -9,7 +9,7 @@ from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import F, Func, Q, Value
 from decimal import Decimal
 from datetime import timedelta
 import logging
@@ -74,6 +74,52 @@ class TipoParcela(models.TextChoices):
     ENTRADA = 'ENTRADA', 'Entrada'
 
 
+class ParcelaQuerySet(models.QuerySet):
+    """QuerySet de Parcela com a valoração do dia calculada no SELECT"""
+
+    def com_valores_hoje(self, data=None):
+        """
+        Anota juros_hoje, multa_hoje, desconto_hoje, valor_total_hoje,
+        dias_atraso_hoje e a configuração de boleto efetiva (config_*) na data
+        (padrão: hoje). Nada é gravado; calcular_valores_hoje() reaproveita as
+        anotações quando a data coincide.
+        """
+        from financeiro.services.encargos_service import expressoes_valores_hoje
+
+        qs = self
+        for etapa in expressoes_valores_hoje(data):
+            qs = qs.annotate(**etapa)
+        return qs
+
+    def liberadas_reajuste(self):
+        """
+        Parcelas não bloqueadas por reajuste pendente, pelo bloqueio
+        materializado do contrato (Contrato.parcela_bloqueada_a_partir).
+
+        O bloqueio precisa estar em dia — Contrato.atualizar_bloqueios_reajuste()
+        (tarefa diária) ou Contrato.garantir_bloqueios_reajuste(contratos)
+        recalcula os contratos vencidos antes do filtro.
+        """
+        return self.filter(self._q_liberada_reajuste())
+
+    def com_liberacao_reajuste(self):
+        """
+        Anota `liberada_reajuste` (bool) com a mesma regra de liberadas_reajuste(),
+        para quem precisa listar também as bloqueadas. Parcela.pode_gerar_boleto()
+        usa a anotação quando presente, sem consultar Reajuste.
+        """
+        return self.annotate(liberada_reajuste=models.ExpressionWrapper(
+            self._q_liberada_reajuste(), output_field=models.BooleanField(),
+        ))
+
+    @staticmethod
+    def _q_liberada_reajuste():
+        return (
+            models.Q(contrato__parcela_bloqueada_a_partir__isnull=True)
+            | models.Q(numero_parcela__lt=models.F('contrato__parcela_bloqueada_a_partir'))
+        )
+
+
 class Parcela(TimeStampedModel):
     """Modelo para representar uma parcela do contrato"""
 
@@ -202,6 +248,18 @@ class Parcela(TimeStampedModel):
         verbose_name='Nosso Número',
         help_text='Sequencial bruto do nosso número (sem convênio, sem DV). Usado para conciliação CNAB.'
     )
+    # Chave normalizada (sem zeros à esquerda) mantida pelo próprio banco: o
+    # retorno CNAB envia o nosso número zero-padded e o sistema pode ter gravado
+    # a forma curta. Indexada junto com a conta para casamento por igualdade.
+    nosso_numero_chave = models.GeneratedField(
+        expression=Func(
+            F('nosso_numero'), Value('0'),
+            function='LTRIM', output_field=models.CharField(max_length=30),
+        ),
+        output_field=models.CharField(max_length=30),
+        db_persist=True,
+        verbose_name='Chave do Nosso Número',
+    )
     nosso_numero_formatado = models.CharField(
         max_length=30,
         blank=True,
@@ -250,6 +308,16 @@ class Parcela(TimeStampedModel):
         verbose_name='PDF do boleto (banco de dados)',
         help_text='Cópia do PDF em banco de dados — persiste em storage efêmero (Render)'
     )
+    boleto_pdf_blob = models.ForeignKey(
+        'ArquivoPdf',
+        null=True,
+        blank=True,
+        on_delete=models.PROTECT,
+        related_name='parcelas',
+        editable=False,
+        verbose_name='PDF do boleto (armazenamento por conteúdo)',
+        help_text='PDF deduplicado por SHA-256 — substitui boleto_pdf_db (BOLETO_PDF_BLOB_STORE)'
+    )
     boleto_url = models.URLField(
         max_length=500,
         blank=True,
@@ -399,6 +467,17 @@ class Parcela(TimeStampedModel):
         verbose_name='Status Normalizado da Cobrança',
         help_text='Status transversal (boleto/pix). Vazio = ainda não emitida via Boleto-API.',
     )
+    # Polling Sicoob (sem webhook de boleto): agenda da próxima consulta
+    # individual GET /cobranca/{id}. Ver boleto_api_conciliacao.polling_sicoob.
+    proxima_consulta_em = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name='Próxima Consulta (polling)',
+        help_text='Quando o polling volta a consultar esta cobrança no gateway. Vazio = na próxima execução.',
+    )
+
+    objects = ParcelaQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Parcela'
@@ -411,6 +490,9 @@ class Parcela(TimeStampedModel):
             models.Index(fields=['pago']),
             models.Index(fields=['status_boleto']),
             models.Index(fields=['nosso_numero']),
+            # Resolução em lote do retorno CNAB (nosso número sem zeros à esquerda)
+            models.Index(fields=['conta_bancaria', 'nosso_numero_chave'], name='fin_parcela_conta_nnchave_idx'),
+            models.Index(fields=['nosso_numero_chave'], name='fin_parcela_nnchave_idx'),
             # Compound indexes for common dashboard/vencimento queries
             models.Index(fields=['pago', 'data_vencimento'], name='fin_parcela_pago_venc_idx'),
             models.Index(fields=['contrato', 'pago', 'data_vencimento'], name='fin_parcela_ctrt_pago_venc_idx'),
@@ -428,6 +510,18 @@ class Parcela(TimeStampedModel):
     def __str__(self):
         return f"Parcela {self.numero_parcela}/{self.contrato.numero_parcelas} - Contrato {self.contrato.numero_contrato}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Estado que entra no resumo mensal: o signal compara com ele para só
+        # recalcular quando algo mudou e para recalcular também o mês antigo
+        instance._estado_resumo = instance.estado_resumo()
+        return instance
+
+    def estado_resumo(self):
+        """(contrato_id, data_vencimento, pago, valor_atual, valor_pago) carregados."""
+        return tuple(self.__dict__.get(campo) for campo in ResumoRecebiveisMensal.CAMPOS_PARCELA)
+
     def clean(self):
         """Validações de negócio da parcela"""
         super().clean()
@@ -468,7 +562,8 @@ class Parcela(TimeStampedModel):
         já venceu (hoje >= data_prevista) e ainda não foi aplicado, todos os
         boletos desse ciclo em diante ficam bloqueados.
 
-        Índice FIXO nunca bloqueia.
+        Índice FIXO nunca bloqueia. Vinda de com_liberacao_reajuste(), usa a
+        anotação `liberada_reajuste` (bloqueio materializado) sem consultas.
 
         Returns:
             tuple: (pode_gerar: bool, motivo: str)
@@ -479,45 +574,14 @@ class Parcela(TimeStampedModel):
         if self.status_boleto == StatusBoleto.PAGO:
             return False, "Boleto já foi pago."
 
-        # Índice FIXO: sempre pode gerar
-        from contratos.models import TipoCorrecao
-        if self.contrato.tipo_correcao == TipoCorrecao.FIXO:
-            return True, "Índice FIXO — sem necessidade de reajuste."
-
-        prazo = self.contrato.prazo_reajuste_meses or 12
-        ciclo_da_parcela = (self.numero_parcela - 1) // prazo + 1
+        liberada = getattr(self, 'liberada_reajuste', None)
+        if liberada is not None:
+            if liberada:
+                return True, "Liberado para geração."
+            return False, self.contrato.motivo_bloqueio_reajuste()
 
-        if ciclo_da_parcela <= 1:
-            return True, "Primeiro ciclo — liberado."
-
-        from dateutil.relativedelta import relativedelta
-        from django.utils import timezone as tz
-
-        hoje = tz.now().date()
-
-        # Verifica em cascata do ciclo 2 até o ciclo desta parcela
-        for ciclo_check in range(2, ciclo_da_parcela + 1):
-            data_reajuste = (
-                self.contrato.data_contrato
-                + relativedelta(months=(ciclo_check - 1) * prazo)
-            )
-            if hoje < data_reajuste:
-                # Ciclo ainda não venceu — os subsequentes também não
-                break
-
-            reajuste_aplicado = Reajuste.objects.filter(
-                contrato=self.contrato,
-                ciclo=ciclo_check,
-                aplicado=True
-            ).exists()
-            if not reajuste_aplicado:
-                return False, (
-                    f"Reajuste do ciclo {ciclo_check} pendente desde "
-                    f"{data_reajuste.strftime('%d/%m/%Y')}. "
-                    f"Execute o reajuste antes de gerar boletos."
-                )
-
-        return True, "Liberado para geração."
+        # Mesma cascata do contrato (bloqueio materializado quando vigente)
+        return self.contrato.pode_gerar_boleto(self.numero_parcela)
 
     @property
     def valor_total(self):
@@ -753,6 +817,9 @@ class Parcela(TimeStampedModel):
         from datetime import date
 
         hoje = date.today()
+        if getattr(self, 'data_valores_hoje', None) == hoje:
+            return self._valores_hoje_anotados()
+
         config = self.contrato.get_config_boleto()
 
         # Calcular juros e multa para hoje
@@ -807,14 +874,36 @@ class Parcela(TimeStampedModel):
             'config_dias_carencia': config.get('dias_carencia', 0) or 0,
         }
 
+    def _valores_hoje_anotados(self):
+        """calcular_valores_hoje() a partir das anotações de com_valores_hoje()."""
+        return {
+            'valor_original': self.valor_atual,
+            'multa_hoje': self.multa_hoje,
+            'juros_hoje': self.juros_hoje,
+            'desconto_hoje': self.desconto_hoje,
+            'desconto_disponivel': self.desconto_disponivel_hoje,
+            'valor_total_hoje': self.valor_total_hoje,
+            'dias_atraso': self.dias_atraso_hoje,
+            'vencido': self.dias_atraso_hoje > 0,
+            'config_multa_percentual': self.config_multa_percentual,
+            'config_multa_tipo': 'PERCENTUAL',
+            'config_juros_percentual': self.config_juros_percentual,
+            'config_juros_tipo': 'PERCENTUAL',
+            'config_desconto_valor': self.config_desconto_valor,
+            'config_desconto_tipo': self.config_desconto_tipo,
+            'config_desconto_dias': self.config_desconto_dias,
+            'config_dias_carencia': self.config_dias_carencia,
+        }
+
     def obter_proximos_nosso_numero(self, conta_bancaria):
         """
         Obtém o próximo nosso número disponível para a conta bancária.
         Incrementa o contador na conta bancária.
+
+        Reserva atômica (ContaBancaria.reservar_nossos_numeros): seguro com
+        vários workers emitindo boletos da mesma conta ao mesmo tempo.
         """
-        conta_bancaria.nosso_numero_atual += 1
-        conta_bancaria.save(update_fields=['nosso_numero_atual'])
-        return conta_bancaria.nosso_numero_atual
+        return conta_bancaria.reservar_nossos_numeros(1)[0]
 
     def pode_transicionar_cobranca(self, novo) -> bool:
         """True se a transição do status_cobranca atual para `novo` é permitida."""
@@ -952,7 +1041,8 @@ class Parcela(TimeStampedModel):
             pdf_content = resultado['pdf_content']
             nome_arquivo = f"boleto_{contrato.numero_contrato}_{self.numero_parcela}.pdf"
             self.boleto_pdf.save(nome_arquivo, ContentFile(pdf_content), save=False)
-            self.boleto_pdf_db = pdf_content
+            from financeiro.services.pdf_store import anexar_pdf_parcela
+            anexar_pdf_parcela(self, pdf_content)
 
         if resultado.get('pix_copia_cola'):
             self.pix_copia_cola = resultado['pix_copia_cola']
@@ -1046,8 +1136,9 @@ class Parcela(TimeStampedModel):
                 pdf_content = resultado['pdf_content']
                 nome_arquivo = f"boleto_{self.contrato.numero_contrato}_{self.numero_parcela}.pdf"
                 self.boleto_pdf.save(nome_arquivo, ContentFile(pdf_content), save=False)
-                # Cópia em banco de dados — persiste em deploys com storage efêmero
-                self.boleto_pdf_db = pdf_content
+                # Cópia persistente: store por conteúdo ou banco de dados (storage efêmero)
+                from financeiro.services.pdf_store import anexar_pdf_parcela
+                anexar_pdf_parcela(self, pdf_content)
 
             # PIX se disponível
             if resultado.get('pix_copia_cola'):
@@ -1387,11 +1478,13 @@ class Reajuste(TimeStampedModel):
 
     @property
     def percentual_liquido(self):
-        """Percentual efetivamente aplicado após desconto em p.p."""
-        perc = self.percentual
-        if self.desconto_percentual:
-            perc = max(Decimal('0'), perc - self.desconto_percentual)
-        return perc
+        """
+        Percentual efetivamente aplicado. `percentual` já é gravado líquido do
+        desconto em p.p. (percentual_final do preview; percentual_bruto guarda
+        o índice) — desconto_percentual fica só como registro e não é
+        subtraído de novo, para o recálculo dar o mesmo valor do preview.
+        """
+        return self.percentual
 
     # ------------------------------------------------------------------
     # Métodos de classe para cálculo automático
@@ -1414,13 +1507,58 @@ class Reajuste(TimeStampedModel):
         antecipacao_meses: quantos meses antes do aniversário exibir como pendente.
         """
         from django.utils import timezone as tz
+
+        proximo = cls._ciclo_candidato(contrato, tz.now().date(), antecipacao_meses)
+        if proximo is None:
+            return None
+
+        # Verifica se já existe reajuste aplicado para esse ciclo
+        if cls.objects.filter(contrato=contrato, ciclo=proximo, aplicado=True).exists():
+            return None
+
+        return proximo
+
+    @classmethod
+    def ciclos_pendentes(cls, contratos, antecipacao_meses=1):
+        """
+        Versão em lote de calcular_ciclo_pendente: {contrato_id: ciclo} dos
+        contratos com reajuste pendente.
+
+        Uma consulta para os contratos (se vier um queryset) e uma para os
+        reajustes já aplicados dos ciclos candidatos — em vez de uma por contrato.
+        """
+        from django.utils import timezone as tz
+
+        hoje = tz.now().date()
+        candidatos = {}
+        for contrato in contratos:
+            proximo = cls._ciclo_candidato(contrato, hoje, antecipacao_meses)
+            if proximo is not None:
+                candidatos[contrato.pk] = proximo
+        if not candidatos:
+            return {}
+
+        aplicados = set()
+        ids = list(candidatos)
+        for inicio in range(0, len(ids), 500):
+            aplicados.update(cls.objects.filter(
+                contrato_id__in=ids[inicio:inicio + 500], aplicado=True,
+            ).values_list('contrato_id', 'ciclo'))
+
+        return {
+            contrato_id: ciclo for contrato_id, ciclo in candidatos.items()
+            if (contrato_id, ciclo) not in aplicados
+        }
+
+    @staticmethod
+    def _ciclo_candidato(contrato, hoje, antecipacao_meses):
+        """Próximo ciclo pelas datas do contrato, sem consultar reajustes já aplicados."""
         from contratos.models import TipoCorrecao
 
         if contrato.tipo_correcao == TipoCorrecao.FIXO:
             return None
 
         prazo = contrato.prazo_reajuste_meses
-        hoje = tz.now().date()
 
         # Comparação mês-a-mês (ignora o dia): soma antecipação para "adiantar"
         hoje_ym = hoje.year * 12 + hoje.month + antecipacao_meses
@@ -1440,10 +1578,6 @@ class Reajuste(TimeStampedModel):
         if proximo > ciclos_decorridos + 1:
             return None
 
-        # Verifica se já existe reajuste aplicado para esse ciclo
-        if cls.objects.filter(contrato=contrato, ciclo=proximo, aplicado=True).exists():
-            return None
-
         # Verifica se há parcelas no intervalo desse ciclo
         parcela_inicial = (proximo - 1) * prazo + 1
         if parcela_inicial > contrato.numero_parcelas:
@@ -1487,13 +1621,8 @@ class Reajuste(TimeStampedModel):
         Se taxa = 0, retorna amortização linear (saldo / n), sem juros.
         Se n = 0, retorna 0.
         """
-        if n_parcelas <= 0:
-            return Decimal('0')
-        i = taxa_mensal_pct / Decimal('100')
-        if i == 0:
-            return (saldo / Decimal(n_parcelas)).quantize(Decimal('0.01'))
-        fator = i / (1 - (1 + i) ** (-n_parcelas))
-        return (saldo * fator).quantize(Decimal('0.01'))
+        from financeiro.services.amortizacao import calcular_pmt
+        return calcular_pmt(saldo, taxa_mensal_pct, n_parcelas)
 
     @staticmethod
     def _calcular_price_tabela(pv, taxa_mensal_pct, n):
@@ -1502,25 +1631,10 @@ class Reajuste(TimeStampedModel):
 
         pmt constante, amort crescente, juros decrescentes.
         Se taxa=0, degenera em linear (amort=pmt=PV/n, juros=0).
+        Calculada em centavos inteiros (financeiro.services.amortizacao).
         """
-        if n <= 0:
-            return []
-        i = taxa_mensal_pct / Decimal('100')
-        pmt = Reajuste._calcular_pmt(pv, taxa_mensal_pct, n)
-        tabela = []
-        saldo = pv
-        for k in range(n):
-            juros_k = (saldo * i).quantize(Decimal('0.01'))
-            if k == n - 1:
-                # última parcela: amort = saldo restante (corrige arredondamentos)
-                amort_k = saldo
-                pmt_k = amort_k + juros_k
-            else:
-                amort_k = (pmt - juros_k).quantize(Decimal('0.01'))
-                pmt_k = pmt
-            saldo = (saldo - amort_k).quantize(Decimal('0.01'))
-            tabela.append((pmt_k, amort_k, juros_k))
-        return tabela
+        from financeiro.services.amortizacao import tabela_price
+        return tabela_price(pv, taxa_mensal_pct, n)
 
     @staticmethod
     def _calcular_sac_tabela(pv, taxa_mensal_pct, n):
@@ -1528,23 +1642,10 @@ class Reajuste(TimeStampedModel):
         Gera tabela completa de SAC: lista de (pmt, amort, juros) para n períodos.
 
         amort constante = PV/n, juros decrescentes, pmt decrescente.
+        Calculada em centavos inteiros (financeiro.services.amortizacao).
         """
-        if n <= 0:
-            return []
-        i = taxa_mensal_pct / Decimal('100')
-        amort = (pv / Decimal(n)).quantize(Decimal('0.01'))
-        tabela = []
-        saldo = pv
-        for k in range(n):
-            juros_k = (saldo * i).quantize(Decimal('0.01'))
-            if k == n - 1:
-                amort_k = saldo  # última parcela: zera o saldo
-            else:
-                amort_k = amort
-            pmt_k = amort_k + juros_k
-            saldo = (saldo - amort_k).quantize(Decimal('0.01'))
-            tabela.append((pmt_k, amort_k, juros_k))
-        return tabela
+        from financeiro.services.amortizacao import tabela_sac
+        return tabela_sac(pv, taxa_mensal_pct, n)
 
     @classmethod
     def preview_reajuste(cls, contrato, ciclo,
@@ -1573,8 +1674,96 @@ class Reajuste(TimeStampedModel):
           - total_parcelas, valor_anterior_total, valor_novo_total, diferenca_total
           - boletos_emitidos, erro
         """
-        from contratos.models import IndiceReajuste, TabelaJurosContrato
-        from django.db.models import Sum
+        from contratos.models import TabelaJurosContrato
+
+        taxa_tabela = TabelaJurosContrato.get_juros_para_ciclo(contrato, ciclo)
+
+        def carregar_parcelas():
+            return list(contrato.parcelas.filter(pago=False).order_by('numero_parcela'))
+
+        def carregar_intermediarias():
+            return list(contrato.intermediarias.filter(paga=False).order_by('mes_vencimento'))
+
+        return cls._montar_preview(
+            contrato, ciclo, taxa_tabela, carregar_parcelas, carregar_intermediarias,
+            desconto_percentual, desconto_valor,
+        )
+
+    @classmethod
+    def preview_reajuste_lote(cls, contratos, ciclo_map,
+                              desconto_percentual=None, desconto_valor=None):
+        """
+        preview_reajuste de vários contratos com número constante de consultas.
+
+        Carrega de uma vez as parcelas não pagas, as faixas de TabelaJurosContrato
+        e as intermediárias não pagas de todos os contratos; os índices vêm das
+        séries em cache (contratos.series_indices), uma consulta por tipo no máximo.
+
+        Args:
+            contratos: Contratos (iterável de instâncias).
+            ciclo_map: {contrato_id: ciclo} — ex.: Reajuste.ciclos_pendentes(contratos).
+                Contratos sem ciclo no mapa ficam de fora.
+
+        Returns:
+            {contrato_id: preview}, com a mesma estrutura de preview_reajuste.
+        """
+        from collections import defaultdict
+        from contratos.models import PrestacaoIntermediaria, TabelaJurosContrato
+
+        contratos = [c for c in contratos if ciclo_map.get(c.pk) is not None]
+        if not contratos:
+            return {}
+        por_id = {c.pk: c for c in contratos}
+        ids = list(por_id)
+
+        parcelas = defaultdict(list)
+        for parcela in Parcela.objects.filter(
+            contrato_id__in=ids, pago=False,
+        ).order_by('contrato_id', 'numero_parcela'):
+            parcelas[parcela.contrato_id].append(parcela)
+
+        faixas = defaultdict(list)
+        for faixa in TabelaJurosContrato.objects.filter(contrato_id__in=ids).order_by('-ciclo_inicio'):
+            faixas[faixa.contrato_id].append(faixa)
+
+        intermediarias = defaultdict(list)
+        ids_inter = [c.pk for c in contratos if c.intermediarias_reajustadas]
+        if ids_inter:
+            for inter in PrestacaoIntermediaria.objects.filter(
+                contrato_id__in=ids_inter, paga=False,
+            ).order_by('contrato_id', 'mes_vencimento'):
+                inter.contrato = por_id[inter.contrato_id]  # data_vencimento usa o contrato
+                intermediarias[inter.contrato_id].append(inter)
+
+        previews = {}
+        for contrato in contratos:
+            ciclo = ciclo_map[contrato.pk]
+            # Mesma regra de TabelaJurosContrato.get_juros_para_ciclo
+            faixa = next((
+                f for f in faixas[contrato.pk]
+                if f.ciclo_inicio <= ciclo and (f.ciclo_fim is None or f.ciclo_fim >= ciclo)
+            ), None)
+            previews[contrato.pk] = cls._montar_preview(
+                contrato, ciclo,
+                faixa.juros_mensal if faixa else None,
+                lambda pk=contrato.pk: parcelas[pk],
+                lambda pk=contrato.pk: intermediarias[pk],
+                desconto_percentual, desconto_valor,
+            )
+        return previews
+
+    @classmethod
+    def _montar_preview(cls, contrato, ciclo, taxa_tabela, carregar_parcelas,
+                        carregar_intermediarias, desconto_percentual, desconto_valor):
+        """
+        Cálculo de preview_reajuste sobre dados já resolvidos.
+
+        taxa_tabela: juros mensal da TabelaJurosContrato do ciclo (None = sem tabela).
+        carregar_parcelas: () -> parcelas não pagas do contrato, por numero_parcela.
+        carregar_intermediarias: () -> intermediárias não pagas, por mes_vencimento.
+        Os carregadores só são chamados quando o índice está disponível.
+        """
+        from contratos.models import IndiceReajuste
 
         prazo = contrato.prazo_reajuste_meses
         indice_tipo = contrato.tipo_correcao
@@ -1593,10 +1782,13 @@ class Reajuste(TimeStampedModel):
 
         # TabelaJurosContrato tem precedência: taxa de financiamento por ciclo
         # Quando presente → MODO TABELA PRICE; senão → spread fixo / MODO SIMPLES
-        taxa_tabela = TabelaJurosContrato.get_juros_para_ciclo(contrato, ciclo)
         usa_tabela_price = taxa_tabela is not None
         spread = taxa_tabela if usa_tabela_price else (contrato.spread_reajuste or Decimal('0'))
 
+        from contratos.models import TipoAmortizacao
+        usa_sac = usa_tabela_price and contrato.tipo_amortizacao == TipoAmortizacao.SAC
+        tipo_calculo = 'SAC' if usa_sac else ('TABELA_PRICE' if usa_tabela_price else 'SIMPLES')
+
         if percentual_bruto is None:
             fallback = contrato.tipo_correcao_fallback
             if fallback:
@@ -1618,6 +1810,7 @@ class Reajuste(TimeStampedModel):
                     'parcela_inicial': parcela_inicial,
                     'parcela_final': parcela_final,
                     'spread': spread,
+                    'tipo_calculo': tipo_calculo,
                 }
 
         desc_perc = Decimal(str(desconto_percentual)) if desconto_percentual else Decimal('0')
@@ -1645,20 +1838,16 @@ class Reajuste(TimeStampedModel):
         valor_novo_total = Decimal('0')
         boletos_emitidos = []
 
-        from contratos.models import TipoAmortizacao
-        usa_sac = usa_tabela_price and contrato.tipo_amortizacao == TipoAmortizacao.SAC
+        parcelas_nao_pagas = carregar_parcelas()
 
         if usa_tabela_price and not usa_sac:
             # MODO TABELA PRICE — modelo multiplicativo composto
             # Conforme cláusula contratual:
             #   PMT_novo = PMT_atual × (1 + IPCA) × (1 + taxa_mensal)^prazo
             # onde (1+taxa_mensal)^prazo é o fator de juros compostos anuais.
-            todas_restantes = contrato.parcelas.filter(
-                pago=False,
-                tipo_parcela=TipoParcela.NORMAL,
-            ).order_by('numero_parcela')
+            todas_restantes = [p for p in parcelas_nao_pagas if p.tipo_parcela == TipoParcela.NORMAL]
 
-            primeira = todas_restantes.first()
+            primeira = todas_restantes[0] if todas_restantes else None
             pmt_atual = primeira.valor_atual if primeira else Decimal('0')
 
             prazo = contrato.prazo_reajuste_meses
@@ -1691,22 +1880,17 @@ class Reajuste(TimeStampedModel):
 
         elif usa_sac:
             # MODO SAC — amortização constante recalculada sobre o saldo corrigido
-            todas_restantes = contrato.parcelas.filter(
-                pago=False,
-                tipo_parcela=TipoParcela.NORMAL,
-            ).order_by('numero_parcela')
+            todas_restantes = [p for p in parcelas_nao_pagas if p.tipo_parcela == TipoParcela.NORMAL]
 
-            n_restantes = todas_restantes.count()
+            n_restantes = len(todas_restantes)
 
             # Saldo SAC = soma das amortizações pendentes (principal real)
-            saldo_atual = todas_restantes.aggregate(
-                total=Sum('amortizacao')
-            )['total']
-            if saldo_atual is None:
+            amortizacoes = [p.amortizacao for p in todas_restantes if p.amortizacao is not None]
+            if amortizacoes:
+                saldo_atual = sum(amortizacoes, Decimal('0'))
+            else:
                 # fallback se amortizacao não preenchida
-                saldo_atual = todas_restantes.aggregate(
-                    total=Sum('valor_atual')
-                )['total'] or Decimal('0')
+                saldo_atual = sum((p.valor_atual for p in todas_restantes), Decimal('0'))
 
             saldo_atualizado = (saldo_atual * (1 + percentual_com_caps / 100)).quantize(Decimal('0.01'))
 
@@ -1739,10 +1923,7 @@ class Reajuste(TimeStampedModel):
             # Ex.: contrato 360 meses, ciclo 2 IPCA 10% → parcelas 13-360 × 1,10.
             parcela_final = contrato.numero_parcelas  # estende até o final do contrato
             fator = 1 + (percentual_com_caps / 100)
-            parcelas_qs = contrato.parcelas.filter(
-                numero_parcela__gte=parcela_inicial,
-                pago=False,
-            ).order_by('numero_parcela')
+            parcelas_qs = [p for p in parcelas_nao_pagas if p.numero_parcela >= parcela_inicial]
 
             for p in parcelas_qs:
                 novo_valor = p.valor_atual * fator
@@ -1769,11 +1950,10 @@ class Reajuste(TimeStampedModel):
         valor_inter_novo_total = Decimal('0')
         if contrato.intermediarias_reajustadas:
             fator_inter = 1 + (percentual_com_caps / 100)
-            intermediarias_qs = contrato.intermediarias.filter(
-                paga=False,
-                mes_vencimento__gte=parcela_inicial,
-                mes_vencimento__lte=parcela_final,
-            ).order_by('mes_vencimento')
+            intermediarias_qs = [
+                inter for inter in carregar_intermediarias()
+                if parcela_inicial <= inter.mes_vencimento <= parcela_final
+            ]
             for inter in intermediarias_qs:
                 novo_valor_inter = (inter.valor_atual * fator_inter).quantize(Decimal('0.01'))
                 detalhes_intermediarias.append({
@@ -1790,7 +1970,7 @@ class Reajuste(TimeStampedModel):
         return {
             'ciclo': ciclo,
             'indice_tipo': indice_tipo,
-            'tipo_calculo': 'SAC' if usa_sac else ('TABELA_PRICE' if usa_tabela_price else 'SIMPLES'),
+            'tipo_calculo': tipo_calculo,
             'periodo_referencia_inicio': inicio_ref,
             'periodo_referencia_fim': fim_ref,
             'percentual_bruto': percentual_bruto,
@@ -1881,13 +2061,18 @@ class Reajuste(TimeStampedModel):
             raise ValidationError(errors)
 
     @transaction.atomic
-    def aplicar_reajuste(self):
+    def aplicar_reajuste(self, preview=None):
         """
         Aplica o reajuste nas parcelas especificadas.
 
         Atualiza o valor_atual de todas as parcelas não pagas no intervalo
         e libera a geração de boletos para o próximo ciclo.
 
+        Args:
+            preview: Resultado de preview_reajuste / preview_reajuste_lote para
+                este contrato e ciclo. Se as parcelas ainda estiverem como no
+                preview, grava os valores calculados nele em vez de recalcular.
+
         Returns:
             dict: Resumo da aplicação com quantidade de parcelas e valores
         """
@@ -1918,7 +2103,14 @@ class Reajuste(TimeStampedModel):
         usa_tabela_price = taxa_tabela is not None
         usa_sac = usa_tabela_price and self.contrato.tipo_amortizacao == TipoAmortizacao.SAC
 
-        if usa_tabela_price and not usa_sac:
+        aplicado_do_preview = self._aplicar_valores_do_preview(preview) if preview else None
+
+        if aplicado_do_preview is not None:
+            # Valores já calculados no preview (ex.: preview_reajuste_lote)
+            parcelas_reajustadas, valor_anterior_total, valor_novo_total = aplicado_do_preview
+            perc_final = preview['percentual_final']
+
+        elif usa_tabela_price and not usa_sac:
             # MODO TABELA PRICE — modelo multiplicativo composto
             # PMT_novo = PMT_atual × (1 + IPCA) × (1 + taxa_mensal)^prazo
             parcelas = self.contrato.parcelas.filter(
@@ -1953,9 +2145,12 @@ class Reajuste(TimeStampedModel):
             ).order_by('numero_parcela'))
 
             n_restantes = len(parcelas)
-            saldo_atual = sum(
-                (p.amortizacao or p.valor_atual) for p in parcelas
-            )
+            # Mesmo saldo do preview: amortizações pendentes, ou valor_atual se não preenchidas
+            amortizacoes = [p.amortizacao for p in parcelas if p.amortizacao is not None]
+            if amortizacoes:
+                saldo_atual = sum(amortizacoes, Decimal('0'))
+            else:
+                saldo_atual = sum((p.valor_atual for p in parcelas), Decimal('0'))
 
             saldo_atualizado = (saldo_atual * (1 + perc_final / 100)).quantize(Decimal('0.01'))
             tabela_sac = self._calcular_sac_tabela(saldo_atualizado, taxa_tabela, n_restantes)
@@ -1997,6 +2192,9 @@ class Reajuste(TimeStampedModel):
             if parcelas:
                 self.parcela_final = parcelas[-1].numero_parcela
 
+        # Gravações em lote acima não disparam os signals de Parcela
+        ResumoRecebiveisMensal.atualizar_contratos([self.contrato_id])
+
         # Cancelar boletos das parcelas afetadas cujo valor mudou.
         # O PDF/código de barras foi gerado com o valor antigo — deve ser regenerado.
         boletos_cancelados = self.contrato.parcelas.filter(
@@ -2066,6 +2264,54 @@ class Reajuste(TimeStampedModel):
             'boletos_cancelados': boletos_cancelados,
         }
 
+    def _aplicar_valores_do_preview(self, preview):
+        """
+        Grava nas parcelas os valores novos do preview, sem recalcular.
+
+        Só vale se o preview é deste ciclo e as parcelas não pagas que o cálculo
+        completo alcançaria são exatamente as do preview, com o mesmo
+        valor_atual (nenhuma paga, criada ou alterada desde então); senão
+        retorna None e aplicar_reajuste faz o cálculo completo.
+
+        Returns:
+            (parcelas_reajustadas, valor_anterior_total, valor_novo_total) ou None
+        """
+        if 'erro' in preview or preview.get('ciclo') != self.ciclo:
+            return None
+
+        linhas = {linha['numero_parcela']: linha for linha in preview['parcelas']}
+        # Mesmo escopo dos modos de aplicar_reajuste
+        if preview.get('tipo_calculo') == 'SIMPLES':
+            escopo = self.contrato.parcelas.filter(
+                numero_parcela__gte=self.parcela_inicial, pago=False,
+            )
+        else:
+            escopo = self.contrato.parcelas.filter(
+                pago=False, tipo_parcela=TipoParcela.NORMAL,
+            )
+        parcelas = list(escopo.order_by('numero_parcela'))
+        if {p.numero_parcela for p in parcelas} != set(linhas) or any(
+            p.valor_atual != linhas[p.numero_parcela]['valor_atual'] for p in parcelas
+        ):
+            return None
+
+        campos = ['valor_atual']
+        sac = preview.get('tipo_calculo') == 'SAC'
+        if sac:
+            campos += ['amortizacao', 'juros_embutido']
+        for parcela in parcelas:
+            linha = linhas[parcela.numero_parcela]
+            parcela.valor_atual = linha['valor_novo']
+            if sac:
+                parcela.amortizacao = linha['amortizacao_nova']
+                parcela.juros_embutido = linha['juros_novo']
+        Parcela.objects.bulk_update(parcelas, campos)
+
+        if parcelas and preview.get('tipo_calculo') == 'SIMPLES':
+            self.parcela_final = parcelas[-1].numero_parcela
+
+        return len(parcelas), preview['valor_anterior_total'], preview['valor_novo_total']
+
     @classmethod
     def criar_reajuste_ciclo(cls, contrato, ciclo, indice_tipo=None, percentual=None):
         """
@@ -3108,3 +3354,474 @@ class EventoCobrancaApi(models.Model):
 
     def __str__(self):
         return f'CobrancaAPI {self.cobranca_id} [{self.status_cobranca}] → {self.get_status_display()}'
+
+
+class WebhookInbox(models.Model):
+    """
+    Caixa de entrada dos webhooks Boleto-API e PIX no modo fast-ack
+    (WEBHOOK_INBOX): o endpoint valida a assinatura, grava o evento bruto e
+    responde 202; financeiro.services.webhook_inbox processa depois, em ordem
+    por cobrança (`chave`). Só inserção — o processamento atualiza apenas os
+    campos de controle. Reentrega do mesmo evento cai no unique de event_id.
+    """
+
+    ORIGEM_BOLETO_API = 'boleto_api'
+    ORIGEM_PIX = 'pix'
+    ORIGEM_CHOICES = [
+        (ORIGEM_BOLETO_API, 'Boleto-API'),
+        (ORIGEM_PIX, 'PIX'),
+    ]
+
+    STATUS_PENDENTE = 'pendente'
+    STATUS_PROCESSADO = 'processado'
+    STATUS_ERRO = 'erro'
+    STATUS_CHOICES = [
+        (STATUS_PENDENTE, 'Pendente'),
+        (STATUS_PROCESSADO, 'Processado'),
+        (STATUS_ERRO, 'Erro (tentativas esgotadas)'),
+    ]
+
+    origem = models.CharField(max_length=20, choices=ORIGEM_CHOICES, verbose_name='Origem')
+    event_id = models.CharField(
+        max_length=150,
+        verbose_name='ID do Evento',
+        help_text='event_id do gateway / EndToEndId do PIX (ou hash do corpo, se ausente).',
+    )
+    chave = models.CharField(
+        max_length=150,
+        verbose_name='Chave de Ordenação',
+        help_text='Cobrança do evento (cobranca_id/ext_ref/txid): processados em ordem por chave.',
+    )
+    payload = models.TextField(verbose_name='Payload')
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDENTE, verbose_name='Status',
+    )
+    resultado = models.CharField(
+        max_length=20, blank=True, verbose_name='Resultado',
+        help_text='Status devolvido pelo processamento (baixado, duplicado, sem_parcela...).',
+    )
+    tentativas = models.PositiveIntegerField(default=0, verbose_name='Tentativas')
+    erro = models.TextField(blank=True, verbose_name='Erro')
+    proxima_tentativa_em = models.DateTimeField(null=True, blank=True, verbose_name='Próxima Tentativa em')
+    reservada_por = models.CharField(max_length=64, blank=True, verbose_name='Reservada por')
+    reservada_ate = models.DateTimeField(null=True, blank=True, verbose_name='Reservada até')
+    recebido_em = models.DateTimeField(auto_now_add=True, verbose_name='Recebido em')
+    processado_em = models.DateTimeField(null=True, blank=True, verbose_name='Processado em')
+
+    class Meta:
+        verbose_name = 'Webhook (caixa de entrada)'
+        verbose_name_plural = 'Webhooks (caixa de entrada)'
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['origem', 'event_id'], name='unique_webhook_inbox_evento'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'id'], name='fin_inbox_status_idx'),
+            models.Index(fields=['chave', 'status'], name='fin_inbox_chave_status_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_origem_display()} {self.event_id} [{self.get_status_display()}]'
+
+
+class ArquivoPdf(models.Model):
+    """
+    PDF armazenado por conteúdo (SHA-256) no storage 'boleto_pdfs'.
+
+    Um carnê de lote compartilhado por N parcelas vira um único arquivo; os
+    bytes ficam fora da tabela de parcelas (ver financeiro.services.pdf_store).
+    """
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name='SHA-256')
+    tamanho = models.PositiveIntegerField(verbose_name='Tamanho (bytes)')
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name='Criado em')
+
+    class Meta:
+        verbose_name = 'Arquivo PDF'
+        verbose_name_plural = 'Arquivos PDF'
+
+    def __str__(self):
+        return f'PDF {self.sha256[:12]} ({self.tamanho} bytes)'
+
+    @property
+    def caminho(self):
+        """Caminho no storage: aa/bb/<sha256>.pdf (fan-out por prefixo)."""
+        return f'{self.sha256[:2]}/{self.sha256[2:4]}/{self.sha256}.pdf'
+
+
+class ResumoRecebiveisMensal(models.Model):
+    """
+    Resumo materializado dos recebíveis por (imobiliária, mês de vencimento).
+
+    Os dashboards liam previsto × realizado × vencido agregando a tabela de
+    parcelas inteira a cada request; lendo daqui são algumas dezenas de linhas.
+    Cada linha é recalculada a partir das parcelas do mês sempre que uma
+    parcela é criada, paga, reajustada ou removida (financeiro.signals e os
+    caminhos em lote, via atualizar_parcelas). reconstruir() refaz tudo —
+    comando `reconstruir_resumo_recebiveis` e tarefa diária.
+
+    "Vencido" depende do dia: nos meses anteriores ao corrente é todo o valor
+    em aberto; o mês corrente é sempre agregado direto das parcelas (serie /
+    totais), então o resumo não envelhece durante o mês.
+    """
+    imobiliaria = models.ForeignKey(
+        'core.Imobiliaria',
+        on_delete=models.CASCADE,
+        related_name='resumos_recebiveis',
+        verbose_name='Imobiliária'
+    )
+    mes = models.DateField(verbose_name='Mês', help_text='Primeiro dia do mês de vencimento')
+    qtd_parcelas = models.PositiveIntegerField(default=0, verbose_name='Parcelas')
+    qtd_pagas = models.PositiveIntegerField(default=0, verbose_name='Parcelas pagas')
+    valor_previsto = models.DecimalField(
+        max_digits=16, decimal_places=2, default=Decimal('0.00'), verbose_name='Previsto'
+    )
+    valor_realizado = models.DecimalField(
+        max_digits=16, decimal_places=2, default=Decimal('0.00'), verbose_name='Realizado'
+    )
+    valor_aberto = models.DecimalField(
+        max_digits=16, decimal_places=2, default=Decimal('0.00'), verbose_name='Em aberto'
+    )
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name='Atualizado em')
+
+    CAMPOS_PARCELA = ('contrato_id', 'data_vencimento', 'pago', 'valor_atual', 'valor_pago')
+
+    class Meta:
+        verbose_name = 'Resumo Mensal de Recebíveis'
+        verbose_name_plural = 'Resumos Mensais de Recebíveis'
+        ordering = ['imobiliaria', 'mes']
+        constraints = [
+            models.UniqueConstraint(fields=['imobiliaria', 'mes'], name='unique_resumo_recebiveis_mes'),
+        ]
+        indexes = [
+            models.Index(fields=['mes'], name='fin_resumo_receb_mes_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.imobiliaria_id} {self.mes:%m/%Y}: {self.qtd_parcelas} parcelas'
+
+    @property
+    def qtd_abertas(self):
+        return self.qtd_parcelas - self.qtd_pagas
+
+    # -------------------------------------------------------------------------
+    # Manutenção
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _agregados():
+        from django.db.models import Count, Sum
+        return dict(
+            qtd_parcelas=Count('id'),
+            qtd_pagas=Count('id', filter=Q(pago=True)),
+            valor_previsto=Sum('valor_atual'),
+            valor_realizado=Sum('valor_pago', filter=Q(pago=True)),
+            valor_aberto=Sum('valor_atual', filter=Q(pago=False)),
+        )
+
+    @classmethod
+    def _linha(cls, imobiliaria_id, mes, row):
+        return cls(
+            imobiliaria_id=imobiliaria_id, mes=mes,
+            qtd_parcelas=row['qtd_parcelas'], qtd_pagas=row['qtd_pagas'],
+            valor_previsto=row['valor_previsto'] or Decimal('0.00'),
+            valor_realizado=row['valor_realizado'] or Decimal('0.00'),
+            valor_aberto=row['valor_aberto'] or Decimal('0.00'),
+        )
+
+    @classmethod
+    def _gravar(cls, linhas):
+        campos = ['qtd_parcelas', 'qtd_pagas', 'valor_previsto', 'valor_realizado',
+                  'valor_aberto', 'atualizado_em']
+        agora = timezone.now()
+        for linha in linhas:
+            linha.atualizado_em = agora
+        cls.objects.bulk_create(
+            linhas, batch_size=500, update_conflicts=True,
+            unique_fields=['imobiliaria', 'mes'], update_fields=campos,
+        )
+
+    @classmethod
+    def _travar(cls, imobiliaria_id, meses):
+        """
+        Trava (SELECT ... FOR UPDATE) as linhas dos meses, criando as que
+        faltam, em ordem de mês. Duas baixas no mesmo mês recalculam em
+        série: a segunda espera o commit da primeira e, em READ COMMITTED,
+        agrega já vendo a parcela dela — sem isso a última gravação
+        sobrescrevia os totais da outra.
+        """
+        cls.objects.bulk_create(
+            [cls(imobiliaria_id=imobiliaria_id, mes=mes) for mes in sorted(meses)],
+            ignore_conflicts=True,
+        )
+        list(
+            cls.objects.select_for_update()
+            .filter(imobiliaria_id=imobiliaria_id, mes__in=meses)
+            .order_by('mes').values_list('pk', flat=True)
+        )
+
+    @classmethod
+    def recalcular(cls, chaves):
+        """
+        Recalcula as linhas (imobiliaria_id, mes) a partir das parcelas: uma
+        consulta agrupada por imobiliária, cobrindo o intervalo dos meses pedidos,
+        com as linhas travadas (_travar) até o fim da transação do chamador.
+        Meses que ficaram sem parcelas são removidos.
+        """
+        from django.db.models.functions import TruncMonth
+        from dateutil.relativedelta import relativedelta
+
+        por_imob = {}
+        for imobiliaria_id, mes in chaves:
+            if imobiliaria_id is not None and mes is not None:
+                por_imob.setdefault(imobiliaria_id, set()).add(mes.replace(day=1))
+
+        for imobiliaria_id, meses in por_imob.items():
+            with transaction.atomic():
+                cls._travar(imobiliaria_id, meses)
+                rows = {
+                    row['mes_venc']: row
+                    for row in Parcela.objects.filter(
+                        contrato__imobiliaria_id=imobiliaria_id,
+                        data_vencimento__gte=min(meses),
+                        data_vencimento__lt=max(meses) + relativedelta(months=1),
+                    ).annotate(mes_venc=TruncMonth('data_vencimento')).values('mes_venc').annotate(
+                        **cls._agregados()
+                    ).order_by()
+                }
+                rows = {mes: rows[mes] for mes in meses if mes in rows}
+                cls._gravar([cls._linha(imobiliaria_id, mes, row) for mes, row in rows.items()])
+                vazios = meses - set(rows)
+                if vazios:
+                    cls.objects.filter(imobiliaria_id=imobiliaria_id, mes__in=vazios).delete()
+
+    @classmethod
+    def chaves_parcelas(cls, parcelas):
+        """
+        (imobiliaria_id, mes) das parcelas — instâncias ou tuplas
+        (contrato_id, data_vencimento). A imobiliária vem do contrato em cache
+        ou de uma consulta para todos os contratos do lote.
+        """
+        from contratos.models import Contrato
+
+        pares = set()
+        imob_por_contrato = {}
+        for parcela in parcelas:
+            if isinstance(parcela, tuple):
+                contrato_id, vencimento = parcela
+            else:
+                contrato_id, vencimento = parcela.contrato_id, parcela.data_vencimento
+                if Parcela.contrato.is_cached(parcela):
+                    imob_por_contrato[contrato_id] = parcela.contrato.imobiliaria_id
+            if contrato_id is not None and vencimento is not None:
+                pares.add((contrato_id, vencimento.replace(day=1)))
+
+        faltam = {c for c, _ in pares} - set(imob_por_contrato)
+        if faltam:
+            imob_por_contrato.update(
+                Contrato.objects.filter(pk__in=faltam).values_list('id', 'imobiliaria_id')
+            )
+        return {(imob_por_contrato.get(c), mes) for c, mes in pares}
+
+    @classmethod
+    def atualizar_parcelas(cls, parcelas, anteriores=()):
+        """
+        Recalcula os meses das parcelas. Para gravações em lote (bulk_create,
+        bulk_update, update) que não disparam os signals de Parcela.
+
+        Args:
+            parcelas: Parcelas (ou tuplas (contrato_id, data_vencimento)).
+            anteriores: Idem, com o estado anterior — quando o vencimento muda
+                o mês antigo também precisa ser recalculado.
+        """
+        chaves = cls.chaves_parcelas(list(parcelas) + list(anteriores))
+        if chaves:
+            cls.recalcular(chaves)
+
+    @classmethod
+    def atualizar_contratos(cls, contratos, imobiliarias_anteriores=()):
+        """
+        Recalcula todos os meses com parcelas dos contratos — e os mesmos
+        meses nas `imobiliarias_anteriores`, quando o contrato mudou de
+        imobiliária.
+        """
+        from django.db.models.functions import TruncMonth
+
+        ids = [getattr(c, 'pk', c) for c in contratos]
+        chaves = set(
+            Parcela.objects.filter(contrato_id__in=ids)
+            .annotate(mes_venc=TruncMonth('data_vencimento'))
+            .values_list('contrato__imobiliaria_id', 'mes_venc')
+            .distinct().order_by()
+        )
+        chaves |= {
+            (imobiliaria_id, mes)
+            for imobiliaria_id in imobiliarias_anteriores for _, mes in list(chaves)
+        }
+        if chaves:
+            cls.recalcular(chaves)
+
+    @classmethod
+    @transaction.atomic
+    def reconstruir(cls, imobiliarias=None):
+        """
+        Refaz o resumo a partir das parcelas: uma consulta agrupada por
+        (imobiliária, mês). Sem `imobiliarias`, refaz todas.
+
+        Returns:
+            int: linhas gravadas.
+        """
+        from django.db.models.functions import TruncMonth
+
+        parcelas = Parcela.objects.all()
+        resumo = cls.objects.all()
+        if imobiliarias is not None:
+            ids = [getattr(i, 'pk', i) for i in imobiliarias]
+            parcelas = parcelas.filter(contrato__imobiliaria_id__in=ids)
+            resumo = resumo.filter(imobiliaria_id__in=ids)
+
+        linhas = [
+            cls._linha(row['contrato__imobiliaria_id'], row['mes_venc'], row)
+            for row in parcelas.annotate(mes_venc=TruncMonth('data_vencimento'))
+            .values('contrato__imobiliaria_id', 'mes_venc')
+            .annotate(**cls._agregados()).order_by()
+        ]
+        resumo.delete()
+        cls._gravar(linhas)
+        return len(linhas)
+
+    # -------------------------------------------------------------------------
+    # Leitura
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def _mes_corrente(cls, imobiliarias, hoje, ate_hoje=False, por_imobiliaria=False):
+        """
+        Mês corrente agregado das parcelas, com o vencido até ontem. Com
+        por_imobiliaria=True devolve {imobiliaria_id: linha}.
+        """
+        from django.db.models import Count, Sum
+        from dateutil.relativedelta import relativedelta
+
+        inicio = hoje.replace(day=1)
+        parcelas = Parcela.objects.filter(data_vencimento__gte=inicio)
+        if ate_hoje:
+            parcelas = parcelas.filter(data_vencimento__lte=hoje)
+        else:
+            parcelas = parcelas.filter(data_vencimento__lt=inicio + relativedelta(months=1))
+        if imobiliarias is not None:
+            parcelas = parcelas.filter(contrato__imobiliaria_id__in=imobiliarias)
+        agregados = dict(
+            cls._agregados(),
+            qtd_vencidas=Count('id', filter=Q(pago=False, data_vencimento__lt=hoje)),
+            valor_vencido=Sum('valor_atual', filter=Q(pago=False, data_vencimento__lt=hoje)),
+        )
+        if not por_imobiliaria:
+            return parcelas.aggregate(**agregados)
+        return {
+            row['contrato__imobiliaria_id']: row
+            for row in parcelas.values('contrato__imobiliaria_id').annotate(**agregados).order_by()
+        }
+
+    @staticmethod
+    def _formatar(row, vencido):
+        """Linha de leitura: valores Decimal (0 quando vazio) e contagens."""
+        zero = Decimal('0.00')
+        qtd_vencidas, valor_vencido = vencido
+        return {
+            'qtd_parcelas': row.get('qtd_parcelas') or 0,
+            'qtd_pagas': row.get('qtd_pagas') or 0,
+            'qtd_abertas': (row.get('qtd_parcelas') or 0) - (row.get('qtd_pagas') or 0),
+            'qtd_vencidas': qtd_vencidas or 0,
+            'valor_previsto': row.get('valor_previsto') or zero,
+            'valor_realizado': row.get('valor_realizado') or zero,
+            'valor_aberto': row.get('valor_aberto') or zero,
+            'valor_vencido': valor_vencido or zero,
+        }
+
+    @staticmethod
+    def _somas():
+        from django.db.models import Sum
+        return dict(
+            qtd_parcelas=Sum('qtd_parcelas'), qtd_pagas=Sum('qtd_pagas'),
+            valor_previsto=Sum('valor_previsto'), valor_realizado=Sum('valor_realizado'),
+            valor_aberto=Sum('valor_aberto'),
+        )
+
+    @classmethod
+    def serie(cls, imobiliarias, inicio, fim, hoje=None, ate_hoje=False):
+        """
+        Série mensal entre os meses de `inicio` e `fim` (inclusive), somando as
+        imobiliárias (None = todas).
+
+        O mês corrente vem direto das parcelas; com ate_hoje=True ele só
+        considera os vencimentos até hoje (gráficos "até a data").
+
+        Returns:
+            dict: {mes (dia 1): {qtd_parcelas, qtd_pagas, qtd_abertas,
+                qtd_vencidas, valor_previsto, valor_realizado, valor_aberto,
+                valor_vencido}} — só os meses com parcelas.
+        """
+        hoje = hoje or timezone.now().date()
+        corrente = hoje.replace(day=1)
+        inicio, fim = inicio.replace(day=1), fim.replace(day=1)
+
+        resumo = cls.objects.filter(mes__gte=inicio, mes__lte=fim).exclude(mes=corrente)
+        if imobiliarias is not None:
+            resumo = resumo.filter(imobiliaria_id__in=imobiliarias)
+        serie = {}
+        for row in resumo.values('mes').annotate(**cls._somas()).order_by('mes'):
+            # Mês passado: todo o valor em aberto já venceu
+            vencido = (row['qtd_parcelas'] - row['qtd_pagas'], row['valor_aberto']) \
+                if row['mes'] < corrente else (0, None)
+            serie[row['mes']] = cls._formatar(row, vencido)
+
+        if inicio <= corrente <= fim:
+            row = cls._mes_corrente(imobiliarias, hoje, ate_hoje=ate_hoje)
+            if row['qtd_parcelas']:
+                serie[corrente] = cls._formatar(row, (row['qtd_vencidas'], row['valor_vencido']))
+        return dict(sorted(serie.items()))
+
+    @classmethod
+    def totais(cls, imobiliarias=None, hoje=None, por_imobiliaria=False):
+        """
+        Totais de todos os meses, no formato de cada mês de serie(). Substitui
+        o aggregate sobre a tabela de parcelas inteira.
+
+        Com por_imobiliaria=True devolve {imobiliaria_id: totais} (só as
+        imobiliárias com parcelas).
+        """
+        from django.db.models import Case, DecimalField, IntegerField, Sum, When
+
+        hoje = hoje or timezone.now().date()
+        corrente = hoje.replace(day=1)
+        resumo = cls.objects.exclude(mes=corrente)
+        if imobiliarias is not None:
+            resumo = resumo.filter(imobiliaria_id__in=imobiliarias)
+        # As somas de vencido vêm antes de _somas(): depois dela qtd_parcelas
+        # e qtd_pagas já são os nomes dos agregados, não dos campos
+        agregados = dict(
+            # Meses passados: o que está em aberto já venceu
+            qtd_vencidas=Sum(Case(
+                When(mes__lt=corrente, then=F('qtd_parcelas') - F('qtd_pagas')),
+                default=0, output_field=IntegerField(),
+            )),
+            valor_vencido=Sum('valor_aberto', filter=Q(mes__lt=corrente), output_field=DecimalField()),
+            **cls._somas(),
+        )
+
+        def somar(row, atual):
+            soma = {campo: (row.get(campo) or 0) + (atual.get(campo) or 0) for campo in agregados}
+            return cls._formatar(soma, (soma['qtd_vencidas'], soma['valor_vencido']))
+
+        if not por_imobiliaria:
+            return somar(resumo.aggregate(**agregados), cls._mes_corrente(imobiliarias, hoje))
+
+        linhas = {
+            row['imobiliaria_id']: row
+            for row in resumo.values('imobiliaria_id').annotate(**agregados).order_by()
+        }
+        atuais = cls._mes_corrente(imobiliarias, hoje, por_imobiliaria=True)
+        return {
+            imob_id: somar(linhas.get(imob_id, {}), atuais.get(imob_id, {}))
+            for imob_id in linhas.keys() | atuais.keys()
+        }
@@ -0,0 +1,244 @@
+"""
+Motor de tabelas de amortização (Price e SAC) em centavos inteiros.
+
+As tabelas de Reajuste._calcular_price_tabela / _calcular_sac_tabela eram
+montadas período a período com Decimal (multiplicação + quantize por linha),
+o que pesa em contratos de 360 parcelas e nas telas que recalculam vários
+contratos. Aqui o saldo, os juros e a amortização correm como int em
+centavos: juros_k = arredonda(saldo_k × taxa), com a taxa como fração exata
+(numerador/denominador) e arredondamento HALF_EVEN — o mesmo do quantize
+padrão do Decimal. PMT (Price) e amortização constante (SAC) continuam
+calculados em Decimal, uma vez por tabela, exatamente como antes.
+
+O resultado é idêntico, centavo a centavo, à implementação Decimal
+(tabela_price_decimal / tabela_sac_decimal, mantidas como referência). Quando
+o saldo não está em centavos ou o produto saldo × taxa passaria da precisão
+do contexto Decimal (28 dígitos) — casos em que a referência arredonda no
+meio da conta — o motor usa a própria referência.
+
+Sem numpy: a recorrência do saldo arredonda a cada período, então cada tabela
+é sequencial de qualquer forma; o ganho vem de trocar Decimal por int.
+
+Desenvolvedor: Maxwell da Silva Oliveira
+"""
+from decimal import Decimal
+from typing import Iterable, List, Optional, Tuple
+
+PRICE = 'PRICE'
+SAC = 'SAC'
+
+_CENTAVO = Decimal('0.01')
+# Dígitos do contexto Decimal padrão; acima disso a referência arredonda
+# saldo × taxa antes do quantize e o cálculo inteiro deixaria de coincidir
+_PRECISAO_DECIMAL = 28
+
+Linha = Tuple[Decimal, Decimal, Decimal]
+
+
+def calcular_pmt(saldo, taxa_mensal_pct, n_parcelas) -> Decimal:
+    """
+    Valor da prestação pela fórmula da Tabela Price.
+
+    PMT = PV × i / (1 − (1+i)^−n)
+
+    Se taxa = 0, retorna amortização linear (saldo / n), sem juros.
+    Se n = 0, retorna 0.
+    """
+    if n_parcelas <= 0:
+        return Decimal('0')
+    i = taxa_mensal_pct / Decimal('100')
+    if i == 0:
+        return (saldo / Decimal(n_parcelas)).quantize(_CENTAVO)
+    fator = i / (1 - (1 + i) ** (-n_parcelas))
+    return (saldo * fator).quantize(_CENTAVO)
+
+
+def tabela_price_decimal(pv, taxa_mensal_pct, n) -> List[Linha]:
+    """Tabela Price período a período em Decimal (implementação de referência)."""
+    if n <= 0:
+        return []
+    i = taxa_mensal_pct / Decimal('100')
+    pmt = calcular_pmt(pv, taxa_mensal_pct, n)
+    tabela = []
+    saldo = pv
+    for k in range(n):
+        juros_k = (saldo * i).quantize(_CENTAVO)
+        if k == n - 1:
+            # última parcela: amort = saldo restante (corrige arredondamentos)
+            amort_k = saldo
+            pmt_k = amort_k + juros_k
+        else:
+            amort_k = (pmt - juros_k).quantize(_CENTAVO)
+            pmt_k = pmt
+        saldo = (saldo - amort_k).quantize(_CENTAVO)
+        tabela.append((pmt_k, amort_k, juros_k))
+    return tabela
+
+
+def tabela_sac_decimal(pv, taxa_mensal_pct, n) -> List[Linha]:
+    """Tabela SAC período a período em Decimal (implementação de referência)."""
+    if n <= 0:
+        return []
+    i = taxa_mensal_pct / Decimal('100')
+    amort = (pv / Decimal(n)).quantize(_CENTAVO)
+    tabela = []
+    saldo = pv
+    for k in range(n):
+        juros_k = (saldo * i).quantize(_CENTAVO)
+        if k == n - 1:
+            amort_k = saldo  # última parcela: zera o saldo
+        else:
+            amort_k = amort
+        pmt_k = amort_k + juros_k
+        saldo = (saldo - amort_k).quantize(_CENTAVO)
+        tabela.append((pmt_k, amort_k, juros_k))
+    return tabela
+
+
+def _centavos(valor) -> Optional[int]:
+    """Valor em centavos, ou None se tiver fração de centavo."""
+    centavos = Decimal(valor).scaleb(2)
+    if centavos != centavos.to_integral_value():
+        return None
+    return int(centavos)
+
+
+def _fracao_taxa(pv_centavos: int, taxa_mensal_pct) -> Optional[Tuple[int, int]]:
+    """
+    taxa/100 como (numerador, denominador), ou None se saldo × taxa não for
+    exato no contexto Decimal (a referência arredondaria antes do quantize).
+    """
+    i = Decimal(taxa_mensal_pct) / Decimal('100')
+    digitos = len(i.as_tuple().digits) + len(str(abs(pv_centavos))) + 1
+    if digitos > _PRECISAO_DECIMAL:
+        return None
+    return i.as_integer_ratio()
+
+
+def _arredondar(numerador: int, denominador: int) -> int:
+    """numerador / denominador arredondado HALF_EVEN (denominador > 0)."""
+    q, r = divmod(2 * numerador + denominador, 2 * denominador)
+    if r == 0 and q & 1:
+        q -= 1  # empate exato em meio centavo: vai para o par
+    return q
+
+
+def price_centavos(pv_centavos: int, num: int, den: int, pmt_centavos: int, n: int):
+    """Colunas (pmt, amortizacao, juros) da Tabela Price, em centavos."""
+    # juros = arredonda(saldo × num / den), com _arredondar inline no laço
+    num2, den2 = 2 * num, 2 * den
+    amorts = []
+    juros = []
+    saldo = pv_centavos
+    for _ in range(n - 1):
+        j, r = divmod(saldo * num2 + den, den2)
+        if r == 0 and j & 1:
+            j -= 1
+        juros.append(j)
+        amorts.append(pmt_centavos - j)
+        saldo -= pmt_centavos - j
+    j = _arredondar(saldo * num, den)
+    juros.append(j)
+    amorts.append(saldo)
+    pmts = [pmt_centavos] * (n - 1)
+    pmts.append(saldo + j)
+    return pmts, amorts, juros
+
+
+def sac_centavos(pv_centavos: int, num: int, den: int, amort_centavos: int, n: int):
+    """Colunas (pmt, amortizacao, juros) da tabela SAC, em centavos."""
+    amorts = [amort_centavos] * n
+    amorts[-1] = pv_centavos - amort_centavos * (n - 1)
+    # Saldo antes do período k: pv − k × amort (a amortização é constante), então
+    # o numerador de juros cai um passo fixo por período
+    den2 = 2 * den
+    passo = 2 * amort_centavos * num
+    numerador = 2 * pv_centavos * num + den
+    juros = []
+    for _ in range(n):
+        j, r = divmod(numerador, den2)
+        if r == 0 and j & 1:
+            j -= 1
+        juros.append(j)
+        numerador -= passo
+    pmts = [a + j for a, j in zip(amorts, juros)]
+    return pmts, amorts, juros
+
+
+def _decimais(centavos, constante=None) -> List[Decimal]:
+    """Coluna em centavos -> Decimal com 2 casas; uma coluna constante vira o mesmo objeto."""
+    if constante is not None:
+        valor = Decimal(constante) * _CENTAVO
+        decimais = [valor] * len(centavos)
+        decimais[-1] = Decimal(centavos[-1]) * _CENTAVO
+        return decimais
+    return list(map(_CENTAVO.__mul__, map(Decimal, centavos)))
+
+
+def tabela_price(pv, taxa_mensal_pct, n) -> List[Linha]:
+    """
+    Tabela Price: lista de (pmt, amort, juros) para n períodos.
+
+    pmt constante, amort crescente, juros decrescentes; a última parcela
+    absorve o saldo restante. Idêntica a tabela_price_decimal.
+    """
+    if n <= 0:
+        return []
+    pv_centavos = _centavos(pv)
+    fracao = _fracao_taxa(pv_centavos, taxa_mensal_pct) if pv_centavos is not None else None
+    if fracao is None:
+        return tabela_price_decimal(pv, taxa_mensal_pct, n)
+    pmt_centavos = _centavos(calcular_pmt(pv, taxa_mensal_pct, n))
+    pmts, amorts, juros = price_centavos(pv_centavos, *fracao, pmt_centavos, n)
+    return list(zip(_decimais(pmts, pmt_centavos), _decimais(amorts), _decimais(juros)))
+
+
+def tabela_sac(pv, taxa_mensal_pct, n) -> List[Linha]:
+    """
+    Tabela SAC: lista de (pmt, amort, juros) para n períodos.
+
+    amort constante = PV/n, juros e pmt decrescentes; a última parcela zera o
+    saldo. Idêntica a tabela_sac_decimal.
+    """
+    if n <= 0:
+        return []
+    pv_centavos = _centavos(pv)
+    fracao = _fracao_taxa(pv_centavos, taxa_mensal_pct) if pv_centavos is not None else None
+    if fracao is None:
+        return tabela_sac_decimal(pv, taxa_mensal_pct, n)
+    amort_centavos = _centavos((pv / Decimal(n)).quantize(_CENTAVO))
+    pmts, amorts, juros = sac_centavos(pv_centavos, *fracao, amort_centavos, n)
+    return list(zip(_decimais(pmts), _decimais(amorts, amort_centavos), _decimais(juros)))
+
+
+def tabela_centavos(pv, taxa_mensal_pct, n, sistema: str = PRICE):
+    """
+    Colunas (pmts, amortizacoes, juros) da tabela em centavos (int), sem
+    montar Decimal por linha — para totais e telas que processam muitos contratos.
+    """
+    if n <= 0:
+        return [], [], []
+    pv_centavos = _centavos(pv)
+    fracao = _fracao_taxa(pv_centavos, taxa_mensal_pct) if pv_centavos is not None else None
+    if fracao is None:
+        referencia = tabela_sac_decimal if sistema == SAC else tabela_price_decimal
+        linhas = referencia(pv, taxa_mensal_pct, n)
+        return tuple([int(linha[c] * 100) for linha in linhas] for c in range(3))
+    if sistema == SAC:
+        amort_centavos = _centavos((pv / Decimal(n)).quantize(_CENTAVO))
+        return sac_centavos(pv_centavos, *fracao, amort_centavos, n)
+    pmt_centavos = _centavos(calcular_pmt(pv, taxa_mensal_pct, n))
+    return price_centavos(pv_centavos, *fracao, pmt_centavos, n)
+
+
+def tabelas_em_lote(itens: Iterable[Tuple], sistema: str = PRICE, em_centavos: bool = False) -> list:
+    """
+    Tabelas de vários contratos de uma vez: itens = [(pv, taxa_mensal_pct, n), ...].
+
+    sistema: PRICE ou SAC (valores de TipoAmortizacao).
+    em_centavos: True devolve as colunas de tabela_centavos em vez das linhas Decimal.
+    """
+    if em_centavos:
+        return [tabela_centavos(pv, taxa, n, sistema) for pv, taxa, n in itens]
+    gerar = tabela_sac if sistema == SAC else tabela_price
+    return [gerar(pv, taxa, n) for pv, taxa, n in itens]
@@ -12,17 +12,29 @@ Endpoints consumidos:
   DELETE /cobranca/{id}         → baixar_cobranca()
   POST   /carne                 → gerar_carne()
 
+Conexões: uma requests.Session por host do gateway (pool keep-alive de
+BOLETO_API_POOL_MAXSIZE), compartilhada pelas threads do processo. Um
+circuito por (host, provider) corta as chamadas depois de
+BOLETO_API_CIRCUITO_FALHAS falhas seguidas (5xx/conexão) e só deixa passar
+uma chamada de teste após BOLETO_API_CIRCUITO_ABERTO_SEGUNDOS. `em_lote` /
+`consultar_cobrancas_lote` fazem o fan-out dos jobs diários num pool de
+threads, limitado por tenant/provider.
+
 Desenvolvedor: Maxwell da Silva Oliveira
 """
 import base64
 import json
 import logging
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 from typing import Any
+from urllib.parse import urlsplit
 
 import requests
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +64,127 @@ def _redact(d: dict, campos=('client_secret', 'password', 'pfx', 'key')) -> dict
     return {k: '***' if k in campos else v for k, v in d.items()}
 
 
+# ---------------------------------------------------------------------------
+# Conexões, circuito e limites por tenant (compartilhados no processo)
+# ---------------------------------------------------------------------------
+
+_sessoes_http = {}
+_circuitos = {}
+_limites_tenant = {}
+_compartilhados_lock = threading.Lock()
+
+
+def _host(base_url: str) -> str:
+    return urlsplit(base_url).netloc or base_url
+
+
+def sessao_boleto_api(base_url):
+    """
+    Retorna a requests.Session compartilhada do host de `base_url`, com pool
+    de BOLETO_API_POOL_MAXSIZE conexões keep-alive (>= BOLETO_API_CONCORRENCIA).
+    """
+    host = _host(base_url)
+    with _compartilhados_lock:
+        sessao = _sessoes_http.get(host)
+        if sessao is None:
+            tamanho = max(int(getattr(settings, 'BOLETO_API_POOL_MAXSIZE', 10)), 1)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=tamanho)
+            sessao = requests.Session()
+            sessao.mount('http://', adapter)
+            sessao.mount('https://', adapter)
+            _sessoes_http[host] = sessao
+        return sessao
+
+
+class CircuitoAbertoError(requests.ConnectionError):
+    """Chamada recusada sem ir à rede: o circuito do gateway/provider está aberto."""
+
+
+class Circuito:
+    """
+    Circuit breaker de um gateway/provider.
+
+    Fechado: tudo passa; conta falhas seguidas. Ao atingir `limite_falhas`
+    abre por `aberto_segundos` e recusa as chamadas. Vencido o prazo fica
+    meio-aberto: uma única chamada de teste passa — sucesso fecha, falha
+    reabre.
+    """
+
+    def __init__(self, nome, limite_falhas, aberto_segundos):
+        self.nome = nome
+        self.limite_falhas = max(int(limite_falhas), 1)
+        self.aberto_segundos = aberto_segundos
+        self.falhas = 0
+        self.aberto_ate = None
+        self._em_teste = False
+        self._lock = threading.Lock()
+
+    @property
+    def aberto(self) -> bool:
+        return self.aberto_ate is not None
+
+    def permitir(self) -> bool:
+        with self._lock:
+            if self.aberto_ate is None:
+                return True
+            if time.monotonic() < self.aberto_ate or self._em_teste:
+                return False
+            self._em_teste = True
+            return True
+
+    def registrar_sucesso(self):
+        with self._lock:
+            if self.aberto_ate is not None:
+                logger.info('[BoletoAPI] circuito %s fechado', self.nome)
+            self.falhas = 0
+            self.aberto_ate = None
+            self._em_teste = False
+
+    def registrar_falha(self):
+        with self._lock:
+            self.falhas += 1
+            if self._em_teste or self.falhas >= self.limite_falhas:
+                if not self._em_teste:
+                    logger.error('[BoletoAPI] circuito %s aberto após %d falhas seguidas; '
+                                 'chamadas suspensas por %ss',
+                                 self.nome, self.falhas, self.aberto_segundos)
+                self.aberto_ate = time.monotonic() + self.aberto_segundos
+            self._em_teste = False
+
+
+def circuito_boleto_api(base_url, provider) -> Circuito:
+    chave = (_host(base_url), provider or '')
+    with _compartilhados_lock:
+        circuito = _circuitos.get(chave)
+        if circuito is None:
+            circuito = Circuito(
+                '%s/%s' % chave,
+                getattr(settings, 'BOLETO_API_CIRCUITO_FALHAS', 5),
+                getattr(settings, 'BOLETO_API_CIRCUITO_ABERTO_SEGUNDOS', 60),
+            )
+            _circuitos[chave] = circuito
+        return circuito
+
+
+def _limite_tenant(base_url, tenant_id, provider) -> threading.BoundedSemaphore:
+    chave = (_host(base_url), tenant_id or '', provider or '')
+    with _compartilhados_lock:
+        limite = _limites_tenant.get(chave)
+        if limite is None:
+            tamanho = max(int(getattr(settings, 'BOLETO_API_CONCORRENCIA_POR_TENANT', 4)), 1)
+            limite = _limites_tenant[chave] = threading.BoundedSemaphore(tamanho)
+        return limite
+
+
+def _provider_da_chamada(kwargs) -> str:
+    """Provider da chamada — todas as rotas o levam no corpo ou na query string."""
+    for origem in ('json', 'params'):
+        dados = kwargs.get(origem)
+        if isinstance(dados, dict) and dados.get('provider'):
+            return str(dados['provider'])
+    return ''
+
+
 # ---------------------------------------------------------------------------
 # Client
 # ---------------------------------------------------------------------------
@@ -76,24 +209,39 @@ class BoletoApiClient:
     # ------------------------------------------------------------------ #
 
     def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Chamada com retry (backoff exponencial) pela session compartilhada.
+        Circuito aberto → CircuitoAbertoError (um requests.RequestException,
+        tratado pelos chamadores como falha de conexão), sem novas tentativas.
+        """
         url = f'{self.base_url}{path}'
+        sessao = sessao_boleto_api(self.base_url)
+        circuito = circuito_boleto_api(self.base_url, _provider_da_chamada(kwargs))
         delay = self.delay_inicial
         last_exc: Exception | None = None
         for tentativa in range(1, self.max_tentativas + 1):
+            if not circuito.permitir():
+                raise CircuitoAbertoError(
+                    f'Boleto-API indisponível (circuito {circuito.nome} aberto)')
             try:
-                resp = requests.request(method, url, timeout=self.timeout, **kwargs)
+                resp = sessao.request(method, url, timeout=self.timeout, **kwargs)
                 if resp.status_code < 500:
+                    circuito.registrar_sucesso()
                     return resp
+                circuito.registrar_falha()
                 logger.warning(
                     '[BoletoAPI] HTTP %d em %s %s (tentativa %d/%d)',
                     resp.status_code, method, path, tentativa, self.max_tentativas,
                 )
             except requests.RequestException as exc:
+                circuito.registrar_falha()
                 last_exc = exc
                 logger.warning(
                     '[BoletoAPI] Falha de conexão em %s %s (tentativa %d/%d): %s',
                     method, path, tentativa, self.max_tentativas, exc,
                 )
+            if circuito.aberto:
+                break
             if tentativa < self.max_tentativas:
                 time.sleep(delay)
                 delay = min(delay * 2, 30)
@@ -131,6 +279,52 @@ class BoletoApiClient:
             'erro': f'Boleto-API retornou {resp.status_code}: {detalhe}',
         }
 
+    # ------------------------------------------------------------------ #
+    # Fan-out (jobs diários)
+    # ------------------------------------------------------------------ #
+
+    def em_lote(self, itens, chamada, concorrencia=None) -> list:
+        """
+        Aplica `chamada(item)` a cada item num pool de threads e devolve os
+        resultados na ordem dos itens.
+
+        Cada item é um dict com 'tenant_id' e 'provider': no máximo
+        BOLETO_API_CONCORRENCIA_POR_TENANT chamadas simultâneas por par, e
+        BOLETO_API_CONCORRENCIA (ou `concorrencia`) no total. Exceção
+        inesperada vira {'sucesso': False, 'erro': ...} só daquele item.
+        """
+        itens = list(itens)
+        if concorrencia is None:
+            concorrencia = getattr(settings, 'BOLETO_API_CONCORRENCIA', 8)
+
+        def executar(item):
+            limite = _limite_tenant(self.base_url, item.get('tenant_id'), item.get('provider'))
+            with limite:
+                try:
+                    return chamada(item)
+                except Exception as exc:
+                    logger.exception('[BoletoAPI] falha no lote (tenant=%s provider=%s): %s',
+                                     item.get('tenant_id'), item.get('provider'), exc)
+                    return {'sucesso': False, 'erro': str(exc)}
+
+        workers = max(min(int(concorrencia), len(itens)), 1)
+        if workers == 1:
+            return [executar(item) for item in itens]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='boleto-api') as pool:
+            return list(pool.map(executar, itens))
+
+    def consultar_cobrancas_lote(self, cobrancas, concorrencia=None) -> list:
+        """
+        consultar_cobranca() em paralelo. `cobrancas`: dicts com cobranca_id,
+        tenant_id, provider e bapi_token (opcional). Resultados na mesma ordem.
+        """
+        return self.em_lote(
+            cobrancas,
+            lambda c: self.consultar_cobranca(
+                c['cobranca_id'], c['tenant_id'], c['provider'], bapi_token=c.get('bapi_token')),
+            concorrencia=concorrencia,
+        )
+
     # ------------------------------------------------------------------ #
     # Normalização da resposta CobrancaOut
     # ------------------------------------------------------------------ #
@@ -3,7 +3,9 @@ Conciliação Boleto-API — baixa idempotente a partir do polling de boleto
 (Sicoob) e da conciliação de Pix recebidos (rede de segurança do webhook).
 """
 import logging
+from datetime import datetime, time, timedelta
 
+from django.conf import settings
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
@@ -108,3 +110,262 @@ def conciliacao_financeira(imobiliaria, inicio, fim):
         'total_gateway': len(itens_gateway),
         'total_sistema': len(parcelas),
     }
+
+
+def conciliar_pix_em_lote(itens, origem='pix', lote=500) -> dict:
+    """
+    Baixa as parcelas dos Pix recebidos `itens` ({txid, valor, ...}).
+
+    Os txids são resolvidos em uma consulta IN por lote (pix_txid indexado),
+    e as baixas de cada lote rodam numa transação, com savepoint por parcela
+    (uma falha não desfaz as demais). Idempotente: parcela já paga só é
+    contada.
+
+    Returns:
+        dict: recebidos, casados, sem_parcela, ja_pagas, baixadas, erros
+    """
+    from django.db import transaction
+    from financeiro.models import Parcela
+
+    por_txid = {}
+    for item in itens:
+        txid = str(item.get('txid') or '')
+        if txid:
+            por_txid.setdefault(txid, item)
+
+    resultado = {'recebidos': len(por_txid), 'casados': 0, 'sem_parcela': 0,
+                 'ja_pagas': 0, 'baixadas': 0, 'erros': 0}
+    txids = list(por_txid)
+    for inicio in range(0, len(txids), lote):
+        bloco = txids[inicio:inicio + lote]
+        parcelas = {}
+        # Em aberto primeiro: com txid repetido vale a parcela ainda não paga
+        for p in Parcela.objects.filter(pix_txid__in=bloco).order_by('pago', 'pk'):
+            parcelas.setdefault(p.pix_txid, p)
+        resultado['sem_parcela'] += len(bloco) - len(parcelas)
+        resultado['casados'] += len(parcelas)
+        with transaction.atomic():
+            for txid, p in parcelas.items():
+                if p.pago:
+                    resultado['ja_pagas'] += 1
+                    continue
+                try:
+                    with transaction.atomic():
+                        baixar_por_conciliacao(p, valor=por_txid[txid].get('valor'), origem=origem)
+                except Exception as exc:
+                    resultado['erros'] += 1
+                    logger.exception('[BoletoAPI conciliacao/%s] falha na baixa da parcela pk=%s: %s',
+                                     origem, p.pk, exc)
+                    continue
+                resultado['baixadas'] += 1
+    return resultado
+
+
+# Status do gateway em que o boleto não será mais liquidado: sai do polling
+_STATUS_ENCERRADO = {'baixado': 'baixada', 'cancelado': 'baixada', 'expirado': 'expirada'}
+
+
+def proxima_consulta_sicoob(data_vencimento, hoje):
+    """
+    Data da próxima consulta individual de uma parcela Sicoob em aberto:
+    amanhã se vencida ou a até SICOOB_POLLING_JANELA_DIAS do vencimento;
+    senão o início dessa janela, sem passar de SICOOB_POLLING_INTERVALO_MAX_DIAS
+    (pega pagamento antecipado).
+    """
+    amanha = hoje + timedelta(days=1)
+    if data_vencimento is None:
+        return amanha
+    janela = getattr(settings, 'SICOOB_POLLING_JANELA_DIAS', 5)
+    intervalo = max(getattr(settings, 'SICOOB_POLLING_INTERVALO_MAX_DIAS', 7), 1)
+    return max(amanha, min(data_vencimento - timedelta(days=janela),
+                           hoje + timedelta(days=intervalo)))
+
+
+def _baixar(parcela, valor):
+    """Baixa da conciliação com savepoint; False (e log) se falhar."""
+    from django.db import transaction
+
+    try:
+        with transaction.atomic():
+            baixar_por_conciliacao(parcela, valor=valor, origem='polling-sicoob')
+    except Exception as exc:
+        logger.exception('[BoletoAPI conciliacao/polling-sicoob] falha na baixa da parcela pk=%s: %s',
+                         parcela.pk, exc)
+        return False
+    return True
+
+
+def _inicio_do_dia(data):
+    return timezone.make_aware(datetime.combine(data, time.min))
+
+
+def _conciliacao_sicoob(client, hoje):
+    """
+    Fonte em lote do polling: GET /conciliacao de cada conta Sicoob desde o
+    cursor (com um dia de sobreposição). Não grava o cursor: quem chama o
+    avança (_avancar_cursor) só depois que as baixas da conta deram certo.
+
+    Returns:
+        tuple: (contas cobertas {conta_id: conta}, liquidados {cobranca_id: item}, chamadas)
+    """
+    from core.models import ContaBancaria, ProviderBoleto
+
+    if not getattr(settings, 'SICOOB_POLLING_CONCILIACAO', True):
+        return {}, {}, 0
+    contas = list(ContaBancaria.objects.filter(provider=ProviderBoleto.SICOOB, ativo=True)
+                  .exclude(tenant_id=''))
+    dias = getattr(settings, 'SICOOB_POLLING_JANELA_DIAS', 5)
+    itens = [
+        {'conta': conta, 'tenant_id': conta.tenant_id, 'provider': conta.provider,
+         'bapi_token': conta.bapi_token or None,
+         'inicio': (conta.polling_conciliado_ate or hoje - timedelta(days=dias)) - timedelta(days=1)}
+        for conta in contas
+    ]
+    resultados = client.em_lote(itens, lambda c: client.consultar_conciliacao(
+        c['inicio'].isoformat(), hoje.isoformat(), c['tenant_id'], c['provider'],
+        bapi_token=c['bapi_token']))
+
+    cobertas, liquidados = {}, {}
+    for item, r in zip(itens, resultados):
+        if not r.get('sucesso'):
+            logger.warning('[BoletoAPI polling] conciliação indisponível p/ conta %s: %s',
+                           item['conta'].pk, r.get('erro', ''))
+            continue
+        cobertas[item['conta'].pk] = item['conta']
+        for liquidado in r.get('itens') or []:
+            cid = str(liquidado.get('cobranca_id') or liquidado.get('id') or '')
+            if cid:
+                liquidados[cid] = liquidado
+    return cobertas, liquidados, len(itens)
+
+
+def _avancar_cursor(contas, hoje):
+    """Grava polling_conciliado_ate = hoje nas contas cujas baixas foram todas feitas."""
+    from core.models import ContaBancaria
+
+    for conta in contas:
+        conta.polling_conciliado_ate = hoje
+    ContaBancaria.objects.bulk_update(contas, ['polling_conciliado_ate'])
+
+
+def _agendar_revisao(em_aberto, cobertas, hoje):
+    """
+    Parcelas de contas cobertas pela conciliação ainda sem proxima_consulta_em
+    ganham uma revisão individual espaçada (baixa/cancelamento/expiração no
+    banco não aparecem na conciliação), distribuída pelos próximos
+    SICOOB_POLLING_REVISAO_DIAS para não concentrar as consultas num dia.
+    """
+    from financeiro.models import Parcela
+
+    revisao = max(getattr(settings, 'SICOOB_POLLING_REVISAO_DIAS', 30), 1)
+    pks = list(em_aberto.filter(conta_bancaria_id__in=cobertas, proxima_consulta_em__isnull=True)
+               .values_list('pk', flat=True))
+    Parcela.objects.bulk_update(
+        [Parcela(pk=pk, proxima_consulta_em=_inicio_do_dia(hoje + timedelta(days=1 + pk % revisao)))
+         for pk in pks],
+        ['proxima_consulta_em'], batch_size=500)
+
+
+def polling_sicoob(hoje=None) -> dict:
+    """
+    Polling das cobranças Sicoob (o Sicoob não envia webhook de boleto).
+
+    1. Contas cuja conciliação (GET /conciliacao) respondeu: as parcelas
+       liquidadas no período são baixadas e as demais só têm uma revisão
+       individual a cada SICOOB_POLLING_REVISAO_DIAS. O cursor da conta só
+       avança se todas as baixas dela deram certo; senão a próxima execução
+       relê o período.
+    2. Demais contas: GET /cobranca/{id} só das parcelas com
+       proxima_consulta_em vencida, próximas do vencimento primeiro, até
+       SICOOB_POLLING_MAX_CONSULTAS (0 = sem limite); cada consulta reagenda
+       a parcela (proxima_consulta_sicoob). Baixada/cancelada no banco sai
+       do polling.
+
+    Uma baixa que falha é registrada no log e não interrompe as demais.
+
+    Returns:
+        dict: baixadas, baixadas_conciliacao, consultadas, evitadas (chamadas
+        poupadas frente a uma consulta por parcela em aberto), em_aberto.
+    """
+    from django.db.models import Case, IntegerField, Q, Value, When
+    from core.models import ProviderBoleto
+    from financeiro.models import Parcela, StatusCobranca
+    from financeiro.services.boleto_api_client import BoletoApiClient
+
+    hoje = hoje or timezone.localdate()
+    agora = timezone.now()
+    janela = getattr(settings, 'SICOOB_POLLING_JANELA_DIAS', 5)
+    revisao = max(getattr(settings, 'SICOOB_POLLING_REVISAO_DIAS', 30), 1)
+    client = BoletoApiClient()
+
+    em_aberto = (Parcela.objects
+                 .filter(provider=ProviderBoleto.SICOOB, pago=False)
+                 .exclude(cobranca_id='')
+                 .exclude(status_cobranca__in=[StatusCobranca.BAIXADA, StatusCobranca.EXPIRADA,
+                                               StatusCobranca.ESTORNADA]))
+    total = em_aberto.count()
+
+    cobertas, liquidados, chamadas_conciliacao = _conciliacao_sicoob(client, hoje)
+    baixadas_conciliacao, contas_com_falha = 0, set()
+    if liquidados:
+        for p in em_aberto.filter(conta_bancaria_id__in=list(cobertas),
+                                  cobranca_id__in=list(liquidados)):
+            if _baixar(p, liquidados[p.cobranca_id].get('valor')):
+                baixadas_conciliacao += 1
+            else:
+                contas_com_falha.add(p.conta_bancaria_id)
+    _avancar_cursor([conta for pk, conta in cobertas.items() if pk not in contas_com_falha], hoje)
+    _agendar_revisao(em_aberto, list(cobertas), hoje)
+
+    candidatas = (em_aberto
+                  .filter(Q(proxima_consulta_em__isnull=True) | Q(proxima_consulta_em__lte=agora))
+                  .select_related('conta_bancaria')
+                  .annotate(
+                      em_revisao=Case(When(conta_bancaria_id__in=list(cobertas), then=Value(1)),
+                                   default=Value(0), output_field=IntegerField()),
+                      fora_da_janela=Case(
+                          When(data_vencimento__range=(hoje - timedelta(days=janela),
+                                                       hoje + timedelta(days=janela)), then=Value(0)),
+                          default=Value(1), output_field=IntegerField()))
+                  # Revisões das contas cobertas ficam por último no limite de consultas
+                  .order_by('em_revisao', 'fora_da_janela', 'data_vencimento', 'pk'))
+    limite = getattr(settings, 'SICOOB_POLLING_MAX_CONSULTAS', 0)
+    parcelas = list(candidatas[:limite] if limite else candidatas)
+
+    cobrancas = []
+    for p in parcelas:
+        tenant_id, bapi_token = p._bapi_ctx()
+        cobrancas.append({'cobranca_id': p.cobranca_id, 'tenant_id': tenant_id,
+                          'provider': p.provider, 'bapi_token': bapi_token})
+    baixadas, reagendadas = 0, []
+    for p, r in zip(parcelas, client.consultar_cobrancas_lote(cobrancas)):
+        status = str(r.get('status', '')).lower()
+        if r.get('sucesso') and status in ('liquidado', 'pago'):
+            if _baixar(p, r.get('valor')):
+                baixadas += 1
+                continue
+            # Falhou: tenta de novo amanhã, sem mudar o status da cobrança
+            p.refresh_from_db(fields=['status_cobranca'])
+            p.proxima_consulta_em = _inicio_do_dia(hoje + timedelta(days=1))
+        elif (r.get('sucesso') and status in _STATUS_ENCERRADO
+                and p.transicionar_cobranca(_STATUS_ENCERRADO[status], salvar=False)):
+            p.proxima_consulta_em = None
+        elif r.get('sucesso') and p.conta_bancaria_id in cobertas:
+            p.proxima_consulta_em = _inicio_do_dia(hoje + timedelta(days=revisao))
+        elif r.get('sucesso'):
+            p.proxima_consulta_em = _inicio_do_dia(proxima_consulta_sicoob(p.data_vencimento, hoje))
+        else:
+            p.proxima_consulta_em = _inicio_do_dia(hoje + timedelta(days=1))
+        reagendadas.append(p)
+    Parcela.objects.bulk_update(reagendadas, ['proxima_consulta_em', 'status_cobranca'], batch_size=500)
+
+    resultado = {
+        'baixadas': baixadas + baixadas_conciliacao,
+        'baixadas_conciliacao': baixadas_conciliacao,
+        'consultadas': len(parcelas),
+        'evitadas': max(total - len(parcelas) - chamadas_conciliacao, 0),
+        'em_aberto': total,
+    }
+    logger.info('[BoletoAPI] polling Sicoob: %(baixadas)d baixada(s), %(consultadas)d '
+                'consulta(s), %(evitadas)d evitada(s) de %(em_aberto)d em aberto', resultado)
+    return resultado
@@ -24,17 +24,45 @@ Empresa: M&S do Brasil LTDA
 import requests
 import json
 import logging
+import threading
 import time
 import re
 import base64
 from decimal import Decimal
 from datetime import date, timedelta
+from urllib.parse import urlsplit
 from django.conf import settings
 from django.utils import timezone
+from requests.adapters import HTTPAdapter
 from financeiro.models import TipoParcela
 
 logger = logging.getLogger(__name__)
 
+# Sessions HTTP compartilhadas por host BRCobrança (keep-alive + pool de conexões).
+_sessoes_http = {}
+_sessoes_lock = threading.Lock()
+
+
+def sessao_brcobranca(base_url):
+    """
+    Retorna a requests.Session compartilhada do host de `base_url`.
+
+    O pool (BRCOBRANCA_POOL_MAXSIZE conexões) é dimensionado para os workers da
+    geração concorrente: cada thread reaproveita uma conexão já aberta em vez
+    de um handshake TCP/TLS por boleto.
+    """
+    host = urlsplit(base_url).netloc or base_url
+    with _sessoes_lock:
+        sessao = _sessoes_http.get(host)
+        if sessao is None:
+            tamanho = max(int(getattr(settings, 'BRCOBRANCA_POOL_MAXSIZE', 10)), 1)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=tamanho)
+            sessao = requests.Session()
+            sessao.mount('http://', adapter)
+            sessao.mount('https://', adapter)
+            _sessoes_http[host] = sessao
+        return sessao
+
 
 class BRCobrancaError(Exception):
     """Excecao para erros do BRCobranca"""
@@ -478,13 +506,35 @@ class BoletoService:
 
         return dados_filtrados
 
-    def _montar_dados_boleto(self, parcela, conta_bancaria):
+    def _formatar_nosso_numero(self, nosso_numero, codigo_banco):
+        """
+        Formata o nosso número para o banco: zeros à esquerda até
+        CAMPOS_BANCO[banco]['nosso_numero_len'] e o tamanho de TAMANHOS_CAMPOS.
+
+        Returns:
+            str: nosso número formatado ('' se None)
+        """
+        valor = '' if nosso_numero is None else str(nosso_numero)
+        if not valor:
+            return valor
+        tamanho = self.CAMPOS_BANCO.get(codigo_banco, {}).get('nosso_numero_len')
+        if tamanho:
+            valor = valor.zfill(tamanho)[:tamanho]
+        tamanho_max = self.TAMANHOS_CAMPOS.get(codigo_banco, {}).get('nosso_numero')
+        if tamanho_max:
+            valor = ''.join(filter(str.isdigit, valor)).zfill(tamanho_max)[:tamanho_max]
+        return valor
+
+    def _montar_dados_boleto(self, parcela, conta_bancaria, nosso_numero=None, reservar=True):
         """
         Monta os dados do boleto no formato esperado pelo BRCobranca.
 
         Args:
             parcela: Instancia de Parcela
             conta_bancaria: Instancia de ContaBancaria
+            nosso_numero: Número já reservado; se None, reserva um
+            reservar: False monta sem nosso número (lotes: reservado depois só para
+                os boletos válidos e aplicado com _formatar_nosso_numero)
 
         Returns:
             tuple: (dict com dados formatados para a API, nosso_numero)
@@ -497,7 +547,8 @@ class BoletoService:
         config_boleto = contrato.get_config_boleto()
 
         # Obter proximo nosso numero
-        nosso_numero = parcela.obter_proximos_nosso_numero(conta_bancaria)
+        if nosso_numero is None and reservar:
+            nosso_numero = parcela.obter_proximos_nosso_numero(conta_bancaria)
 
         # Documento do pagador (CPF ou CNPJ)
         documento_pagador = self._formatar_cpf_cnpj(
@@ -614,7 +665,7 @@ class BoletoService:
              'carteira': str(carteira),
 
              # Dados do Boleto
-             'nosso_numero': str(nosso_numero),
+             'nosso_numero': self._formatar_nosso_numero(nosso_numero, codigo_banco),
              # manter ambas chaves para compatibilidade com diferentes versões/expectativas
              'numero_documento': numero_documento,
              'documento_numero': numero_documento,  # Alias usado por alguns bancos/implementações
@@ -675,11 +726,7 @@ class BoletoService:
             if dados.get('convenio'):
                 dados['convenio'] = str(dados['convenio']).zfill(6)
 
-        # Bradesco (237)
-        elif codigo_banco == '237':
-            # Nosso numero max 11 digitos
-            if dados.get('nosso_numero'):
-                dados['nosso_numero'] = str(dados['nosso_numero']).zfill(11)[:11]
+        # Bradesco (237): só o nosso número (11 dígitos, _formatar_nosso_numero)
 
         # C6 Bank (336) — CNAB 400, carteiras 10/20, nosso numero 10 digitos (DV modulo 11)
         elif codigo_banco == '336':
@@ -688,26 +735,17 @@ class BoletoService:
                 dados['convenio'] = conta_bancaria.convenio or ''
             if dados.get('convenio'):
                 dados['convenio'] = str(dados['convenio']).zfill(12)[:12]
-            # Nosso numero exatamente 10 digitos
-            if dados.get('nosso_numero'):
-                dados['nosso_numero'] = str(dados['nosso_numero']).zfill(10)[:10]
 
         # Itau (341)
         elif codigo_banco == '341':
             # Campo seu_numero para carteiras especiais (max 7 digitos)
             dados['seu_numero'] = (numero_documento[:7] if numero_documento else '').zfill(7)
-            # Nosso numero max 8 digitos
-            if dados.get('nosso_numero'):
-                dados['nosso_numero'] = str(dados['nosso_numero']).zfill(8)[:8]
 
         # Sicredi (748)
         elif codigo_banco == '748':
             # Campos obrigatorios: usar valores do modelo com fallbacks seguros
             dados['posto'] = getattr(conta_bancaria, 'posto', '') or '01'
             dados['byte_idt'] = getattr(conta_bancaria, 'byte_idt', '') or '2'
-            # Nosso numero max 5 digitos
-            if dados.get('nosso_numero'):
-                dados['nosso_numero'] = str(dados['nosso_numero']).zfill(5)[:5]
 
         # Sicoob (756)
         # Campos: agencia (4), conta_corrente (8), nosso_numero (7), convenio (7), variacao (2)
@@ -725,9 +763,6 @@ class BoletoService:
             # Conta corrente max 8 digitos
             if dados.get('conta_corrente'):
                 dados['conta_corrente'] = str(dados['conta_corrente']).zfill(8)[:8]
-            # Nosso numero max 7 digitos
-            if dados.get('nosso_numero'):
-                dados['nosso_numero'] = str(dados['nosso_numero']).zfill(7)[:7]
             # Modalidade (codigo_beneficiario quando aplicavel)
             if hasattr(conta_bancaria, 'codigo_beneficiario') and conta_bancaria.codigo_beneficiario:
                 dados['codigo_beneficiario'] = conta_bancaria.codigo_beneficiario
@@ -1091,7 +1126,8 @@ class BoletoService:
         1 chamada à API por lote → drástica redução de requisições vs. gerar_boleto() individual.
 
         Cada parcela do lote recebe:
-          • boleto_pdf_db: PDF combinado do lote (carnê com todos os boletos)
+          • PDF combinado do lote (carnê com todos os boletos): um único ArquivoPdf
+            com BOLETO_PDF_BLOB_STORE, senão copiado em boleto_pdf_db de cada parcela
           • nosso_numero / nosso_numero_formatado: calculados localmente (convenio+seq para BB)
           • status_boleto = GERADO  •  data_geracao_boleto = agora
 
@@ -1131,21 +1167,32 @@ class BoletoService:
             for inicio in range(0, len(todas_parcelas), tamanho_lote):
                 lote = todas_parcelas[inicio:inicio + tamanho_lote]
 
-                # Montar dados de cada boleto (incrementa nosso_numero_atual em ContaBancaria)
-                lote_dados = []
+                # Montar e validar cada boleto antes de reservar nossos números,
+                # para que parcelas inválidas não consumam a sequência da conta
+                validos = []
                 for parcela in lote:
                     try:
-                        dados, nosso_numero = self._montar_dados_boleto(parcela, conta)
-                        dados.pop('codigo_banco', None)
-                        lote_dados.append((parcela, dados, nosso_numero))
+                        dados, _ = self._montar_dados_boleto(parcela, conta, reservar=False)
+                        validacao = self._validar_dados_boleto(dados, exigir_nosso_numero=False)
+                        if not validacao['valido']:
+                            raise ValueError('; '.join(validacao['erros']))
+                        validos.append((parcela, dados))
                     except Exception as exc:
                         msg = f'Parcela pk={parcela.pk}: {exc}'
                         erros.append(msg)
                         logger.warning('gerar_boletos_lote: erro ao montar parcela pk=%s: %s', parcela.pk, exc)
 
-                if not lote_dados:
+                if not validos:
                     continue
 
+                # Nossos números só dos válidos, num único UPDATE em ContaBancaria
+                numeros = conta.reservar_nossos_numeros(len(validos))
+                lote_dados = []
+                for (parcela, dados), nosso_numero in zip(validos, numeros):
+                    codigo_banco = dados.pop('codigo_banco', None)
+                    dados['nosso_numero'] = self._formatar_nosso_numero(nosso_numero, codigo_banco)
+                    lote_dados.append((parcela, dados, nosso_numero))
+
                 # Spec OpenAPI: form-data — type + data (JSON file) + include_data
                 # bank embutido em cada boleto; include_data=true → JSON com DV por boleto
                 lote_boletos = []
@@ -1231,6 +1278,9 @@ class BoletoService:
                     banco_nome, len(lote_dados), len(pdf_combinado),
                 )
 
+                from financeiro.services.pdf_store import guardar_pdf, store_habilitado
+                arquivo_lote = guardar_pdf(pdf_combinado) if store_habilitado() else None
+
                 agora = timezone.now()
                 a_atualizar = []
                 for idx, (parcela, dados, nosso_numero) in enumerate(lote_dados):
@@ -1259,7 +1309,14 @@ class BoletoService:
                     parcela.numero_documento = parcela.gerar_numero_documento()
                     parcela.data_geracao_boleto = agora
                     # PDF do lote — carnê compartilhado por todas as parcelas do lote
-                    parcela.boleto_pdf_db = pdf_combinado
+                    # (no store por conteúdo: um único arquivo para o lote inteiro)
+                    if arquivo_lote is not None:
+                        parcela.boleto_pdf_blob = arquivo_lote
+                        parcela.boleto_pdf_db = None
+                    else:
+                        # Sem o blob anterior, que teria precedência na leitura
+                        parcela.boleto_pdf_blob = None
+                        parcela.boleto_pdf_db = pdf_combinado
                     a_atualizar.append(parcela)
 
                 ParcelaModel.objects.bulk_update(
@@ -1268,6 +1325,7 @@ class BoletoService:
                         'conta_bancaria', 'status_boleto',
                         'nosso_numero', 'nosso_numero_formatado', 'nosso_numero_dv',
                         'numero_documento', 'data_geracao_boleto', 'boleto_pdf_db',
+                        'boleto_pdf_blob',
                     ],
                 )
                 gerados += len(a_atualizar)
@@ -1403,10 +1461,10 @@ class BoletoService:
                 logger.info(f"Chamando BRCobranca: {url}")
                 logger.debug(f"Banco: {banco_nome}, params count: {len(params)}")
 
-                # Enviar via GET
+                # Enviar via GET (session compartilhada do host — keep-alive)
                 # O header Accept e necessario para o versionamento via header do Grape API
                 # (version 'v1', using: :header, vendor: 'BoletoApi')
-                response = requests.get(
+                response = sessao_brcobranca(self.brcobranca_url).get(
                     url,
                     params=params,
                     headers={'Accept': 'application/vnd.BoletoApi-v1+json'},
@@ -1434,6 +1492,9 @@ class BoletoService:
                         f"Rate limit 429 — aguardando {retry_after}s "
                         f"(tentativa {tentativa}/{self.max_tentativas})"
                     )
+                    # Segura também as demais threads/processos que emitem boletos
+                    from .brcobranca_throttle import registrar_rate_limit
+                    registrar_rate_limit(retry_after)
                     if tentativa == 1:
                         # Na primeira tentativa o 429 pode ser cold start do Render.com:
                         # espera a API acordar antes de retentar (evita esperar retry_after fixo)
@@ -1557,10 +1618,14 @@ class BoletoService:
             'erro': 'Falha ao gerar boleto apos multiplas tentativas. Tente novamente mais tarde.'
         }
 
-    def _validar_dados_boleto(self, dados):
+    def _validar_dados_boleto(self, dados, exigir_nosso_numero=True):
         """
         Valida dados basicos do boleto antes de enviar para API.
 
+        Args:
+            exigir_nosso_numero: False valida o boleto antes de reservar o
+                nosso número (gerar_boletos_lote)
+
         Returns:
             dict: {'valido': bool, 'erros': list}
         """
@@ -1569,6 +1634,8 @@ class BoletoService:
         # Validacoes basicas
         campos_obrigatorios = ['cedente', 'agencia', 'conta_corrente', 'nosso_numero',
                                'data_vencimento', 'valor', 'sacado', 'sacado_documento']
+        if not exigir_nosso_numero:
+            campos_obrigatorios.remove('nosso_numero')
 
         for campo in campos_obrigatorios:
             if not dados.get(campo):
@@ -13,10 +13,18 @@ cache: a geração de boletos registra o instante do último burst e a remessa
 aguarda o tempo restante do cooldown antes do primeiro POST — dando à cota
 do rate limit tempo para se recuperar.
 
+Na geração concorrente (gerar_boletos_automaticos com workers > 1) o mesmo
+módulo coordena o rate limit entre as threads:
+  - registrar_rate_limit / aguardar_rate_limit: pausa global após um 429,
+    compartilhada via cache (vale para todas as threads e processos)
+  - ConcorrenciaAdaptativa: limite de chamadas simultâneas em AIMD — cai pela
+    metade a cada 429 e volta a subir aos poucos com as respostas bem-sucedidas
+
 Desenvolvedor: Maxwell da Silva Oliveira
 """
 import time
 import logging
+import threading
 
 from django.conf import settings
 from django.core.cache import cache
@@ -27,6 +35,10 @@ logger = logging.getLogger(__name__)
 _CACHE_KEY = 'brcobranca:ultimo_uso_boleto'
 # Janela em que o marcador continua válido (deve cobrir folgadamente o cooldown).
 _CACHE_TIMEOUT = 600
+# Chave de cache do instante (epoch) até o qual novas chamadas devem aguardar (429).
+_CACHE_KEY_PAUSA = 'brcobranca:pausa_ate'
+# Teto de uma pausa por rate limit (s) — blinda contra Retry-After absurdo.
+_PAUSA_MAXIMA = 120
 
 
 def _cooldown_segundos() -> float:
@@ -73,3 +85,101 @@ def aguardar_cooldown_remessa() -> float:
     )
     time.sleep(restante)
     return restante
+
+
+def registrar_rate_limit(retry_after) -> None:
+    """
+    Registra um 429: novas chamadas de qualquer thread/processo aguardam
+    `retry_after` segundos (aguardar_rate_limit). Só estende a pausa vigente.
+    """
+    try:
+        ate = time.time() + min(max(float(retry_after), 0.0), _PAUSA_MAXIMA)
+        if ate > (cache.get(_CACHE_KEY_PAUSA) or 0):
+            cache.set(_CACHE_KEY_PAUSA, ate, timeout=_PAUSA_MAXIMA)
+    except Exception:
+        logger.debug('brcobranca_throttle: falha ao registrar rate limit (cache indisponível)')
+
+
+def aguardar_rate_limit() -> float:
+    """
+    Aguarda a pausa global registrada por registrar_rate_limit, se houver.
+
+    Retorna o número de segundos efetivamente aguardados (0 se não houve espera).
+    """
+    try:
+        ate = cache.get(_CACHE_KEY_PAUSA)
+    except Exception:
+        return 0.0
+    if not ate:
+        return 0.0
+    restante = min(ate - time.time(), _PAUSA_MAXIMA)
+    if restante <= 0:
+        return 0.0
+    logger.info('[BRCobrança] rate limit: aguardando %.1fs antes da próxima chamada', restante)
+    time.sleep(restante)
+    return restante
+
+
+class ConcorrenciaAdaptativa:
+    """
+    Semáforo de limite variável (AIMD) para chamadas simultâneas à BRCobrança.
+
+    Começa em `maximo`; cada 429 reduz o limite pela metade (mínimo 1) e cada
+    `janela` respostas sem 429 seguidas devolvem uma vaga, até `maximo`.
+
+    Uso:
+        limite = ConcorrenciaAdaptativa(8)
+        with limite.vaga() as vaga:
+            resultado = chamar_api()
+            vaga.rate_limited = resultado.get('rate_limited', False)
+    """
+
+    def __init__(self, maximo, janela=10):
+        self.maximo = max(int(maximo), 1)
+        self.janela = max(int(janela), 1)
+        self.limite = self.maximo
+        self._em_uso = 0
+        self._sucessos = 0
+        self._cond = threading.Condition()
+
+    def adquirir(self) -> None:
+        with self._cond:
+            while self._em_uso >= self.limite:
+                self._cond.wait()
+            self._em_uso += 1
+
+    def liberar(self, rate_limited=False) -> None:
+        with self._cond:
+            self._em_uso -= 1
+            if rate_limited:
+                self._sucessos = 0
+                novo = max(self.limite // 2, 1)
+                if novo < self.limite:
+                    logger.warning('[BRCobrança] 429: concorrência reduzida de %d para %d',
+                                   self.limite, novo)
+                self.limite = novo
+            else:
+                self._sucessos += 1
+                if self._sucessos >= self.janela and self.limite < self.maximo:
+                    self._sucessos = 0
+                    self.limite += 1
+            self._cond.notify_all()
+
+    def vaga(self):
+        return _Vaga(self)
+
+
+class _Vaga:
+    """Context manager de ConcorrenciaAdaptativa.vaga()."""
+
+    def __init__(self, limitador):
+        self._limitador = limitador
+        self.rate_limited = False
+
+    def __enter__(self):
+        self._limitador.adquirir()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._limitador.liberar(rate_limited=self.rate_limited)
+        return False
@@ -28,6 +28,7 @@ from typing import Dict, List
 from django.conf import settings
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import Q
 from django.core.files.base import ContentFile
 
 logger = logging.getLogger(__name__)
@@ -49,6 +50,10 @@ BANCOS_BRCOBRANCA = {cod: spec['brcobranca_id'] for cod, spec in _BANCOS.items()
 # providers são excluídas de toda elegibilidade de remessa CNAB.
 PROVIDERS_BOLETO_API = ('c6', 'sicoob')
 
+# Chaves por query no fallback por sufixo (endswith) da resolução de nosso
+# número: um OR por lote em vez de uma query por registro não encontrado.
+LOTE_SUFIXO_NOSSO_NUMERO = 200
+
 # Codigos de ocorrencia padrao CNAB
 OCORRENCIAS_CNAB = {
     '01': ('ENTRADA', 'Entrada Confirmada'),
@@ -67,6 +72,14 @@ OCORRENCIAS_CNAB = {
 }
 
 
+def normalizar_nosso_numero(nosso_numero) -> str:
+    """Chave de casamento do nosso número: sem espaços e sem zeros à esquerda.
+
+    Espelha Parcela.nosso_numero_chave (coluna gerada com LTRIM(nosso_numero, '0')).
+    """
+    return str(nosso_numero or '').strip().lstrip('0')
+
+
 class CNABService:
     """
     Servico para geracao de arquivos de remessa e processamento de retorno.
@@ -188,28 +201,79 @@ class CNABService:
         """
         Busca Parcela pelo nosso_numero com fallback de strip de zeros à esquerda.
 
-        Estratégia (por conta_bancaria quando fornecida):
-        1. Exact match + conta_bancaria
-        2. endswith(stripped) + conta_bancaria  ← CNAB envia zero-padded, DB pode ter curto
-        3. Exact match global
-        4. endswith(stripped) global
+        Delegado a resolver_parcelas_por_nosso_numero (chave normalizada indexada);
+        mantido para chamadas avulsas de um único registro.
+        """
+        return self.resolver_parcelas_por_nosso_numero(
+            [nosso_numero], conta_bancaria
+        ).get(nosso_numero)
+
+    def resolver_parcelas_por_nosso_numero(self, nossos_numeros, conta_bancaria=None) -> Dict:
+        """
+        Resolve em lote nosso_numero → Parcela para um retorno inteiro.
+
+        Estratégia (mesma precedência da busca unitária, mas por chave indexada):
+        1. nosso_numero_chave IN (...) + conta_bancaria  ← 1 query
+        2. nosso_numero_chave IN (...) global, só para o que sobrou  ← 1 query
+        3. endswith(stripped) num OR único por lote de chaves, só para o que ainda
+           sobrou — cobre nosso número gravado com prefixo (ex.: convênio BB) e é
+           raro na prática.
+
+        Dentro da mesma chave, prefere a parcela cujo nosso_numero bruto é igual ao
+        recebido (ex.: '000123' vs '123'). nosso_numero vazio nunca é resolvido.
+        O PDF armazenado (boleto_pdf_db) não é carregado.
+
+        Returns:
+            Dict {nosso_numero recebido: Parcela} (ausente = não encontrada)
         """
         from financeiro.models import Parcela
-        nn_stripped = nosso_numero.lstrip('0') if nosso_numero else ''
 
-        if conta_bancaria:
-            qs_conta = Parcela.objects.filter(conta_bancaria=conta_bancaria)
-            parcela = qs_conta.filter(nosso_numero=nosso_numero).first()
-            if not parcela and nn_stripped:
-                parcela = qs_conta.filter(nosso_numero__endswith=nn_stripped).first()
-            if parcela:
-                return parcela
-
-        # Fallback global (sem filtro de conta)
-        parcela = Parcela.objects.filter(nosso_numero=nosso_numero).first()
-        if not parcela and nn_stripped:
-            parcela = Parcela.objects.filter(nosso_numero__endswith=nn_stripped).first()
-        return parcela
+        pendentes = {}
+        for nn in nossos_numeros:
+            nn = str(nn or '').strip()
+            chave = normalizar_nosso_numero(nn)
+            if chave:
+                pendentes.setdefault(chave, set()).add(nn)
+
+        resolvidas = {}
+        base = Parcela.objects.defer('boleto_pdf_db')
+
+        def _casar(qs):
+            candidatas = {}
+            for parcela in qs.filter(nosso_numero_chave__in=list(pendentes)):
+                candidatas.setdefault(parcela.nosso_numero_chave, []).append(parcela)
+            for chave, parcelas in candidatas.items():
+                for nn in pendentes.pop(chave):
+                    resolvidas[nn] = next(
+                        (p for p in parcelas if p.nosso_numero == nn), parcelas[0]
+                    )
+
+        def _casar_sufixo(qs):
+            chaves = list(pendentes)
+            for inicio in range(0, len(chaves), LOTE_SUFIXO_NOSSO_NUMERO):
+                lote = chaves[inicio:inicio + LOTE_SUFIXO_NOSSO_NUMERO]
+                filtro = Q()
+                for chave in lote:
+                    filtro |= Q(nosso_numero__endswith=chave)
+                lote = set(lote)
+                for parcela in qs.filter(filtro):
+                    nn = parcela.nosso_numero or ''
+                    for i in range(len(nn)):
+                        chave = nn[i:]
+                        if chave in lote and chave in pendentes:
+                            for recebido in pendentes.pop(chave):
+                                resolvidas[recebido] = parcela
+
+        if conta_bancaria and pendentes:
+            _casar(base.filter(conta_bancaria=conta_bancaria))
+        if pendentes:
+            _casar(base)
+        if conta_bancaria and pendentes:
+            _casar_sufixo(base.filter(conta_bancaria=conta_bancaria))
+        if pendentes:
+            _casar_sufixo(base)
+
+        return resolvidas
 
     def _parsear_numero_dv(self, valor: str) -> tuple:
         """Separa número e dígito verificador. Aceita '1234-5' ou '1234 5' ou '1234'."""
@@ -793,10 +857,13 @@ class CNABService:
             arquivo_para_atualizar=arquivo_remessa,
         )
 
-    def processar_retorno(self, arquivo_retorno, user=None) -> Dict:
+    def processar_retorno(self, arquivo_retorno, user=None, em_lote=None) -> Dict:
         """
         Processa um arquivo de retorno CNAB via API BRCobrança (POST /api/retorno).
         Não existe parsing local — todo processamento é delegado à API.
+
+        em_lote=True usa o pipeline de escrita em lote (_processar_registros_em_lote);
+        None segue settings.CNAB_RETORNO_EM_LOTE.
         """
         from financeiro.models import ItemRetorno, StatusArquivoRetorno
 
@@ -882,72 +949,52 @@ class CNABService:
             registros_erro = 0
             valor_total_pago = Decimal('0.00')
 
+            # Resolve todas as parcelas do arquivo antes do laço (1–2 queries IN)
+            parcelas_por_nn = self.resolver_parcelas_por_nosso_numero(
+                [reg.get('nosso_numero') for reg in retornos], conta
+            )
+
+            if em_lote is None:
+                em_lote = getattr(settings, 'CNAB_RETORNO_EM_LOTE', False)
+
             with transaction.atomic():
-                for reg in retornos:
-                    total_registros += 1
-                    try:
-                        nosso_numero = str(reg.get('nosso_numero') or '').strip()
-                        codigo_ocorrencia = str(reg.get('codigo_ocorrencia') or '')
-
-                        def _to_dec(v):
-                            try:
-                                return Decimal(str(v)) if v is not None else Decimal('0.00')
-                            except Exception:
-                                return Decimal('0.00')
-
-                        valor_titulo = _to_dec(reg.get('valor_titulo'))
-                        valor_pago = _to_dec(reg.get('valor_pago'))
-
-                        def _parse_date(s):
-                            if not s:
-                                return None
-                            try:
-                                parts = str(s).split('-')
-                                if len(parts) == 3:
-                                    return datetime(int(parts[0]), int(parts[1]), int(parts[2])).date()
-                            except Exception:
-                                pass
-                            return None
-
-                        data_ocorrencia = _parse_date(reg.get('data_ocorrencia'))
-                        data_credito = _parse_date(reg.get('data_credito'))
-
-                        tipo_ocorrencia = 'OUTROS'
-                        descricao = ''
-                        if codigo_ocorrencia in OCORRENCIAS_CNAB:
-                            tipo_ocorrencia, descricao = OCORRENCIAS_CNAB[codigo_ocorrencia]
-
-                        parcela = self._buscar_parcela_por_nosso_numero(nosso_numero, conta)
-
-                        item, criado = ItemRetorno.objects.get_or_create(
-                            arquivo_retorno=arquivo_retorno,
-                            nosso_numero=nosso_numero,
-                            defaults=dict(
-                                parcela=parcela,
-                                codigo_ocorrencia=codigo_ocorrencia,
-                                descricao_ocorrencia=descricao,
-                                tipo_ocorrencia=tipo_ocorrencia,
-                                valor_titulo=valor_titulo,
-                                valor_pago=valor_pago if valor_pago > 0 else None,
-                                data_ocorrencia=data_ocorrencia,
-                                data_credito=data_credito,
-                            ),
+                if em_lote:
+                    total_registros = len(retornos)
+                    registros_processados, registros_erro, valor_total_pago = (
+                        self._processar_registros_em_lote(
+                            arquivo_retorno, retornos, parcelas_por_nn
                         )
-                        if not criado:
-                            registros_processados += (1 if item.processado else 0)
-                            continue
-
-                        if item.processar_baixa():
-                            registros_processados += 1
-                            if tipo_ocorrencia == 'LIQUIDACAO':
-                                valor_total_pago += valor_pago or valor_titulo
-                        else:
-                            if item.erro_processamento:
-                                registros_erro += 1
-
-                    except Exception as e:
-                        registros_erro += 1
-                        logger.exception("[Retorno] Erro ao processar registro: %s", e)
+                    )
+                else:
+                    for reg in retornos:
+                        total_registros += 1
+                        try:
+                            dados_reg = self._parsear_registro_retorno(reg)
+                            nosso_numero = dados_reg['nosso_numero']
+                            parcela = parcelas_por_nn.get(nosso_numero)
+
+                            item, criado = ItemRetorno.objects.get_or_create(
+                                arquivo_retorno=arquivo_retorno,
+                                nosso_numero=nosso_numero,
+                                defaults=dict(parcela=parcela, **self._campos_item_retorno(dados_reg)),
+                            )
+                            if not criado:
+                                registros_processados += (1 if item.processado else 0)
+                                continue
+
+                            if item.processar_baixa():
+                                registros_processados += 1
+                                if dados_reg['tipo_ocorrencia'] == 'LIQUIDACAO':
+                                    valor_total_pago += (
+                                        dados_reg['valor_pago'] or dados_reg['valor_titulo']
+                                    )
+                            else:
+                                if item.erro_processamento:
+                                    registros_erro += 1
+
+                        except Exception as e:
+                            registros_erro += 1
+                            logger.exception("[Retorno] Erro ao processar registro: %s", e)
 
                 arquivo_retorno.total_registros = total_registros
                 arquivo_retorno.registros_processados = registros_processados
@@ -985,6 +1032,249 @@ class CNABService:
             logger.exception("[Retorno] Erro inesperado: %s", e)
             return {'sucesso': False, 'erro': str(e)}
 
+    def _parsear_registro_retorno(self, reg: dict) -> dict:
+        """Normaliza um registro de POST /api/retorno (valores Decimal, datas date)."""
+
+        def _to_dec(v):
+            try:
+                return Decimal(str(v)) if v is not None else Decimal('0.00')
+            except Exception:
+                return Decimal('0.00')
+
+        def _parse_date(s):
+            if not s:
+                return None
+            try:
+                parts = str(s).split('-')
+                if len(parts) == 3:
+                    return datetime(int(parts[0]), int(parts[1]), int(parts[2])).date()
+            except Exception:
+                pass
+            return None
+
+        codigo_ocorrencia = str(reg.get('codigo_ocorrencia') or '')
+        tipo_ocorrencia, descricao = OCORRENCIAS_CNAB.get(codigo_ocorrencia, ('OUTROS', ''))
+        return {
+            'nosso_numero': str(reg.get('nosso_numero') or '').strip(),
+            'codigo_ocorrencia': codigo_ocorrencia,
+            'tipo_ocorrencia': tipo_ocorrencia,
+            'descricao': descricao,
+            'valor_titulo': _to_dec(reg.get('valor_titulo')),
+            'valor_pago': _to_dec(reg.get('valor_pago')),
+            'data_ocorrencia': _parse_date(reg.get('data_ocorrencia')),
+            'data_credito': _parse_date(reg.get('data_credito')),
+        }
+
+    @staticmethod
+    def _campos_item_retorno(dados_reg: dict) -> dict:
+        """Campos de ItemRetorno derivados de um registro parseado."""
+        return dict(
+            codigo_ocorrencia=dados_reg['codigo_ocorrencia'],
+            descricao_ocorrencia=dados_reg['descricao'],
+            tipo_ocorrencia=dados_reg['tipo_ocorrencia'],
+            valor_titulo=dados_reg['valor_titulo'],
+            valor_pago=dados_reg['valor_pago'] if dados_reg['valor_pago'] > 0 else None,
+            data_ocorrencia=dados_reg['data_ocorrencia'],
+            data_credito=dados_reg['data_credito'],
+        )
+
+    def _processar_registros_em_lote(self, arquivo_retorno, retornos, parcelas_por_nn) -> tuple:
+        """
+        Pipeline em lote do retorno: mesma semântica de ItemRetorno.processar_baixa,
+        com número constante de round trips em vez de ~5 por registro.
+
+        1. Pré-carrega os ItemRetorno já existentes do arquivo (reprocessamento)
+        2. Calcula as baixas em memória — uma instância por Parcela, então vários
+           registros da mesma parcela se aplicam em ordem, como no laço unitário
+        3. bulk_create de ItemRetorno/HistoricoPagamento e bulk_update de
+           Parcela/ItemRemessa
+
+        O erro de um registro fica em ItemRetorno.erro_processamento sem abortar o
+        lote. Liquidação de parcela com cobrança Boleto-API (status_cobranca) usa
+        processar_baixa, que também registra o EventoCobrancaApi da transição.
+
+        Returns:
+            (registros_processados, registros_erro, valor_total_pago)
+        """
+        from financeiro.models import (
+            HistoricoPagamento, ItemRemessa, ItemRetorno, Parcela, ResumoRecebiveisMensal, StatusBoleto,
+        )
+
+        processados = 0
+        erros = 0
+        valor_total_pago = Decimal('0.00')
+
+        itens_por_nn = {
+            item.nosso_numero: item
+            for item in ItemRetorno.objects.filter(arquivo_retorno=arquivo_retorno)
+        }
+        novos = []
+        repetidos = []
+        for reg in retornos:
+            try:
+                dados_reg = self._parsear_registro_retorno(reg)
+            except Exception as e:
+                erros += 1
+                logger.exception("[Retorno] Erro ao processar registro: %s", e)
+                continue
+            nosso_numero = dados_reg['nosso_numero']
+            if nosso_numero in itens_por_nn:
+                repetidos.append(itens_por_nn[nosso_numero])
+                continue
+            item = ItemRetorno(
+                arquivo_retorno=arquivo_retorno,
+                nosso_numero=nosso_numero,
+                parcela=parcelas_por_nn.get(nosso_numero),
+                **self._campos_item_retorno(dados_reg),
+            )
+            itens_por_nn[nosso_numero] = item
+            novos.append(item)
+
+        parcelas = (
+            Parcela.objects.select_related('contrato').defer('boleto_pdf_db')
+            .in_bulk({item.parcela_id for item in novos if item.parcela_id})
+        )
+        remessas_ativas = {}
+        ids_rejeicao = [
+            item.parcela_id for item in novos
+            if item.parcela_id and item.tipo_ocorrencia == 'REJEICAO'
+        ]
+        if ids_rejeicao:
+            for item_remessa in (
+                ItemRemessa.objects
+                .filter(parcela_id__in=ids_rejeicao, status=ItemRemessa.Status.ATIVO)
+                .order_by('-arquivo_remessa__data_geracao')
+            ):
+                remessas_ativas.setdefault(item_remessa.parcela_id, []).append(item_remessa)
+
+        agora = timezone.now()
+        banco = getattr(arquivo_retorno.conta_bancaria, 'banco', '') or ''
+        alteradas = {}
+        remessas_rejeitadas = []
+        historicos = []
+        via_processar_baixa = []
+
+        for item in novos:
+            parcela = parcelas.get(item.parcela_id)
+            if parcela is None:
+                item.erro_processamento = 'Parcela não encontrada'
+                erros += 1
+                continue
+            item.parcela = parcela
+            try:
+                if item.tipo_ocorrencia == 'LIQUIDACAO':
+                    if parcela.status_cobranca:
+                        via_processar_baixa.append(item)
+                        continue
+                    # Guard: não reprocessar parcela já baixada (retorno duplicado do banco)
+                    if parcela.pago:
+                        item.erro_processamento = 'Parcela já paga — possível retorno duplicado'
+                        item.processado = True
+                        erros += 1
+                        continue
+
+                    valor = item.valor_pago or item.valor_titulo
+                    data_pgto = item.data_ocorrencia or timezone.localdate()
+                    if data_pgto > parcela.data_vencimento:
+                        parcela.valor_juros, parcela.valor_multa = (
+                            parcela.calcular_juros_multa(data_pgto)
+                        )
+                    parcela.status_boleto = StatusBoleto.PAGO
+                    parcela.data_pagamento_boleto = timezone.make_aware(
+                        datetime.combine(data_pgto, datetime.min.time())
+                    )
+                    parcela.valor_pago_boleto = valor
+                    parcela.banco_pagador = banco
+                    parcela.agencia_pagadora = ''
+                    parcela.pago = True
+                    parcela.data_pagamento = data_pgto
+                    parcela.valor_pago = valor
+                    parcela.observacoes = f'Pago via boleto. Banco: {banco} Ag: '
+                    historicos.append(HistoricoPagamento(
+                        item_retorno=item,
+                        parcela=parcela,
+                        data_pagamento=data_pgto,
+                        valor_pago=valor,
+                        valor_parcela=parcela.valor_atual,
+                        valor_juros=item.valor_juros or Decimal('0'),
+                        valor_multa=Decimal('0'),
+                        forma_pagamento='BOLETO',
+                        observacoes=(
+                            f'Pago via retorno CNAB. '
+                            f'Arquivo: {arquivo_retorno.nome_arquivo} '
+                            f'Ocorrência: {item.descricao_ocorrencia or item.codigo_ocorrencia}'
+                        ),
+                        origem_pagamento='CNAB',
+                    ))
+                    valor_total_pago += valor
+                elif item.tipo_ocorrencia == 'ENTRADA':
+                    parcela.status_boleto = StatusBoleto.REGISTRADO
+                    parcela.data_registro_boleto = agora
+                elif item.tipo_ocorrencia == 'BAIXA':
+                    parcela.status_boleto = StatusBoleto.BAIXADO
+                    parcela.motivo_rejeicao = item.descricao_ocorrencia
+                elif item.tipo_ocorrencia == 'REJEICAO':
+                    # HU-23 RN-18: mesma regra de ItemRetorno.processar_baixa
+                    motivo = item.descricao_ocorrencia or item.codigo_ocorrencia
+                    ativas = remessas_ativas.get(parcela.pk)
+                    if ativas:
+                        item_remessa = ativas.pop(0)
+                        item_remessa.status = ItemRemessa.Status.REJEITADO
+                        item_remessa.motivo_rejeicao = (motivo or '')[:255]
+                        item_remessa.atualizado_em = agora
+                        remessas_rejeitadas.append(item_remessa)
+                    parcela.status_boleto = StatusBoleto.GERADO
+                    parcela.data_registro_boleto = None
+                    parcela.motivo_rejeicao = motivo
+                elif item.tipo_ocorrencia == 'PROTESTO':
+                    parcela.status_boleto = StatusBoleto.PROTESTADO
+
+                if item.tipo_ocorrencia in ('LIQUIDACAO', 'ENTRADA', 'BAIXA', 'REJEICAO', 'PROTESTO'):
+                    parcela.atualizado_em = agora
+                    alteradas[parcela.pk] = parcela
+                item.processado = True
+                processados += 1
+            except Exception as e:
+                logger.exception("[Retorno] Erro ao processar registro %s: %s", item.nosso_numero, e)
+                item.erro_processamento = str(e)
+                erros += 1
+
+        ItemRetorno.objects.bulk_create(novos, batch_size=500)
+        if alteradas:
+            Parcela.objects.bulk_update(
+                list(alteradas.values()),
+                [
+                    'status_boleto', 'data_pagamento_boleto', 'valor_pago_boleto',
+                    'banco_pagador', 'agencia_pagadora', 'valor_juros', 'valor_multa',
+                    'pago', 'data_pagamento', 'valor_pago', 'observacoes',
+                    'data_registro_boleto', 'motivo_rejeicao', 'atualizado_em',
+                ],
+                batch_size=500,
+            )
+            ResumoRecebiveisMensal.atualizar_parcelas(alteradas.values())
+        if remessas_rejeitadas:
+            ItemRemessa.objects.bulk_update(
+                remessas_rejeitadas, ['status', 'motivo_rejeicao', 'atualizado_em']
+            )
+        HistoricoPagamento.objects.bulk_create(historicos, batch_size=500)
+
+        for item in via_processar_baixa:
+            if item.processar_baixa():
+                processados += 1
+                valor_total_pago += item.valor_pago or item.valor_titulo
+            elif item.erro_processamento:
+                erros += 1
+
+        # Registro repetido no arquivo (ou arquivo reprocessado): conta como no
+        # laço unitário — processado se o item original foi baixado.
+        processados += sum(1 for item in repetidos if item.processado)
+
+        logger.info(
+            "[Retorno] Lote: %d itens novos, %d parcelas atualizadas, %d pagamentos",
+            len(novos), len(alteradas), len(historicos),
+        )
+        return processados, erros, valor_total_pago
+
     def obter_boletos_sem_remessa(
         self,
         conta_bancaria=None,
@@ -1348,17 +1638,12 @@ class CNABService:
 
     @staticmethod
     def _dias_uteis_ate(inicio, fim) -> int:
-        """Conta dias úteis (seg–sex) entre `inicio` (excl.) e `fim` (incl.)."""
+        """Conta dias úteis (seg–sex, exceto feriados) entre `inicio` (excl.) e `fim` (incl.)."""
         from datetime import timedelta
+        from contratos.utils import calendario_padrao
         if fim <= inicio:
             return 0
-        dias = 0
-        d = inicio
-        while d < fim:
-            d += timedelta(days=1)
-            if d.weekday() < 5:  # 0=seg ... 4=sex
-                dias += 1
-        return dias
+        return calendario_padrao().dias_uteis_entre(inicio + timedelta(days=1), fim)
 
     def validar_boletos_para_remessa(self, parcelas, lead_time_dias_uteis: int = 1, hoje=None) -> Dict:
         """
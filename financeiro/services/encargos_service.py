@@ -0,0 +1,262 @@
+"""
+Encargos de atraso (juros de mora + multa) das parcelas vencidas.
+
+Valoração em leitura: expressoes_valores_hoje monta as anotações usadas por
+Parcela.objects.com_valores_hoje(data) — juros, multa, desconto e total do dia
+calculados no próprio SELECT, sem gravar nada e sem consultar contrato/config
+parcela a parcela.
+
+Dois motores para a atualização diária:
+  - atualizar_juros_multa_sql: UPDATE ... FROM contratos executado no banco, em
+    faixas de id (chunks curtos → locks curtos, memória constante no worker)
+  - atualizar_juros_multa_python: implementação de referência, via
+    Parcela.calcular_juros_multa parcela a parcela
+
+Regra (a mesma de Parcela.calcular_juros_multa):
+  multa = valor_atual × percentual_multa / 100             (uma vez)
+  juros = valor_atual × percentual_juros_mora / 100 × dias_atraso / 30
+
+O motor SQL arredonda o valor exato para centavos (meio centavo para cima); a
+referência grava a expansão decimal de 1/30 e deixa o arredondamento para a
+coluna — os dois só divergem num empate exato de meio centavo.
+
+Desenvolvedor: Maxwell da Silva Oliveira
+"""
+import logging
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import (
+    BooleanField, Case, CharField, DateField, DecimalField, ExpressionWrapper, F, Func,
+    IntegerField, Max, Min, Q, Value, When,
+)
+from django.db.models.functions import Coalesce, Round
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Bancos com UPDATE ... FROM suportado pelo motor SQL (SQLite >= 3.33).
+VENDORS_SQL = ('postgresql', 'sqlite')
+
+# Dias de atraso até a data de referência (inteiro) por banco. Os divisores do
+# UPDATE são literais reais (3000.0/100.0): no SQLite um decimal inteiro (2500.00)
+# é gravado como INTEGER e a divisão seria inteira.
+_DIAS_ATRASO_SQL = {
+    'postgresql': '(%s::date - p.data_vencimento)',
+    'sqlite': 'CAST(julianday(%s) - julianday(p.data_vencimento) AS INTEGER)',
+}
+
+
+def _chunk_size() -> int:
+    try:
+        return max(int(getattr(settings, 'JUROS_MULTA_CHUNK_SIZE', 5000)), 1)
+    except (TypeError, ValueError):
+        return 5000
+
+
+def motor_sql_disponivel() -> bool:
+    """True se o banco atual suporta o motor SQL."""
+    return connection.vendor in VENDORS_SQL
+
+
+def atualizar_juros_multa_sql(data_referencia=None, chunk_size=None) -> int:
+    """
+    Recalcula juros e multa de todas as parcelas vencidas e não pagas no banco.
+
+    Um UPDATE ... FROM contratos por faixa de `chunk_size` ids, cada faixa em sua
+    própria transação. Nada é carregado para o Python além de min/max(id).
+
+    Returns:
+        Quantidade de parcelas atualizadas
+    """
+    from contratos.models import Contrato
+    from financeiro.models import Parcela
+
+    if not motor_sql_disponivel():
+        raise NotImplementedError(
+            f'Motor SQL de juros/multa não suportado em {connection.vendor}'
+        )
+
+    hoje = data_referencia or timezone.localdate()
+    chunk_size = chunk_size or _chunk_size()
+
+    faixa = Parcela.objects.filter(pago=False, data_vencimento__lt=hoje).aggregate(
+        inicio=Min('id'), fim=Max('id'),
+    )
+    if faixa['inicio'] is None:
+        return 0
+
+    qn = connection.ops.quote_name
+    dias = _DIAS_ATRASO_SQL[connection.vendor]
+    sql = (
+        f'UPDATE {qn(Parcela._meta.db_table)} AS p '
+        f'SET valor_juros = ROUND(p.valor_atual * c.percentual_juros_mora * {dias} / 3000.0, 2), '
+        f'valor_multa = ROUND(p.valor_atual * c.percentual_multa / 100.0, 2) '
+        f'FROM {qn(Contrato._meta.db_table)} AS c '
+        f'WHERE c.id = p.contrato_id AND p.pago = %s AND p.data_vencimento < %s '
+        f'AND p.id >= %s AND p.id < %s'
+    )
+
+    total = 0
+    for inicio in range(faixa['inicio'], faixa['fim'] + 1, chunk_size):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, [hoje, False, hoje, inicio, inicio + chunk_size])
+            total += cursor.rowcount
+    return total
+
+
+def atualizar_juros_multa_python(data_referencia=None) -> int:
+    """
+    Implementação de referência: Parcela.calcular_juros_multa em cada parcela
+    vencida e um bulk_update final. Usada em bancos sem o motor SQL e como
+    oráculo nos testes de equivalência.
+    """
+    from financeiro.models import Parcela
+
+    hoje = data_referencia or timezone.localdate()
+    parcelas_vencidas = list(
+        Parcela.objects.filter(pago=False, data_vencimento__lt=hoje)
+        .select_related('contrato')
+    )
+
+    to_update = []
+    for parcela in parcelas_vencidas:
+        juros, multa = parcela.calcular_juros_multa(hoje)
+        parcela.valor_juros = juros
+        parcela.valor_multa = multa
+        to_update.append(parcela)
+
+    if to_update:
+        Parcela.objects.bulk_update(to_update, ['valor_juros', 'valor_multa'])
+
+    return len(to_update)
+
+
+# ---------------------------------------------------------------------------
+# Valoração em leitura (anotações)
+# ---------------------------------------------------------------------------
+
+class DiasEntre(Func):
+    """Dias corridos de `inicio` até `fim` (fim - inicio), como inteiro."""
+    arity = 2
+    template = '(%(expressions)s)'
+    arg_joiner = ' - '
+    output_field = IntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='CAST(julianday(%(expressions)s) AS INTEGER)',
+            arg_joiner=') - julianday(',
+            **extra_context,
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, function='DATEDIFF', template='%(function)s(%(expressions)s)',
+            arg_joiner=', ', **extra_context,
+        )
+
+
+_DINHEIRO = DecimalField(max_digits=14, decimal_places=2)
+_CENTESIMO = Value(Decimal('0.01'), output_field=DecimalField(max_digits=3, decimal_places=2))
+
+
+def _config_boleto(campo_imobiliaria, campo_contrato, output_field):
+    """Campo efetivo de Contrato.get_config_boleto() como expressão."""
+    return Case(
+        When(
+            contrato__usar_config_boleto_imobiliaria=True,
+            then=F(f'contrato__imobiliaria__{campo_imobiliaria}'),
+        ),
+        default=F(f'contrato__{campo_contrato}'),
+        output_field=output_field,
+    )
+
+
+def expressoes_valores_hoje(data_referencia=None) -> list:
+    """
+    Anotações de Parcela equivalentes a Parcela.calcular_valores_hoje() na data.
+
+    Devolvidas em etapas (lista de dicts) porque as últimas referenciam as
+    primeiras; ParcelaQuerySet.com_valores_hoje aplica um annotate por etapa.
+    Os multiplicadores vêm antes dos divisores para que o SQLite, que grava
+    decimais inteiros como INTEGER, não faça divisão inteira.
+    """
+    hoje = data_referencia or timezone.localdate()
+    ref = Value(hoje, output_field=DateField())
+    zero = Value(Decimal('0.00'), output_field=_DINHEIRO)
+    vencida = Q(pago=False, data_vencimento__lt=hoje)
+
+    config = {
+        'config_multa_percentual': F('contrato__percentual_multa'),
+        'config_juros_percentual': F('contrato__percentual_juros_mora'),
+        'config_desconto_valor': Coalesce(
+            _config_boleto('percentual_desconto_padrao', 'valor_desconto_boleto', _DINHEIRO),
+            zero,
+        ),
+        'config_desconto_tipo': Coalesce(
+            _config_boleto('tipo_valor_desconto', 'tipo_valor_desconto', CharField()),
+            Value('PERCENTUAL'),
+        ),
+        'config_desconto_dias': Coalesce(
+            _config_boleto('dias_para_desconto_padrao', 'dias_desconto_boleto', IntegerField()),
+            0,
+        ),
+        'config_dias_carencia': Coalesce(
+            _config_boleto('dias_para_encargos_padrao', 'dias_carencia_boleto', IntegerField()),
+            0,
+        ),
+        'data_valores_hoje': ref,
+    }
+    dias = {
+        'dias_atraso_hoje': Case(
+            When(data_vencimento__lt=hoje, then=DiasEntre(ref, F('data_vencimento'))),
+            default=0,
+        ),
+        # Dias até o vencimento; negativo quando já venceu
+        'dias_ate_vencimento': DiasEntre(F('data_vencimento'), ref),
+    }
+    desconto_disponivel = Q(
+        dias_ate_vencimento__gte=0,
+        dias_ate_vencimento__lte=F('config_desconto_dias'),
+        config_desconto_valor__gt=0,
+    )
+    valores = {
+        'multa_hoje': Case(
+            When(vencida, then=Round(
+                F('valor_atual') * F('config_multa_percentual') * _CENTESIMO,
+                2, output_field=_DINHEIRO,
+            )),
+            default=zero,
+        ),
+        'juros_hoje': Case(
+            When(vencida, then=Round(
+                F('valor_atual') * F('config_juros_percentual') * _CENTESIMO
+                * F('dias_atraso_hoje') / Value(30),
+                2, output_field=_DINHEIRO,
+            )),
+            default=zero,
+        ),
+        'desconto_disponivel_hoje': Case(
+            When(desconto_disponivel, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        ),
+        'desconto_hoje': Case(
+            When(desconto_disponivel & Q(config_desconto_tipo='PERCENTUAL'), then=Round(
+                F('valor_atual') * F('config_desconto_valor') * _CENTESIMO,
+                2, output_field=_DINHEIRO,
+            )),
+            When(desconto_disponivel, then=F('config_desconto_valor')),
+            default=zero,
+        ),
+    }
+    total = {
+        'valor_total_hoje': ExpressionWrapper(
+            F('valor_atual') + F('juros_hoje') + F('multa_hoje') - F('desconto_hoje'),
+            output_field=_DINHEIRO,
+        ),
+    }
+    return [config, dias, valores, total]
@@ -46,17 +46,22 @@ class GeracaoBoletosService:
         Respeita a cascata da HU-06: para no primeiro bloqueio (as seguintes
         também estariam bloqueadas). Retorna (elegiveis, bloqueados).
 
-        `ciclos_aplicados` (opcional) é repassado a `pode_gerar_boleto` para
-        evitar consulta a Reajuste por parcela quando o chamador já pré-carregou
-        os ciclos reajustados do contrato.
+        Parcelas anotadas por com_liberacao_reajuste() (prefetch do painel)
+        usam a anotação `liberada_reajuste`; senão `ciclos_aplicados`
+        (opcional) é repassado a `pode_gerar_boleto` para evitar consulta a
+        Reajuste por parcela quando o chamador já pré-carregou os ciclos.
         """
         elegiveis, bloqueados = [], []
         for p in self._qs_parcelas_base(contrato):
             if len(elegiveis) >= quantidade:
                 break
-            pode, motivo = contrato.pode_gerar_boleto(
-                p.numero_parcela, ciclos_aplicados=ciclos_aplicados
-            )
+            liberada = getattr(p, 'liberada_reajuste', None)
+            if liberada is not None:
+                pode, motivo = liberada, ('' if liberada else contrato.motivo_bloqueio_reajuste())
+            else:
+                pode, motivo = contrato.pode_gerar_boleto(
+                    p.numero_parcela, ciclos_aplicados=ciclos_aplicados
+                )
             if not pode:
                 bloqueados.append((p, motivo))
                 break  # cascata HU-06
@@ -97,7 +102,14 @@ class GeracaoBoletosService:
         """
         from django.db.models import Count, Q, Prefetch
         from contratos.models import Contrato, StatusContrato, PrestacaoIntermediaria
-        from financeiro.models import StatusBoleto, TipoParcela, Parcela, Reajuste
+        from financeiro.models import StatusBoleto, TipoParcela, Parcela
+
+        ativos = Contrato.objects.filter(status=StatusContrato.ATIVO, imobiliaria__in=imobiliarias)
+        if imobiliaria_id:
+            ativos = ativos.filter(imobiliaria_id=imobiliaria_id)
+        # Bloqueio por reajuste materializado em dia: a liberação de cada
+        # parcela sai do próprio SELECT (com_liberacao_reajuste)
+        Contrato.garantir_bloqueios_reajuste(ativos)
 
         # Pré-carrega tudo o que o laço precisa em poucas consultas (em vez de
         # ~3 consultas por contrato + N+1): parcelas pendentes, intermediárias
@@ -106,6 +118,7 @@ class GeracaoBoletosService:
             Parcela.objects
             .filter(pago=False, status_boleto=StatusBoleto.NAO_GERADO)
             .exclude(tipo_parcela=TipoParcela.INTERMEDIARIA)
+            .com_liberacao_reajuste()
             .order_by('numero_parcela')
         )
         inter_pend_qs = (
@@ -113,7 +126,7 @@ class GeracaoBoletosService:
             .select_related('parcela_vinculada')
         )
         contratos = (
-            Contrato.objects.filter(status=StatusContrato.ATIVO, imobiliaria__in=imobiliarias)
+            ativos
             .select_related('imobiliaria', 'comprador')
             .annotate(_ja_gerados=Count(
                 'parcelas',
@@ -125,29 +138,15 @@ class GeracaoBoletosService:
             )
             .order_by('imobiliaria__nome', 'numero_contrato')
         )
-        if imobiliaria_id:
-            contratos = contratos.filter(imobiliaria_id=imobiliaria_id)
-
         contratos = list(contratos)
 
-        # Ciclos já reajustados (aplicado=True) de todos os contratos em 1 consulta
-        # — evita uma consulta a Reajuste por parcela em pode_gerar_boleto().
-        ciclos_por_contrato: dict = {}
-        for cid, ciclo in Reajuste.objects.filter(
-            contrato_id__in=[c.pk for c in contratos], aplicado=True
-        ).values_list('contrato_id', 'ciclo'):
-            ciclos_por_contrato.setdefault(cid, set()).add(ciclo)
-
         grupos = {}
         kpi_a_gerar = kpi_bloqueados = kpi_intermediarias = 0
         kpi_valor = Decimal('0.00')
         contratos_com_pendencia = set()
 
         for contrato in contratos:
-            ciclos_aplic = ciclos_por_contrato.get(contrato.pk, set())
-            elegiveis, bloqueados = self.proximas_elegiveis(
-                contrato, quantidade, ciclos_aplicados=ciclos_aplic
-            )
+            elegiveis, bloqueados = self.proximas_elegiveis(contrato, quantidade)
             inter = self.intermediarias_elegiveis(contrato) if incluir_intermediarias else []
             ja_gerados = contrato._ja_gerados
             if not elegiveis and not bloqueados and not inter:
@@ -236,16 +235,17 @@ class GeracaoBoletosService:
     # RN-14 — Notificação consolidada por canal
     # ------------------------------------------------------------------ #
     def _pdf_consolidado(self, parcelas):
-        """Concatena os PDFs (boleto_pdf_db) das parcelas em 1 PDF via pypdf."""
+        """Concatena os PDFs armazenados das parcelas em 1 PDF via pypdf."""
         try:
             import io
             from pypdf import PdfWriter, PdfReader
+            from financeiro.services.pdf_store import pdf_da_parcela
             writer = PdfWriter()
             for p in parcelas:
-                data = getattr(p, 'boleto_pdf_db', None)
+                data = pdf_da_parcela(p)
                 if not data:
                     continue
-                reader = PdfReader(io.BytesIO(bytes(data)))
+                reader = PdfReader(io.BytesIO(data))
                 for pg in reader.pages:
                     writer.add_page(pg)
             if not writer.pages:
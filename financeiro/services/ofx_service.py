@@ -18,6 +18,11 @@ Estratégia de reconciliação (em ordem de prioridade):
   P3  — valor ±R$0,10 + data de vencimento no mesmo mês
   P4  — valor ±R$0,10 sem restrição de data
 
+As parcelas em aberto são indexadas uma vez por arquivo (_IndiceParcelas):
+nosso_número, número do contrato, valor em centavos (+ ano/mês) e uma
+varredura do MEMO pelos tamanhos de chave existentes. Os FITIDs já quitados
+são lidos numa única consulta antes da reconciliação.
+
 Parse:
   POST /api/ofx/parse no boleto_cnab_api (gem Ruby `ofx`, OFX v1/v2, bank-specific)
   Se a API estiver indisponível, RuntimeError é levantado.
@@ -25,7 +30,7 @@ Parse:
 import io
 import logging
 from datetime import date
-from decimal import Decimal, InvalidOperation
+from decimal import ROUND_CEILING, ROUND_FLOOR, Decimal, InvalidOperation
 
 import requests
 
@@ -157,6 +162,116 @@ class OFXReconciliacao:
         return self.parcela is not None and self.confianca != 'NAO_ENCONTRADA'
 
 
+class _Posicoes(list):
+    """Posições (crescentes) das parcelas de uma chave, com cursor para a primeira livre."""
+
+    __slots__ = ('cursor',)
+
+    def __init__(self):
+        super().__init__()
+        self.cursor = 0
+
+
+def _centavos(valor: Decimal) -> int:
+    return int((valor * 100).to_integral_value())
+
+
+class _IndiceParcelas:
+    """
+    Índices das parcelas em aberto, montados uma vez por arquivo OFX.
+
+    Cada índice guarda, por chave, as posições das parcelas na ordem da lista
+    recebida. O cursor de cada chave só avança (parcela usada não volta a
+    ficar livre), então cada critério devolve a mesma parcela da varredura
+    linear — a primeira disponível na ordem da lista — sem percorrê-la.
+    """
+
+    def __init__(self, parcelas: list):
+        self.parcelas = parcelas
+        self.usadas = [False] * len(parcelas)
+        self._posicao = {}
+        self._nosso_numero: dict[str, _Posicoes] = {}
+        self._contrato: dict[str, _Posicoes] = {}
+        self._valor: dict[int, _Posicoes] = {}
+        self._valor_mes: dict[tuple, _Posicoes] = {}
+
+        for pos, p in enumerate(parcelas):
+            self._posicao[p.pk] = pos
+            if p.nosso_numero:
+                self._incluir(self._nosso_numero, p.nosso_numero, pos)
+            num = p.contrato.numero_contrato
+            if num:
+                self._incluir(self._contrato, num.upper(), pos)
+            if p.valor_atual is not None:
+                centavos = _centavos(p.valor_atual)
+                self._incluir(self._valor, centavos, pos)
+                if p.data_vencimento:
+                    venc = p.data_vencimento
+                    self._incluir(self._valor_mes, (centavos, venc.year, venc.month), pos)
+
+        # Tamanhos distintos das chaves procuradas dentro do MEMO
+        self._tamanhos_nosso_numero = sorted({len(k) for k in self._nosso_numero})
+        self._tamanhos_contrato = sorted({len(k) for k in self._contrato})
+
+    @staticmethod
+    def _incluir(indice, chave, pos):
+        posicoes = indice.get(chave)
+        if posicoes is None:
+            posicoes = indice[chave] = _Posicoes()
+        posicoes.append(pos)
+
+    def _primeira_livre(self, posicoes) -> int | None:
+        if not posicoes:
+            return None
+        while posicoes.cursor < len(posicoes) and self.usadas[posicoes[posicoes.cursor]]:
+            posicoes.cursor += 1
+        return posicoes[posicoes.cursor] if posicoes.cursor < len(posicoes) else None
+
+    def _melhor(self, candidatos):
+        """Parcela de menor posição entre os grupos de candidatos (None se nenhum livre)."""
+        melhor = None
+        for posicoes in candidatos:
+            pos = self._primeira_livre(posicoes)
+            if pos is not None and (melhor is None or pos < melhor):
+                melhor = pos
+        return None if melhor is None else self.parcelas[melhor]
+
+    @staticmethod
+    def _no_texto(indice, tamanhos, texto):
+        for tamanho in tamanhos:
+            if tamanho > len(texto):
+                break
+            for i in range(len(texto) - tamanho + 1):
+                posicoes = indice.get(texto[i:i + tamanho])
+                if posicoes:
+                    yield posicoes
+
+    @staticmethod
+    def _faixa_centavos(valor: Decimal, tolerancia: Decimal) -> range:
+        inicio = ((valor - tolerancia) * 100).to_integral_value(rounding=ROUND_CEILING)
+        fim = ((valor + tolerancia) * 100).to_integral_value(rounding=ROUND_FLOOR)
+        return range(int(inicio), int(fim) + 1)
+
+    def usar(self, parcela) -> None:
+        self.usadas[self._posicao[parcela.pk]] = True
+
+    def por_nosso_numero(self, nosso_numero: str):
+        return self._melhor([self._nosso_numero.get(nosso_numero)])
+
+    def nosso_numero_no_texto(self, texto: str):
+        return self._melhor(self._no_texto(self._nosso_numero, self._tamanhos_nosso_numero, texto))
+
+    def contrato_no_texto(self, texto: str):
+        return self._melhor(self._no_texto(self._contrato, self._tamanhos_contrato, texto.upper()))
+
+    def por_valor(self, valor: Decimal, tolerancia: Decimal, data: date | None = None):
+        """Primeira parcela com |valor − valor_atual| ≤ tolerância (e vencimento no mês de `data`)."""
+        faixa = self._faixa_centavos(valor, tolerancia)
+        if data is None:
+            return self._melhor(self._valor.get(c) for c in faixa)
+        return self._melhor(self._valor_mes.get((c, data.year, data.month)) for c in faixa)
+
+
 class OFXService:
     """
     Serviço de reconciliação OFX.
@@ -184,6 +299,8 @@ class OFXService:
         self.brcobranca_url = brcobranca_url or getattr(
             settings, 'BRCOBRANCA_URL', 'http://localhost:9292'
         )
+        # FITIDs com HistoricoPagamento, carregados por processar()
+        self._fitids_processados: set | None = None
 
     def processar(self, ofx_content: str | bytes) -> dict:
         """
@@ -239,8 +356,8 @@ class OFXService:
         if self.contrato:
             qs = qs.filter(contrato=self.contrato)
 
-        parcelas_abertas = list(qs)
-        parcelas_usadas: set = set()  # pks já reconciliados
+        indice = _IndiceParcelas(list(qs))
+        self._fitids_processados = self._fitids_existentes(transacoes)
 
         resultados = []
         parcelas_quitadas = []
@@ -254,11 +371,11 @@ class OFXService:
                 ))
                 continue
 
-            rec = self._reconciliar(tx, parcelas_abertas, parcelas_usadas)
+            rec = self._reconciliar(tx, indice)
             resultados.append(rec)
 
             if rec.reconciliada:
-                parcelas_usadas.add(rec.parcela.pk)
+                indice.usar(rec.parcela)
                 parcelas_quitadas.append(rec.parcela)
                 self._quitar(rec.parcela, tx)
 
@@ -272,71 +389,82 @@ class OFXService:
             'parser': parser_usado,
         }
 
-    def _reconciliar(self, tx: OFXTransaction, parcelas: list,
-                     usadas: set) -> OFXReconciliacao:
+    def _reconciliar(self, tx: OFXTransaction, indice: _IndiceParcelas) -> OFXReconciliacao:
         """
-        Tenta casar a transação com uma parcela.
+        Tenta casar a transação com uma parcela ainda não usada do índice.
         Retorna OFXReconciliacao com o resultado.
         """
-        disponiveis = [p for p in parcelas if p.pk not in usadas]
-
         # P1a — nosso_número extraído via BRCobrança (bank-specific, mais preciso)
         if tx.nosso_numero_extraido:
-            for p in disponiveis:
-                if p.nosso_numero and p.nosso_numero == tx.nosso_numero_extraido:
-                    return OFXReconciliacao(
-                        tx, p, 'ALTA',
-                        f'nosso_número {p.nosso_numero} extraído via BRCobrança'
-                    )
-
-        # P1b — nosso_número da parcela encontrado literalmente no MEMO
-        if tx.memo:
-            for p in disponiveis:
-                if p.nosso_numero and p.nosso_numero in tx.memo:
-                    return OFXReconciliacao(
-                        tx, p, 'ALTA',
-                        f'nosso_número {p.nosso_numero} encontrado no MEMO')
+            p = indice.por_nosso_numero(tx.nosso_numero_extraido)
+            if p is not None:
+                return OFXReconciliacao(
+                    tx, p, 'ALTA',
+                    f'nosso_número {p.nosso_numero} extraído via BRCobrança'
+                )
 
-        # P2 — número do contrato no MEMO
         if tx.memo:
-            for p in disponiveis:
-                num = p.contrato.numero_contrato
-                if num and num.upper() in tx.memo.upper():
-                    return OFXReconciliacao(
-                        tx, p, 'ALTA',
-                        f'contrato {num} encontrado no MEMO')
+            # P1b — nosso_número da parcela encontrado literalmente no MEMO
+            p = indice.nosso_numero_no_texto(tx.memo)
+            if p is not None:
+                return OFXReconciliacao(
+                    tx, p, 'ALTA',
+                    f'nosso_número {p.nosso_numero} encontrado no MEMO')
+
+            # P2 — número do contrato no MEMO
+            p = indice.contrato_no_texto(tx.memo)
+            if p is not None:
+                return OFXReconciliacao(
+                    tx, p, 'ALTA',
+                    f'contrato {p.contrato.numero_contrato} encontrado no MEMO')
 
         # P3 — valor exato + mesmo mês de vencimento
         if tx.data:
-            for p in disponiveis:
-                valor_match = abs(tx.valor - p.valor_atual) <= self.TOLERANCIA_VALOR
-                mesmo_mes = (p.data_vencimento and
-                             p.data_vencimento.year == tx.data.year and
-                             p.data_vencimento.month == tx.data.month)
-                if valor_match and mesmo_mes:
-                    return OFXReconciliacao(
-                        tx, p, 'MEDIA',
-                        f'valor R${tx.valor} ≈ R${p.valor_atual} no mesmo mês {tx.data:%m/%Y}'
-                    )
-
-        # P4 — valor exato sem restrição de data
-        for p in disponiveis:
-            valor_match = abs(tx.valor - p.valor_atual) <= self.TOLERANCIA_VALOR
-            if valor_match:
+            p = indice.por_valor(tx.valor, self.TOLERANCIA_VALOR, tx.data)
+            if p is not None:
                 return OFXReconciliacao(
-                    tx, p, 'BAIXA',
-                    f'valor R${tx.valor} ≈ R${p.valor_atual} (sem correspondência de data)'
+                    tx, p, 'MEDIA',
+                    f'valor R${tx.valor} ≈ R${p.valor_atual} no mesmo mês {tx.data:%m/%Y}'
                 )
 
+        # P4 — valor exato sem restrição de data
+        p = indice.por_valor(tx.valor, self.TOLERANCIA_VALOR)
+        if p is not None:
+            return OFXReconciliacao(
+                tx, p, 'BAIXA',
+                f'valor R${tx.valor} ≈ R${p.valor_atual} (sem correspondência de data)'
+            )
+
         return OFXReconciliacao(tx, confianca='NAO_ENCONTRADA',
                                 motivo='Nenhuma parcela correspondente encontrada')
 
+    # FITIDs por consulta no pré-carregamento (limite de parâmetros do banco)
+    LOTE_FITIDS = 1000
+
+    @classmethod
+    def _fitids_existentes(cls, transacoes: list[OFXTransaction]) -> set:
+        """FITIDs do arquivo que já têm HistoricoPagamento (uma consulta por lote)."""
+        from financeiro.models import HistoricoPagamento
+
+        fitids = sorted({tx.fitid for tx in transacoes if tx.fitid and tx.valor > 0})
+        existentes = set()
+        for i in range(0, len(fitids), cls.LOTE_FITIDS):
+            existentes.update(HistoricoPagamento.objects.filter(
+                fitid_ofx__in=fitids[i:i + cls.LOTE_FITIDS],
+            ).values_list('fitid_ofx', flat=True))
+        return existentes
+
     def _quitar(self, parcela, tx: OFXTransaction) -> None:
         """Marca a parcela como paga com os dados da transação OFX e cria HistoricoPagamento."""
         from financeiro.models import HistoricoPagamento
 
         # Deduplicação: não quitar se já existe histórico com mesmo FITID
-        if tx.fitid and HistoricoPagamento.objects.filter(fitid_ofx=tx.fitid).exists():
+        # (pré-carregada em processar(); consulta avulsa se chamado isoladamente)
+        fitids = self._fitids_processados
+        if tx.fitid and (
+            tx.fitid in fitids if fitids is not None
+            else HistoricoPagamento.objects.filter(fitid_ofx=tx.fitid).exists()
+        ):
             logger.warning('OFX: FITID %s já processado — parcela pk=%s ignorada', tx.fitid, parcela.pk)
             return
 
@@ -363,6 +491,8 @@ class OFXService:
                 origem_pagamento='OFX',
                 fitid_ofx=tx.fitid or '',
             )
+            if fitids is not None and tx.fitid:
+                fitids.add(tx.fitid)
         except Exception as e:
             logger.error('OFX: erro ao quitar parcela pk=%s: %s', parcela.pk, e)
 
@@ -0,0 +1,128 @@
+"""
+Armazenamento de PDFs de boleto por conteúdo (SHA-256).
+
+Os bytes ficam no storage 'boleto_pdfs' (settings.STORAGES — FileSystemStorage
+num diretório local por padrão; qualquer backend compatível, ex.: S3 via
+django-storages) e a tabela ArquivoPdf guarda só hash e tamanho. O mesmo PDF
+gravado N vezes (carnê de um lote de gerar_boletos_lote) ocupa um arquivo só.
+
+Leitura unificada: pdf_da_parcela / resposta_pdf_parcela procuram, nesta
+ordem, o blob por conteúdo e a cópia legada em Parcela.boleto_pdf_db.
+
+Desenvolvedor: Maxwell da Silva Oliveira
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, InvalidStorageError, storages
+from django.db import IntegrityError, transaction
+
+logger = logging.getLogger(__name__)
+
+STORAGE_ALIAS = 'boleto_pdfs'
+
+
+def store_habilitado() -> bool:
+    """True se novos PDFs devem ir para o store por conteúdo (e não para a tabela)."""
+    return bool(getattr(settings, 'BOLETO_PDF_BLOB_STORE', False))
+
+
+def pdf_storage():
+    """Storage dos PDFs; sem alias configurado, usa MEDIA_ROOT/boleto_pdfs."""
+    try:
+        return storages[STORAGE_ALIAS]
+    except InvalidStorageError:
+        return FileSystemStorage(location=settings.MEDIA_ROOT / 'boleto_pdfs')
+
+
+def guardar_pdf(conteudo):
+    """
+    Grava o PDF no store (se ainda não existir) e devolve o ArquivoPdf.
+
+    Idempotente: o mesmo conteúdo sempre resolve para o mesmo registro/arquivo.
+    """
+    from financeiro.models import ArquivoPdf
+
+    conteudo = bytes(conteudo)
+    sha256 = hashlib.sha256(conteudo).hexdigest()
+    try:
+        with transaction.atomic():
+            arquivo, _ = ArquivoPdf.objects.get_or_create(
+                sha256=sha256, defaults={'tamanho': len(conteudo)},
+            )
+    except IntegrityError:
+        # Outro worker criou o mesmo hash entre o get e o create
+        arquivo = ArquivoPdf.objects.get(sha256=sha256)
+
+    storage = pdf_storage()
+    if not storage.exists(arquivo.caminho):
+        nome = storage.save(arquivo.caminho, ContentFile(conteudo))
+        if nome != arquivo.caminho:
+            # Gravação concorrente do mesmo conteúdo: o arquivo canônico já existe
+            storage.delete(nome)
+    return arquivo
+
+
+def abrir_pdf(arquivo):
+    """Abre o PDF do store para leitura em streaming (file-like, modo 'rb')."""
+    return pdf_storage().open(arquivo.caminho, 'rb')
+
+
+def anexar_pdf_parcela(parcela, conteudo):
+    """
+    Associa o PDF à parcela (sem salvar): no store por conteúdo quando
+    BOLETO_PDF_BLOB_STORE está ativo, senão na cópia legada boleto_pdf_db.
+
+    Sempre limpa o outro lado: um blob antigo (ex.: vindo de
+    migrar_pdfs_boleto) tem precedência na leitura e serviria o PDF anterior.
+    """
+    if store_habilitado():
+        parcela.boleto_pdf_blob = guardar_pdf(conteudo)
+        parcela.boleto_pdf_db = None
+    else:
+        parcela.boleto_pdf_blob = None
+        parcela.boleto_pdf_db = conteudo
+
+
+def tem_pdf_armazenado(parcela) -> bool:
+    """True se a parcela tem PDF no store ou na cópia em banco."""
+    return bool(parcela.boleto_pdf_blob_id or parcela.boleto_pdf_db)
+
+
+def pdf_da_parcela(parcela):
+    """Bytes do PDF armazenado da parcela (store por conteúdo ou banco), ou None."""
+    if parcela.boleto_pdf_blob_id:
+        try:
+            with abrir_pdf(parcela.boleto_pdf_blob) as f:
+                return f.read()
+        except (OSError, ValueError) as e:
+            logger.warning('PDF %s ausente no store: %s', parcela.boleto_pdf_blob_id, e)
+    if parcela.boleto_pdf_db:
+        return bytes(parcela.boleto_pdf_db)
+    return None
+
+
+def resposta_pdf_parcela(parcela, filename, disposition='attachment'):
+    """
+    Resposta HTTP com o PDF armazenado da parcela, ou None se não houver.
+
+    O store é servido em streaming (FileResponse); a cópia legada em banco já
+    está em memória e vai como HttpResponse.
+    """
+    from django.http import FileResponse, HttpResponse
+
+    response = None
+    if parcela.boleto_pdf_blob_id:
+        try:
+            response = FileResponse(
+                abrir_pdf(parcela.boleto_pdf_blob), content_type='application/pdf',
+            )
+        except (OSError, ValueError) as e:
+            logger.warning('PDF %s ausente no store: %s', parcela.boleto_pdf_blob_id, e)
+    if response is None and parcela.boleto_pdf_db:
+        response = HttpResponse(bytes(parcela.boleto_pdf_db), content_type='application/pdf')
+    if response is not None:
+        response['Content-Disposition'] = f'{disposition}; filename="{filename}"'
+    return response
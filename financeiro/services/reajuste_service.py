@@ -18,6 +18,7 @@ from django.db import transaction
 from django.utils import timezone
 
 from contratos.models import Contrato, IndiceReajuste, TipoCorrecao
+from contratos.series_indices import serie_indice
 from financeiro.models import Parcela, Reajuste
 
 logger = logging.getLogger(__name__)
@@ -108,15 +109,11 @@ class ReajusteService:
         Returns:
             Tuple (todos_disponiveis, lista_meses_faltantes)
         """
-        meses_faltantes = []
-        data_atual = data_inicio.replace(day=1)
-        data_fim_mes = data_fim.replace(day=1)
-
-        while data_atual <= data_fim_mes:
-            indice = self.buscar_indice(tipo_indice, data_atual.year, data_atual.month)
-            if not indice:
-                meses_faltantes.append(f"{data_atual.month:02d}/{data_atual.year}")
-            data_atual = data_atual + relativedelta(months=1)
+        # Série em cache: período completo é checado em O(1), sem consulta por mês
+        faltantes = serie_indice(tipo_indice).meses_faltantes(
+            data_inicio.year, data_inicio.month, data_fim.year, data_fim.month
+        )
+        meses_faltantes = [f"{mes:02d}/{ano}" for ano, mes in faltantes]
 
         return len(meses_faltantes) == 0, meses_faltantes
 
@@ -160,14 +157,15 @@ class ReajusteService:
             'metodologia': 'Cálculo Exato - Atualização por Índice Econômico'
         }
 
-        # Iterar pelos meses do período
+        # Iterar pelos meses do período (variações da série em cache)
+        serie = serie_indice(tipo_indice)
         mes_atual = data_inicio.month
         ano_atual = data_inicio.year
         fator_acumulado = Decimal('1.0')
 
         while (ano_atual < data_fim.year) or (ano_atual == data_fim.year and mes_atual <= data_fim.month):
-            # Buscar índice do mês
-            indice = self.buscar_indice(tipo_indice, ano_atual, mes_atual)
+            # Variação do mês
+            percentual_mes = serie.valor(ano_atual, mes_atual)
 
             # Calcular dias do mês
             dias_no_mes = monthrange(ano_atual, mes_atual)[1]
@@ -190,8 +188,7 @@ class ReajusteService:
                 dias_considerados = dias_no_mes
                 proporcao = Decimal('1.0')
 
-            if indice:
-                percentual_mes = indice.valor
+            if percentual_mes is not None:
                 percentual_aplicado = percentual_mes * proporcao
                 fator_mes = 1 + (percentual_aplicado / 100)
                 fator_acumulado *= fator_mes
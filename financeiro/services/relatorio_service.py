@@ -7,19 +7,92 @@ Empresa: M&S do Brasil LTDA
 
 Este módulo implementa os relatórios de prestações a pagar e pagas,
 com suporte a filtros, totalizadores e exportação.
+
+Exportação em streaming: gerar_relatorio_prestacoes_streaming devolve os itens
+como gerador (queryset lido em lotes) e os exportadores CSV (iterar_csv), Excel
+(openpyxl write-only) e PDF (página a página) consomem esse gerador sem montar
+a lista inteira; os totalizadores são acumulados durante a leitura.
 """
 import logging
 from datetime import date, timedelta
 from decimal import Decimal
-from typing import Dict, Optional, Any
+from itertools import islice
+from typing import Dict, Iterator, Optional, Any
 from dataclasses import dataclass, field
 from enum import Enum
 
+from django.conf import settings
+from django.db import connections
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
 
+def _chunk_size_exportacao() -> int:
+    try:
+        return max(int(getattr(settings, 'RELATORIO_EXPORT_CHUNK_SIZE', 2000)), 1)
+    except (TypeError, ValueError):
+        return 2000
+
+
+def _timeout_cache_totais() -> int:
+    try:
+        return max(int(getattr(settings, 'RELATORIO_TOTAIS_CACHE_TIMEOUT', 300)), 0)
+    except (TypeError, ValueError):
+        return 300
+
+
+def _iterar_em_lotes(queryset, chunk_size: int):
+    """
+    Percorre o queryset em lotes de `chunk_size`, na ordem dele.
+
+    Usa .iterator(chunk_size) — cursor nomeado no PostgreSQL. Com
+    DISABLE_SERVER_SIDE_CURSORS (pgBouncer) o iterator traria o resultado
+    inteiro de uma vez; nesse caso lê só os ids ordenados e busca os objetos
+    lote a lote.
+    """
+    conexao = connections[queryset.db]
+    if not (conexao.vendor == 'postgresql'
+            and conexao.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS')):
+        yield from queryset.iterator(chunk_size=chunk_size)
+        return
+
+    ids = list(queryset.values_list('pk', flat=True))
+    for inicio in range(0, len(ids), chunk_size):
+        lote = ids[inicio:inicio + chunk_size]
+        por_id = queryset.order_by().in_bulk(lote)
+        for pk in lote:
+            if pk in por_id:  # removida entre as duas leituras
+                yield por_id[pk]
+
+
+# Linhas de dados por página do PDF: paisagem A4, fonte 8, cabe na 1ª página
+# (com título e data) ainda com a linha de totais
+_LINHAS_POR_PAGINA_PDF = 20
+
+
+class _Eco:
+    """Pseudo-arquivo para csv.writer: devolve a linha em vez de gravá-la."""
+
+    def write(self, valor):
+        return valor
+
+
+def _lotes(iteravel, tamanho: int):
+    """
+    Divide o iterável em listas de até `tamanho`, indicando a última:
+    (lote, ultimo). Sempre produz ao menos um lote (vazio se não houver itens).
+    """
+    iterador = iter(iteravel)
+    lote = list(islice(iterador, tamanho))
+    while True:
+        proximo = list(islice(iterador, tamanho))
+        yield lote, not proximo
+        if not proximo:
+            return
+        lote = proximo
+
+
 class TipoRelatorio(Enum):
     """Tipos de relatório disponíveis"""
     PRESTACOES_A_PAGAR = 'prestacoes_a_pagar'
@@ -71,6 +144,23 @@ class TotalizadorPrestacoes:
     valor_vencido: Decimal = field(default_factory=lambda: Decimal('0.00'))
     valor_a_vencer: Decimal = field(default_factory=lambda: Decimal('0.00'))
 
+    def acumular(self, item: 'ItemRelatorioPrestacao', por_vencimento: bool = True):
+        """Soma um item aos totais (vencidas/a vencer só quando por_vencimento)."""
+        self.total_parcelas += 1
+        self.valor_total += item.valor_total
+        self.valor_principal += item.valor_atual
+        self.valor_juros += item.valor_juros
+        self.valor_multa += item.valor_multa
+        self.valor_desconto += item.valor_desconto
+        if not por_vencimento:
+            return
+        if item.dias_atraso > 0:
+            self.parcelas_vencidas += 1
+            self.valor_vencido += item.valor_total
+        else:
+            self.parcelas_a_vencer += 1
+            self.valor_a_vencer += item.valor_total
+
 
 @dataclass
 class ItemRelatorioPrestacao:
@@ -119,67 +209,10 @@ class RelatorioService:
         Returns:
             dict: Relatório com itens e totalizadores
         """
-        from financeiro.models import Parcela
-
         logger.info(f"Gerando relatório de prestações a pagar com filtros: {filtro}")
 
-        # Query base: parcelas não pagas
-        queryset = Parcela.objects.filter(pago=False).select_related(
-            'contrato',
-            'contrato__comprador',
-            'contrato__imobiliaria'
-        )
-
-        # Aplicar filtros
-        queryset = self._aplicar_filtros_parcela(queryset, filtro, pago=False)
-
-        # Ordenar por data de vencimento
-        queryset = queryset.order_by('data_vencimento', 'contrato__numero_contrato')
-
-        # Construir itens do relatório
-        hoje = date.today()
-        itens = []
         totalizador = TotalizadorPrestacoes()
-
-        for parcela in queryset:
-            # Calcular juros e multa atualizados
-            juros, multa = parcela.calcular_juros_multa(hoje)
-            dias_atraso = (hoje - parcela.data_vencimento).days if hoje > parcela.data_vencimento else 0
-            valor_total = parcela.valor_atual + juros + multa - parcela.valor_desconto
-
-            item = ItemRelatorioPrestacao(
-                contrato_numero=parcela.contrato.numero_contrato,
-                comprador_nome=parcela.contrato.comprador.nome,
-                comprador_documento=parcela.contrato.comprador.documento,
-                numero_parcela=parcela.numero_parcela,
-                tipo_parcela=parcela.tipo_parcela,
-                data_vencimento=parcela.data_vencimento,
-                valor_original=parcela.valor_original,
-                valor_atual=parcela.valor_atual,
-                valor_juros=juros,
-                valor_multa=multa,
-                valor_desconto=parcela.valor_desconto,
-                valor_total=valor_total,
-                dias_atraso=dias_atraso,
-                status_boleto=parcela.status_boleto,
-                ciclo_reajuste=parcela.ciclo_reajuste,
-            )
-            itens.append(item)
-
-            # Atualizar totalizadores
-            totalizador.total_parcelas += 1
-            totalizador.valor_total += valor_total
-            totalizador.valor_principal += parcela.valor_atual
-            totalizador.valor_juros += juros
-            totalizador.valor_multa += multa
-            totalizador.valor_desconto += parcela.valor_desconto
-
-            if dias_atraso > 0:
-                totalizador.parcelas_vencidas += 1
-                totalizador.valor_vencido += valor_total
-            else:
-                totalizador.parcelas_a_vencer += 1
-                totalizador.valor_a_vencer += valor_total
+        itens = list(self.iterar_prestacoes(filtro, pago=False, totalizador=totalizador))
 
         logger.info(f"Relatório gerado com {len(itens)} itens")
 
@@ -205,56 +238,10 @@ class RelatorioService:
         Returns:
             dict: Relatório com itens e totalizadores
         """
-        from financeiro.models import Parcela
-
         logger.info(f"Gerando relatório de prestações pagas com filtros: {filtro}")
 
-        # Query base: parcelas pagas
-        queryset = Parcela.objects.filter(pago=True).select_related(
-            'contrato',
-            'contrato__comprador',
-            'contrato__imobiliaria'
-        )
-
-        # Aplicar filtros
-        queryset = self._aplicar_filtros_parcela(queryset, filtro, pago=True)
-
-        # Ordenar por data de pagamento (mais recente primeiro)
-        queryset = queryset.order_by('-data_pagamento', 'contrato__numero_contrato')
-
-        # Construir itens do relatório
-        itens = []
         totalizador = TotalizadorPrestacoes()
-
-        for parcela in queryset:
-            item = ItemRelatorioPrestacao(
-                contrato_numero=parcela.contrato.numero_contrato,
-                comprador_nome=parcela.contrato.comprador.nome,
-                comprador_documento=parcela.contrato.comprador.documento,
-                numero_parcela=parcela.numero_parcela,
-                tipo_parcela=parcela.tipo_parcela,
-                data_vencimento=parcela.data_vencimento,
-                valor_original=parcela.valor_original,
-                valor_atual=parcela.valor_atual,
-                valor_juros=parcela.valor_juros,
-                valor_multa=parcela.valor_multa,
-                valor_desconto=parcela.valor_desconto,
-                valor_total=parcela.valor_pago or Decimal('0.00'),
-                dias_atraso=0,
-                status_boleto=parcela.status_boleto,
-                data_pagamento=parcela.data_pagamento,
-                valor_pago=parcela.valor_pago,
-                ciclo_reajuste=parcela.ciclo_reajuste,
-            )
-            itens.append(item)
-
-            # Atualizar totalizadores
-            totalizador.total_parcelas += 1
-            totalizador.valor_total += parcela.valor_pago or Decimal('0.00')
-            totalizador.valor_principal += parcela.valor_atual
-            totalizador.valor_juros += parcela.valor_juros
-            totalizador.valor_multa += parcela.valor_multa
-            totalizador.valor_desconto += parcela.valor_desconto
+        itens = list(self.iterar_prestacoes(filtro, pago=True, totalizador=totalizador))
 
         logger.info(f"Relatório gerado com {len(itens)} itens")
 
@@ -267,6 +254,199 @@ class RelatorioService:
             'quantidade_itens': len(itens),
         }
 
+    def gerar_relatorio_prestacoes_streaming(
+        self,
+        filtro: FiltroRelatorio,
+        pago: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Relatório de prestações (a pagar ou pagas) para exportação em streaming.
+
+        Mesmo formato de gerar_relatorio_prestacoes_a_pagar/pagas, mas `itens` é
+        um gerador de uma passada sobre o banco e o `totalizador` só fica completo
+        depois que os itens forem consumidos — os exportadores escrevem os totais
+        no fim. Não há `quantidade_itens` (o total não é conhecido antes).
+        """
+        tipo = TipoRelatorio.PRESTACOES_PAGAS if pago else TipoRelatorio.PRESTACOES_A_PAGAR
+        totalizador = TotalizadorPrestacoes()
+        return {
+            'tipo': tipo.value,
+            'data_geracao': timezone.now(),
+            'filtros_aplicados': self._filtros_para_dict(filtro),
+            'itens': self.iterar_prestacoes(filtro, pago=pago, totalizador=totalizador),
+            'totalizador': totalizador,
+        }
+
+    def iterar_prestacoes(
+        self,
+        filtro: FiltroRelatorio,
+        pago: bool = False,
+        totalizador: Optional[TotalizadorPrestacoes] = None,
+        chunk_size: Optional[int] = None,
+    ) -> Iterator[ItemRelatorioPrestacao]:
+        """
+        Gera os itens do relatório de prestações lendo o banco em lotes.
+
+        Memória constante: nenhuma lista de parcelas é montada. Se `totalizador`
+        for informado, os totais são acumulados à medida que os itens saem.
+        """
+        queryset = self._queryset_prestacoes(filtro, pago)
+        for parcela in _iterar_em_lotes(queryset, chunk_size or _chunk_size_exportacao()):
+            item = self._item_prestacao(parcela, pago)
+            if totalizador is not None:
+                totalizador.acumular(item, por_vencimento=not pago)
+            yield item
+
+    def totalizar_prestacoes(
+        self,
+        filtro: FiltroRelatorio,
+        pago: bool = False,
+        usar_cache: bool = False,
+    ) -> TotalizadorPrestacoes:
+        """
+        Só os totalizadores do relatório de prestações, num único aggregate().
+
+        Mesmos filtros (_aplicar_filtros_parcela) e mesmas regras de
+        gerar_relatorio_prestacoes_a_pagar/pagas — juros e multa do dia via
+        com_valores_hoje, vencida = dias de atraso > 0 — sem carregar parcelas.
+
+        Args:
+            filtro: Filtros para o relatório
+            pago: True para prestações pagas, False para a pagar
+            usar_cache: Reaproveita o resultado por filtro e data durante
+                RELATORIO_TOTAIS_CACHE_TIMEOUT segundos (dashboards)
+
+        Returns:
+            TotalizadorPrestacoes
+        """
+        from django.core.cache import cache
+
+        hoje = date.today()
+        chave = self._chave_cache_totais(filtro, pago, hoje)
+        if usar_cache:
+            totalizador = cache.get(chave)
+            if totalizador is not None:
+                return totalizador
+
+        totalizador = self._agregar_totais(filtro, pago, hoje)
+
+        if usar_cache:
+            cache.set(chave, totalizador, timeout=_timeout_cache_totais())
+        return totalizador
+
+    def _agregar_totais(self, filtro: FiltroRelatorio, pago: bool, hoje: date) -> TotalizadorPrestacoes:
+        """Totalizadores em SQL: Sum/Count condicionais sobre as parcelas filtradas."""
+        from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value
+        from django.db.models.functions import Coalesce
+        from financeiro.models import Parcela
+
+        dinheiro = DecimalField(max_digits=16, decimal_places=2)
+        zero = Value(Decimal('0.00'), output_field=dinheiro)
+
+        def soma(expressao, condicao=None):
+            return Coalesce(Sum(expressao, filter=condicao, output_field=dinheiro), zero)
+
+        queryset = self._aplicar_filtros_parcela(
+            Parcela.objects.filter(pago=pago), filtro, pago=pago
+        )
+
+        if pago:
+            totais = queryset.aggregate(
+                total_parcelas=Count('pk'),
+                valor_total=soma(Coalesce('valor_pago', zero)),
+                valor_principal=soma('valor_atual'),
+                valor_juros=soma('valor_juros'),
+                valor_multa=soma('valor_multa'),
+                valor_desconto=soma('valor_desconto'),
+            )
+        else:
+            # Mesmo valor_total por item de gerar_relatorio_prestacoes_a_pagar
+            queryset = queryset.com_valores_hoje(hoje).annotate(
+                valor_total_relatorio=ExpressionWrapper(
+                    F('valor_atual') + F('juros_hoje') + F('multa_hoje') - F('valor_desconto'),
+                    output_field=dinheiro,
+                ),
+            )
+            vencida = Q(data_vencimento__lt=hoje)
+            totais = queryset.aggregate(
+                total_parcelas=Count('pk'),
+                valor_total=soma('valor_total_relatorio'),
+                valor_principal=soma('valor_atual'),
+                valor_juros=soma('juros_hoje'),
+                valor_multa=soma('multa_hoje'),
+                valor_desconto=soma('valor_desconto'),
+                parcelas_vencidas=Count('pk', filter=vencida),
+                parcelas_a_vencer=Count('pk', filter=~vencida),
+                valor_vencido=soma('valor_total_relatorio', vencida),
+                valor_a_vencer=soma('valor_total_relatorio', ~vencida),
+            )
+
+        return TotalizadorPrestacoes(**{
+            campo: valor.quantize(Decimal('0.01')) if isinstance(valor, Decimal) else valor
+            for campo, valor in totais.items()
+        })
+
+    def _chave_cache_totais(self, filtro: FiltroRelatorio, pago: bool, hoje: date) -> str:
+        """Chave de cache dos totalizadores: tipo, data e hash dos filtros."""
+        import hashlib
+        import json
+
+        filtros = json.dumps(self._filtros_para_dict(filtro), sort_keys=True)
+        resumo = hashlib.md5(filtros.encode(), usedforsecurity=False).hexdigest()
+        tipo = TipoRelatorio.PRESTACOES_PAGAS if pago else TipoRelatorio.PRESTACOES_A_PAGAR
+        return f'relatorio:totais:{tipo.value}:{hoje.isoformat()}:{resumo}'
+
+    def _queryset_prestacoes(self, filtro: FiltroRelatorio, pago: bool):
+        """Parcelas do relatório já filtradas e ordenadas."""
+        from financeiro.models import Parcela
+
+        queryset = Parcela.objects.filter(pago=pago).select_related(
+            'contrato',
+            'contrato__comprador',
+            'contrato__imobiliaria'
+        )
+        queryset = self._aplicar_filtros_parcela(queryset, filtro, pago=pago)
+
+        if pago:
+            # Data de pagamento, mais recente primeiro
+            return queryset.order_by('-data_pagamento', 'contrato__numero_contrato', 'pk')
+
+        # Juros e multa do dia, calculados no SELECT (com_valores_hoje)
+        return queryset.com_valores_hoje(date.today()).order_by(
+            'data_vencimento', 'contrato__numero_contrato', 'pk'
+        )
+
+    def _item_prestacao(self, parcela, pago: bool) -> ItemRelatorioPrestacao:
+        """Converte uma parcela de _queryset_prestacoes em item do relatório."""
+        if pago:
+            juros, multa = parcela.valor_juros, parcela.valor_multa
+            dias_atraso = 0
+            valor_total = parcela.valor_pago or Decimal('0.00')
+        else:
+            juros, multa = parcela.juros_hoje, parcela.multa_hoje
+            dias_atraso = parcela.dias_atraso_hoje
+            valor_total = parcela.valor_atual + juros + multa - parcela.valor_desconto
+
+        return ItemRelatorioPrestacao(
+            contrato_numero=parcela.contrato.numero_contrato,
+            comprador_nome=parcela.contrato.comprador.nome,
+            comprador_documento=parcela.contrato.comprador.documento,
+            numero_parcela=parcela.numero_parcela,
+            tipo_parcela=parcela.tipo_parcela,
+            data_vencimento=parcela.data_vencimento,
+            valor_original=parcela.valor_original,
+            valor_atual=parcela.valor_atual,
+            valor_juros=juros,
+            valor_multa=multa,
+            valor_desconto=parcela.valor_desconto,
+            valor_total=valor_total,
+            dias_atraso=dias_atraso,
+            status_boleto=parcela.status_boleto,
+            data_pagamento=parcela.data_pagamento if pago else None,
+            valor_pago=parcela.valor_pago if pago else None,
+            ciclo_reajuste=parcela.ciclo_reajuste,
+        )
+
     def gerar_relatorio_posicao_contratos(
         self,
         filtro: FiltroRelatorio
@@ -567,21 +747,19 @@ class RelatorioService:
             'ciclo_reajuste': filtro.ciclo_reajuste,
         }
 
-    def exportar_para_csv(self, relatorio: Dict[str, Any]) -> str:
+    def iterar_csv(self, relatorio: Dict[str, Any]) -> Iterator[str]:
         """
-        Exporta relatório para formato CSV.
+        Gera o CSV do relatório linha a linha (para StreamingHttpResponse).
 
         Args:
-            relatorio: Relatório gerado
+            relatorio: Relatório gerado (itens em lista ou gerador)
 
-        Returns:
-            str: Conteúdo CSV
+        Yields:
+            str: Uma linha CSV, com terminador
         """
         import csv
-        from io import StringIO
 
-        output = StringIO()
-        writer = csv.writer(output)
+        writer = csv.writer(_Eco())
 
         tipo = relatorio.get('tipo')
 
@@ -595,7 +773,7 @@ class RelatorioService:
             if tipo == TipoRelatorio.PRESTACOES_PAGAS.value:
                 cabecalho.extend(['Data Pagamento', 'Valor Pago'])
 
-            writer.writerow(cabecalho)
+            yield writer.writerow(cabecalho)
 
             # Itens
             for item in relatorio.get('itens', []):
@@ -620,9 +798,19 @@ class RelatorioService:
                         item.data_pagamento.strftime('%d/%m/%Y') if item.data_pagamento else '',
                         f'{item.valor_pago:.2f}' if item.valor_pago else '',
                     ])
-                writer.writerow(linha)
+                yield writer.writerow(linha)
 
-        return output.getvalue()
+    def exportar_para_csv(self, relatorio: Dict[str, Any]) -> str:
+        """
+        Exporta relatório para formato CSV.
+
+        Args:
+            relatorio: Relatório gerado
+
+        Returns:
+            str: Conteúdo CSV
+        """
+        return ''.join(self.iterar_csv(relatorio))
 
     def exportar_para_json(self, relatorio: Dict[str, Any]) -> str:
         """
@@ -648,18 +836,26 @@ class RelatorioService:
 
         return json.dumps(relatorio, default=converter, indent=2, ensure_ascii=False)
 
-    def exportar_para_excel(self, relatorio: Dict[str, Any]) -> bytes:
+    def exportar_para_excel(self, relatorio: Dict[str, Any], destino=None) -> Optional[bytes]:
         """
         Exporta relatório para formato Excel (XLSX).
 
+        Usa o modo write-only do openpyxl: as linhas vão direto para o arquivo
+        à medida que os itens são lidos, então `itens` pode ser um gerador
+        (gerar_relatorio_prestacoes_streaming). As larguras de coluna são fixas
+        por tipo de relatório — não há como medir as células depois de escritas.
+
         Args:
             relatorio: Relatório gerado
+            destino: Arquivo (file-like binário) onde gravar; se omitido, o
+                conteúdo é devolvido em bytes
 
         Returns:
-            bytes: Conteúdo do arquivo Excel
+            bytes: Conteúdo do arquivo Excel (None quando `destino` é informado)
         """
         try:
             from openpyxl import Workbook
+            from openpyxl.cell import WriteOnlyCell
             from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
             from openpyxl.utils import get_column_letter
             from io import BytesIO
@@ -667,11 +863,10 @@ class RelatorioService:
             logger.error("openpyxl não instalado. Execute: pip install openpyxl")
             raise ImportError("Biblioteca openpyxl é necessária para exportar Excel")
 
-        wb = Workbook()
-        ws = wb.active
+        wb = Workbook(write_only=True)
 
         tipo = relatorio.get('tipo')
-        ws.title = tipo.replace('_', ' ').title()[:31]
+        ws = wb.create_sheet(title=tipo.replace('_', ' ').title()[:31])
 
         # Estilos
         header_font = Font(bold=True, color='FFFFFF')
@@ -686,102 +881,54 @@ class RelatorioService:
         currency_format = '#,##0.00'
         date_format = 'DD/MM/YYYY'
 
-        row_num = 1
+        def celula(valor, **estilo):
+            cell = WriteOnlyCell(ws, value=valor)
+            for atributo, valor_estilo in estilo.items():
+                setattr(cell, atributo, valor_estilo)
+            return cell
 
-        # Título
-        ws.merge_cells(f'A{row_num}:N{row_num}')
-        ws[f'A{row_num}'] = f"Relatório: {tipo.replace('_', ' ').title()}"
-        ws[f'A{row_num}'].font = Font(bold=True, size=14)
-        row_num += 1
+        headers, larguras, formatos, linhas = [], [], {}, ()
 
-        # Data de geração
-        data_geracao = relatorio.get('data_geracao')
-        if data_geracao:
-            ws[f'A{row_num}'] = f"Gerado em: {data_geracao.strftime('%d/%m/%Y %H:%M')}"
-            row_num += 2
-
-        # Cabeçalhos e dados conforme tipo
         if tipo in [TipoRelatorio.PRESTACOES_A_PAGAR.value, TipoRelatorio.PRESTACOES_PAGAS.value]:
+            pagas = tipo == TipoRelatorio.PRESTACOES_PAGAS.value
             headers = [
                 'Contrato', 'Comprador', 'Documento', 'Parcela', 'Tipo',
                 'Vencimento', 'Valor Original', 'Valor Atual', 'Juros',
                 'Multa', 'Desconto', 'Valor Total', 'Dias Atraso', 'Status Boleto'
             ]
-            if tipo == TipoRelatorio.PRESTACOES_PAGAS.value:
+            larguras = [15, 35, 18, 9, 14, 12, 15, 15, 12, 12, 12, 15, 12, 16]
+            if pagas:
                 headers.extend(['Data Pagamento', 'Valor Pago'])
-
-            # Escrever cabeçalho
-            for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=row_num, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = header_alignment
-                cell.border = border
-
-            row_num += 1
-
-            # Escrever dados
-            for item in relatorio.get('itens', []):
-                data_row = [
-                    item.contrato_numero,
-                    item.comprador_nome,
-                    item.comprador_documento,
-                    item.numero_parcela,
-                    item.tipo_parcela,
-                    item.data_vencimento,
-                    float(item.valor_original),
-                    float(item.valor_atual),
-                    float(item.valor_juros),
-                    float(item.valor_multa),
-                    float(item.valor_desconto),
-                    float(item.valor_total),
-                    item.dias_atraso,
-                    item.status_boleto,
-                ]
-                if tipo == TipoRelatorio.PRESTACOES_PAGAS.value:
-                    data_row.extend([
-                        item.data_pagamento,
-                        float(item.valor_pago) if item.valor_pago else 0,
-                    ])
-
-                for col, value in enumerate(data_row, 1):
-                    cell = ws.cell(row=row_num, column=col, value=value)
-                    cell.border = border
-
-                    # Formato de moeda para colunas de valor
-                    if col in [7, 8, 9, 10, 11, 12, 16]:
-                        cell.number_format = currency_format
-                    # Formato de data
-                    if col in [6, 15]:
-                        cell.number_format = date_format
-
-                row_num += 1
-
-            # Totalizadores
-            row_num += 1
-            totalizador = relatorio.get('totalizador')
-            if totalizador:
-                ws[f'A{row_num}'] = 'TOTALIZADORES'
-                ws[f'A{row_num}'].font = Font(bold=True)
-                row_num += 1
-
-                ws[f'A{row_num}'] = 'Total de Parcelas:'
-                ws[f'B{row_num}'] = totalizador.total_parcelas
-                row_num += 1
-
-                ws[f'A{row_num}'] = 'Valor Total:'
-                ws[f'B{row_num}'] = float(totalizador.valor_total)
-                ws[f'B{row_num}'].number_format = currency_format
-                row_num += 1
-
-                if tipo == TipoRelatorio.PRESTACOES_A_PAGAR.value:
-                    ws[f'A{row_num}'] = 'Parcelas Vencidas:'
-                    ws[f'B{row_num}'] = totalizador.parcelas_vencidas
-                    row_num += 1
-
-                    ws[f'A{row_num}'] = 'Valor Vencido:'
-                    ws[f'B{row_num}'] = float(totalizador.valor_vencido)
-                    ws[f'B{row_num}'].number_format = currency_format
+                larguras.extend([16, 15])
+            formatos = {col: currency_format for col in [7, 8, 9, 10, 11, 12, 16]}
+            formatos.update({6: date_format, 15: date_format})
+
+            def linhas_prestacoes():
+                for item in relatorio.get('itens', []):
+                    data_row = [
+                        item.contrato_numero,
+                        item.comprador_nome,
+                        item.comprador_documento,
+                        item.numero_parcela,
+                        item.tipo_parcela,
+                        item.data_vencimento,
+                        float(item.valor_original),
+                        float(item.valor_atual),
+                        float(item.valor_juros),
+                        float(item.valor_multa),
+                        float(item.valor_desconto),
+                        float(item.valor_total),
+                        item.dias_atraso,
+                        item.status_boleto,
+                    ]
+                    if pagas:
+                        data_row.extend([
+                            item.data_pagamento,
+                            float(item.valor_pago) if item.valor_pago else 0,
+                        ])
+                    yield data_row
+
+            linhas = linhas_prestacoes()
 
         elif tipo == TipoRelatorio.POSICAO_CONTRATOS.value:
             headers = [
@@ -790,20 +937,11 @@ class RelatorioService:
                 'Pagas', 'A Pagar', 'Vencidas', 'Total Pago',
                 'Saldo Devedor', 'Progresso %', 'Próximo Vencimento'
             ]
-
-            # Escrever cabeçalho
-            for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=row_num, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = header_alignment
-                cell.border = border
-
-            row_num += 1
-
-            # Escrever dados
-            for item in relatorio.get('itens', []):
-                data_row = [
+            larguras = [15, 35, 35, 14, 15, 15, 15, 15, 8, 9, 10, 15, 15, 13, 20]
+            formatos = {col: currency_format for col in [5, 6, 7, 12, 13]}
+            formatos.update({4: date_format, 15: date_format, 14: '0.00%'})
+            linhas = (
+                [
                     item['contrato_numero'],
                     item['comprador_nome'],
                     item['imovel'],
@@ -820,22 +958,8 @@ class RelatorioService:
                     round(item['progresso_percentual'], 2),
                     item['proxima_parcela_vencimento'],
                 ]
-
-                for col, value in enumerate(data_row, 1):
-                    cell = ws.cell(row=row_num, column=col, value=value)
-                    cell.border = border
-
-                    # Formato de moeda
-                    if col in [5, 6, 7, 12, 13]:
-                        cell.number_format = currency_format
-                    # Formato de data
-                    if col in [4, 15]:
-                        cell.number_format = date_format
-                    # Formato de percentual
-                    if col == 14:
-                        cell.number_format = '0.00%'
-
-                row_num += 1
+                for item in relatorio.get('itens', [])
+            )
 
         elif tipo == TipoRelatorio.PREVISAO_REAJUSTES.value:
             headers = [
@@ -843,20 +967,10 @@ class RelatorioService:
                 'Dias Restantes', 'Ciclo', 'Status', 'Parcelas Afetadas',
                 'Bloqueado', 'Último Reajuste'
             ]
-
-            # Escrever cabeçalho
-            for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=row_num, column=col, value=header)
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = header_alignment
-                cell.border = border
-
-            row_num += 1
-
-            # Escrever dados
-            for item in relatorio.get('itens', []):
-                data_row = [
+            larguras = [15, 35, 10, 18, 16, 7, 16, 19, 11, 17]
+            formatos = {4: date_format, 10: date_format}
+            linhas = (
+                [
                     item['contrato_numero'],
                     item['comprador_nome'],
                     item['tipo_correcao'],
@@ -868,129 +982,133 @@ class RelatorioService:
                     'Sim' if item['bloqueio_ativo'] else 'Não',
                     item['ultimo_reajuste'],
                 ]
+                for item in relatorio.get('itens', [])
+            )
+
+        # Larguras antes da primeira linha (exigência do modo write-only)
+        for col, largura in enumerate(larguras, 1):
+            ws.column_dimensions[get_column_letter(col)].width = largura
 
-                for col, value in enumerate(data_row, 1):
-                    cell = ws.cell(row=row_num, column=col, value=value)
-                    cell.border = border
-
-                    if col in [4, 10]:
-                        cell.number_format = date_format
-
-                row_num += 1
-
-        # Ajustar largura das colunas
-        for col in range(1, ws.max_column + 1):
-            column_letter = get_column_letter(col)
-            max_length = 0
-            for row in range(1, ws.max_row + 1):
-                cell = ws.cell(row=row, column=col)
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except Exception:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
+        # Título
+        ws.append([celula(f"Relatório: {tipo.replace('_', ' ').title()}", font=Font(bold=True, size=14))])
+
+        # Data de geração
+        data_geracao = relatorio.get('data_geracao')
+        if data_geracao:
+            ws.append([f"Gerado em: {data_geracao.strftime('%d/%m/%Y %H:%M')}"])
+            ws.append([])
+
+        if headers:
+            ws.append([
+                celula(header, font=header_font, fill=header_fill,
+                       alignment=header_alignment, border=border)
+                for header in headers
+            ])
+
+        for data_row in linhas:
+            ws.append([
+                celula(value, border=border, number_format=formatos.get(col, 'General'))
+                for col, value in enumerate(data_row, 1)
+            ])
+
+        # Totalizadores (completos só agora, se os itens vieram de um gerador)
+        totalizador = relatorio.get('totalizador')
+        if totalizador and tipo in [TipoRelatorio.PRESTACOES_A_PAGAR.value,
+                                    TipoRelatorio.PRESTACOES_PAGAS.value]:
+            ws.append([])
+            ws.append([celula('TOTALIZADORES', font=Font(bold=True))])
+            ws.append(['Total de Parcelas:', totalizador.total_parcelas])
+            ws.append([
+                'Valor Total:',
+                celula(float(totalizador.valor_total), number_format=currency_format),
+            ])
+            if tipo == TipoRelatorio.PRESTACOES_A_PAGAR.value:
+                ws.append(['Parcelas Vencidas:', totalizador.parcelas_vencidas])
+                ws.append([
+                    'Valor Vencido:',
+                    celula(float(totalizador.valor_vencido), number_format=currency_format),
+                ])
+
+        if destino is not None:
+            wb.save(destino)
+            return None
 
         # Salvar em BytesIO
         output = BytesIO()
         wb.save(output)
-        output.seek(0)
-
         return output.getvalue()
 
-    def exportar_para_pdf(self, relatorio: Dict[str, Any]) -> bytes:
+    def exportar_para_pdf(self, relatorio: Dict[str, Any], destino=None) -> Optional[bytes]:
         """
         Exporta relatório para formato PDF.
 
+        Desenha página a página no canvas (uma tabela por página, com o
+        cabeçalho repetido), consumindo `itens` aos poucos — pode ser um
+        gerador (gerar_relatorio_prestacoes_streaming). A linha de totais vai
+        na última página.
+
         Args:
             relatorio: Relatório gerado
+            destino: Arquivo (file-like binário) onde gravar; se omitido, o
+                conteúdo é devolvido em bytes
 
         Returns:
-            bytes: Conteúdo do arquivo PDF
+            bytes: Conteúdo do arquivo PDF (None quando `destino` é informado)
         """
         try:
             from reportlab.lib import colors
             from reportlab.lib.pagesizes import A4, landscape
             from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
             from reportlab.lib.units import mm
-            from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+            from reportlab.pdfgen import canvas
+            from reportlab.platypus import Table, TableStyle, Paragraph
             from io import BytesIO
         except ImportError:
             logger.error("reportlab não instalado. Execute: pip install reportlab")
             raise ImportError("Biblioteca reportlab é necessária para exportar PDF")
 
-        output = BytesIO()
         tipo = relatorio.get('tipo')
+        linha_total = None
 
-        # Usar paisagem para tabelas largas
-        doc = SimpleDocTemplate(
-            output,
-            pagesize=landscape(A4),
-            rightMargin=10*mm,
-            leftMargin=10*mm,
-            topMargin=15*mm,
-            bottomMargin=15*mm
-        )
-
-        elements = []
-        styles = getSampleStyleSheet()
-
-        # Título
-        title_style = ParagraphStyle(
-            'Title',
-            parent=styles['Heading1'],
-            fontSize=16,
-            spaceAfter=12
-        )
-        title = Paragraph(f"Relatório: {tipo.replace('_', ' ').title()}", title_style)
-        elements.append(title)
-
-        # Data de geração
-        data_geracao = relatorio.get('data_geracao')
-        if data_geracao:
-            date_text = Paragraph(
-                f"Gerado em: {data_geracao.strftime('%d/%m/%Y %H:%M')}",
-                styles['Normal']
-            )
-            elements.append(date_text)
-            elements.append(Spacer(1, 10*mm))
-
-        # Construir tabela conforme tipo
+        # Colunas e linhas conforme tipo
         if tipo in [TipoRelatorio.PRESTACOES_A_PAGAR.value, TipoRelatorio.PRESTACOES_PAGAS.value]:
+            pagas = tipo == TipoRelatorio.PRESTACOES_PAGAS.value
             headers = [
                 'Contrato', 'Comprador', 'Parcela', 'Tipo',
                 'Vencimento', 'Valor Atual', 'Juros', 'Multa',
                 'Valor Total', 'Status'
             ]
-            if tipo == TipoRelatorio.PRESTACOES_PAGAS.value:
+            if pagas:
                 headers.extend(['Dt Pgto', 'Valor Pago'])
 
-            data = [headers]
-
-            for item in relatorio.get('itens', []):
-                row = [
-                    item.contrato_numero[:15],
-                    item.comprador_nome[:20],
-                    str(item.numero_parcela),
-                    item.tipo_parcela[:10],
-                    item.data_vencimento.strftime('%d/%m/%Y'),
-                    f'R$ {item.valor_atual:,.2f}',
-                    f'R$ {item.valor_juros:,.2f}',
-                    f'R$ {item.valor_multa:,.2f}',
-                    f'R$ {item.valor_total:,.2f}',
-                    item.status_boleto[:10],
-                ]
-                if tipo == TipoRelatorio.PRESTACOES_PAGAS.value:
-                    row.extend([
-                        item.data_pagamento.strftime('%d/%m/%Y') if item.data_pagamento else '-',
-                        f'R$ {item.valor_pago:,.2f}' if item.valor_pago else '-',
-                    ])
-                data.append(row)
-
-            # Linha de totais
-            totalizador = relatorio.get('totalizador')
-            if totalizador:
+            def linhas_prestacoes():
+                for item in relatorio.get('itens', []):
+                    row = [
+                        item.contrato_numero[:15],
+                        item.comprador_nome[:20],
+                        str(item.numero_parcela),
+                        item.tipo_parcela[:10],
+                        item.data_vencimento.strftime('%d/%m/%Y'),
+                        f'R$ {item.valor_atual:,.2f}',
+                        f'R$ {item.valor_juros:,.2f}',
+                        f'R$ {item.valor_multa:,.2f}',
+                        f'R$ {item.valor_total:,.2f}',
+                        item.status_boleto[:10],
+                    ]
+                    if pagas:
+                        row.extend([
+                            item.data_pagamento.strftime('%d/%m/%Y') if item.data_pagamento else '-',
+                            f'R$ {item.valor_pago:,.2f}' if item.valor_pago else '-',
+                        ])
+                    yield row
+
+            linhas = linhas_prestacoes()
+
+            # Avaliada depois das linhas: o totalizador pode estar sendo acumulado
+            def linha_total():
+                totalizador = relatorio.get('totalizador')
+                if not totalizador:
+                    return None
                 total_row = [
                     'TOTAL', '', str(totalizador.total_parcelas), '',
                     '', f'R$ {totalizador.valor_principal:,.2f}',
@@ -998,19 +1116,17 @@ class RelatorioService:
                     f'R$ {totalizador.valor_multa:,.2f}',
                     f'R$ {totalizador.valor_total:,.2f}', ''
                 ]
-                if tipo == TipoRelatorio.PRESTACOES_PAGAS.value:
+                if pagas:
                     total_row.extend(['', ''])
-                data.append(total_row)
+                return total_row
 
         elif tipo == TipoRelatorio.POSICAO_CONTRATOS.value:
             headers = [
                 'Contrato', 'Comprador', 'Valor Total', 'Pago',
                 'Saldo', 'Parcelas', 'Pagas', 'Progresso'
             ]
-            data = [headers]
-
-            for item in relatorio.get('itens', []):
-                row = [
+            linhas = (
+                [
                     item['contrato_numero'][:15],
                     item['comprador_nome'][:25],
                     f"R$ {float(item['valor_total']):,.2f}",
@@ -1020,17 +1136,16 @@ class RelatorioService:
                     str(item['parcelas_pagas']),
                     f"{item['progresso_percentual']:.1f}%",
                 ]
-                data.append(row)
+                for item in relatorio.get('itens', [])
+            )
 
         elif tipo == TipoRelatorio.PREVISAO_REAJUSTES.value:
             headers = [
                 'Contrato', 'Comprador', 'Índice', 'Próx. Reajuste',
                 'Dias', 'Ciclo', 'Status', 'Bloqueado'
             ]
-            data = [headers]
-
-            for item in relatorio.get('itens', []):
-                row = [
+            linhas = (
+                [
                     item['contrato_numero'][:15],
                     item['comprador_nome'][:25],
                     item['tipo_correcao'],
@@ -1040,21 +1155,44 @@ class RelatorioService:
                     item['status_reajuste'],
                     'Sim' if item['bloqueio_ativo'] else 'Não',
                 ]
-                data.append(row)
+                for item in relatorio.get('itens', [])
+            )
 
         else:
-            data = [['Relatório não suportado para exportação PDF']]
+            headers = ['Relatório não suportado para exportação PDF']
+            linhas = ()
 
-        # Criar tabela
-        col_widths = None
-        if len(data) > 0 and len(data[0]) > 0:
-            available_width = landscape(A4)[0] - 20*mm
-            col_widths = [available_width / len(data[0])] * len(data[0])
+        output = destino if destino is not None else BytesIO()
+
+        # Usar paisagem para tabelas largas
+        pagesize = landscape(A4)
+        largura_pagina, altura_pagina = pagesize
+        margem_x, margem_y = 10*mm, 15*mm
+        largura_util = largura_pagina - 2 * margem_x
+        col_widths = [largura_util / len(headers)] * len(headers)
+
+        pdf = canvas.Canvas(output, pagesize=pagesize)
+        styles = getSampleStyleSheet()
+
+        # Título
+        title_style = ParagraphStyle(
+            'Title',
+            parent=styles['Heading1'],
+            fontSize=16,
+            spaceAfter=12
+        )
+        cabecalho = [Paragraph(f"Relatório: {tipo.replace('_', ' ').title()}", title_style)]
 
-        table = Table(data, colWidths=col_widths)
+        # Data de geração
+        data_geracao = relatorio.get('data_geracao')
+        if data_geracao:
+            cabecalho.append(Paragraph(
+                f"Gerado em: {data_geracao.strftime('%d/%m/%Y %H:%M')}",
+                styles['Normal']
+            ))
 
         # Estilo da tabela
-        style = TableStyle([
+        estilo_base = [
             ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4472C4')),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
             ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
@@ -1066,18 +1204,35 @@ class RelatorioService:
             ('BACKGROUND', (0, 1), (-1, -1), colors.white),
             ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
             ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#E8F0FE')]),
-        ])
-
-        # Destacar última linha (totais) se houver
-        if len(data) > 1:
-            style.add('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#D6DCE4'))
-            style.add('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold')
+        ]
+        # Destaque da linha de totais
+        estilo_totais = estilo_base + [
+            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#D6DCE4')),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ]
 
-        table.setStyle(style)
-        elements.append(table)
+        for numero, (lote, ultima) in enumerate(_lotes(linhas, _LINHAS_POR_PAGINA_PDF), 1):
+            topo = altura_pagina - margem_y
+            if numero == 1:
+                for paragrafo in cabecalho:
+                    _, altura = paragrafo.wrapOn(pdf, largura_util, topo)
+                    paragrafo.drawOn(pdf, margem_x, topo - altura)
+                    topo -= altura + paragrafo.getSpaceAfter()
+                topo -= 10*mm
+
+            data = [headers] + lote
+            total = linha_total() if ultima and linha_total else None
+            if total:
+                data.append(total)
+
+            table = Table(data, colWidths=col_widths)
+            table.setStyle(TableStyle(estilo_totais if total else estilo_base))
+            _, altura = table.wrapOn(pdf, largura_util, topo - margem_y)
+            table.drawOn(pdf, margem_x, topo - altura)
+            pdf.showPage()
 
         # Construir PDF
-        doc.build(elements)
-        output.seek(0)
-
+        pdf.save()
+        if destino is not None:
+            return None
         return output.getvalue()
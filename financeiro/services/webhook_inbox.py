@@ -0,0 +1,290 @@
+"""
+Caixa de entrada dos webhooks Boleto-API e PIX (WebhookInbox).
+
+No modo fast-ack (WEBHOOK_INBOX) os endpoints só validam a assinatura, gravam
+o evento bruto e respondem 202 — a baixa não roda mais dentro do callback do
+banco, que sob rajada de liquidações estourava o timeout e reentregava.
+
+O consumo segue o da fila de notificações (notificacoes.fila): cada worker
+reserva um lote (SELECT ... FOR UPDATE SKIP LOCKED quando há, mais reserva
+gravada por UPDATE condicional). Só entra no lote o evento mais antigo
+pendente de cada cobrança (`chave`), então os eventos de uma mesma cobrança
+são aplicados na ordem de chegada; os de cobranças diferentes podem rodar em
+paralelo (WEBHOOK_INBOX_WORKERS threads). A reserva é renovada antes de
+cada evento e o desfecho só é gravado se o evento ainda for do worker, então
+um lote mais lento que o lease não é processado duas vezes. Cada evento é
+processado numa transação; exceção — ou baixa que devolve status 'erro' —
+reagenda com backoff exponencial até WEBHOOK_INBOX_MAX_TENTATIVAS, depois
+fica com status ERRO (e libera a fila da cobrança).
+
+Desenvolvedor: Maxwell da Silva Oliveira
+"""
+import hashlib
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import Exists, Min, OuterRef, Q
+from django.utils import timezone
+
+from financeiro.models import WebhookInbox
+from notificacoes.fila import identificar_worker
+
+logger = logging.getLogger(__name__)
+
+
+def _param(nome, padrao):
+    try:
+        return max(int(getattr(settings, nome, padrao)), 0)
+    except (TypeError, ValueError):
+        return padrao
+
+
+def ativa():
+    """True quando os webhooks respondem 202 e deixam o processamento para o worker."""
+    return bool(getattr(settings, 'WEBHOOK_INBOX', False))
+
+
+def id_do_corpo(raw_body):
+    """event_id de reserva para evento sem identificador: hash do corpo (reentrega idêntica)."""
+    return 'sha256:' + hashlib.sha256(raw_body).hexdigest()
+
+
+def registrar(origem, event_id, chave, payload):
+    """
+    Grava o evento na caixa de entrada.
+
+    Returns:
+        tuple: (WebhookInbox, criado) — criado=False para reentrega do mesmo event_id.
+    """
+    try:
+        with transaction.atomic():
+            return WebhookInbox.objects.create(
+                origem=origem, event_id=event_id[:150],
+                chave=(chave or f'{origem}:{event_id}')[:150], payload=payload,
+            ), True
+    except IntegrityError:
+        return WebhookInbox.objects.get(origem=origem, event_id=event_id[:150]), False
+
+
+def atraso_retentativa(tentativas):
+    """base × 2^(tentativas−1) segundos, limitado a WEBHOOK_INBOX_RETRY_MAX_SEGUNDOS."""
+    base = _param('WEBHOOK_INBOX_RETRY_BASE_SEGUNDOS', 30)
+    teto = _param('WEBHOOK_INBOX_RETRY_MAX_SEGUNDOS', 1800)
+    return timedelta(seconds=min(base * 2 ** max(tentativas - 1, 0), teto))
+
+
+def _disponiveis(agora):
+    """Eventos que um worker pode reservar agora: o mais antigo pendente de cada chave."""
+    anteriores = WebhookInbox.objects.filter(
+        chave=OuterRef('chave'), id__lt=OuterRef('id'), status=WebhookInbox.STATUS_PENDENTE,
+    )
+    return WebhookInbox.objects.filter(
+        Q(proxima_tentativa_em__isnull=True) | Q(proxima_tentativa_em__lte=agora),
+        Q(reservada_ate__isnull=True) | Q(reservada_ate__lt=agora),
+        status=WebhookInbox.STATUS_PENDENTE,
+    ).exclude(Exists(anteriores))
+
+
+def reservar_lote(worker, tamanho=None):
+    """
+    Reserva até `tamanho` eventos (padrão WEBHOOK_INBOX_LOTE) para o worker,
+    por WEBHOOK_INBOX_LEASE_SEGUNDOS, em ordem de chegada.
+    """
+    tamanho = tamanho or _param('WEBHOOK_INBOX_LOTE', 100)
+    agora = timezone.now()
+    reservada_ate = agora + timedelta(seconds=_param('WEBHOOK_INBOX_LEASE_SEGUNDOS', 120))
+
+    with transaction.atomic():
+        candidatos = _disponiveis(agora).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            candidatos = candidatos.select_for_update(skip_locked=True)
+        ids = list(candidatos.values_list('id', flat=True)[:tamanho])
+        if not ids:
+            return []
+        WebhookInbox.objects.filter(
+            Q(reservada_ate__isnull=True) | Q(reservada_ate__lt=agora),
+            id__in=ids, status=WebhookInbox.STATUS_PENDENTE,
+        ).update(reservada_por=worker, reservada_ate=reservada_ate)
+
+    return list(WebhookInbox.objects.filter(
+        id__in=ids, reservada_por=worker, reservada_ate=reservada_ate).order_by('id'))
+
+
+class FalhaNaBaixa(Exception):
+    """O processamento devolveu status 'erro' (a baixa falhou sem exceção)."""
+
+
+class _ReservaPerdida(Exception):
+    """O evento deixou de ser do worker enquanto era processado."""
+
+
+def _aplicar(evento):
+    """
+    Roda o processamento síncrono de sempre sobre o payload gravado.
+
+    _processar_evento_pix / _processar_evento_cobranca capturam a falha da
+    baixa e devolvem status 'erro'; aqui isso vira exceção, para desfazer o
+    log do evento (EventoPIX / EventoCobrancaApi) junto com a transação e
+    seguir o caminho de retentativa — senão a reentrega daria "duplicado".
+    """
+    from financeiro import views
+
+    dados = json.loads(evento.payload)
+    if evento.origem == WebhookInbox.ORIGEM_PIX:
+        resultado = views._processar_evento_pix(**views._args_evento_pix(dados))
+    else:
+        resultado = views._processar_evento_cobranca(**views._args_evento_cobranca(dados))
+    if str(resultado.get('status', '')).lower() == 'erro':
+        raise FalhaNaBaixa(resultado.get('erro') or 'falha na baixa')
+    return resultado
+
+
+def _da_reserva(evento):
+    """Linha do evento enquanto ainda reservada pelo worker que a pegou."""
+    return WebhookInbox.objects.filter(
+        pk=evento.pk, reservada_por=evento.reservada_por, status=WebhookInbox.STATUS_PENDENTE,
+    )
+
+
+def _renovar_reserva(evento):
+    """
+    Renova a reserva do evento antes de processá-lo. False se ela venceu (no
+    meio de um lote lento) ou outro worker a tomou — o evento volta à fila.
+    """
+    agora = timezone.now()
+    reservada_ate = agora + timedelta(seconds=_param('WEBHOOK_INBOX_LEASE_SEGUNDOS', 120))
+    return bool(evento.reservada_por) and _da_reserva(evento).filter(
+        reservada_ate__gt=agora,
+    ).update(reservada_ate=reservada_ate) == 1
+
+
+def _processar(evento):
+    """
+    Processa um evento e grava o desfecho. Devolve o status final do evento,
+    ou None se a reserva foi perdida para outro worker (nada é gravado).
+    """
+    if not _renovar_reserva(evento):
+        logger.warning('[WebhookInbox] evento %s: reserva de %s tomada por outro worker — pulando',
+                       evento.pk, evento.reservada_por)
+        return None
+
+    try:
+        with transaction.atomic():
+            resultado = _aplicar(evento)
+            evento.status = WebhookInbox.STATUS_PROCESSADO
+            evento.resultado = str(resultado.get('status', ''))[:20]
+            evento.processado_em = timezone.now()
+            # Desfecho condicionado à reserva: sem ela, desfaz o processamento
+            if not _da_reserva(evento).update(
+                status=evento.status, resultado=evento.resultado,
+                processado_em=evento.processado_em, reservada_por='', reservada_ate=None,
+            ):
+                raise _ReservaPerdida
+    except _ReservaPerdida:
+        logger.warning('[WebhookInbox] evento %s: reserva perdida durante o processamento',
+                       evento.pk)
+        return None
+    except Exception as exc:
+        evento.status = WebhookInbox.STATUS_PENDENTE
+        evento.tentativas += 1
+        evento.erro = str(exc)
+        if evento.tentativas >= max(_param('WEBHOOK_INBOX_MAX_TENTATIVAS', 5), 1):
+            evento.status = WebhookInbox.STATUS_ERRO
+            logger.exception('[WebhookInbox] evento %s (%s) falhou %dx — desistindo',
+                             evento.pk, evento.event_id, evento.tentativas)
+        else:
+            evento.proxima_tentativa_em = timezone.now() + atraso_retentativa(evento.tentativas)
+            logger.warning('[WebhookInbox] evento %s (%s) falhou (tentativa %d): %s',
+                           evento.pk, evento.event_id, evento.tentativas, exc)
+        if not _da_reserva(evento).update(
+            tentativas=evento.tentativas, erro=evento.erro, status=evento.status,
+            proxima_tentativa_em=evento.proxima_tentativa_em,
+            reservada_por='', reservada_ate=None,
+        ):
+            return None
+        return evento.status
+
+    evento.reservada_por, evento.reservada_ate = '', None
+    return evento.status
+
+
+def _processar_em_thread(eventos):
+    try:
+        return [_processar(e) for e in eventos]
+    finally:
+        connections.close_all()
+
+
+def _processar_lote(lote):
+    """Processa o lote em até WEBHOOK_INBOX_WORKERS threads (chaves distintas por construção)."""
+    workers = min(max(_param('WEBHOOK_INBOX_WORKERS', 1), 1), len(lote))
+    if workers <= 1:
+        return [_processar(e) for e in lote]
+    fatias = [lote[i::workers] for i in range(workers)]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='webhook-inbox') as pool:
+        return [s for r in pool.map(_processar_em_thread, fatias) for s in r]
+
+
+def metricas(agora=None):
+    """
+    Situação da caixa de entrada: pendentes, com erro e o atraso (s) do
+    pendente mais antigo — o lag atual do processamento.
+    """
+    agora = agora or timezone.now()
+    pendentes = WebhookInbox.objects.filter(status=WebhookInbox.STATUS_PENDENTE)
+    mais_antigo = pendentes.aggregate(m=Min('recebido_em'))['m']
+    return {
+        'pendentes': pendentes.count(),
+        'com_erro': WebhookInbox.objects.filter(status=WebhookInbox.STATUS_ERRO).count(),
+        'atraso_s': round((agora - mais_antigo).total_seconds(), 3) if mais_antigo else 0.0,
+    }
+
+
+def consumir(worker=None, tamanho_lote=None, max_lotes=None):
+    """
+    Consome a caixa de entrada até esvaziá-la (ou até `max_lotes`). Pode rodar
+    em vários processos ao mesmo tempo.
+
+    Returns:
+        dict: processados, reagendados, erros, perdidos (reserva tomada por
+            outro worker), lotes, lag_medio_s / lag_max_s
+            (recebimento → processamento dos eventos deste consumo), duracao_s
+            e as métricas() ao final.
+    """
+    worker = worker or identificar_worker()
+    estatisticas = {'processados': 0, 'reagendados': 0, 'erros': 0, 'perdidos': 0, 'lotes': 0}
+    lags = []
+    inicio = time.monotonic()
+
+    while max_lotes is None or estatisticas['lotes'] < max_lotes:
+        lote = reservar_lote(worker, tamanho_lote)
+        if not lote:
+            break
+        estatisticas['lotes'] += 1
+        for evento, status in zip(lote, _processar_lote(lote)):
+            if status == WebhookInbox.STATUS_PROCESSADO:
+                estatisticas['processados'] += 1
+                lags.append((evento.processado_em - evento.recebido_em).total_seconds())
+            elif status == WebhookInbox.STATUS_ERRO:
+                estatisticas['erros'] += 1
+            elif status is None:
+                estatisticas['perdidos'] += 1
+            else:
+                estatisticas['reagendados'] += 1
+
+    estatisticas['lag_medio_s'] = round(sum(lags) / len(lags), 3) if lags else 0.0
+    estatisticas['lag_max_s'] = round(max(lags), 3) if lags else 0.0
+    estatisticas['duracao_s'] = round(time.monotonic() - inicio, 3)
+    estatisticas.update(metricas())
+    if estatisticas['lotes']:
+        logger.info(
+            '[WebhookInbox] %(processados)d processado(s), %(reagendados)d reagendado(s), '
+            '%(erros)d erro(s); lag médio %(lag_medio_s).1fs / máx %(lag_max_s).1fs; '
+            '%(pendentes)d pendente(s)', estatisticas,
+        )
+    return estatisticas
@@ -0,0 +1,84 @@
+"""
+Signals do app financeiro.
+
+Gravação/remoção de Parcela recalcula os meses afetados do resumo de
+recebíveis (ResumoRecebiveisMensal) — o do vencimento atual e, se o
+vencimento mudou, o anterior. Gravações que não mexem em contrato,
+vencimento, pagamento ou valor não custam nada.
+
+Remoções em cascata (contrato removido, queryset.delete()) recalculam cada
+mês uma única vez. Contrato que muda de imobiliária recalcula os meses nas
+duas (a antiga perde as parcelas, a nova ganha).
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from financeiro.models import Parcela, ResumoRecebiveisMensal
+
+CAMPOS_RESUMO = {'contrato', *ResumoRecebiveisMensal.CAMPOS_PARCELA}
+
+
+@receiver(post_save, sender=Parcela)
+def atualizar_resumo_ao_gravar_parcela(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not CAMPOS_RESUMO & set(update_fields):
+        return
+    anterior = instance.__dict__.get('_estado_resumo')
+    atual = instance.estado_resumo()
+    if anterior == atual:
+        return
+    instance._estado_resumo = atual
+    anteriores = [anterior[:2]] if anterior and anterior[:2] != atual[:2] else []
+    ResumoRecebiveisMensal.atualizar_parcelas([instance], anteriores=anteriores)
+
+
+@receiver(post_delete, sender=Parcela)
+def atualizar_resumo_ao_remover_parcela(sender, instance, origin=None, **kwargs):
+    modelo = getattr(origin, 'model', origin)  # queryset.delete() ou instância
+    if getattr(modelo, '_meta', None) is not None and modelo._meta.label == 'contratos.Contrato':
+        return  # recalculado pelos signals do contrato, de uma vez
+    chaves = ResumoRecebiveisMensal.chaves_parcelas([instance])
+    if origin is not None and origin is not instance:
+        # Todas as linhas do lote já foram removidas: cada mês basta uma vez
+        feitas = origin.__dict__.setdefault('_resumo_recalculado', set())
+        chaves -= feitas
+        feitas |= chaves
+    if chaves:
+        ResumoRecebiveisMensal.recalcular(chaves)
+
+
+@receiver(pre_delete, sender='contratos.Contrato')
+def guardar_meses_do_contrato(sender, instance, **kwargs):
+    from django.db.models.functions import TruncMonth
+
+    instance._resumo_meses = set(
+        instance.parcelas.annotate(mes_venc=TruncMonth('data_vencimento'))
+        .values_list('mes_venc', flat=True).distinct().order_by()
+    )
+
+
+@receiver(post_delete, sender='contratos.Contrato')
+def atualizar_resumo_ao_remover_contrato(sender, instance, **kwargs):
+    meses = instance.__dict__.get('_resumo_meses')
+    if meses:
+        ResumoRecebiveisMensal.recalcular({(instance.imobiliaria_id, mes) for mes in meses})
+
+
+@receiver(pre_save, sender='contratos.Contrato')
+def guardar_imobiliaria_do_contrato(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and 'imobiliaria' not in update_fields:
+        return
+    instance._resumo_imobiliaria_anterior = (
+        sender.objects.filter(pk=instance.pk).values_list('imobiliaria_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender='contratos.Contrato')
+def atualizar_resumo_ao_trocar_imobiliaria(sender, instance, created=False, raw=False, **kwargs):
+    anterior = instance.__dict__.pop('_resumo_imobiliaria_anterior', None)
+    if raw or created or anterior is None or anterior == instance.imobiliaria_id:
+        return
+    ResumoRecebiveisMensal.atualizar_contratos([instance], imobiliarias_anteriores=[anterior])
@@ -8,6 +8,7 @@ Empresa: M&S do Brasil LTDA
 from celery import shared_task
 from django.utils import timezone
 from django.conf import settings
+from django.db import transaction
 from datetime import timedelta
 import logging
 
@@ -17,41 +18,199 @@ from .models import Reajuste
 logger = logging.getLogger(__name__)
 
 
+def _chave_resumo_reajustes(execucao):
+    return f'reajustes:resumo:{execucao}'
+
+
+def resumo_reajustes(execucao):
+    """
+    Resumo da execução 'AAAA-MM-DD' de processar_reajustes_pendentes
+    (contagens, vazão e latência por contrato), ou None se não houve execução.
+    """
+    from django.core.cache import cache
+    return cache.get(_chave_resumo_reajustes(execucao))
+
+
 @shared_task
-def processar_reajustes_pendentes():
+def processar_reajustes_pendentes(distribuir=True, chunk_size=None):
     """
     Tarefa agendada para processar reajustes automáticos de todos os contratos ativos.
 
-    Identifica contratos com ciclo pendente usando Reajuste.calcular_ciclo_pendente()
-    e aplica cada ciclo usando Reajuste.preview_reajuste() + aplicar_reajuste().
+    Coordenador: calcula os ciclos pendentes de uma vez (Reajuste.ciclos_pendentes
+    — uma consulta de contratos e uma de reajustes aplicados) e distribui os
+    contratos pendentes em lotes de REAJUSTES_CHUNK_SIZE para processar_reajustes_lote,
+    num chord do Celery cuja callback (consolidar_reajustes) junta os resultados
+    e libera o lock do dia — se o chord falhar, o errback liberar_lock_reajustes.
 
-    Recomendado: executar mensalmente no primeiro dia do mês.
+    Args:
+        distribuir: True enfileira os lotes para os workers e retorna logo;
+            False executa o chord no próprio processo e retorna o consolidado
+            (usado pelo comando processar_reajustes).
+        chunk_size: Contratos por lote (padrão: REAJUSTES_CHUNK_SIZE).
+
+    Retomável: os reajustes já aplicados saem do cálculo de pendentes e cada
+    lote confere o ciclo sob lock do contrato, então reexecutar depois de uma
+    queda só processa o que faltou.
     """
+    import time
+    from celery import chord
+    from django.core.cache import cache
+
     logger.info("Iniciando processamento automático de reajustes pendentes...")
+    inicio = time.time()
+    execucao = timezone.now().date().isoformat()
 
-    contratos = Contrato.objects.filter(status=StatusContrato.ATIVO).select_related('comprador', 'imobiliaria')
-    processados = 0
-    reajustados = 0
-    erros = 0
+    chave_lock = f'reajustes:lock:{execucao}'
+    if not cache.add(chave_lock, timezone.now().isoformat(), timeout=6 * 3600):
+        logger.warning("Processamento de reajustes de %s já em execução — ignorando", execucao)
+        return {'processados': 0, 'reajustados': 0, 'erros': 0, 'em_execucao': True}
 
-    for contrato in contratos:
-        processados += 1
-        ciclo = Reajuste.calcular_ciclo_pendente(contrato)
-        if ciclo is None:
-            continue
+    try:
+        contratos = Contrato.objects.filter(status=StatusContrato.ATIVO).only(
+            'id', 'tipo_correcao', 'prazo_reajuste_meses', 'data_contrato',
+            'ciclo_reajuste_atual', 'numero_parcelas',
+        ).order_by('id')
+        processados = 0
+
+        def contar(iteravel):
+            nonlocal processados
+            for contrato in iteravel:
+                processados += 1
+                yield contrato
+
+        pendentes = sorted(Reajuste.ciclos_pendentes(contar(contratos.iterator(chunk_size=2000))).items())
+
+        if chunk_size is None:
+            chunk_size = getattr(settings, 'REAJUSTES_CHUNK_SIZE', 50)
+        chunk_size = max(int(chunk_size or 1), 1)
+        lotes = [pendentes[i:i + chunk_size] for i in range(0, len(pendentes), chunk_size)]
+
+        logger.info(
+            "Reajustes %s: %d contratos verificados, %d pendentes em %d lotes",
+            execucao, processados, len(pendentes), len(lotes),
+        )
+        if not lotes:
+            return consolidar_reajustes([], execucao, inicio, processados)
+
+        # Se um lote ou a consolidação falhar, a callback não roda: o errback
+        # no corpo do chord (chamado também para falhas do cabeçalho) libera o lock
+        assinatura = chord(
+            [processar_reajustes_lote.s(lote) for lote in lotes],
+            consolidar_reajustes.s(execucao, inicio, processados).on_error(
+                liberar_lock_reajustes.s(execucao)
+            ),
+        )
+        if not distribuir:
+            return assinatura.apply().get()
+
+        resultado = assinatura.apply_async()
+        # O lock passa a ser liberado pela callback do chord (ou pelo errback)
+        chave_lock = None
+        return {
+            'processados': processados,
+            'pendentes': len(pendentes),
+            'lotes': len(lotes),
+            'execucao': execucao,
+            'chord_id': resultado.id,
+        }
+    finally:
+        if chave_lock:
+            cache.delete(chave_lock)
+
+
+@shared_task
+def processar_reajustes_lote(itens):
+    """
+    Aplica os reajustes de um lote [(contrato_id, ciclo), ...] do coordenador.
+
+    Idempotente: com o contrato travado (select_for_update), um ciclo que já
+    está aplicado é ignorado; criação e aplicação do Reajuste ficam na mesma
+    transação, então uma queda no meio não deixa reajuste pela metade.
+
+    Returns:
+        Lista de {'contrato_id', 'ciclo', 'status', 'duracao_ms'}, com status
+        'reajustado', 'ignorado' ou 'erro'.
+    """
+    import time
+
+    resultados = []
+    for contrato_id, ciclo in itens:
+        inicio = time.perf_counter()
         try:
-            resultado = aplicar_reajuste_automatico(contrato.id, ciclo)
-            if resultado:
-                reajustados += 1
+            with transaction.atomic():
+                contrato = Contrato.objects.select_for_update().filter(pk=contrato_id).only(
+                    'id', 'ciclo_reajuste_atual',
+                ).first()
+                if (contrato is None or (contrato.ciclo_reajuste_atual or 1) >= ciclo
+                        or Reajuste.objects.filter(contrato_id=contrato_id, ciclo=ciclo, aplicado=True).exists()):
+                    status = 'ignorado'
+                else:
+                    status = 'reajustado' if aplicar_reajuste_automatico(contrato_id, ciclo) else 'ignorado'
         except Exception as e:
-            erros += 1
-            logger.exception("Erro no reajuste automático do contrato %s: %s", contrato.numero_contrato, e)
+            status = 'erro'
+            logger.exception("Erro no reajuste automático do contrato %s: %s", contrato_id, e)
+        resultados.append({
+            'contrato_id': contrato_id,
+            'ciclo': ciclo,
+            'status': status,
+            'duracao_ms': round((time.perf_counter() - inicio) * 1000, 3),
+        })
+    return resultados
+
+
+@shared_task
+def consolidar_reajustes(resultados_lotes, execucao, inicio, processados):
+    """
+    Callback do chord de processar_reajustes_pendentes: soma os lotes, calcula
+    vazão e latência por contrato (p50/p95/máx), grava o resumo em cache
+    (resumo_reajustes) e libera o lock da execução.
+    """
+    import time
+    from django.core.cache import cache
+
+    itens = [item for lote in resultados_lotes for item in lote]
+    duracoes = sorted(item['duracao_ms'] for item in itens)
+    decorrido = max(time.time() - inicio, 1e-6)
+
+    def percentil(p):
+        if not duracoes:
+            return 0
+        return duracoes[min(int(round(p * (len(duracoes) - 1))), len(duracoes) - 1)]
+
+    resumo = {
+        'execucao': execucao,
+        'processados': processados,
+        'pendentes': len(itens),
+        'lotes': len(resultados_lotes),
+        'reajustados': sum(1 for item in itens if item['status'] == 'reajustado'),
+        'ignorados': sum(1 for item in itens if item['status'] == 'ignorado'),
+        'erros': sum(1 for item in itens if item['status'] == 'erro'),
+        'contratos_com_erro': [item['contrato_id'] for item in itens if item['status'] == 'erro'],
+        'duracao_s': round(decorrido, 3),
+        'contratos_por_segundo': round(len(itens) / decorrido, 2),
+        'latencia_ms': {'p50': percentil(0.50), 'p95': percentil(0.95), 'max': duracoes[-1] if duracoes else 0},
+    }
+    cache.set(_chave_resumo_reajustes(execucao), resumo, timeout=7 * 86400)
+    cache.delete(f'reajustes:lock:{execucao}')
 
     logger.info(
         f"Reajustes automáticos: {processados} contratos verificados, "
-        f"{reajustados} reajustados, {erros} erros."
+        f"{resumo['reajustados']} reajustados, {resumo['erros']} erros "
+        f"({resumo['contratos_por_segundo']} contratos/s, p95 {resumo['latencia_ms']['p95']} ms)."
     )
-    return {'processados': processados, 'reajustados': reajustados, 'erros': erros}
+    return resumo
+
+
+@shared_task
+def liberar_lock_reajustes(request, exc, traceback, execucao):
+    """
+    Errback do chord de processar_reajustes_pendentes: sem a callback, o lock
+    do dia ficaria preso até expirar e bloquearia a reexecução.
+    """
+    from django.core.cache import cache
+
+    logger.error("Reajustes %s: chord falhou (%s) — liberando o lock", execucao, exc)
+    cache.delete(f'reajustes:lock:{execucao}')
 
 
 @shared_task
@@ -132,46 +291,48 @@ def aplicar_reajuste_automatico(contrato_id, ciclo=None):
         f"{resultado.get('parcelas_reajustadas', 0)} parcelas."
     )
 
-    # Notificar gestor da imobiliária
-    try:
-        enviar_alerta_reajuste.delay(
-            contrato_id=contrato.id,
-            dias_restantes=0,
-            urgente=False,
-            bloqueado=False,
-        )
-    except Exception:
-        pass
+    # Notificar gestor da imobiliária só após o commit: em processar_reajustes_lote
+    # esta task roda dentro do atomic do lote, que ainda pode ser desfeito
+    def _notificar():
+        try:
+            enviar_alerta_reajuste.delay(
+                contrato_id=contrato.id,
+                dias_restantes=0,
+                urgente=False,
+                bloqueado=False,
+            )
+        except Exception:
+            pass
+
+    transaction.on_commit(_notificar)
 
     return resultado
 
 
 @shared_task
-def atualizar_juros_multa_parcelas_vencidas():
+def atualizar_juros_multa_parcelas_vencidas(motor=None):
     """
     Atualiza juros e multa de todas as parcelas vencidas e não pagas
-    """
-    from .models import Parcela
 
-    logger.info("Iniciando atualização de juros e multa de parcelas vencidas...")
-
-    hoje = timezone.now().date()
-    parcelas_vencidas = list(
-        Parcela.objects.filter(pago=False, data_vencimento__lt=hoje)
-        .select_related('contrato')
+    motor: 'sql' (UPDATE ... FROM contratos em faixas de id, no banco) ou
+    'python' (referência, parcela a parcela). Padrão: settings.JUROS_MULTA_MOTOR.
+    O motor SQL cai para o Python em bancos sem suporte.
+    """
+    from .services.encargos_service import (
+        atualizar_juros_multa_python, atualizar_juros_multa_sql, motor_sql_disponivel,
     )
 
-    to_update = []
-    for parcela in parcelas_vencidas:
-        juros, multa = parcela.calcular_juros_multa(hoje)
-        parcela.valor_juros = juros
-        parcela.valor_multa = multa
-        to_update.append(parcela)
+    motor = motor or getattr(settings, 'JUROS_MULTA_MOTOR', 'sql')
+    if motor == 'sql' and not motor_sql_disponivel():
+        motor = 'python'
+
+    logger.info("Iniciando atualização de juros e multa de parcelas vencidas (motor=%s)...", motor)
 
-    if to_update:
-        Parcela.objects.bulk_update(to_update, ['valor_juros', 'valor_multa'])
+    if motor == 'sql':
+        count = atualizar_juros_multa_sql()
+    else:
+        count = atualizar_juros_multa_python()
 
-    count = len(to_update)
     logger.info(f"Atualização concluída. {count} parcelas atualizadas.")
 
     return count
@@ -233,6 +394,34 @@ def buscar_indices_economicos():
     return resultados
 
 
+@shared_task
+def atualizar_bloqueios_reajuste():
+    """
+    Recalcula o bloqueio por reajuste materializado dos contratos cuja
+    validade venceu (aniversário de ciclo atingido) ou que nunca foram calculados.
+    Executar diariamente, logo após a virada do dia.
+    """
+    from contratos.models import Contrato
+
+    total = Contrato.atualizar_bloqueios_reajuste()
+    logger.info("Bloqueio por reajuste recalculado em %d contrato(s)", total)
+    return {'atualizados': total}
+
+
+@shared_task
+def reconstruir_resumo_recebiveis():
+    """
+    Refaz o resumo mensal de recebíveis (ResumoRecebiveisMensal) a partir das
+    parcelas. O resumo é mantido a cada gravação; a reconstrução diária corrige
+    o que tenha escapado (ex.: update() direto em parcelas).
+    """
+    from .models import ResumoRecebiveisMensal
+
+    total = ResumoRecebiveisMensal.reconstruir()
+    logger.info("Resumo de recebíveis reconstruído: %d linha(s)", total)
+    return {'linhas': total}
+
+
 @shared_task
 def verificar_alertas_reajuste():
     """
@@ -338,87 +527,187 @@ Por favor, aplique o reajuste para liberar a geração de boletos.
         return False
 
 
-@shared_task
-def gerar_boletos_automaticos():
+def _emitir_boleto_automatico(parcela):
+    """Gera o boleto de uma parcela e devolve o item de `detalhes` do resultado."""
+    contrato = parcela.contrato
+    identificacao = f"{contrato.numero_contrato}/{parcela.numero_parcela}"
+    try:
+        resultado = parcela.gerar_boleto(enviar_email=True)
+        if resultado and resultado.get('sucesso'):
+            return {
+                'parcela': identificacao,
+                'status': 'gerado',
+                'nosso_numero': resultado.get('nosso_numero')
+            }
+        return {
+            'parcela': identificacao,
+            'status': 'erro',
+            'motivo': resultado.get('erro', 'Erro desconhecido') if resultado else 'Sem resposta',
+            'rate_limited': bool(resultado and resultado.get('rate_limited')),
+        }
+    except Exception as e:
+        logger.exception(f"Erro ao gerar boleto da parcela {parcela.id}: {e}")
+        return {
+            'parcela': identificacao,
+            'status': 'erro',
+            'motivo': str(e)
+        }
+
+
+def _emitir_boleto_concorrente(parcela, limitador):
+    """
+    _emitir_boleto_automatico dentro de uma thread do pool: respeita a pausa
+    global de 429 e a concorrência adaptativa da BRCobrança, e fecha a conexão
+    de banco da thread ao final.
+    """
+    from django.db import connections
+    from .services.brcobranca_throttle import aguardar_rate_limit
+
+    try:
+        aguardar_rate_limit()
+        with limitador.vaga() as vaga:
+            detalhe = _emitir_boleto_automatico(parcela)
+            vaga.rate_limited = detalhe.get('rate_limited', False)
+        return detalhe
+    finally:
+        connections.close_all()
+
+
+def _chave_progresso_boletos(competencia):
+    return f'boletos_automaticos:progresso:{competencia}'
+
+
+def progresso_boletos_automaticos(competencia):
+    """
+    Progresso da geração automática da competência 'AAAA-MM' (vencimentos do
+    mês), ou None se não houve execução recente.
+    """
+    from django.core.cache import cache
+    return cache.get(_chave_progresso_boletos(competencia))
+
+
+@shared_task(bind=True)
+def gerar_boletos_automaticos(self, workers=None):
     """
     Gera boletos automaticamente para parcelas do próximo mês.
     Executar mensalmente (ex: dia 25 de cada mês).
 
     Respeita a regra de bloqueio por reajuste.
+
+    Args:
+        workers: Boletos emitidos em paralelo (padrão: BOLETOS_AUTOMATICOS_WORKERS).
+            1 = sequencial. Acima disso, um pool de threads compartilha a session
+            HTTP da BRCobrança e o rate limit adaptativo de brcobranca_throttle.
+
+    Retomável: só entram parcelas ainda NAO_GERADO, então uma execução
+    interrompida continua de onde parou ao ser reexecutada. O progresso fica
+    em cache (progresso_boletos_automaticos) e no estado PROGRESS da task.
     """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    from django.core.cache import cache
     from .models import Parcela, StatusBoleto
-    from contratos.models import StatusContrato
+    from .services.brcobranca_throttle import ConcorrenciaAdaptativa
+    from contratos.models import Contrato, StatusContrato
+
+    if workers is None:
+        workers = getattr(settings, 'BOLETOS_AUTOMATICOS_WORKERS', 1)
+    workers = max(int(workers or 1), 1)
 
-    logger.info("Iniciando geração automática de boletos...")
+    logger.info("Iniciando geração automática de boletos (workers=%d)...", workers)
 
     # Calcular período: parcelas com vencimento no próximo mês
     hoje = timezone.now().date()
     primeiro_dia_proximo_mes = (hoje.replace(day=1) + timedelta(days=32)).replace(day=1)
     ultimo_dia_proximo_mes = (primeiro_dia_proximo_mes + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-
-    # Buscar parcelas elegíveis
-    parcelas = list(Parcela.objects.filter(
-        contrato__status=StatusContrato.ATIVO,
-        data_vencimento__gte=primeiro_dia_proximo_mes,
-        data_vencimento__lte=ultimo_dia_proximo_mes,
-        pago=False,
-        status_boleto=StatusBoleto.NAO_GERADO
-    ).select_related(
-        'contrato',
-        'contrato__comprador',
-        'contrato__imovel__imobiliaria',
-        'contrato__imobiliaria',
-        'conta_bancaria',
-    ))
+    competencia = primeiro_dia_proximo_mes.strftime('%Y-%m')
 
     resultados = {
-        'total': len(parcelas),
+        'total': 0,
         'gerados': 0,
         'bloqueados': 0,
         'erros': 0,
         'detalhes': []
     }
 
-    for parcela in parcelas:
-        contrato = parcela.contrato
-
-        # Verificar bloqueio de reajuste
-        pode_gerar, motivo = contrato.pode_gerar_boleto(parcela.numero_parcela)
-
-        if not pode_gerar:
-            resultados['bloqueados'] += 1
-            resultados['detalhes'].append({
-                'parcela': f"{contrato.numero_contrato}/{parcela.numero_parcela}",
-                'status': 'bloqueado',
-                'motivo': motivo
-            })
-            continue
+    # Uma execução por competência: evita dois workers Celery emitindo o mesmo mês
+    chave_lock = f'boletos_automaticos:lock:{competencia}'
+    if not cache.add(chave_lock, timezone.now().isoformat(), timeout=6 * 3600):
+        logger.warning("Geração automática de %s já em execução — ignorando", competencia)
+        resultados['em_execucao'] = True
+        return resultados
 
-        # Gerar boleto
-        try:
-            resultado = parcela.gerar_boleto(enviar_email=True)
-            if resultado and resultado.get('sucesso'):
-                resultados['gerados'] += 1
-                resultados['detalhes'].append({
-                    'parcela': f"{contrato.numero_contrato}/{parcela.numero_parcela}",
-                    'status': 'gerado',
-                    'nosso_numero': resultado.get('nosso_numero')
-                })
+    try:
+        anterior = progresso_boletos_automaticos(competencia)
+        if anterior and not anterior.get('concluido'):
+            logger.info(
+                "Retomando geração de %s (execução anterior parou em %s/%s)",
+                competencia, anterior.get('processadas'), anterior.get('total'),
+            )
+
+        # Bloqueio por reajuste materializado em dia antes de carregar as
+        # parcelas: a liberação vem do próprio SELECT (com_liberacao_reajuste)
+        Contrato.atualizar_bloqueios_reajuste()
+
+        # Buscar parcelas elegíveis
+        parcelas = list(Parcela.objects.filter(
+            contrato__status=StatusContrato.ATIVO,
+            data_vencimento__gte=primeiro_dia_proximo_mes,
+            data_vencimento__lte=ultimo_dia_proximo_mes,
+            pago=False,
+            status_boleto=StatusBoleto.NAO_GERADO
+        ).com_liberacao_reajuste().select_related(
+            'contrato',
+            'contrato__comprador',
+            'contrato__imovel__imobiliaria',
+            'contrato__imobiliaria',
+            'conta_bancaria',
+        ).order_by('id'))
+        resultados['total'] = len(parcelas)
+
+        progresso = {
+            'competencia': competencia,
+            'total': len(parcelas),
+            'processadas': 0,
+            'concluido': False,
+        }
+
+        def registrar(detalhe):
+            detalhe.pop('rate_limited', None)
+            chave = {'gerado': 'gerados', 'bloqueado': 'bloqueados'}.get(detalhe['status'], 'erros')
+            resultados[chave] += 1
+            resultados['detalhes'].append(detalhe)
+            progresso['processadas'] += 1
+            _publicar_progresso(self, cache, progresso, resultados)
+
+        # Bloqueio de reajuste já resolvido no SELECT (liberada_reajuste)
+        elegiveis = []
+        for parcela in parcelas:
+            if parcela.liberada_reajuste:
+                elegiveis.append(parcela)
             else:
-                resultados['erros'] += 1
-                resultados['detalhes'].append({
-                    'parcela': f"{contrato.numero_contrato}/{parcela.numero_parcela}",
-                    'status': 'erro',
-                    'motivo': resultado.get('erro', 'Erro desconhecido') if resultado else 'Sem resposta'
+                registrar({
+                    'parcela': f"{parcela.contrato.numero_contrato}/{parcela.numero_parcela}",
+                    'status': 'bloqueado',
+                    'motivo': parcela.contrato.motivo_bloqueio_reajuste(),
                 })
-        except Exception as e:
-            resultados['erros'] += 1
-            resultados['detalhes'].append({
-                'parcela': f"{contrato.numero_contrato}/{parcela.numero_parcela}",
-                'status': 'erro',
-                'motivo': str(e)
-            })
-            logger.exception(f"Erro ao gerar boleto da parcela {parcela.id}: {e}")
+
+        if workers == 1:
+            for parcela in elegiveis:
+                registrar(_emitir_boleto_automatico(parcela))
+        elif elegiveis:
+            limitador = ConcorrenciaAdaptativa(workers)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='boletos') as pool:
+                futuros = [
+                    pool.submit(_emitir_boleto_concorrente, parcela, limitador)
+                    for parcela in elegiveis
+                ]
+                for futuro in as_completed(futuros):
+                    registrar(futuro.result())
+
+        progresso['concluido'] = True
+        _publicar_progresso(self, cache, progresso, resultados)
+    finally:
+        cache.delete(chave_lock)
 
     logger.info(
         f"Geração automática concluída: {resultados['gerados']} gerados, "
@@ -428,6 +717,19 @@ def gerar_boletos_automaticos():
     return resultados
 
 
+def _publicar_progresso(task, cache, progresso, resultados):
+    """Grava o progresso em cache e, quando rodando no Celery, no estado da task."""
+    progresso.update(
+        gerados=resultados['gerados'],
+        bloqueados=resultados['bloqueados'],
+        erros=resultados['erros'],
+        atualizado_em=timezone.now().isoformat(),
+    )
+    cache.set(_chave_progresso_boletos(progresso['competencia']), dict(progresso), timeout=7 * 86400)
+    if task.request.id:
+        task.update_state(state='PROGRESS', meta=dict(progresso))
+
+
 @shared_task
 def enviar_lembretes_vencimento():
     """
@@ -843,65 +1145,57 @@ def enviar_relatorio_posicao_contratos(formato='excel'):
 @shared_task
 def polling_boletos_sicoob():
     """
-    Sicoob não envia webhook de boleto: consulta GET /cobranca/{id} das parcelas
-    Sicoob em aberto e baixa as que estiverem liquidadas. Rodar diariamente.
+    Sicoob não envia webhook de boleto: baixa as parcelas Sicoob liquidadas a
+    partir da conciliação em lote do gateway e, onde ela não estiver
+    disponível, de GET /cobranca/{id} das parcelas cuja consulta está agendada
+    (proxima_consulta_em). Rodar diariamente.
     """
-    from core.models import ProviderBoleto
-    from .models import Parcela
-    from .services.boleto_api_client import BoletoApiClient
-    from .services.boleto_api_conciliacao import baixar_por_conciliacao
+    from .services.boleto_api_conciliacao import polling_sicoob
 
-    parcelas = (Parcela.objects
-                .filter(provider=ProviderBoleto.SICOOB, pago=False)
-                .exclude(cobranca_id='')
-                .select_related('conta_bancaria'))
-    client = BoletoApiClient()
-    baixadas = 0
-    for p in parcelas:
-        conta = p.conta_bancaria
-        r = client.consultar_cobranca(
-            p.cobranca_id, getattr(conta, 'tenant_id', '') or '', p.provider,
-            bapi_token=(getattr(conta, 'bapi_token', '') or None))
-        if r.get('sucesso') and str(r.get('status', '')).lower() in ('liquidado', 'pago'):
-            baixar_por_conciliacao(p, valor=r.get('valor'), origem='polling-sicoob')
-            baixadas += 1
-    logger.info('[BoletoAPI] polling Sicoob: %d parcela(s) baixada(s)', baixadas)
-    return {'baixadas': baixadas}
+    return polling_sicoob()
 
 
 @shared_task
 def conciliar_pix_recebidos(dias=1):
     """
-    Rede de segurança do webhook Pix: lista GET /pix/recebidos do período e baixa
-    as parcelas casadas por txid ainda não pagas. Rodar diariamente.
+    Rede de segurança do webhook Pix: lista GET /pix/recebidos do período de
+    cada conta e baixa em lote as parcelas casadas por txid ainda não pagas
+    (conciliar_pix_em_lote). Rodar diariamente.
     """
     from core.models import ProviderBoleto, ContaBancaria
-    from .models import Parcela
     from .services.boleto_api_client import BoletoApiClient
-    from .services.boleto_api_conciliacao import baixar_por_conciliacao
+    from .services.boleto_api_conciliacao import conciliar_pix_em_lote
 
     fim = timezone.now().date()
     inicio = fim - timedelta(days=dias)
     client = BoletoApiClient()
-    baixadas = 0
-    contas = ContaBancaria.objects.filter(
-        provider__in=[ProviderBoleto.C6, ProviderBoleto.SICOOB], ativo=True)
-    for conta in contas:
-        r = client.listar_pix_recebidos(
-            inicio.isoformat(), fim.isoformat(), conta.tenant_id, conta.provider,
-            bapi_token=(conta.bapi_token or None))
-        if not r.get('sucesso'):
-            continue
-        for item in r.get('itens', []):
-            txid = str(item.get('txid') or '')
-            if not txid:
-                continue
-            p = Parcela.objects.filter(pix_txid=txid, pago=False).first()
-            if p:
-                baixar_por_conciliacao(p, valor=item.get('valor'), origem='pix')
-                baixadas += 1
-    logger.info('[BoletoAPI] conciliação Pix: %d parcela(s) baixada(s)', baixadas)
-    return {'baixadas': baixadas}
+    contas = [
+        {'tenant_id': conta.tenant_id, 'provider': conta.provider,
+         'bapi_token': conta.bapi_token or None}
+        for conta in ContaBancaria.objects.filter(
+            provider__in=[ProviderBoleto.C6, ProviderBoleto.SICOOB], ativo=True)
+    ]
+    recebidos = client.em_lote(contas, lambda c: client.listar_pix_recebidos(
+        inicio.isoformat(), fim.isoformat(), c['tenant_id'], c['provider'],
+        bapi_token=c['bapi_token']))
+    itens = [item for r in recebidos if r.get('sucesso') for item in r.get('itens', [])]
+    resultado = conciliar_pix_em_lote(itens, origem='pix')
+    resultado['contas_com_erro'] = sum(1 for r in recebidos if not r.get('sucesso'))
+    logger.info('[BoletoAPI] conciliação Pix: %(baixadas)d baixada(s), %(ja_pagas)d já paga(s), '
+                '%(sem_parcela)d txid(s) sem parcela de %(recebidos)d recebido(s)', resultado)
+    return resultado
+
+
+@shared_task
+def processar_webhook_inbox():
+    """
+    Consome a caixa de entrada dos webhooks Boleto-API/PIX (modo fast-ack,
+    WEBHOOK_INBOX): aplica os eventos pendentes em ordem por cobrança e
+    devolve contagens e lag. Rodar a cada minuto.
+    """
+    from .services.webhook_inbox import consumir
+
+    return consumir()
 
 
 @shared_task
@@ -986,19 +1280,18 @@ def retentar_cobrancas_pix_automatico(janela_dias=7):
                         data_vencimento__lt=hoje,
                         data_vencimento__gte=hoje - timedelta(days=janela_dias))
                 .exclude(pix_txid='')
-                .select_related('contrato'))
+                .filter(contrato__in=RecorrenciaPix.objects
+                        .filter(status=RecStatusPA.APROVADA).values('contrato'))
+                .select_related('conta_bancaria'))
     client = BoletoApiClient()
-    retentadas = 0
+    retentativas = []
     for p in parcelas:
-        rec = RecorrenciaPix.objects.filter(
-            contrato=p.contrato, status=RecStatusPA.APROVADA).first()
-        if not rec:
-            continue
         tenant_id, bapi_token = p._bapi_ctx()
-        r = client.retentar_cobranca_pa(
-            p.pix_txid, (hoje + timedelta(days=1)).isoformat(),
-            tenant_id, p.provider, bapi_token=bapi_token)
-        if r.get('sucesso'):
-            retentadas += 1
+        retentativas.append({'txid': p.pix_txid, 'tenant_id': tenant_id,
+                             'provider': p.provider, 'bapi_token': bapi_token})
+    data_retentativa = (hoje + timedelta(days=1)).isoformat()
+    resultados = client.em_lote(retentativas, lambda c: client.retentar_cobranca_pa(
+        c['txid'], data_retentativa, c['tenant_id'], c['provider'], bapi_token=c['bapi_token']))
+    retentadas = sum(1 for r in resultados if r.get('sucesso'))
     logger.info('[BoletoAPI] Pix Automático: %d retentativa(s) agendada(s)', retentadas)
     return {'retentadas': retentadas}
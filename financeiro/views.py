@@ -24,7 +24,7 @@ import logging
 import time
 
 from django.core.cache import cache
-from .models import Parcela, Reajuste, StatusBoleto, HistoricoPagamento, TipoParcela
+from .models import Parcela, Reajuste, ResumoRecebiveisMensal, StatusBoleto, HistoricoPagamento, TipoParcela
 from core.models import Imobiliaria, ContaBancaria, get_imobiliarias_usuario, usuario_tem_permissao_total, registrar_auditoria
 from core.mixins import verificar_acesso_tenant
 from core.hashids_utils import encode_id as _encode_id
@@ -341,20 +341,23 @@ def api_dashboard_dados(request):
 
     parcelas_qs = Parcela.objects.all()
     contratos_qs = Contrato.objects.all()
+    imobiliarias = None
 
     if imobiliaria_id:
         parcelas_qs = parcelas_qs.filter(contrato__imobiliaria_id=imobiliaria_id)
         contratos_qs = contratos_qs.filter(imobiliaria_id=imobiliaria_id)
+        imobiliarias = [imobiliaria_id]
 
-    # Dados para gráficos de pizza — 2 aggregates em vez de 7 queries
-    p_counts = parcelas_qs.aggregate(
-        pagas=Count('id', filter=Q(pago=True)),
-        pendentes=Count('id', filter=Q(pago=False, data_vencimento__gte=hoje)),
-        vencidas=Count('id', filter=Q(pago=False, data_vencimento__lt=hoje)),
-    )
+    # Totais e séries mensais vêm do resumo materializado (ResumoRecebiveisMensal)
+    # em vez de agregar a tabela de parcelas a cada request
+    p_counts = ResumoRecebiveisMensal.totais(imobiliarias, hoje=hoje)
     status_parcelas = {
         'labels': ['Pagas', 'Pendentes', 'Vencidas'],
-        'data': [p_counts['pagas'], p_counts['pendentes'], p_counts['vencidas']],
+        'data': [
+            p_counts['qtd_pagas'],
+            p_counts['qtd_abertas'] - p_counts['qtd_vencidas'],
+            p_counts['qtd_vencidas'],
+        ],
         'colors': ['#28a745', '#ffc107', '#dc3545'],
     }
 
@@ -370,76 +373,46 @@ def api_dashboard_dados(request):
         'colors': ['#007bff', '#28a745', '#dc3545', '#6c757d'],
     }
 
-    # Dados para gráfico de barras - Recebimentos por mês (últimos 12 meses)
-    # 1 query com TruncMonth em vez de 2 queries × 12 meses
+    # Dados para gráfico de barras - Recebimentos por mês (últimos 12 meses),
+    # vencimentos até hoje
     meses = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
     inicio_12m = (hoje - relativedelta(months=11)).replace(day=1)
-    receb_por_mes = {
-        row['mes']: row
-        for row in parcelas_qs.filter(
-            data_vencimento__gte=inicio_12m,
-            data_vencimento__lte=hoje,
-        ).annotate(mes=TruncMonth('data_vencimento')).values('mes').annotate(
-            recebido=Sum('valor_pago', filter=Q(pago=True)),
-            esperado=Sum('valor_atual'),
-        ).order_by('mes')
-    }
+    ate_hoje = ResumoRecebiveisMensal.serie(imobiliarias, inicio_12m, hoje, hoje=hoje, ate_hoje=True)
 
     recebimentos_mensais = {'labels': [], 'recebido': [], 'esperado': []}
     for i in range(11, -1, -1):
         data = hoje - relativedelta(months=i)
         chave = data.replace(day=1)
-        row = receb_por_mes.get(chave, {})
+        row = ate_hoje.get(chave, {})
         recebimentos_mensais['labels'].append(f"{meses[data.month-1]}/{data.year % 100}")
-        recebimentos_mensais['recebido'].append(float(row.get('recebido') or 0))
-        recebimentos_mensais['esperado'].append(float(row.get('esperado') or 0))
+        recebimentos_mensais['recebido'].append(float(row.get('valor_realizado') or 0))
+        recebimentos_mensais['esperado'].append(float(row.get('valor_previsto') or 0))
 
     # Dados para gráfico de linha - Inadimplência por mês
-    # 1 query com TruncMonth em vez de 1 query × 12 meses
-    inad_por_mes = {
-        row['mes']: row
-        for row in parcelas_qs.filter(
-            pago=False,
-            data_vencimento__gte=inicio_12m,
-            data_vencimento__lt=hoje,
-        ).annotate(mes=TruncMonth('data_vencimento')).values('mes').annotate(
-            total=Sum('valor_atual'),
-            quantidade=Count('id'),
-        ).order_by('mes')
-    }
-
     inadimplencia_mensal = {'labels': [], 'valores': [], 'quantidades': []}
     for i in range(11, -1, -1):
         data = hoje - relativedelta(months=i)
         chave = data.replace(day=1)
-        row = inad_por_mes.get(chave, {})
+        row = ate_hoje.get(chave, {})
         inadimplencia_mensal['labels'].append(f"{meses[data.month-1]}/{data.year % 100}")
-        inadimplencia_mensal['valores'].append(float(row.get('total') or 0))
-        inadimplencia_mensal['quantidades'].append(row.get('quantidade') or 0)
-
-    # Tabela vencimentos consolidados - próximos 3 meses — 1 query com TruncMonth
-    inicio_3m = hoje.replace(day=1)
-    fim_3m = (inicio_3m + relativedelta(months=3)) - timedelta(days=1)
-    venc_por_mes = {
-        row['mes']: row
-        for row in parcelas_qs.filter(
-            pago=False,
-            data_vencimento__gte=inicio_3m,
-            data_vencimento__lte=fim_3m,
-        ).annotate(mes=TruncMonth('data_vencimento')).values('mes').annotate(
-            total_valor=Sum('valor_atual'),
-            quantidade=Count('id'),
-        ).order_by('mes')
-    }
+        inadimplencia_mensal['valores'].append(float(row.get('valor_vencido') or 0))
+        inadimplencia_mensal['quantidades'].append(row.get('qtd_vencidas') or 0)
+
+    # Série completa (mês inteiro) para vencimentos próximos e fluxo de caixa
+    inicio_fluxo = (hoje - relativedelta(months=5)).replace(day=1)
+    fim_fluxo = (hoje + relativedelta(months=6, day=1)) - timedelta(days=1)
+    serie = ResumoRecebiveisMensal.serie(imobiliarias, inicio_fluxo, fim_fluxo, hoje=hoje)
+
+    # Tabela vencimentos consolidados - próximos 3 meses
     vencimentos_proximos = []
     for i in range(3):
         data = hoje + relativedelta(months=i)
         chave = data.replace(day=1)
-        row = venc_por_mes.get(chave, {})
+        row = serie.get(chave, {})
         vencimentos_proximos.append({
             'mes': f"{meses[data.month - 1]}/{data.year}",
-            'quantidade': row.get('quantidade') or 0,
-            'valor_total': float(row.get('total_valor') or 0),
+            'quantidade': row.get('qtd_abertas') or 0,
+            'valor_total': float(row.get('valor_aberto') or 0),
         })
 
     # G-02: Inadimplência por faixa de atraso — 1 aggregate em vez de 4 queries
@@ -461,18 +434,10 @@ def api_dashboard_dados(request):
         'colors': ['#ffc107', '#fd7e14', '#dc3545', '#6f1212'],
     }
 
-    # G-03: Fluxo de caixa previsto vs. realizado — 1 query com TruncMonth (12 queries → 1)
-    inicio_fluxo = (hoje - relativedelta(months=5)).replace(day=1)
-    fim_fluxo = (hoje + relativedelta(months=6, day=1)) - timedelta(days=1)
+    # G-03: Fluxo de caixa previsto vs. realizado
     fluxo_por_mes = {
-        row['mes']: row
-        for row in parcelas_qs.filter(
-            data_vencimento__gte=inicio_fluxo,
-            data_vencimento__lte=fim_fluxo,
-        ).annotate(mes=TruncMonth('data_vencimento')).values('mes').annotate(
-            previsto=Sum('valor_atual'),
-            realizado=Sum('valor_pago', filter=Q(pago=True)),
-        ).order_by('mes')
+        mes: {'previsto': row['valor_previsto'], 'realizado': row['valor_realizado']}
+        for mes, row in serie.items()
     }
     fluxo_caixa = {'labels': [], 'realizado': [], 'previsto': [], 'is_future': []}
     for i in range(-5, 7):
@@ -632,20 +597,19 @@ def listar_parcelas(request):
     except (ValueError, TypeError):
         per_page = 25
 
-    paginator = Paginator(parcelas, per_page)
+    # Juros/multa do dia calculados no SELECT da página (com_valores_hoje)
+    paginator = Paginator(parcelas.com_valores_hoje(hoje), per_page)
     page_number = request.GET.get('page', 1)
     try:
         page_obj = paginator.get_page(page_number)
     except Exception:
         page_obj = paginator.get_page(1)
 
-    # Calcular juros/multa dinâmico para parcelas vencidas não pagas na página atual
     for p in page_obj:
         if not p.pago and p.data_vencimento < hoje:
-            juros, multa = p.calcular_juros_multa(hoje)
-            p.juros_dinamico = juros
-            p.multa_dinamico = multa
-            p.total_com_encargos = p.valor_atual + juros + multa
+            p.juros_dinamico = p.juros_hoje
+            p.multa_dinamico = p.multa_hoje
+            p.total_com_encargos = p.valor_atual + p.juros_hoje + p.multa_hoje
         else:
             p.juros_dinamico = None
             p.multa_dinamico = None
@@ -1094,17 +1058,18 @@ def dashboard_imobiliaria(request, imobiliaria_id):
         contrato__imovel__imobiliaria=imobiliaria
     )
 
-    # Estatísticas gerais
-    stats_geral = parcelas_imob.aggregate(
-        total=Count('id'),
-        pagas=Count('id', filter=Q(pago=True)),
-        pendentes=Count('id', filter=Q(pago=False)),
-        vencidas=Count('id', filter=Q(pago=False, data_vencimento__lt=hoje)),
-        valor_total=Sum('valor_atual'),
-        valor_recebido=Sum('valor_pago', filter=Q(pago=True)),
-        valor_pendente=Sum('valor_atual', filter=Q(pago=False)),
-        valor_vencido=Sum('valor_atual', filter=Q(pago=False, data_vencimento__lt=hoje)),
-    )
+    # Estatísticas gerais — do resumo mensal de recebíveis
+    totais = ResumoRecebiveisMensal.totais([imobiliaria.pk], hoje=hoje)
+    stats_geral = {
+        'total': totais['qtd_parcelas'],
+        'pagas': totais['qtd_pagas'],
+        'pendentes': totais['qtd_abertas'],
+        'vencidas': totais['qtd_vencidas'],
+        'valor_total': totais['valor_previsto'],
+        'valor_recebido': totais['valor_realizado'],
+        'valor_pendente': totais['valor_aberto'],
+        'valor_vencido': totais['valor_vencido'],
+    }
 
     # Parcelas do mês atual
     parcelas_mes = parcelas_imob.filter(
@@ -1498,20 +1463,22 @@ def download_boleto(request, hid):
     parcela = get_object_or_404(Parcela.objects.select_related('contrato__imobiliaria'), pk=pk)
     verificar_acesso_tenant(request, parcela.contrato.imobiliaria)
 
-    if not parcela.boleto_pdf:
+    from financeiro.services.pdf_store import resposta_pdf_parcela, tem_pdf_armazenado
+
+    if not parcela.boleto_pdf and not tem_pdf_armazenado(parcela):
         messages.error(request, 'Boleto não disponível para download.')
         return redirect('financeiro:detalhe_parcela', hid=hid)
 
-    # Se o arquivo não existir no disco (storage efêmero do Render), serve do banco de dados
-    if not parcela.boleto_pdf.storage.exists(parcela.boleto_pdf.name):
+    # Se o arquivo não existir no disco (storage efêmero do Render), serve do
+    # store por conteúdo ou do banco de dados
+    if not parcela.boleto_pdf or not parcela.boleto_pdf.storage.exists(parcela.boleto_pdf.name):
         logger.warning(
-            "Arquivo de boleto ausente no storage (%s), buscando do banco de dados...",
+            "Arquivo de boleto ausente no storage (%s), buscando a cópia armazenada...",
             parcela.boleto_pdf.name
         )
-        if parcela.boleto_pdf_db:
-            filename = f'boleto_{parcela.contrato.numero_contrato}_{parcela.numero_parcela}.pdf'
-            response = HttpResponse(bytes(parcela.boleto_pdf_db), content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        filename = f'boleto_{parcela.contrato.numero_contrato}_{parcela.numero_parcela}.pdf'
+        response = resposta_pdf_parcela(parcela, filename)
+        if response is not None:
             return response
 
         # Sem cópia em DB: tenta regenerar via BRCobrança (usa Parcela.gerar_boleto para
@@ -3891,10 +3858,12 @@ def api_parcelas_elegibilidade(request, contrato_id):
 
 
 def _api_parcelas_elegibilidade_logic(request, contrato_id):
+    # Bloqueio por reajuste materializado em dia antes de ler o contrato
+    Contrato.garantir_bloqueios_reajuste(Contrato.objects.filter(pk=contrato_id))
     contrato = get_object_or_404(Contrato, pk=contrato_id)
 
-    # Obter todas as parcelas nao pagas
-    parcelas = contrato.parcelas.filter(pago=False).order_by('numero_parcela')
+    # Obter todas as parcelas nao pagas, já com a liberação por reajuste
+    parcelas = contrato.parcelas.filter(pago=False).com_liberacao_reajuste().order_by('numero_parcela')
 
     # Verificar se o tipo de correcao e FIXO (sem reajuste necessario)
     tipo_correcao_fixo = contrato.tipo_correcao == TipoCorrecao.FIXO
@@ -3919,11 +3888,17 @@ def _api_parcelas_elegibilidade_logic(request, contrato_id):
     for parcela in parcelas:
         ciclo_parcela = contrato.calcular_ciclo_parcela(parcela.numero_parcela)
 
-        # Elegibilidade — FONTE ÚNICA: contrato.pode_gerar_boleto() (mesma regra
-        # de HU-03/HU-24 e do gerar_carne). NÃO recalcular aqui: ciclos futuros
-        # ainda não vencidos são liberados; só bloqueia reajuste efetivamente
-        # pendente (cascata). Garante que o preview concorde com a geração.
-        pode_gerar, motivo = contrato.pode_gerar_boleto(parcela.numero_parcela)
+        # Elegibilidade — mesma regra de contrato.pode_gerar_boleto() (HU-03/HU-24
+        # e gerar_carne), lida do bloqueio materializado no SELECT
+        # (liberada_reajuste): ciclos futuros ainda não vencidos são liberados;
+        # só bloqueia reajuste efetivamente pendente (cascata).
+        pode_gerar = parcela.liberada_reajuste
+        if not pode_gerar:
+            motivo = contrato.motivo_bloqueio_reajuste()
+        elif tipo_correcao_fixo:
+            motivo = "Índice FIXO — sem necessidade de reajuste."
+        else:
+            motivo = "Liberado para geração."
         if not pode_gerar and primeiro_ciclo_bloqueado is None:
             primeiro_ciclo_bloqueado = ciclo_parcela
 
@@ -4592,12 +4567,14 @@ def aplicar_reajuste_contrato(request, contrato_id):
                 return JsonResponse({'sucesso': False, 'erro': 'Parcela inicial deve ser menor ou igual a parcela final'}, status=400)
 
             ciclo = contrato.ciclo_reajuste_atual + 1
+            # percentual é gravado líquido do desconto (ver Reajuste.percentual_liquido)
+            desc_pct = Decimal(str(desconto_percentual)) if desconto_percentual else Decimal('0')
 
             reajuste = Reajuste.objects.create(
                 contrato=contrato,
                 data_reajuste=timezone.now().date(),
                 indice_tipo=indice_tipo,
-                percentual=percentual,
+                percentual=max(Decimal('0'), percentual - desc_pct) if desc_pct else percentual,
                 percentual_bruto=percentual,
                 desconto_percentual=Decimal(str(desconto_percentual)) if desconto_percentual else None,
                 desconto_valor=Decimal(str(desconto_valor)) if desconto_valor else None,
@@ -4652,46 +4629,54 @@ def reajustes_pendentes(request):
     Para cada contrato calcula: percentual do índice, prestação atual do
     ciclo e estimativa da prestação nova.
     """
-    from contratos.models import Contrato as ContratoModel, IndiceReajuste, TabelaJurosContrato
+    from contratos.models import Contrato as ContratoModel
 
-    contratos_ativos = ContratoModel.objects.filter(
+    contratos_ativos = list(ContratoModel.objects.filter(
         status=StatusContrato.ATIVO
     ).select_related('comprador', 'imobiliaria', 'imovel').order_by(
         'imobiliaria__nome', 'data_contrato'
-    )
+    ))
+    ciclos = Reajuste.ciclos_pendentes(contratos_ativos)
+    contratos_pendentes = [c for c in contratos_ativos if c.pk in ciclos]
 
-    pendentes = []
-    for contrato in contratos_ativos:
-        ciclo = Reajuste.calcular_ciclo_pendente(contrato)
-        if ciclo is None:
-            continue
+    # Paginação
+    per_page = request.GET.get('per_page', '25')
+    try:
+        per_page = min(int(per_page), 100)
+    except (ValueError, TypeError):
+        per_page = 25
 
-        inicio_ref, fim_ref = Reajuste.calcular_periodo_referencia(contrato, ciclo)
-        prazo = contrato.prazo_reajuste_meses
-        parcela_inicial = (ciclo - 1) * prazo + 1
-        parcela_final = min(ciclo * prazo, contrato.numero_parcelas)
+    paginator = Paginator(contratos_pendentes, per_page)
+    page_obj = paginator.get_page(request.GET.get('page', 1))
 
-        # Busca o índice acumulado do período de referência
-        indice_tipo = contrato.tipo_correcao
-        percentual = IndiceReajuste.get_acumulado_periodo(
-            indice_tipo,
-            inicio_ref.year, inicio_ref.month,
-            fim_ref.year, fim_ref.month,
-        )
-        # Tenta fallback se configurado e índice principal sem dados
-        if percentual is None and contrato.tipo_correcao_fallback:
-            percentual = IndiceReajuste.get_acumulado_periodo(
-                contrato.tipo_correcao_fallback,
-                inicio_ref.year, inicio_ref.month,
-                fim_ref.year, fim_ref.month,
-            )
-            if percentual is not None:
-                indice_tipo = contrato.tipo_correcao_fallback
+    # Preview só dos contratos da página, em lote (consultas constantes)
+    contratos_pagina = list(page_obj)
+    previews = Reajuste.preview_reajuste_lote(contratos_pagina, ciclos)
 
-        # Spread
-        taxa_tabela = TabelaJurosContrato.get_juros_para_ciclo(contrato, ciclo)
-        usa_price = taxa_tabela is not None
-        spread = taxa_tabela if usa_price else (contrato.spread_reajuste or Decimal('0'))
+    # Prestação atual: valor_atual da parcela NORMAL inicial do ciclo
+    iniciais = {
+        c.pk: (ciclos[c.pk] - 1) * c.prazo_reajuste_meses + 1 for c in contratos_pagina
+    }
+    prestacoes_atuais = {
+        (r['contrato_id'], r['numero_parcela']): r['valor_atual']
+        for r in Parcela.objects.filter(
+            contrato_id__in=list(iniciais),
+            numero_parcela__in=set(iniciais.values()),
+            tipo_parcela=TipoParcela.NORMAL,
+        ).values('contrato_id', 'numero_parcela', 'valor_atual')
+    }
+
+    pendentes = []
+    for contrato in contratos_pagina:
+        ciclo = ciclos[contrato.pk]
+        preview = previews[contrato.pk]
+        parcela_inicial = iniciais[contrato.pk]
+        parcela_final = min(ciclo * contrato.prazo_reajuste_meses, contrato.numero_parcelas)
+
+        # Índice acumulado do período de referência (com fallback, se configurado)
+        percentual = preview.get('percentual_bruto')
+        spread = preview['spread']
+        usa_price = preview['tipo_calculo'] != 'SIMPLES'
 
         percentual_final = None
         if percentual is not None:
@@ -4700,14 +4685,7 @@ def reajustes_pendentes(request):
             teto = contrato.reajuste_teto or Decimal('999')
             percentual_final = max(piso, min(teto, perc_com_spread))
 
-        # Prestação atual: primeiro valor_atual do ciclo (parcela NORMAL não paga preferencial)
-        from financeiro.models import Parcela as ParcelaModel  # evita circular
-        parcela_ref = ParcelaModel.objects.filter(
-            contrato=contrato,
-            numero_parcela=parcela_inicial,
-            tipo_parcela=TipoParcela.NORMAL,
-        ).values('valor_atual').first()
-        prestacao_atual = parcela_ref['valor_atual'] if parcela_ref else None
+        prestacao_atual = prestacoes_atuais.get((contrato.pk, parcela_inicial))
 
         # Estimativa da prestação nova (somente modo SIMPLES — Price recalcula PMT)
         prestacao_nova = None
@@ -4719,9 +4697,9 @@ def reajustes_pendentes(request):
             'ciclo': ciclo,
             'parcela_inicial': parcela_inicial,
             'parcela_final': parcela_final,
-            'periodo_referencia_inicio': inicio_ref,
-            'periodo_referencia_fim': fim_ref,
-            'indice_tipo': indice_tipo,
+            'periodo_referencia_inicio': preview['periodo_referencia_inicio'],
+            'periodo_referencia_fim': preview['periodo_referencia_fim'],
+            'indice_tipo': preview['indice_tipo'],
             'percentual': percentual_final,        # None = sem dados ainda
             'percentual_bruto': percentual,        # acumulado puro do índice
             'spread': spread,
@@ -4733,19 +4711,9 @@ def reajustes_pendentes(request):
             'dados_disponiveis': percentual_final is not None,
         })
 
-    # Paginação
-    per_page = request.GET.get('per_page', '25')
-    try:
-        per_page = min(int(per_page), 100)
-    except (ValueError, TypeError):
-        per_page = 25
-
-    paginator = Paginator(pendentes, per_page)
-    page_obj = paginator.get_page(request.GET.get('page', 1))
-
     from itertools import groupby
     pendentes_agrupados = []
-    for imob_nome, grupo in groupby(list(page_obj), key=lambda x: x['contrato'].imobiliaria.nome):
+    for imob_nome, grupo in groupby(pendentes, key=lambda x: x['contrato'].imobiliaria.nome):
         pendentes_agrupados.append({
             'imobiliaria': imob_nome,
             'contratos': list(grupo),
@@ -4753,7 +4721,7 @@ def reajustes_pendentes(request):
 
     context = {
         'pendentes_agrupados': pendentes_agrupados,
-        'total_pendentes': len(pendentes),
+        'total_pendentes': len(contratos_pendentes),
         'page_obj': page_obj,
         'paginator': paginator,
         'is_paginated': paginator.num_pages > 1,
@@ -4805,6 +4773,19 @@ def aplicar_reajuste_lote(request):
             pass
     _contratos_map_lote = {c.id: c for c in Contrato.objects.filter(pk__in=_ids_validos)}
 
+    # Ciclos e previews de todos os contratos de uma vez; aplicar_reajuste
+    # reaproveita o preview em vez de recalcular
+    _ciclos_lote = Reajuste.ciclos_pendentes(_contratos_map_lote.values())
+    try:
+        _previews_lote = Reajuste.preview_reajuste_lote(
+            _contratos_map_lote.values(), _ciclos_lote,
+            desconto_percentual=desconto_percentual,
+            desconto_valor=desconto_valor,
+        )
+    except Exception as e:
+        logger.exception('Erro no preview em lote, calculando contrato a contrato: %s', e)
+        _previews_lote = {}
+
     resultados = []
     total_ok = 0
     total_erro = 0
@@ -4822,7 +4803,7 @@ def aplicar_reajuste_lote(request):
             total_erro += 1
             continue
 
-        ciclo = Reajuste.calcular_ciclo_pendente(contrato)
+        ciclo = _ciclos_lote.get(_cid_int)
         if ciclo is None:
             resultados.append({
                 'contrato_id': contrato_id,
@@ -4834,7 +4815,7 @@ def aplicar_reajuste_lote(request):
             continue
 
         try:
-            preview = Reajuste.preview_reajuste(
+            preview = _previews_lote.get(_cid_int) or Reajuste.preview_reajuste(
                 contrato, ciclo,
                 desconto_percentual=desconto_percentual,
                 desconto_valor=desconto_valor,
@@ -4860,11 +4841,10 @@ def aplicar_reajuste_lote(request):
             total_erro += 1
             continue
 
-        if not contrato.parcelas.filter(
-            numero_parcela__gte=preview['parcela_inicial'],
-            numero_parcela__lte=preview['parcela_final'],
-            pago=False,
-        ).exists():
+        if not any(
+            preview['parcela_inicial'] <= p['numero_parcela'] <= preview['parcela_final']
+            for p in preview['parcelas']
+        ):
             resultados.append({
                 'contrato_id': contrato_id,
                 'numero_contrato': contrato.numero_contrato,
@@ -4896,7 +4876,7 @@ def aplicar_reajuste_lote(request):
                 ip_address=get_client_ip(request),
                 observacoes=observacoes,
             )
-            resultado = reajuste.aplicar_reajuste()
+            resultado = reajuste.aplicar_reajuste(preview=preview)
             registrar_auditoria(
                 request, 'REAJUSTE_APLICADO', 'Contrato', contrato.pk,
                 f'Lote ciclo {ciclo}'
@@ -5105,6 +5085,7 @@ def excluir_reajuste(request, hid):
                 for parcela in parcelas_list:
                     parcela.valor_atual = (parcela.valor_atual / fator_reajuste).quantize(Decimal('0.01'))
             Parcela.objects.bulk_update(parcelas_list, ['valor_atual'])
+            ResumoRecebiveisMensal.atualizar_parcelas(parcelas_list)
 
             # Reverter intermediárias
             intermediarias = list(contrato.intermediarias.filter(
@@ -5277,6 +5258,7 @@ def alterar_indice_reajuste(request, hid):
                     for p in parcelas_list:
                         p.valor_atual = (p.valor_atual / fator_antigo).quantize(Decimal('0.01'))
                 Parcela.objects.bulk_update(parcelas_list, ['valor_atual'])
+                ResumoRecebiveisMensal.atualizar_parcelas(parcelas_list)
 
                 intermediarias = list(contrato.intermediarias.filter(
                     paga=False,
@@ -5631,17 +5613,18 @@ class DashboardContabilidadeView(LoginRequiredMixin, TemplateView):
         )
         context['stats_contratos'] = stats_contratos
 
-        # Estatísticas de parcelas
-        stats_parcelas = parcelas_qs.aggregate(
-            total=Count('id'),
-            pagas=Count('id', filter=Q(pago=True)),
-            pendentes=Count('id', filter=Q(pago=False)),
-            vencidas=Count('id', filter=Q(pago=False, data_vencimento__lt=hoje)),
-            valor_total=Sum('valor_atual'),
-            valor_recebido=Sum('valor_pago', filter=Q(pago=True)),
-            valor_pendente=Sum('valor_atual', filter=Q(pago=False)),
-            valor_vencido=Sum('valor_atual', filter=Q(pago=False, data_vencimento__lt=hoje)),
-        )
+        # Estatísticas de parcelas — do resumo mensal de recebíveis
+        totais = ResumoRecebiveisMensal.totais(imobiliaria_ids, hoje=hoje)
+        stats_parcelas = {
+            'total': totais['qtd_parcelas'],
+            'pagas': totais['qtd_pagas'],
+            'pendentes': totais['qtd_abertas'],
+            'vencidas': totais['qtd_vencidas'],
+            'valor_total': totais['valor_previsto'],
+            'valor_recebido': totais['valor_realizado'],
+            'valor_pendente': totais['valor_aberto'],
+            'valor_vencido': totais['valor_vencido'],
+        }
         context['stats_parcelas'] = stats_parcelas
 
         # =========================================================================
@@ -5656,13 +5639,15 @@ class DashboardContabilidadeView(LoginRequiredMixin, TemplateView):
             )
         }
         parcela_por_imob = {
-            row['contrato__imobiliaria_id']: row
-            for row in parcelas_qs.values('contrato__imobiliaria_id').annotate(
-                pendentes=Count('id', filter=Q(pago=False)),
-                vencidas=Count('id', filter=Q(pago=False, data_vencimento__lt=hoje)),
-                valor_pendente=Sum('valor_atual', filter=Q(pago=False)),
-                valor_vencido=Sum('valor_atual', filter=Q(pago=False, data_vencimento__lt=hoje)),
-            )
+            imob_id: {
+                'pendentes': row['qtd_abertas'],
+                'vencidas': row['qtd_vencidas'],
+                'valor_pendente': row['valor_aberto'],
+                'valor_vencido': row['valor_vencido'],
+            }
+            for imob_id, row in ResumoRecebiveisMensal.totais(
+                imobiliaria_ids, hoje=hoje, por_imobiliaria=True
+            ).items()
         }
 
         # Pre-fetch all active contratos + Reajuste records — 2 queries instead of N×M+N
@@ -5817,22 +5802,16 @@ def api_dashboard_contabilidade(request):
         imobiliarias = Imobiliaria.objects.filter(ativo=True)
 
     imobiliaria_ids = imobiliarias.values_list('id', flat=True)
-    parcelas_qs = Parcela.objects.filter(contrato__imobiliaria__in=imobiliaria_ids)
     contratos_qs = Contrato.objects.filter(imobiliaria__in=imobiliaria_ids)
 
     # Dados para gráficos
     meses = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
 
-    # Recebimentos por mês (últimos 12 meses) — 1 query com TruncMonth
+    # Recebimentos por mês (últimos 12 meses) — do resumo mensal de recebíveis
     inicio_12m = (hoje - relativedelta(months=11)).replace(day=1)
     recebimentos_por_mes = {
-        row['mes']: row
-        for row in parcelas_qs.filter(data_vencimento__gte=inicio_12m).annotate(
-            mes=TruncMonth('data_vencimento')
-        ).values('mes').annotate(
-            recebido=Sum('valor_pago', filter=Q(pago=True)),
-            esperado=Sum('valor_atual'),
-        ).order_by('mes')
+        mes: {'recebido': row['valor_realizado'], 'esperado': row['valor_previsto']}
+        for mes, row in ResumoRecebiveisMensal.serie(imobiliaria_ids, inicio_12m, hoje, hoje=hoje).items()
     }
     recebimentos_mensais = {'labels': [], 'recebido': [], 'esperado': []}
     for i in range(11, -1, -1):
@@ -5848,10 +5827,10 @@ def api_dashboard_contabilidade(request):
     imobs_list = list(imobiliarias[:8])
     imob_ids_top8 = [im.id for im in imobs_list]
     dist_por_imob = {
-        row['contrato__imobiliaria']: row['total']
-        for row in parcelas_qs.filter(
-            contrato__imobiliaria__in=imob_ids_top8, pago=False
-        ).values('contrato__imobiliaria').annotate(total=Sum('valor_atual'))
+        imob_id: row['valor_aberto']
+        for imob_id, row in ResumoRecebiveisMensal.totais(
+            imob_ids_top8, hoje=hoje, por_imobiliaria=True
+        ).items()
     }
     distribuicao_imobiliarias = {'labels': [], 'valores': [], 'cores': []}
     for i, imob in enumerate(imobs_list):
@@ -6159,10 +6138,16 @@ def exportar_relatorio(request, tipo):
     # Gerar relatório
     service = RelatorioService()
 
-    if tipo == 'prestacoes_a_pagar':
-        relatorio = service.gerar_relatorio_prestacoes_a_pagar(filtro)
-    elif tipo == 'prestacoes_pagas':
-        relatorio = service.gerar_relatorio_prestacoes_pagas(filtro)
+    if tipo in ('prestacoes_a_pagar', 'prestacoes_pagas'):
+        pago = tipo == 'prestacoes_pagas'
+        if formato == 'json':
+            relatorio = (
+                service.gerar_relatorio_prestacoes_pagas(filtro) if pago
+                else service.gerar_relatorio_prestacoes_a_pagar(filtro)
+            )
+        else:
+            # CSV/Excel/PDF consomem os itens em streaming (memória constante)
+            relatorio = service.gerar_relatorio_prestacoes_streaming(filtro, pago=pago)
     elif tipo == 'posicao_contratos':
         relatorio = service.gerar_relatorio_posicao_contratos(filtro)
     elif tipo == 'previsao_reajustes':
@@ -6179,34 +6164,37 @@ def exportar_relatorio(request, tipo):
     timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
 
     if formato == 'json':
-        conteudo = service.exportar_para_json(relatorio)
-        content_type = 'application/json'
+        response = HttpResponse(service.exportar_para_json(relatorio), content_type='application/json')
         extensao = 'json'
-    elif formato == 'excel' or formato == 'xlsx':
-        try:
-            conteudo = service.exportar_para_excel(relatorio)
-            content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            extensao = 'xlsx'
-        except ImportError as e:
-            logger.exception("Biblioteca openpyxl não disponível para exportação Excel: %s", e)
-            return HttpResponse(str(e), status=500)
-    elif formato == 'pdf':
+    elif formato in ('excel', 'xlsx', 'pdf'):
+        import tempfile
+
+        # Gravado em arquivo temporário e servido em streaming (FileResponse)
+        arquivo = tempfile.TemporaryFile()
         try:
-            conteudo = service.exportar_para_pdf(relatorio)
-            content_type = 'application/pdf'
-            extensao = 'pdf'
+            if formato == 'pdf':
+                service.exportar_para_pdf(relatorio, destino=arquivo)
+                content_type = 'application/pdf'
+                extensao = 'pdf'
+            else:
+                service.exportar_para_excel(relatorio, destino=arquivo)
+                content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+                extensao = 'xlsx'
         except ImportError as e:
-            logger.exception("Biblioteca reportlab não disponível para exportação PDF: %s", e)
+            arquivo.close()
+            logger.exception("Biblioteca de exportação %s não disponível: %s", formato, e)
             return HttpResponse(str(e), status=500)
+        arquivo.seek(0)
+        response = FileResponse(arquivo, content_type=content_type)
     else:
-        conteudo = service.exportar_para_csv(relatorio)
-        content_type = 'text/csv'
+        from django.http import StreamingHttpResponse
+
+        response = StreamingHttpResponse(service.iterar_csv(relatorio), content_type='text/csv')
         extensao = 'csv'
 
     # Criar response
     filename = f'relatorio_{tipo}_{timestamp}.{extensao}'
 
-    response = HttpResponse(conteudo, content_type=content_type)
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
 
     return response
@@ -6382,27 +6370,27 @@ def api_relatorio_resumo(request):
 
     service = RelatorioService()
 
-    # Prestações a pagar (próximos 30 dias)
+    # Prestações a pagar (próximos 30 dias) — só os totais, agregados no banco
     filtro.data_inicio = hoje
     filtro.data_fim = hoje + timedelta(days=30)
-    relatorio_a_pagar = service.gerar_relatorio_prestacoes_a_pagar(filtro)
+    totais_a_pagar = service.totalizar_prestacoes(filtro, pago=False, usar_cache=True)
 
     # Prestações pagas (últimos 30 dias)
     filtro.data_inicio = hoje - timedelta(days=30)
     filtro.data_fim = hoje
-    relatorio_pagas = service.gerar_relatorio_prestacoes_pagas(filtro)
+    totais_pagas = service.totalizar_prestacoes(filtro, pago=True, usar_cache=True)
 
     # Previsão de reajustes
     relatorio_reajustes = service.gerar_relatorio_previsao_reajustes(60)
 
     return JsonResponse({
         'a_pagar': {
-            'total_parcelas': relatorio_a_pagar['totalizador'].total_parcelas if hasattr(relatorio_a_pagar['totalizador'], 'total_parcelas') else 0,
-            'valor_total': float(relatorio_a_pagar['totalizador'].valor_total) if hasattr(relatorio_a_pagar['totalizador'], 'valor_total') else 0,
+            'total_parcelas': totais_a_pagar.total_parcelas,
+            'valor_total': float(totais_a_pagar.valor_total),
         },
         'pagas': {
-            'total_parcelas': relatorio_pagas['totalizador'].total_parcelas if hasattr(relatorio_pagas['totalizador'], 'total_parcelas') else 0,
-            'valor_total': float(relatorio_pagas['totalizador'].valor_total) if hasattr(relatorio_pagas['totalizador'], 'valor_total') else 0,
+            'total_parcelas': totais_pagas.total_parcelas,
+            'valor_total': float(totais_pagas.valor_total),
         },
         'reajustes_pendentes': len(relatorio_reajustes.get('itens', [])),
     })
@@ -7251,6 +7239,9 @@ def api_boletos_lote(request):
         parcelas = Parcela.objects.filter(pk__in=parcela_ids, pago=False)
         if not parcelas.exists():
             return JsonResponse({'sucesso': False, 'erro': 'Nenhuma parcela válida.'}, status=400)
+        # Liberação por reajuste no SELECT, com o bloqueio materializado em dia
+        Contrato.garantir_bloqueios_reajuste(Contrato.objects.filter(pk__in=parcelas.values('contrato_id')))
+        parcelas = parcelas.com_liberacao_reajuste().select_related('contrato')
 
         conta_bancaria = None
         if conta_bancaria_id:
@@ -8042,23 +8033,20 @@ def api_imobiliaria_fluxo_caixa(request, imobiliaria_id):
     hoje = timezone.now().date()
     meses_nomes = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
 
-    base_qs = Parcela.objects.filter(contrato__imobiliaria=imobiliaria)
-
-    # 1 query com TruncMonth em vez de 12 aggregates individuais
+    # Do resumo mensal de recebíveis; o mês corrente vem direto das parcelas
     inicio_fluxo = (hoje - relativedelta(months=5)).replace(day=1)
     fim_fluxo = (hoje + relativedelta(months=6, day=1)) - timedelta(days=1)
     fluxo_por_mes = {
-        row['mes']: row
-        for row in base_qs.filter(
-            data_vencimento__gte=inicio_fluxo,
-            data_vencimento__lte=fim_fluxo,
-        ).annotate(mes=TruncMonth('data_vencimento')).values('mes').annotate(
-            esperado=Sum('valor_atual'),
-            recebido=Sum('valor_pago', filter=Q(pago=True)),
-            qtd_total=Count('id'),
-            qtd_pago=Count('id', filter=Q(pago=True)),
-            qtd_vencido=Count('id', filter=Q(pago=False, data_vencimento__lt=hoje)),
-        ).order_by('mes')
+        mes: {
+            'esperado': row['valor_previsto'],
+            'recebido': row['valor_realizado'],
+            'qtd_total': row['qtd_parcelas'],
+            'qtd_pago': row['qtd_pagas'],
+            'qtd_vencido': row['qtd_vencidas'],
+        }
+        for mes, row in ResumoRecebiveisMensal.serie(
+            [imobiliaria.pk], inicio_fluxo, fim_fluxo, hoje=hoje
+        ).items()
     }
 
     meses = []
@@ -8486,6 +8474,7 @@ def simulador_antecipacao(request, contrato_id):
                     ['pago', 'data_pagamento', 'valor_pago', 'valor_desconto',
                      'status_boleto', 'data_pagamento_boleto', 'valor_pago_boleto'],
                 )
+                ResumoRecebiveisMensal.atualizar_parcelas(item['parcela'] for item in preview_itens)
                 HistoricoPagamento.objects.bulk_create(historicos)
 
             messages.success(
@@ -8936,9 +8925,9 @@ def download_boleto_publico(request, token):
 
     filename = f'boleto_parcela_{parcela.numero_parcela}.pdf'
 
-    if parcela.boleto_pdf_db:
-        response = HttpResponse(bytes(parcela.boleto_pdf_db), content_type='application/pdf')
-        response['Content-Disposition'] = f'inline; filename="{filename}"'
+    from financeiro.services.pdf_store import resposta_pdf_parcela
+    response = resposta_pdf_parcela(parcela, filename, disposition='inline')
+    if response is not None:
         response['X-Robots-Tag'] = 'noindex, nofollow'
         response['Cache-Control'] = 'private, no-store'
         return response
@@ -9103,6 +9092,19 @@ def _processar_evento_pix(end_to_end_id, txid, valor_str, horario_str,
         }
 
 
+def _args_evento_pix(evento):
+    """Argumentos de _processar_evento_pix para um evento do array "pix"."""
+    return {
+        'end_to_end_id': str(evento.get('endToEndId', '')).strip(),
+        'txid': str(evento.get('txid', '')).strip(),
+        'valor_str': str(evento.get('valor', '0')).strip(),
+        'horario_str': str(evento.get('horario', '')).strip(),
+        'pagador': evento.get('pagador', {}),
+        'info_pagador': str(evento.get('infoPagador', '')).strip(),
+        'payload_raw': _json_module.dumps(evento, ensure_ascii=False),
+    }
+
+
 @csrf_exempt
 @require_POST
 def webhook_pix(request):
@@ -9114,8 +9116,12 @@ def webhook_pix(request):
     Fail-closed em produção: token vazio ⇒ 503 (o webhook dá baixa em parcela;
     sem autenticação configurada não pode aceitar POST anônimo). Em DEBUG a
     validação é pulada (dev/staging).
+
+    Com WEBHOOK_INBOX os eventos vão para a caixa de entrada (WebhookInbox) e a
+    resposta é 202; a baixa roda no worker (financeiro.services.webhook_inbox).
     """
-    from .models import EventoPIX
+    from .models import WebhookInbox
+    from .services import webhook_inbox
     import hmac as _hmac
 
     token_esperado = getattr(_settings, 'PIX_WEBHOOK_TOKEN', '')
@@ -9142,22 +9148,30 @@ def webhook_pix(request):
     if not isinstance(eventos_pix, list):
         eventos_pix = [eventos_pix]
 
+    if webhook_inbox.ativa():
+        # Fast-ack: grava cada evento na caixa de entrada e responde 202
+        enfileirados = []
+        for evento in eventos_pix:
+            end_to_end_id = str(evento.get('endToEndId', '')).strip()
+            if not end_to_end_id:
+                enfileirados.append({'erro': 'endToEndId ausente no evento'})
+                continue
+            registro, criado = webhook_inbox.registrar(
+                WebhookInbox.ORIGEM_PIX, end_to_end_id,
+                _chave_ordem_cobranca(txid=str(evento.get('txid', '')).strip()) or end_to_end_id,
+                _json_module.dumps(evento, ensure_ascii=False),
+            )
+            enfileirados.append({'endToEndId': end_to_end_id, 'inbox_id': registro.pk,
+                                 'status': 'enfileirado' if criado else 'duplicado'})
+        return JsonResponse({'enfileirados': enfileirados}, status=202)
+
     resultados = []
     for evento in eventos_pix:
         end_to_end_id = str(evento.get('endToEndId', '')).strip()
         if not end_to_end_id:
             resultados.append({'erro': 'endToEndId ausente no evento'})
             continue
-        resultado = _processar_evento_pix(
-            end_to_end_id=end_to_end_id,
-            txid=str(evento.get('txid', '')).strip(),
-            valor_str=str(evento.get('valor', '0')).strip(),
-            horario_str=str(evento.get('horario', '')).strip(),
-            pagador=evento.get('pagador', {}),
-            info_pagador=str(evento.get('infoPagador', '')).strip(),
-            payload_raw=_json_module.dumps(evento, ensure_ascii=False),
-        )
-        resultados.append(resultado)
+        resultados.append(_processar_evento_pix(**_args_evento_pix(evento)))
 
     return JsonResponse({'processados': resultados}, status=200)
 
@@ -9243,13 +9257,7 @@ def _processar_evento_cobranca(
         return {'status': 'duplicado', 'evento_id': _log('duplicado', paid_at=paid_at, valor=valor).pk}
 
     # Casar com a parcela: cobranca_id -> ext_ref -> txid
-    parcela = None
-    if cobranca_id:
-        parcela = Parcela.objects.filter(cobranca_id=cobranca_id).first()
-    if not parcela and ext_ref:
-        parcela = Parcela.objects.filter(ext_ref=ext_ref).first()
-    if not parcela and txid:
-        parcela = Parcela.objects.filter(pix_txid=txid).first()
+    parcela = _parcela_da_cobranca(Parcela.objects.all(), cobranca_id, ext_ref, txid)
     if not parcela:
         logger.warning('[BoletoAPI webhook] evento sem parcela (cobranca_id=%s ext_ref=%s txid=%s)',
                        cobranca_id, ext_ref, txid)
@@ -9298,6 +9306,46 @@ def _processar_evento_cobranca(
     return {'status': evt.status, 'parcela_id': parcela.pk, 'evento_id': evt.pk}
 
 
+def _parcela_da_cobranca(parcelas, cobranca_id='', ext_ref='', txid=''):
+    """Parcela de um evento da cobrança: cobranca_id -> ext_ref -> txid (None se não casar)."""
+    for campo, valor in (('cobranca_id', cobranca_id), ('ext_ref', ext_ref), ('pix_txid', txid)):
+        if valor:
+            parcela = parcelas.filter(**{campo: valor}).first()
+            if parcela:
+                return parcela
+    return None
+
+
+def _chave_ordem_cobranca(cobranca_id='', ext_ref='', txid='', id_rec=''):
+    """
+    Chave de ordenação na WebhookInbox para um evento de cobrança.
+
+    Eventos da mesma cobrança nem sempre trazem o mesmo identificador (id num,
+    só txid ou ext_ref noutro), então a chave é a parcela casada
+    ('parcela:<pk>'); sem parcela, o primeiro identificador presente.
+    """
+    parcela = _parcela_da_cobranca(Parcela.objects.only('pk'), cobranca_id, ext_ref, txid)
+    if parcela:
+        return f'parcela:{parcela.pk}'
+    return cobranca_id or ext_ref or txid or id_rec
+
+
+def _args_evento_cobranca(payload):
+    """Argumentos de _processar_evento_cobranca para um evento push do Boleto-API."""
+    return {
+        'cobranca_id': str(payload.get('id', '')).strip(),
+        'status_cobranca': str(payload.get('status', '')).strip(),
+        'event': str(payload.get('event', '')).strip(),
+        'paid_at_str': str(payload.get('paid_at', '')).strip(),
+        'valor_str': str(payload.get('valor', '0')).strip(),
+        'payload_raw': _json_module.dumps(payload, ensure_ascii=False),
+        'event_id': str(payload.get('event_id') or payload.get('evento_id') or '').strip(),
+        'ext_ref': str(payload.get('ext_ref', '')).strip(),
+        'txid': str(payload.get('txid', '')).strip(),
+        'id_rec': str(payload.get('idRec') or payload.get('id_rec') or '').strip(),
+    }
+
+
 @csrf_exempt
 @require_POST
 def webhook_boleto_api(request):
@@ -9309,7 +9357,12 @@ def webhook_boleto_api(request):
     Fail-closed em produção: secret vazio ⇒ 503 — o webhook dá baixa em
     parcela; sem HMAC configurado não pode aceitar POST anônimo. Em DEBUG a
     validação é pulada (dev/staging).
+
+    Com WEBHOOK_INBOX o evento vai para a caixa de entrada (WebhookInbox) e a
+    resposta é 202; o processamento roda no worker, em ordem por cobrança.
     """
+    from .models import WebhookInbox
+    from .services import webhook_inbox
     import hashlib as _hashlib
     import hmac as _hmac
     import json as _json_mod
@@ -9335,30 +9388,28 @@ def webhook_boleto_api(request):
     except (ValueError, _json_mod.JSONDecodeError):
         return JsonResponse({'erro': 'JSON inválido'}, status=400)
 
-    cobranca_id = str(payload.get('id', '')).strip()
-    event = str(payload.get('event', '')).strip()
-    event_id = str(payload.get('event_id') or payload.get('evento_id') or '').strip()
-    ext_ref = str(payload.get('ext_ref', '')).strip()
-    txid = str(payload.get('txid', '')).strip()
-    id_rec = str(payload.get('idRec') or payload.get('id_rec') or '').strip()
+    if not isinstance(payload, dict):
+        return JsonResponse({'erro': 'JSON inválido'}, status=400)
+    args = _args_evento_cobranca(payload)
     # Exige ao menos um identificador de casamento (boleto/bolepix/pix). Eventos
     # de pix_automatico são casados por idRec/txid.
-    if not (cobranca_id or ext_ref or txid or id_rec) and not event.startswith('pix_automatico'):
+    chave = args['cobranca_id'] or args['ext_ref'] or args['txid'] or args['id_rec']
+    if not chave and not args['event'].startswith('pix_automatico'):
         return JsonResponse({'erro': 'Identificador ausente (id/ext_ref/txid)'}, status=400)
 
-    resultado = _processar_evento_cobranca(
-        cobranca_id=cobranca_id,
-        status_cobranca=str(payload.get('status', '')).strip(),
-        event=event,
-        paid_at_str=str(payload.get('paid_at', '')).strip(),
-        valor_str=str(payload.get('valor', '0')).strip(),
-        payload_raw=_json_mod.dumps(payload, ensure_ascii=False),
-        event_id=event_id,
-        ext_ref=ext_ref,
-        txid=txid,
-        id_rec=id_rec,
-    )
-    return JsonResponse(resultado, status=200)
+    if webhook_inbox.ativa():
+        # Fast-ack: grava o evento na caixa de entrada e responde 202
+        # Ordem por parcela: os identificadores variam entre eventos da mesma cobrança
+        registro, criado = webhook_inbox.registrar(
+            WebhookInbox.ORIGEM_BOLETO_API,
+            args['event_id'] or webhook_inbox.id_do_corpo(raw_body),
+            _chave_ordem_cobranca(args['cobranca_id'], args['ext_ref'], args['txid'], args['id_rec']),
+            args['payload_raw'],
+        )
+        return JsonResponse({'status': 'enfileirado' if criado else 'duplicado',
+                             'inbox_id': registro.pk}, status=202)
+
+    return JsonResponse(_processar_evento_cobranca(**args), status=200)
 
 
 @login_required
@@ -9593,9 +9644,6 @@ def api_dashboard_executivo(request):
     """
     34.5.4 — API para o dashboard executivo: receita prevista × realizada × inadimplência (12 meses).
     """
-    from django.db.models import Sum, Count, Q
-    from django.db.models.functions import TruncMonth
-
     hoje = timezone.now().date()
 
     # Filtra por imobiliárias acessíveis ao usuário (tenant isolation)
@@ -9612,23 +9660,12 @@ def api_dashboard_executivo(request):
             return JsonResponse({'erro': 'imobiliaria_id inválido'}, status=400)
     imobiliaria_ids = imobiliarias_qs.values_list('id', flat=True)
 
-    parcelas_qs = Parcela.objects.filter(contrato__imobiliaria__in=imobiliaria_ids)
-
     inicio_12m = (hoje - relativedelta(months=11)).replace(day=1)
     meses_labels = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
 
-    # Receita prevista × realizada por mês (12 meses anteriores incluindo atual)
-    por_mes = {
-        row['mes']: row
-        for row in parcelas_qs.filter(
-            data_vencimento__gte=inicio_12m,
-            data_vencimento__lte=hoje,
-        ).annotate(mes=TruncMonth('data_vencimento')).values('mes').annotate(
-            realizado=Sum('valor_pago', filter=Q(pago=True)),
-            previsto=Sum('valor_atual'),
-            inadimplente=Sum('valor_atual', filter=Q(pago=False, data_vencimento__lt=hoje)),
-        )
-    }
+    # Receita prevista × realizada por mês (12 meses anteriores incluindo atual),
+    # do resumo mensal de recebíveis
+    por_mes = ResumoRecebiveisMensal.serie(imobiliaria_ids, inicio_12m, hoje, hoje=hoje, ate_hoje=True)
 
     receita_prevista = []
     receita_realizada = []
@@ -9640,17 +9677,12 @@ def api_dashboard_executivo(request):
         chave = data.replace(day=1)
         row = por_mes.get(chave) or {}
         labels.append(f"{meses_labels[data.month - 1]}/{data.year % 100}")
-        receita_prevista.append(float(row.get('previsto') or 0))
-        receita_realizada.append(float(row.get('realizado') or 0))
-        inadimplencia_serie.append(float(row.get('inadimplente') or 0))
+        receita_prevista.append(float(row.get('valor_previsto') or 0))
+        receita_realizada.append(float(row.get('valor_realizado') or 0))
+        inadimplencia_serie.append(float(row.get('valor_vencido') or 0))
 
     # KPIs consolidados
-    agg = parcelas_qs.aggregate(
-        total_previsto=Sum('valor_atual', filter=Q(pago=False)),
-        total_recebido=Sum('valor_pago', filter=Q(pago=True)),
-        total_vencido=Sum('valor_atual', filter=Q(pago=False, data_vencimento__lt=hoje)),
-        count_vencido=Count('id', filter=Q(pago=False, data_vencimento__lt=hoje)),
-    )
+    totais = ResumoRecebiveisMensal.totais(imobiliaria_ids, hoje=hoje)
     contratos_ativos = Contrato.objects.filter(
         imobiliaria__in=imobiliaria_ids, status=StatusContrato.ATIVO
     ).count()
@@ -9662,9 +9694,9 @@ def api_dashboard_executivo(request):
         'inadimplencia': inadimplencia_serie,
         'kpis': {
             'contratos_ativos': contratos_ativos,
-            'total_previsto': float(agg['total_previsto'] or 0),
-            'total_recebido': float(agg['total_recebido'] or 0),
-            'total_vencido': float(agg['total_vencido'] or 0),
-            'count_vencido': agg['count_vencido'] or 0,
+            'total_previsto': float(totais['valor_aberto']),
+            'total_recebido': float(totais['valor_realizado']),
+            'total_vencido': float(totais['valor_vencido']),
+            'count_vencido': totais['qtd_vencidas'],
         },
     })
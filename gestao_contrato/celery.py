@@ -16,6 +16,14 @@ def debug_task(self):
 
 # Configuração de tarefas periódicas
 app.conf.beat_schedule = {
+    'atualizar-bloqueios-reajuste-diario': {
+        'task': 'financeiro.tasks.atualizar_bloqueios_reajuste',
+        'schedule': crontab(hour=0, minute=15),  # Diariamente, após a virada do dia
+    },
+    'reconstruir-resumo-recebiveis-diario': {
+        'task': 'financeiro.tasks.reconstruir_resumo_recebiveis',
+        'schedule': crontab(hour=0, minute=30),  # Diariamente, rede de segurança do resumo
+    },
     'processar-reajustes-diario': {
         'task': 'financeiro.tasks.processar_reajustes_pendentes',
         'schedule': crontab(hour=1, minute=0),  # Executa diariamente à 1h
@@ -29,6 +37,10 @@ app.conf.beat_schedule = {
         'task': 'financeiro.tasks.polling_boletos_sicoob',
         'schedule': crontab(minute=15),  # a cada hora (Sicoob não tem webhook de boleto)
     },
+    'boleto-api-webhook-inbox': {
+        'task': 'financeiro.tasks.processar_webhook_inbox',
+        'schedule': crontab(),  # a cada minuto — eventos gravados no modo fast-ack
+    },
     'boleto-api-conciliar-pix': {
         'task': 'financeiro.tasks.conciliar_pix_recebidos',
         'schedule': crontab(hour=6, minute=0),  # diário — rede de segurança do webhook
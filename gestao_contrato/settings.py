@@ -183,6 +183,12 @@ else:
         }
     }
 
+# Busca global: no PostgreSQL usa o índice GIN de trigramas (extensão pg_trgm,
+# criada pela migração core 0025). False = tabela de trigramas própria, como nos
+# demais bancos (ex.: sem permissão para CREATE EXTENSION; rode depois
+# `python manage.py reconstruir_indice_busca`).
+BUSCA_GLOBAL_PG_TRGM = config('BUSCA_GLOBAL_PG_TRGM', default=True, cast=bool)
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -236,6 +242,14 @@ STORAGES = {
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
     },
+    # PDFs de boleto por conteúdo (financeiro.services.pdf_store). Diretório local
+    # por padrão; para S3 aponte o BACKEND para storages.backends.s3.S3Storage.
+    "boleto_pdfs": {
+        "BACKEND": config(
+            'BOLETO_PDF_STORAGE_BACKEND', default='django.core.files.storage.FileSystemStorage'
+        ),
+        "OPTIONS": {"location": config('BOLETO_PDF_STORAGE_DIR', default=str(BASE_DIR / 'media' / 'boleto_pdfs'))},
+    },
 }
 
 MEDIA_URL = '/media/'
@@ -353,8 +367,39 @@ SPECTACULAR_SETTINGS = {
 NOTIFICACAO_DIAS_ANTECEDENCIA = 5
 NOTIFICACAO_DIAS_INADIMPLENCIA = 3
 
+# Envio de e-mail em lote (notificacoes.services.DespachanteEmail): mensagens por
+# conexão SMTP antes de reabri-la, e idade máxima (s) da ConfiguracaoEmail ativa
+# em cache no processo (os signals de ConfiguracaoEmail invalidam na hora)
+EMAIL_MENSAGENS_POR_CONEXAO = config('EMAIL_MENSAGENS_POR_CONEXAO', default=100, cast=int)
+EMAIL_CONFIG_CACHE_TTL = config('EMAIL_CONFIG_CACHE_TTL', default=300, cast=int)
+
+# Fila de notificações (notificacoes.fila): lote reservado por worker, duração da
+# reserva (s), envios simultâneos por canal (1 = sequencial) e reenvio com backoff
+# exponencial — base × 2^(tentativa−1) segundos, até o teto — até o máximo de tentativas
+NOTIFICACOES_LOTE_FILA = config('NOTIFICACOES_LOTE_FILA', default=100, cast=int)
+NOTIFICACOES_LEASE_SEGUNDOS = config('NOTIFICACOES_LEASE_SEGUNDOS', default=300, cast=int)
+NOTIFICACOES_CONCORRENCIA_EMAIL = config('NOTIFICACOES_CONCORRENCIA_EMAIL', default=1, cast=int)
+NOTIFICACOES_CONCORRENCIA_SMS = config('NOTIFICACOES_CONCORRENCIA_SMS', default=1, cast=int)
+NOTIFICACOES_CONCORRENCIA_WHATSAPP = config('NOTIFICACOES_CONCORRENCIA_WHATSAPP', default=1, cast=int)
+NOTIFICACOES_MAX_TENTATIVAS = config('NOTIFICACOES_MAX_TENTATIVAS', default=3, cast=int)
+NOTIFICACOES_RETRY_BASE_SEGUNDOS = config('NOTIFICACOES_RETRY_BASE_SEGUNDOS', default=60, cast=int)
+NOTIFICACOES_RETRY_MAX_SEGUNDOS = config('NOTIFICACOES_RETRY_MAX_SEGUNDOS', default=3600, cast=int)
+
+# Séries de índices (IPCA, IGPM...) em cache no processo: idade máxima em segundos.
+# A versão compartilhada no cache do Django invalida na hora; o TTL só limita a
+# defasagem quando o cache não é compartilhado entre processos (LocMem).
+INDICES_SERIE_CACHE_TTL = config('INDICES_SERIE_CACHE_TTL', default=300, cast=int)
+
+# Calendário de dias úteis (vencimentos, prazos de remessa): feriados estaduais/
+# municipais além dos nacionais, separados por vírgula — 'DD/MM' (todo ano) ou
+# 'AAAA-MM-DD' (data única). Ex.: FERIADOS_LOCAIS=20/11,09/07
+FERIADOS_LOCAIS = config('FERIADOS_LOCAIS', default='', cast=Csv())
+
 # Tarefas Agendadas
 TASK_TOKEN = None
+# Juros/multa diários: 'sql' (UPDATE no banco, em faixas de id) ou 'python' (referência)
+JUROS_MULTA_MOTOR = config('JUROS_MULTA_MOTOR', default='sql')
+JUROS_MULTA_CHUNK_SIZE = config('JUROS_MULTA_CHUNK_SIZE', default=5000, cast=int)
 
 # BRCobrança
 BRCOBRANCA_URL = config('BRCOBRANCA_URL', default='http://localhost:9292')
@@ -381,16 +426,63 @@ BRCOBRANCA_COLD_START_WAIT = 120
 # Template de renderização: 'prawn' (Ruby nativo, sem GhostScript — recomendado Render Free 512MB)
 # ou '' para usar o padrão da API (GhostScript, melhor qualidade mas +50-100MB RAM por PDF).
 BRCOBRANCA_TEMPLATE = config('BRCOBRANCA_TEMPLATE', default='prawn')
+# Conexões keep-alive por host BRCobrança na session compartilhada (>= workers abaixo)
+BRCOBRANCA_POOL_MAXSIZE = config('BRCOBRANCA_POOL_MAXSIZE', default=10, cast=int)
+# Boletos emitidos em paralelo por gerar_boletos_automaticos (1 = sequencial)
+BOLETOS_AUTOMATICOS_WORKERS = config('BOLETOS_AUTOMATICOS_WORKERS', default=1, cast=int)
+# Contratos por subtask do chord de processar_reajustes_pendentes
+REAJUSTES_CHUNK_SIZE = config('REAJUSTES_CHUNK_SIZE', default=50, cast=int)
+# PDFs de boleto: gravar no store por conteúdo (STORAGES['boleto_pdfs'], deduplicado
+# por SHA-256) em vez de Parcela.boleto_pdf_db. Exige storage persistente (disco ou S3);
+# migre os PDFs existentes com: python manage.py migrar_pdfs_boleto
+BOLETO_PDF_BLOB_STORE = config('BOLETO_PDF_BLOB_STORE', default=False, cast=bool)
+# Retorno CNAB: processar os registros em lote (bulk_create/bulk_update em vez de
+# get_or_create + save por registro). Recomendado para arquivos com milhares de linhas.
+CNAB_RETORNO_EM_LOTE = config('CNAB_RETORNO_EM_LOTE', default=False, cast=bool)
 
 # PIX Webhook — token compartilhado enviado pelo PSP no header Authorization: Bearer <token>
 # Deixe vazio para desabilitar a validação (não recomendado em produção)
 PIX_WEBHOOK_TOKEN = config('PIX_WEBHOOK_TOKEN', default='')
 
+# Webhooks Boleto-API/PIX em modo fast-ack: grava o evento na caixa de entrada
+# (WebhookInbox) e responde 202; o worker (task processar_webhook_inbox ou
+# `manage.py processar_webhook_inbox --continuo`) processa em ordem por cobrança.
+# Lote reservado por worker, duração da reserva (s), threads por worker e reenvio
+# com backoff exponencial — base × 2^(tentativa−1) s, até o teto — até o máximo
+WEBHOOK_INBOX = config('WEBHOOK_INBOX', default=False, cast=bool)
+WEBHOOK_INBOX_LOTE = config('WEBHOOK_INBOX_LOTE', default=100, cast=int)
+WEBHOOK_INBOX_LEASE_SEGUNDOS = config('WEBHOOK_INBOX_LEASE_SEGUNDOS', default=120, cast=int)
+WEBHOOK_INBOX_WORKERS = config('WEBHOOK_INBOX_WORKERS', default=1, cast=int)
+WEBHOOK_INBOX_MAX_TENTATIVAS = config('WEBHOOK_INBOX_MAX_TENTATIVAS', default=5, cast=int)
+WEBHOOK_INBOX_RETRY_BASE_SEGUNDOS = config('WEBHOOK_INBOX_RETRY_BASE_SEGUNDOS', default=30, cast=int)
+WEBHOOK_INBOX_RETRY_MAX_SEGUNDOS = config('WEBHOOK_INBOX_RETRY_MAX_SEGUNDOS', default=1800, cast=int)
+
 # Boleto-API gateway (cobrança registrada C6/Sicoob)
 BOLETO_API_URL = config('BOLETO_API_URL', default='http://localhost:8001')
 BOLETO_API_TIMEOUT = config('BOLETO_API_TIMEOUT', default=30, cast=int)
 BOLETO_API_MAX_TENTATIVAS = config('BOLETO_API_MAX_TENTATIVAS', default=3, cast=int)
 BOLETO_API_DELAY_INICIAL = config('BOLETO_API_DELAY_INICIAL', default=2, cast=int)
+# Conexões keep-alive na session compartilhada do gateway (>= BOLETO_API_CONCORRENCIA)
+BOLETO_API_POOL_MAXSIZE = config('BOLETO_API_POOL_MAXSIZE', default=10, cast=int)
+# Chamadas simultâneas nos jobs diários (polling, conciliação Pix, retentativas); 1 = sequencial
+BOLETO_API_CONCORRENCIA = config('BOLETO_API_CONCORRENCIA', default=8, cast=int)
+# ... e no máximo estas por (tenant, provider), para não estourar o rate limit do banco
+BOLETO_API_CONCORRENCIA_POR_TENANT = config('BOLETO_API_CONCORRENCIA_POR_TENANT', default=4, cast=int)
+# Circuit breaker: falhas seguidas (5xx/conexão) que abrem o circuito do gateway/provider
+# e por quanto tempo (s) as chamadas ficam suspensas antes da chamada de teste
+BOLETO_API_CIRCUITO_FALHAS = config('BOLETO_API_CIRCUITO_FALHAS', default=5, cast=int)
+BOLETO_API_CIRCUITO_ABERTO_SEGUNDOS = config('BOLETO_API_CIRCUITO_ABERTO_SEGUNDOS', default=60, cast=int)
+# Polling Sicoob: consulta diária quando a parcela está a até N dias do vencimento
+# (ou vencida); fora dessa janela, no máximo a cada INTERVALO_MAX_DIAS
+SICOOB_POLLING_JANELA_DIAS = config('SICOOB_POLLING_JANELA_DIAS', default=5, cast=int)
+SICOOB_POLLING_INTERVALO_MAX_DIAS = config('SICOOB_POLLING_INTERVALO_MAX_DIAS', default=7, cast=int)
+# Consultas individuais por execução, as mais urgentes primeiro (0 = sem limite)
+SICOOB_POLLING_MAX_CONSULTAS = config('SICOOB_POLLING_MAX_CONSULTAS', default=0, cast=int)
+# Usar GET /conciliacao como fonte em lote (False se o gateway não tiver o endpoint)
+SICOOB_POLLING_CONCILIACAO = config('SICOOB_POLLING_CONCILIACAO', default=True, cast=bool)
+# Contas cobertas pela conciliação: revisão individual de cada parcela a cada N dias
+# (baixa/cancelamento/expiração no banco não aparecem na conciliação)
+SICOOB_POLLING_REVISAO_DIAS = config('SICOOB_POLLING_REVISAO_DIAS', default=30, cast=int)
 # Segredo HMAC compartilhado entre Django e Boleto-API para assinar eventos push.
 # Deve ser o mesmo valor em EVENT_WEBHOOK_SECRET no Boleto-API.
 EVENT_WEBHOOK_SECRET = config('EVENT_WEBHOOK_SECRET', default='')
@@ -401,6 +493,10 @@ BI_API_TOKEN = config('BI_API_TOKEN', default='')
 # Destinatários dos relatórios automáticos por e-mail (separados por vírgula)
 RELATORIO_INADIMPLENCIA_EMAILS = config('RELATORIO_INADIMPLENCIA_EMAILS', default='', cast=Csv())
 RELATORIO_POSICAO_EMAILS = config('RELATORIO_POSICAO_EMAILS', default='', cast=Csv())
+# Exportação de prestações em streaming: parcelas lidas do banco por lote
+RELATORIO_EXPORT_CHUNK_SIZE = config('RELATORIO_EXPORT_CHUNK_SIZE', default=2000, cast=int)
+# Totalizadores de prestações em cache (segundos), para dashboards/widgets
+RELATORIO_TOTAIS_CACHE_TIMEOUT = config('RELATORIO_TOTAIS_CACHE_TIMEOUT', default=300, cast=int)
 
 # 34.6 — PWA: Web Push (VAPID)
 # Gere com: python -c "from py_vapid import Vapid; v=Vapid(); v.generate_keys(); print(v.public_key, v.private_key)"
@@ -5,3 +5,6 @@ class NotificacoesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notificacoes'
     verbose_name = 'Sistema de Notificações'
+
+    def ready(self):
+        from notificacoes import signals  # noqa: F401 — registra os receivers
@@ -249,9 +249,10 @@ class BoletoNotificacaoService:
                     except Exception as e:
                         logger.warning(f"Não foi possível ler PDF do disco: {e}")
 
-                    if not pdf_bytes and getattr(parcela, 'boleto_pdf_db', None):
+                    if not pdf_bytes:
                         try:
-                            pdf_bytes = bytes(parcela.boleto_pdf_db)
+                            from financeiro.services.pdf_store import pdf_da_parcela
+                            pdf_bytes = pdf_da_parcela(parcela)
                         except Exception as e:
                             logger.warning(f"Não foi possível ler PDF do banco: {e}")
 
@@ -389,16 +390,28 @@ class BoletoNotificacaoService:
         imobiliaria = contrato.imovel.imobiliaria
         agendadas = []
 
-        # --- EMAIL ---
-        if comprador.email and getattr(comprador, 'notificar_email', True):
-            try:
-                template = TemplateNotificacao.get_template(
+        # Template e contexto buscados/renderizados uma vez para os três canais
+        memo = {}
+
+        def template_boleto():
+            if 'template' not in memo:
+                memo['template'] = TemplateNotificacao.get_template(
                     codigo=TipoTemplate.BOLETO_CRIADO,
                     imobiliaria=imobiliaria,
                 )
+            return memo['template']
+
+        def renderizado():
+            if 'campos' not in memo:
+                memo['campos'] = template_boleto().renderizar(self.montar_contexto(parcela))
+            return memo['campos']
+
+        # --- EMAIL ---
+        if comprador.email and getattr(comprador, 'notificar_email', True):
+            try:
+                template = template_boleto()
                 if template:
-                    contexto = self.montar_contexto(parcela)
-                    assunto, corpo_sms, corpo_html, _ = template.renderizar(contexto)
+                    assunto, corpo_sms, corpo_html, _ = renderizado()
                 else:
                     assunto = f"Boleto Gerado - Parcela {parcela.numero_parcela}"
                     corpo_sms = f"Boleto da parcela {parcela.numero_parcela} gerado."
@@ -435,13 +448,9 @@ class BoletoNotificacaoService:
                         numero = '+' + numero
 
                     if len(numero) >= 12:
-                        template = TemplateNotificacao.get_template(
-                            codigo=TipoTemplate.BOLETO_CRIADO,
-                            imobiliaria=imobiliaria,
-                        )
+                        template = template_boleto()
                         if template and template.tem_sms:
-                            contexto = self.montar_contexto(parcela)
-                            _, mensagem_sms, _, _ = template.renderizar(contexto)
+                            _, mensagem_sms, _, _ = renderizado()
                         else:
                             mensagem_sms = (
                                 f"Ola {comprador.nome.split()[0]}, "
@@ -482,13 +491,9 @@ class BoletoNotificacaoService:
                         numero = '+' + numero
 
                     if len(numero) >= 12:
-                        template = TemplateNotificacao.get_template(
-                            codigo=TipoTemplate.BOLETO_CRIADO,
-                            imobiliaria=imobiliaria,
-                        )
+                        template = template_boleto()
                         if template and template.tem_whatsapp:
-                            contexto = self.montar_contexto(parcela)
-                            _, _, _, mensagem_wa = template.renderizar(contexto)
+                            _, _, _, mensagem_wa = renderizado()
                         else:
                             mensagem_wa = (
                                 f"Ola {comprador.nome.split()[0]}, "
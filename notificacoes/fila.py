@@ -0,0 +1,245 @@
+"""
+Consumidor da fila de notificações (Notificacao PENDENTE).
+
+Vários workers podem consumir a fila ao mesmo tempo sem envio duplicado:
+cada um reserva um lote com SELECT ... FOR UPDATE SKIP LOCKED (quando o banco
+suporta) e grava a reserva — reservada_por / reservada_ate — na mesma
+transação. O UPDATE da reserva só pega linhas ainda livres, então em bancos
+sem SKIP LOCKED (SQLite) a exclusividade continua garantida. Uma reserva
+vencida (worker que morreu no meio do lote) volta para a fila.
+
+Um lote pode demorar mais que o lease (timeouts de SMTP/WhatsApp): antes de
+cada envio a reserva é renovada por um UPDATE condicional (ainda minha e
+não vencida) — se outro worker já a tomou, a notificação é pulada — e o
+desfecho só é gravado se a reserva ainda for do worker.
+
+O envio tem concorrência limitada por canal (NOTIFICACOES_CONCORRENCIA_EMAIL,
+_SMS, _WHATSAPP; 1 = sequencial). Falhas reagendam a notificação com backoff
+exponencial (proxima_tentativa_em) até NOTIFICACOES_MAX_TENTATIVAS; depois
+disso ela fica com status ERRO.
+
+Desenvolvedor: Maxwell da Silva Oliveira
+"""
+import logging
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Notificacao, StatusNotificacao, TipoNotificacao
+
+logger = logging.getLogger(__name__)
+
+
+def _param(nome, padrao):
+    try:
+        return max(int(getattr(settings, nome, padrao)), 0)
+    except (TypeError, ValueError):
+        return padrao
+
+
+def identificar_worker():
+    """Identificador do worker para a reserva: host:pid:aleatório."""
+    return f"{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def atraso_retentativa(tentativas):
+    """
+    Espera até a próxima tentativa depois de `tentativas` falhas:
+    base × 2^(tentativas−1), limitada a NOTIFICACOES_RETRY_MAX_SEGUNDOS.
+    """
+    base = _param('NOTIFICACOES_RETRY_BASE_SEGUNDOS', 60)
+    teto = _param('NOTIFICACOES_RETRY_MAX_SEGUNDOS', 3600)
+    return timedelta(seconds=min(base * 2 ** max(tentativas - 1, 0), teto))
+
+
+def _disponiveis(agora):
+    """Notificações que um worker pode reservar agora."""
+    return Notificacao.objects.filter(
+        Q(proxima_tentativa_em__isnull=True) | Q(proxima_tentativa_em__lte=agora),
+        Q(reservada_ate__isnull=True) | Q(reservada_ate__lt=agora),
+        status=StatusNotificacao.PENDENTE,
+        data_agendamento__lte=agora,
+    )
+
+
+def reservar_lote(worker, tamanho=None):
+    """
+    Reserva até `tamanho` notificações para o worker (padrão:
+    NOTIFICACOES_LOTE_FILA), por NOTIFICACOES_LEASE_SEGUNDOS.
+
+    Returns:
+        list[Notificacao]: as notificações reservadas, com parcela/contrato.
+    """
+    tamanho = tamanho or _param('NOTIFICACOES_LOTE_FILA', 100)
+    agora = timezone.now()
+    reservada_ate = agora + timedelta(seconds=_param('NOTIFICACOES_LEASE_SEGUNDOS', 300))
+
+    with transaction.atomic():
+        candidatas = _disponiveis(agora).order_by('data_agendamento', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            candidatas = candidatas.select_for_update(skip_locked=True)
+        ids = list(candidatas.values_list('id', flat=True)[:tamanho])
+        if not ids:
+            return []
+        # Condicional: outro worker pode ter reservado entre o SELECT e o UPDATE
+        # quando o banco não tem SKIP LOCKED
+        _disponiveis(agora).filter(id__in=ids).update(
+            reservada_por=worker, reservada_ate=reservada_ate,
+        )
+
+    return list(
+        Notificacao.objects.filter(id__in=ids, reservada_por=worker, reservada_ate=reservada_ate)
+        .select_related('parcela', 'parcela__contrato')
+        .order_by('data_agendamento', 'id')
+    )
+
+
+class ReservaPerdida(Exception):
+    """A reserva da notificação venceu e ela foi tomada por outro worker."""
+
+
+def renovar_reserva(notif):
+    """
+    Estende a reserva por mais NOTIFICACOES_LEASE_SEGUNDOS se ela ainda for
+    do worker que a pegou e não tiver vencido. False = não enviar.
+    """
+    agora = timezone.now()
+    return Notificacao.objects.filter(
+        pk=notif.pk, reservada_por=notif.reservada_por, reservada_ate__gt=agora,
+        status=StatusNotificacao.PENDENTE,
+    ).update(
+        reservada_ate=agora + timedelta(seconds=_param('NOTIFICACOES_LEASE_SEGUNDOS', 300)),
+    ) == 1
+
+
+def _enviar_sequencial(notificacoes, enviar):
+    """Envia em sequência; devolve [(notificacao, erro | None)]."""
+    from .services import DespachanteEmail
+
+    resultados = []
+    # E-mails da mesma sequência compartilham uma conexão SMTP
+    with DespachanteEmail():
+        for notif in notificacoes:
+            if not renovar_reserva(notif):
+                logger.warning("Notificação %s: reserva de %s vencida/tomada — não enviada",
+                               notif.id, notif.reservada_por)
+                resultados.append((notif, ReservaPerdida()))
+                continue
+            try:
+                enviar(notif)
+                resultados.append((notif, None))
+            except Exception as e:
+                logger.warning("Falha ao enviar notificação %s: %s", notif.id, e)
+                resultados.append((notif, e))
+    return resultados
+
+
+def _enviar_em_thread(notificacoes, enviar):
+    try:
+        return _enviar_sequencial(notificacoes, enviar)
+    finally:
+        connections.close_all()
+
+
+def _enviar_lote(lote, enviar):
+    """
+    Envia o lote com concorrência limitada por canal: as notificações de cada
+    canal são divididas entre até NOTIFICACOES_CONCORRENCIA_<CANAL> threads.
+    """
+    fatias = []
+    for tipo in TipoNotificacao.values:
+        do_canal = [n for n in lote if n.tipo == tipo]
+        vagas = min(max(_param(f'NOTIFICACOES_CONCORRENCIA_{tipo}', 1), 1), len(do_canal))
+        fatias.extend(do_canal[i::vagas] for i in range(vagas))
+    desconhecidas = [n for n in lote if n.tipo not in TipoNotificacao.values]
+    if desconhecidas:
+        fatias.append(desconhecidas)
+
+    if len(fatias) <= 1 or all(
+        _param(f'NOTIFICACOES_CONCORRENCIA_{tipo}', 1) <= 1 for tipo in TipoNotificacao.values
+    ):
+        return [r for fatia in fatias for r in _enviar_sequencial(fatia, enviar)]
+
+    from .services import configuracao_email_ativa
+
+    configuracao_email_ativa()  # carrega no thread principal; as threads leem do cache
+    with ThreadPoolExecutor(max_workers=len(fatias), thread_name_prefix='notificacoes') as pool:
+        futuros = [pool.submit(_enviar_em_thread, fatia, enviar) for fatia in fatias]
+        return [r for futuro in futuros for r in futuro.result()]
+
+
+def _registrar(resultados, estatisticas, worker):
+    """
+    Grava o desfecho de cada envio (no thread principal), só nas notificações
+    ainda reservadas pelo worker.
+    """
+    max_tentativas = max(_param('NOTIFICACOES_MAX_TENTATIVAS', 3), 1)
+    for notif, erro in resultados:
+        if isinstance(erro, ReservaPerdida):
+            estatisticas['perdidas'] += 1
+            continue
+        if erro is None:
+            gravado = notif.marcar_como_enviada(worker=worker)
+            chave = 'enviadas'
+        elif notif.tentativas + 1 >= max_tentativas:
+            gravado = notif.marcar_erro(str(erro), worker=worker)
+            chave = 'erros'
+            estatisticas['falhas'].append((notif.id, notif.tentativas, str(erro), True))
+        else:
+            gravado = notif.reagendar(str(erro), atraso_retentativa(notif.tentativas + 1), worker=worker)
+            chave = 'reagendadas'
+            estatisticas['falhas'].append((notif.id, notif.tentativas, str(erro), False))
+        if gravado:
+            estatisticas[chave] += 1
+        else:
+            logger.warning("Notificação %s: reserva tomada durante o envio — desfecho não gravado",
+                           notif.id)
+            estatisticas['perdidas'] += 1
+
+
+def consumir_fila(enviar, worker=None, tamanho_lote=None, max_lotes=None):
+    """
+    Consome a fila até esvaziá-la (ou até `max_lotes`): reserva um lote, envia
+    e grava o resultado, repetidamente. Pode rodar em vários processos ao
+    mesmo tempo.
+
+    Args:
+        enviar: callable(notificacao) que envia ou levanta exceção.
+        worker: identificador da reserva (padrão: identificar_worker()).
+
+    Returns:
+        dict: enviadas, reagendadas, erros, perdidas (reserva tomada por outro
+            worker), lotes, duracao_s, por_segundo e falhas
+            [(id, tentativas, erro, definitiva)].
+    """
+    worker = worker or identificar_worker()
+    estatisticas = {
+        'enviadas': 0, 'reagendadas': 0, 'erros': 0, 'perdidas': 0, 'lotes': 0, 'falhas': [],
+    }
+    inicio = time.monotonic()
+
+    while max_lotes is None or estatisticas['lotes'] < max_lotes:
+        lote = reservar_lote(worker, tamanho_lote)
+        if not lote:
+            break
+        estatisticas['lotes'] += 1
+        _registrar(_enviar_lote(lote, enviar), estatisticas, worker)
+
+    duracao = time.monotonic() - inicio
+    processadas = estatisticas['enviadas'] + estatisticas['reagendadas'] + estatisticas['erros']
+    estatisticas['duracao_s'] = round(duracao, 3)
+    estatisticas['por_segundo'] = round(processadas / duracao, 2) if duracao > 0 else 0.0
+    logger.info(
+        "Fila de notificações (%s): %d enviadas, %d reagendadas, %d erros em %d lote(s) — %.1f/s",
+        worker, estatisticas['enviadas'], estatisticas['reagendadas'], estatisticas['erros'],
+        estatisticas['lotes'], estatisticas['por_segundo'],
+    )
+    return estatisticas
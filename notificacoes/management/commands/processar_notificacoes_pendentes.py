@@ -30,6 +30,9 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS(
                 f'   Notificações enviadas: {resultado["enviadas"]}'
             ))
+            self.stdout.write(self.style.WARNING(
+                f'   Reagendadas (nova tentativa): {resultado["reagendadas"]}'
+            ))
             self.stdout.write(self.style.ERROR(
                 f'   Erros: {resultado["erros"]}'
             ))
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.6 on 2026-10-17 01:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0025_arquivopdf_parcela_boleto_pdf_blob'),
+        ('notificacoes', '0016_add_notificacao_parcela_status_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificacao',
+            name='proxima_tentativa_em',
+            field=models.DateTimeField(blank=True, help_text='Reenvio agendado com backoff exponencial após uma falha', null=True, verbose_name='Próxima Tentativa em'),
+        ),
+        migrations.AddField(
+            model_name='notificacao',
+            name='reservada_ate',
+            field=models.DateTimeField(blank=True, help_text='Fim da reserva; depois disso a notificação volta para a fila', null=True, verbose_name='Reservada até'),
+        ),
+        migrations.AddField(
+            model_name='notificacao',
+            name='reservada_por',
+            field=models.CharField(blank=True, help_text='Worker da fila que está enviando a notificação', max_length=64, verbose_name='Reservada por'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacao',
+            index=models.Index(fields=['status', 'proxima_tentativa_em'], name='notif_status_retry_idx'),
+        ),
+    ]
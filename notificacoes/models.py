@@ -8,6 +8,7 @@ Empresa: M&S do Brasil LTDA
 from django.db import models
 from django.utils import timezone
 from core.models import TimeStampedModel
+from .template_compilado import compilar as compilar_template
 
 
 class TipoNotificacao(models.TextChoices):
@@ -230,6 +231,26 @@ class Notificacao(TimeStampedModel):
         blank=True,
         verbose_name='Mensagem de Erro'
     )
+    proxima_tentativa_em = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Próxima Tentativa em',
+        help_text='Reenvio agendado com backoff exponencial após uma falha'
+    )
+
+    # Reserva (lease) do consumidor da fila — notificacoes.fila
+    reservada_por = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name='Reservada por',
+        help_text='Worker da fila que está enviando a notificação'
+    )
+    reservada_ate = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Reservada até',
+        help_text='Fim da reserva; depois disso a notificação volta para a fila'
+    )
 
     # Rastreamento de entrega
     external_id = models.CharField(
@@ -261,25 +282,66 @@ class Notificacao(TimeStampedModel):
             models.Index(fields=['parcela']),
             models.Index(fields=['external_id'], name='notif_external_id_idx'),
             models.Index(fields=['parcela', 'status'], name='notif_parcela_status_idx'),
+            models.Index(fields=['status', 'proxima_tentativa_em'], name='notif_status_retry_idx'),
         ]
 
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.destinatario} - {self.get_status_display()}"
 
-    def marcar_como_enviada(self, external_id=''):
-        """Marca a notificação como enviada, armazenando o ID externo se fornecido."""
+    def _gravar_se_reservada(self, worker, *campos):
+        """
+        Grava `campos` só se a notificação ainda estiver reservada por `worker`
+        (consumidor da fila). False se a reserva venceu e outro worker a tomou.
+        """
+        valores = {campo: getattr(self, campo) for campo in campos}
+        return Notificacao.objects.filter(pk=self.pk, reservada_por=worker).update(
+            atualizado_em=timezone.now(), **valores,
+        ) == 1
+
+    def marcar_como_enviada(self, external_id='', worker=None):
+        """
+        Marca a notificação como enviada, armazenando o ID externo se fornecido.
+        Com `worker`, grava só se a reserva ainda for dele (devolve False se não).
+        """
         self.status = StatusNotificacao.ENVIADA
         self.data_envio = timezone.now()
         if external_id:
             self.external_id = external_id
+        self.reservada_por, self.reservada_ate = '', None
+        if worker is not None:
+            return self._gravar_se_reservada(
+                worker, 'status', 'data_envio', 'external_id', 'reservada_por', 'reservada_ate',
+            )
         self.save()
+        return True
 
-    def marcar_erro(self, mensagem_erro):
-        """Marca a notificação com erro"""
+    def marcar_erro(self, mensagem_erro, worker=None):
+        """Marca a notificação com erro (com `worker`, só se a reserva ainda for dele)."""
         self.status = StatusNotificacao.ERRO
         self.erro_mensagem = mensagem_erro
         self.tentativas += 1
+        self.reservada_por, self.reservada_ate = '', None
+        if worker is not None:
+            return self._gravar_se_reservada(
+                worker, 'status', 'erro_mensagem', 'tentativas', 'reservada_por', 'reservada_ate',
+            )
         self.save()
+        return True
+
+    def reagendar(self, mensagem_erro, atraso, worker=None):
+        """
+        Falha temporária: continua PENDENTE e volta à fila depois de `atraso`
+        (timedelta). Com `worker`, só se a reserva ainda for dele.
+        """
+        self.erro_mensagem = mensagem_erro
+        self.tentativas += 1
+        self.proxima_tentativa_em = timezone.now() + atraso
+        self.reservada_por, self.reservada_ate = '', None
+        campos = ['erro_mensagem', 'tentativas', 'proxima_tentativa_em', 'reservada_por', 'reservada_ate']
+        if worker is not None:
+            return self._gravar_se_reservada(worker, *campos)
+        self.save(update_fields=[*campos, 'atualizado_em'])
+        return True
 
 
 class TipoGatilho(models.TextChoices):
@@ -491,15 +553,7 @@ class TemplateNotificacao(TimeStampedModel):
         """
         if not self.corpo_whatsapp_interativo:
             return None
-        import copy
-        payload = copy.deepcopy(self.corpo_whatsapp_interativo)
-        for tag, valor in contexto.items():
-            placeholder = f"%%{tag}%%"
-            valor_str = str(valor) if valor is not None else ''
-            for chave in ('title', 'body', 'footer'):
-                if chave in payload and isinstance(payload[chave], str):
-                    payload[chave] = payload[chave].replace(placeholder, valor_str)
-        return payload
+        return compilar_template(self).renderizar_interativo(contexto)
 
     def renderizar(self, contexto):
         """
@@ -509,37 +563,13 @@ class TemplateNotificacao(TimeStampedModel):
         bloco só permanece se contexto['TAG'] tiver valor não-vazio (ex:
         %%SE_PIXCOPIACOLA%%Pague com PIX: %%PIXCOPIACOLA%%%%FIM_PIXCOPIACOLA%%).
 
+        Os campos são tokenizados uma vez e a compilação é reaproveitada
+        enquanto o template não for alterado (ver notificacoes.template_compilado).
+
         Returns:
             tuple: (assunto, corpo_sms, corpo_html, corpo_whatsapp) — todos renderizados
         """
-        import re
-
-        def processar_condicionais(texto):
-            if not texto or '%%SE_' not in texto:
-                return texto
-
-            def repl(m):
-                tag, conteudo = m.group(1), m.group(2)
-                return conteudo if str(contexto.get(tag) or '').strip() else ''
-
-            return re.sub(r'%%SE_(\w+)%%(.*?)%%FIM_\1%%', repl, texto, flags=re.DOTALL)
-
-        assunto_r = processar_condicionais(self.assunto or '')
-        corpo_r = processar_condicionais(self.corpo or '')
-        corpo_html_r = processar_condicionais(self.corpo_html or '')
-        corpo_whatsapp_r = processar_condicionais(self.corpo_whatsapp or '')
-
-        for tag, valor in contexto.items():
-            placeholder = f"%%{tag}%%"
-            valor_str = str(valor) if valor is not None else ''
-            assunto_r = assunto_r.replace(placeholder, valor_str)
-            corpo_r = corpo_r.replace(placeholder, valor_str)
-            if corpo_html_r:
-                corpo_html_r = corpo_html_r.replace(placeholder, valor_str)
-            if corpo_whatsapp_r:
-                corpo_whatsapp_r = corpo_whatsapp_r.replace(placeholder, valor_str)
-
-        return assunto_r, corpo_r, corpo_html_r, corpo_whatsapp_r
+        return compilar_template(self).renderizar(contexto)
 
     @classmethod
     def get_template(cls, codigo, imobiliaria=None, tipo=None):
@@ -6,8 +6,12 @@ Email: maxwbh@gmail.com
 Empresa: M&S do Brasil LTDA
 """
 import logging
+import smtplib
+import threading
+import time
 from uuid import uuid4
 from django.conf import settings
+from django.core.cache import cache
 from twilio.rest import Client
 from .models import (
     ConfiguracaoEmail, ConfiguracaoSMS, ConfiguracaoWhatsApp,
@@ -53,6 +57,238 @@ def _destinatario_telefone_teste(destinatario_real: str) -> str:
     return destinatario_real
 
 
+# =============================================================================
+# CONFIGURAÇÃO DE E-MAIL EM CACHE
+# =============================================================================
+
+_CHAVE_VERSAO_CONFIG_EMAIL = 'notificacoes:config_email:versao'
+_CONFIG_EMAIL = {}
+
+
+def _ttl_config_email() -> int:
+    try:
+        return max(int(getattr(settings, 'EMAIL_CONFIG_CACHE_TTL', 300)), 0)
+    except (TypeError, ValueError):
+        return 300
+
+
+def configuracao_email_ativa():
+    """
+    ConfiguracaoEmail ativa (ou None), do cache do processo.
+
+    Recarrega (1 consulta) quando a versão no cache do Django muda — signals de
+    ConfiguracaoEmail, ver invalidar_configuracao_email — ou depois de
+    EMAIL_CONFIG_CACHE_TTL segundos. A senha SMTP fica só na memória do
+    processo; o cache do Django guarda apenas a versão.
+    """
+    versao = cache.get(_CHAVE_VERSAO_CONFIG_EMAIL)
+    carregada = _CONFIG_EMAIL.get('ativa')
+    if (carregada is not None and carregada[0] == versao
+            and time.monotonic() - carregada[1] < _ttl_config_email()):
+        return carregada[2]
+
+    config = ConfiguracaoEmail.objects.filter(ativo=True).first()
+    _CONFIG_EMAIL['ativa'] = (versao, time.monotonic(), config)
+    return config
+
+
+def invalidar_configuracao_email():
+    """Descarta a configuração deste processo e troca a versão para os demais."""
+    _CONFIG_EMAIL.clear()
+    cache.set(_CHAVE_VERSAO_CONFIG_EMAIL, uuid4().hex, timeout=None)
+
+
+# =============================================================================
+# ENVIO DE E-MAIL EM LOTE (CONEXÃO SMTP REAPROVEITADA)
+# =============================================================================
+
+# Servidor derrubou a conexão (timeout de inatividade, limite por sessão):
+# reconecta e reenvia a mensagem uma vez
+_ERROS_CONEXAO_SMTP = (smtplib.SMTPServerDisconnected, ConnectionError)
+
+_lote_email = threading.local()
+
+_CONFIG_PADRAO = object()
+
+
+class DespachanteEmail:
+    """
+    Envia vários e-mails por uma única conexão SMTP autenticada.
+
+    A conexão é aberta na primeira mensagem e reaberta a cada
+    EMAIL_MENSAGENS_POR_CONEXAO mensagens (limite por sessão comum nos
+    servidores). Se o servidor derrubar a conexão no meio do lote, reconecta e
+    reenvia a mensagem uma vez. Como context manager, vira o lote ativo da
+    thread: ServicoEmail.enviar passa a usar a conexão dele.
+
+        with DespachanteEmail() as lote:
+            for ...:
+                ServicoEmail.enviar(...)
+        lote.enviadas, lote.mensagens_por_segundo
+    """
+
+    def __init__(self, config=_CONFIG_PADRAO, mensagens_por_conexao=None):
+        """
+        Args:
+            config: ConfiguracaoEmail (padrão: a ativa, do cache); None usa o
+                EMAIL_BACKEND/EMAIL_* do settings.
+            mensagens_por_conexao: Mensagens antes de reabrir a conexão
+                (padrão: EMAIL_MENSAGENS_POR_CONEXAO).
+        """
+        self.config = configuracao_email_ativa() if config is _CONFIG_PADRAO else config
+        if mensagens_por_conexao is None:
+            mensagens_por_conexao = getattr(settings, 'EMAIL_MENSAGENS_POR_CONEXAO', 100)
+        self.mensagens_por_conexao = max(int(mensagens_por_conexao or 1), 1)
+
+        self.enviadas = 0
+        self.erros = 0
+        self.conexoes = 0
+        self.reconexoes = 0
+        self._conexao = None
+        self._na_conexao = 0
+        self._inicio = None
+        self._fim = None
+        self._anterior = None
+
+    @property
+    def from_email(self):
+        if self.config:
+            return f"{self.config.nome_remetente} <{self.config.email_remetente}>"
+        return settings.DEFAULT_FROM_EMAIL
+
+    def _abrir(self):
+        from django.core.mail import get_connection
+
+        if self.config:
+            conexao = get_connection(
+                backend='django.core.mail.backends.smtp.EmailBackend',
+                host=self.config.host,
+                port=self.config.porta,
+                username=self.config.usuario,
+                password=self.config.senha,
+                use_tls=self.config.usar_tls,
+                use_ssl=self.config.usar_ssl,
+            )
+        else:
+            conexao = get_connection()
+        conexao.open()
+        self._conexao = conexao
+        self._na_conexao = 0
+        self.conexoes += 1
+
+    def _fechar(self):
+        if self._conexao is None:
+            return
+        try:
+            self._conexao.close()
+        except Exception as e:
+            logger.warning("Erro ao fechar conexão SMTP: %s", e)
+        finally:
+            self._conexao = None
+
+    def enviar_mensagem(self, email):
+        """Envia um EmailMessage já montado pela conexão do lote."""
+        if self._inicio is None:
+            self._inicio = time.monotonic()
+        if self._conexao is None or self._na_conexao >= self.mensagens_por_conexao:
+            self._fechar()
+            self._abrir()
+        try:
+            try:
+                self._conexao.send_messages([email])
+            except _ERROS_CONEXAO_SMTP as e:
+                logger.warning("Conexão SMTP perdida (%s); reconectando", e)
+                self.reconexoes += 1
+                self._fechar()
+                self._abrir()
+                self._conexao.send_messages([email])
+        except Exception:
+            self.erros += 1
+            raise
+        self._na_conexao += 1
+        self.enviadas += 1
+
+    def enviar(self, destinatario, assunto, mensagem, html_message=None, anexos=()):
+        """
+        Monta e envia um e-mail (multipart/alternative quando há HTML).
+
+        Args:
+            anexos: (nome, conteúdo, mimetype) opcionais.
+
+        Returns:
+            str: Message-ID gerado.
+        """
+        from django.core.mail import EmailMultiAlternatives
+
+        message_id = f"<{uuid4()}@gestao-contrato>"
+
+        headers = {'Message-ID': message_id}
+        bounce_addr = getattr(settings, 'BOUNCE_EMAIL_ADDRESS', '')
+        if bounce_addr:
+            headers['Return-Path'] = bounce_addr
+            headers['Errors-To'] = bounce_addr
+
+        email = EmailMultiAlternatives(
+            subject=assunto,
+            body=mensagem,
+            from_email=self.from_email,
+            to=[destinatario],
+            headers=headers,
+        )
+        if html_message:
+            email.attach_alternative(html_message, 'text/html')
+        for nome, conteudo, mimetype in anexos:
+            email.attach(nome, conteudo, mimetype)
+        self.enviar_mensagem(email)
+        return message_id
+
+    @property
+    def duracao(self) -> float:
+        if self._inicio is None:
+            return 0.0
+        return (self._fim or time.monotonic()) - self._inicio
+
+    @property
+    def mensagens_por_segundo(self) -> float:
+        duracao = self.duracao
+        return self.enviadas / duracao if duracao > 0 else 0.0
+
+    def resumo(self) -> dict:
+        return {
+            'enviadas': self.enviadas,
+            'erros': self.erros,
+            'conexoes': self.conexoes,
+            'reconexoes': self.reconexoes,
+            'duracao_s': round(self.duracao, 3),
+            'mensagens_por_segundo': round(self.mensagens_por_segundo, 2),
+        }
+
+    def fechar(self):
+        self._fechar()
+        if self._inicio is not None and self._fim is None:
+            self._fim = time.monotonic()
+
+    def __enter__(self):
+        self._anterior = getattr(_lote_email, 'atual', None)
+        _lote_email.atual = self
+        return self
+
+    def __exit__(self, *exc):
+        _lote_email.atual = self._anterior
+        self.fechar()
+        if self.enviadas or self.erros:
+            logger.info(
+                "Lote de e-mails: %(enviadas)d enviados, %(erros)d erros, %(conexoes)d conexão(ões), "
+                "%(reconexoes)d reconexão(ões), %(mensagens_por_segundo).2f msg/s", self.resumo(),
+            )
+        return False
+
+
+def lote_email_ativo():
+    """DespachanteEmail ativo nesta thread (dentro de um `with DespachanteEmail()`), ou None."""
+    return getattr(_lote_email, 'atual', None)
+
+
 class ServicoEmail:
     """Serviço para envio de e-mails"""
 
@@ -61,6 +297,9 @@ class ServicoEmail:
         """
         Envia um e-mail com suporte a versão HTML alternativa.
 
+        Dentro de um lote (`with DespachanteEmail()`), reaproveita a conexão
+        SMTP do lote; fora dele, abre uma conexão só para esta mensagem.
+
         Args:
             html_message: HTML opcional; quando fornecido, envia multipart/alternative.
 
@@ -68,46 +307,17 @@ class ServicoEmail:
             tuple[bool, str]: (True, message_id) em caso de sucesso; raise em caso de falha.
         """
         try:
-            from django.core.mail import EmailMultiAlternatives, get_connection
-
             destinatario = _destinatario_email_teste(destinatario)
 
-            message_id = f"<{uuid4()}@gestao-contrato>"
-
-            headers = {'Message-ID': message_id}
-            bounce_addr = getattr(settings, 'BOUNCE_EMAIL_ADDRESS', '')
-            if bounce_addr:
-                headers['Return-Path'] = bounce_addr
-                headers['Errors-To'] = bounce_addr
-
-            config = ConfiguracaoEmail.objects.filter(ativo=True).first()
-
-            if not config:
-                connection = None
-                from_email = settings.DEFAULT_FROM_EMAIL
+            lote = lote_email_ativo()
+            if lote is not None:
+                message_id = lote.enviar(destinatario, assunto, mensagem, html_message=html_message)
             else:
-                connection = get_connection(
-                    backend='django.core.mail.backends.smtp.EmailBackend',
-                    host=config.host,
-                    port=config.porta,
-                    username=config.usuario,
-                    password=config.senha,
-                    use_tls=config.usar_tls,
-                    use_ssl=config.usar_ssl,
-                )
-                from_email = f"{config.nome_remetente} <{config.email_remetente}>"
-
-            email = EmailMultiAlternatives(
-                subject=assunto,
-                body=mensagem,
-                from_email=from_email,
-                to=[destinatario],
-                connection=connection,
-                headers=headers,
-            )
-            if html_message:
-                email.attach_alternative(html_message, 'text/html')
-            email.send(fail_silently=False)
+                avulso = DespachanteEmail()
+                try:
+                    message_id = avulso.enviar(destinatario, assunto, mensagem, html_message=html_message)
+                finally:
+                    avulso.fechar()
 
             logger.info("E-mail enviado com sucesso para %s (id=%s)", destinatario, message_id)
             return True, message_id
@@ -0,0 +1,20 @@
+"""
+Signals do app notificacoes.
+
+Gravação/remoção de ConfiguracaoEmail invalida a configuração em cache
+(notificacoes.services.configuracao_email_ativa) — já na hora e de novo no
+commit, para quem recarregou antes de os dados ficarem visíveis.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from notificacoes.models import ConfiguracaoEmail
+from notificacoes.services import invalidar_configuracao_email
+
+
+@receiver(post_save, sender=ConfiguracaoEmail)
+@receiver(post_delete, sender=ConfiguracaoEmail)
+def invalidar_configuracao_ao_gravar(sender, instance, **kwargs):
+    invalidar_configuracao_email()
+    transaction.on_commit(invalidar_configuracao_email)
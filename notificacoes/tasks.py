@@ -108,7 +108,7 @@ def _preparar_notificacao_vencimento(parcela, tipo_notificacao, template=None):
     }
 
     if template:
-        assunto, mensagem, _ = template.renderizar(contexto)
+        assunto, mensagem, *_ = template.renderizar(contexto)
     else:
         assunto = f"Parcela {parcela.numero_parcela}/{parcela.contrato.numero_parcelas} a vencer"
         mensagem = (
@@ -153,47 +153,43 @@ def criar_notificacao_vencimento(parcela, tipo_notificacao):
         notif.save()
 
 
+def _enviar_da_fila(notificacao):
+    """Envia uma Notificacao reservada da fila; levanta exceção se o envio falhar."""
+    sucesso, external_id = enviar_notificacao(
+        tipo=notificacao.tipo,
+        destinatario=notificacao.destinatario,
+        assunto=notificacao.assunto,
+        mensagem=notificacao.mensagem
+    )
+    if not sucesso:
+        raise RuntimeError("Erro ao enviar notificação")
+    if external_id:
+        notificacao.external_id = external_id
+
+
 @shared_task
 def processar_notificacoes_pendentes():
     """
-    Processa e envia todas as notificações pendentes
+    Processa e envia as notificações pendentes pela fila (notificacoes.fila):
+    lotes reservados por lease, respeitando proxima_tentativa_em, com falhas
+    reagendadas em backoff até NOTIFICACOES_MAX_TENTATIVAS. Pode rodar junto
+    com processar_fila_notificacoes sem enviar duas vezes.
     """
-    logger.info("Processando notificações pendentes...")
+    from .fila import consumir_fila
 
-    notificacoes = Notificacao.objects.filter(
-        status=StatusNotificacao.PENDENTE,
-        data_agendamento__lte=timezone.now()
+    logger.info("Processando notificações pendentes...")
+    estatisticas = consumir_fila(_enviar_da_fila)
+    logger.info(
+        f"Processamento concluído. {estatisticas['enviadas']} enviadas, "
+        f"{estatisticas['reagendadas']} reagendadas, {estatisticas['erros']} erros."
     )
 
-    enviadas = 0
-    erros = 0
-
-    for notificacao in notificacoes:
-        try:
-            sucesso, external_id = enviar_notificacao(
-                tipo=notificacao.tipo,
-                destinatario=notificacao.destinatario,
-                assunto=notificacao.assunto,
-                mensagem=notificacao.mensagem
-            )
-
-            if sucesso:
-                notificacao.marcar_como_enviada(external_id=external_id)
-                enviadas += 1
-            else:
-                notificacao.marcar_erro("Erro ao enviar notificação")
-                erros += 1
-
-        except Exception as e:
-            logger.exception("Erro ao processar notificação %s: %s", notificacao.id, e)
-            notificacao.marcar_erro(str(e))
-            erros += 1
-
-    logger.info(f"Processamento concluído. {enviadas} enviadas, {erros} erros.")
-
     return {
-        'enviadas': enviadas,
-        'erros': erros
+        'enviadas': estatisticas['enviadas'],
+        'reagendadas': estatisticas['reagendadas'],
+        'erros': estatisticas['erros'],
+        'perdidas': estatisticas['perdidas'],
+        'por_segundo': estatisticas['por_segundo'],
     }
 
 
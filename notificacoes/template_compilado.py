@@ -0,0 +1,188 @@
+"""
+Representação compilada de TemplateNotificacao.
+
+TemplateNotificacao.renderizar processava cada campo com uma regex para os
+blocos %%SE_TAG%%...%%FIM_TAG%% e depois um str.replace por chave do contexto
+em cada campo. Aqui cada campo (assunto, corpo, corpo_html, corpo_whatsapp e
+os textos do WhatsApp interativo) é compilado uma única vez em segmentos —
+moldes de str.format_map e blocos condicionais — e a renderização preenche
+cada campo com os valores do contexto num único passe.
+
+A compilação fica em cache por (id, atualizado_em) do template; editar o
+template muda atualizado_em e gera uma nova compilação.
+
+Desenvolvedor: Maxwell da Silva Oliveira
+"""
+import copy
+import re
+import threading
+
+_RE_CONDICIONAL = re.compile(r'%%SE_(\w+)%%(.*?)%%FIM_\1%%', re.DOTALL)
+_RE_TAG = re.compile(r'%%(\w+)%%')
+
+CAMPOS = ('assunto', 'corpo', 'corpo_html', 'corpo_whatsapp')
+CHAVES_INTERATIVO = ('title', 'body', 'footer')
+
+_MAX_CACHE = 512
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+class _Valores(dict):
+    """Valores do contexto como texto; TAG fora do contexto fica como está."""
+
+    def __missing__(self, tag):
+        return f'%%{tag}%%'
+
+
+def _tokenizar(texto):
+    """
+    Converte o texto num molde de str.format_map: chaves literais escapadas e
+    cada %%TAG%% vira {TAG}. TAGs que o format trataria como índice
+    posicional (começam com dígito) ficam como texto literal — nenhuma TAG
+    do sistema tem esse formato.
+    """
+    partes = []
+    pos = 0
+    for m in _RE_TAG.finditer(texto):
+        partes.append(texto[pos:m.start()].replace('{', '{{').replace('}', '}}'))
+        tag = m.group(1)
+        partes.append(f'{{{tag}}}' if not tag[0].isdigit() else m.group(0))
+        pos = m.end()
+    partes.append(texto[pos:].replace('{', '{{').replace('}', '}}'))
+    return ''.join(partes)
+
+
+def _compilar_campo(texto, condicionais=True):
+    """
+    Segmentos do campo: moldes (str) e blocos condicionais (tag, molde). Os
+    blocos são resolvidos antes das TAGs, como em TemplateNotificacao.renderizar:
+    o conteúdo do bloco só entra na saída se a TAG do bloco tiver valor.
+    """
+    if not texto:
+        return ()
+    if not condicionais or '%%SE_' not in texto:
+        return (_tokenizar(texto),)
+    segmentos = []
+    pos = 0
+    for m in _RE_CONDICIONAL.finditer(texto):
+        segmentos.append(_tokenizar(texto[pos:m.start()]))
+        segmentos.append((m.group(1), _tokenizar(m.group(2))))
+        pos = m.end()
+    segmentos.append(_tokenizar(texto[pos:]))
+    return tuple(segmentos)
+
+
+def _tags(textos):
+    """TAGs referenciadas nos textos."""
+    return tuple({tag for texto in textos if texto for tag in _RE_TAG.findall(texto)})
+
+
+def _renderizar_campo(segmentos, valores, contexto):
+    if len(segmentos) == 1:
+        return segmentos[0].format_map(valores)
+    partes = []
+    for seg in segmentos:
+        if seg.__class__ is str:
+            partes.append(seg.format_map(valores))
+        elif str(contexto.get(seg[0]) or '').strip():
+            partes.append(seg[1].format_map(valores))
+    return ''.join(partes)
+
+
+def _valores(contexto, tags):
+    """
+    Valores, já como texto (None vira vazio), das TAGs que o template usa —
+    as demais chaves do contexto não custam nada.
+    """
+    valores = _Valores()
+    for tag in tags:
+        if tag in contexto:
+            valor = contexto[tag]
+            valores[tag] = '' if valor is None else str(valor)
+    return valores
+
+
+class TemplateCompilado:
+    """Campos de um TemplateNotificacao pré-tokenizados."""
+
+    __slots__ = ('fonte', 'campos', 'tags', 'interativo', 'tags_interativo')
+
+    def __init__(self, template):
+        interativo = template.corpo_whatsapp_interativo
+        self.fonte = _fonte(template)
+        self.campos = tuple(_compilar_campo(getattr(template, c) or '') for c in CAMPOS)
+        self.tags = _tags(getattr(template, c) for c in CAMPOS)
+        self.interativo = None
+        self.tags_interativo = ()
+        if isinstance(interativo, dict) and interativo:
+            self.interativo = (interativo, {
+                chave: _compilar_campo(interativo[chave], condicionais=False)
+                for chave in CHAVES_INTERATIVO
+                if isinstance(interativo.get(chave), str)
+            })
+            self.tags_interativo = _tags(
+                interativo[chave] for chave in CHAVES_INTERATIVO if isinstance(interativo.get(chave), str)
+            )
+        elif interativo:
+            # JSON fora do schema (sem title/body/footer): devolvido como está
+            self.interativo = (interativo, None)
+
+    def renderizar(self, contexto):
+        """
+        Returns:
+            tuple: (assunto, corpo_sms, corpo_html, corpo_whatsapp)
+        """
+        valores = _valores(contexto, self.tags)
+        return tuple(_renderizar_campo(segmentos, valores, contexto) for segmentos in self.campos)
+
+    def renderizar_interativo(self, contexto):
+        """
+        Payload interativo com as TAGs de title/body/footer substituídas, ou
+        None. Copia só o que muda — dict externo e botões — em vez de deepcopy.
+        """
+        if self.interativo is None:
+            return None
+        original, compilados = self.interativo
+        if compilados is None:
+            return copy.deepcopy(original)
+        valores = _valores(contexto, self.tags_interativo)
+        payload = dict(original)
+        for chave, segmentos in compilados.items():
+            payload[chave] = _renderizar_campo(segmentos, valores, contexto)
+        if isinstance(payload.get('buttons'), list):
+            payload['buttons'] = [
+                dict(botao) if isinstance(botao, dict) else botao for botao in payload['buttons']
+            ]
+        return payload
+
+
+def _fonte(template):
+    return tuple(getattr(template, c) for c in CAMPOS) + (template.corpo_whatsapp_interativo,)
+
+
+def compilar(template):
+    """
+    TemplateCompilado do template, do cache quando (id, atualizado_em) e o
+    conteúdo dos campos não mudaram. Templates não salvos não entram no cache.
+    """
+    if template.pk is None:
+        return TemplateCompilado(template)
+
+    chave = (template.pk, template.atualizado_em)
+    compilado = _cache.get(chave)
+    # Conferir a fonte cobre instâncias alteradas em memória e ainda não salvas
+    if compilado is not None and compilado.fonte == _fonte(template):
+        return compilado
+
+    compilado = TemplateCompilado(template)
+    with _cache_lock:
+        if len(_cache) >= _MAX_CACHE:
+            _cache.clear()
+        _cache[chave] = compilado
+    return compilado
+
+
+def limpar_cache():
+    with _cache_lock:
+        _cache.clear()
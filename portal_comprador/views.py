@@ -425,7 +425,8 @@ def meus_boletos(request):
         'pagos':  _stats_qs['pagos'] or 0,
     }
 
-    paginator = Paginator(parcelas, 20)
+    # Valor atualizado do dia (juros/multa/desconto) calculado no SELECT
+    paginator = Paginator(parcelas.com_valores_hoje(hoje), 20)
     page_number = request.GET.get('page', 1)
     page_obj = paginator.get_page(page_number)
 
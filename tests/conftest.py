@@ -435,6 +435,24 @@ def mock_ibge_error(requests_mock):
 # CONFIGURAÇÕES DE TESTE
 # =============================================================================
 
+@pytest.fixture(autouse=True)
+def limpar_series_indices():
+    """Séries de índices em cache no processo não sobrevivem ao rollback entre testes"""
+    from contratos.series_indices import limpar_series_indices as limpar
+    limpar()
+    yield
+    limpar()
+
+
+@pytest.fixture(autouse=True)
+def limpar_configuracao_email():
+    """ConfiguracaoEmail em cache no processo não sobrevive ao rollback entre testes"""
+    from notificacoes.services import invalidar_configuracao_email
+    invalidar_configuracao_email()
+    yield
+    invalidar_configuracao_email()
+
+
 @pytest.fixture(autouse=True)
 def configure_test_settings(settings):
     """Configurações específicas para testes"""
@@ -6,10 +6,16 @@ Testa:
 - Modelo PrestacaoIntermediaria
 - Lógica de ciclos de reajuste
 - Bloqueio de boleto por reajuste
+- Bloqueio por reajuste materializado (signals, virada de data, filtro em queryset)
 """
+import random
+
 import pytest
 from decimal import Decimal
 from datetime import date, timedelta
+from unittest.mock import patch
+
+from dateutil.relativedelta import relativedelta
 from django.utils import timezone
 from contratos.models import StatusContrato
 
@@ -287,6 +293,156 @@ class TestIndiceReajusteModel:
         assert acumulado > Decimal('1.0')
 
 
+@pytest.mark.django_db
+class TestBloqueioReajusteMaterializado:
+    """Testes do bloqueio por reajuste materializado no Contrato"""
+
+    def _aplicar(self, contrato, ciclo):
+        from financeiro.models import Reajuste
+        return Reajuste.objects.create(
+            contrato=contrato, ciclo=ciclo, percentual=Decimal('1.00'), aplicado=True,
+            parcela_inicial=1, parcela_final=contrato.numero_parcelas,
+        )
+
+    def test_igual_a_verificacao_por_ciclo(self, contrato_factory):
+        """Materializado x cascata ciclo a ciclo, com ciclos aplicados aleatórios"""
+        from contratos.models import Contrato, TipoCorrecao
+
+        hoje = timezone.now().date()
+
+        aleatorio = random.Random(15)
+        for _ in range(8):
+            prazo = aleatorio.choice([6, 12])
+            meses = aleatorio.randint(0, 40)
+            contrato = contrato_factory(
+                numero_parcelas=48,
+                prazo_reajuste_meses=prazo,
+                tipo_correcao=aleatorio.choice([TipoCorrecao.IPCA, TipoCorrecao.FIXO]),
+                data_contrato=hoje - relativedelta(months=meses),
+                data_primeiro_vencimento=hoje - relativedelta(months=meses) + timedelta(days=30),
+            )
+            aplicados = {c for c in range(2, 48 // prazo + 1) if aleatorio.random() < 0.6}
+            for ciclo in sorted(aplicados):
+                self._aplicar(contrato, ciclo)
+
+            contrato = Contrato.objects.get(pk=contrato.pk)
+            assert contrato._bloqueio_vigente(hoje)
+            for numero in range(1, 49):
+                assert contrato.pode_gerar_boleto(numero) == contrato.pode_gerar_boleto(
+                    numero, ciclos_aplicados=aplicados
+                ), (prazo, meses, aplicados, numero)
+
+    def test_reajuste_aplicado_e_removido_atualiza(self, contrato_factory, django_assert_num_queries):
+        hoje = timezone.now().date()
+        contrato = contrato_factory(
+            numero_parcelas=36,
+            data_contrato=hoje - relativedelta(months=13),
+            data_primeiro_vencimento=hoje - relativedelta(months=12),
+        )
+        assert contrato.ciclo_bloqueado_reajuste == 2
+        assert contrato.parcela_bloqueada_a_partir == 13
+        assert contrato.bloqueio_valido_ate is None
+
+        reajuste = self._aplicar(contrato, 2)
+        contrato.refresh_from_db()
+        assert contrato.ciclo_bloqueado_reajuste is None
+        assert contrato.bloqueio_valido_ate == contrato.data_contrato + relativedelta(months=24)
+        with django_assert_num_queries(0):
+            assert contrato.pode_gerar_boleto(13)[0] is True
+            assert contrato.get_primeiro_ciclo_bloqueado() is None
+
+        reajuste.delete()
+        contrato.refresh_from_db()
+        assert contrato.parcela_bloqueada_a_partir == 13
+        with django_assert_num_queries(0):
+            pode, motivo = contrato.pode_gerar_boleto(20)
+        assert pode is False
+        assert "ciclo 2 pendente" in motivo
+
+    def test_virada_de_data(self, contrato_factory):
+        """Aniversário atingido: o materializado vence e a tarefa diária recalcula"""
+        from contratos.models import Contrato
+        from financeiro.tasks import atualizar_bloqueios_reajuste
+
+        hoje = timezone.now().date()
+
+        contrato = contrato_factory(
+            numero_parcelas=36,
+            data_contrato=hoje - relativedelta(months=11),
+            data_primeiro_vencimento=hoje - relativedelta(months=10),
+        )
+        aniversario = contrato.data_contrato + relativedelta(months=12)
+        assert contrato.ciclo_bloqueado_reajuste is None
+        assert contrato.bloqueio_valido_ate == aniversario
+        assert atualizar_bloqueios_reajuste() == {'atualizados': 0}
+
+        depois = timezone.now() + (aniversario - hoje)
+        with patch('django.utils.timezone.now', return_value=depois):
+            # Vencido: volta para a cascata ciclo a ciclo até a tarefa rodar
+            assert not contrato._bloqueio_vigente(aniversario)
+            assert contrato.pode_gerar_boleto(13)[0] is False
+            assert atualizar_bloqueios_reajuste() == {'atualizados': 1}
+
+        contrato = Contrato.objects.get(pk=contrato.pk)
+        assert contrato.ciclo_bloqueado_reajuste == 2
+        assert contrato.bloqueio_calculado_em == aniversario
+
+    def test_filtro_liberadas_em_queryset(self, contrato_factory):
+        from contratos.models import TipoCorrecao
+        from financeiro.models import Parcela
+
+        hoje = timezone.now().date()
+
+        bloqueado = contrato_factory(
+            numero_parcelas=24,
+            data_contrato=hoje - relativedelta(months=13),
+            data_primeiro_vencimento=hoje - relativedelta(months=12),
+        )
+        fixo = contrato_factory(
+            numero_parcelas=24,
+            tipo_correcao=TipoCorrecao.FIXO,
+            data_contrato=hoje - relativedelta(months=13),
+            data_primeiro_vencimento=hoje - relativedelta(months=12),
+        )
+
+        liberadas = Parcela.objects.filter(contrato__in=[bloqueado, fixo]).liberadas_reajuste()
+        numeros = sorted(liberadas.filter(contrato=bloqueado).values_list('numero_parcela', flat=True))
+        assert numeros == list(range(1, 13))
+        assert liberadas.filter(contrato=fixo).count() == 24
+
+    def test_anotacao_no_select_com_bloqueio_garantido(self, contrato_factory, django_assert_num_queries):
+        """garantir_bloqueios_reajuste recalcula o desatualizado; a liberação vem do SELECT"""
+        from contratos.models import Contrato
+        from financeiro.models import Parcela
+
+        hoje = timezone.now().date()
+        contrato = contrato_factory(
+            numero_parcelas=24,
+            data_contrato=hoje - relativedelta(months=13),
+            data_primeiro_vencimento=hoje - relativedelta(months=12),
+        )
+        # Materializado apagado (contrato antigo / nunca calculado)
+        Contrato.objects.filter(pk=contrato.pk).update(
+            bloqueio_calculado_em=None, ciclo_bloqueado_reajuste=None, parcela_bloqueada_a_partir=None,
+        )
+        contratos = Contrato.objects.filter(pk=contrato.pk)
+        assert Contrato.garantir_bloqueios_reajuste(contratos) == 1
+        assert Contrato.garantir_bloqueios_reajuste(contratos) == 0
+
+        with django_assert_num_queries(1):
+            resultado = {
+                p.numero_parcela: p.pode_gerar_boleto()
+                for p in Parcela.objects.filter(contrato=contrato)
+                .com_liberacao_reajuste().select_related('contrato')
+            }
+        assert sorted(n for n, (pode, _) in resultado.items() if pode) == list(range(1, 13))
+        # Mesma resposta da cascata do contrato para as bloqueadas
+        contrato = Contrato.objects.get(pk=contrato.pk)
+        for numero in range(13, 25):
+            assert resultado[numero] == contrato.pode_gerar_boleto(numero)
+        assert "ciclo 2 pendente" in resultado[13][1]
+
+
 # Fixtures específicas para os testes
 @pytest.fixture
 def contrato_factory(db, imobiliaria_factory, comprador_factory, imovel_factory):
@@ -0,0 +1,134 @@
+"""
+Testes do cache de séries de índices (contratos.series_indices)
+
+Testa:
+- Acumulado e meses faltantes da série x cálculo mês a mês (com lacunas)
+- Prioridade do número-índice (Método 1)
+- Invalidação por signal e por importação em lote
+- Varredura de reajustes pendentes sem consulta por mês
+"""
+import random
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from contratos.series_indices import SerieIndice, invalidar_serie_indice, serie_indice
+
+
+def _acumulado_mes_a_mes(registros, ano_inicio, mes_inicio, ano_fim, mes_fim):
+    """Método 2 original: produto das variações cadastradas no período."""
+    valores = [
+        valor for ano, mes, valor, _ in registros
+        if (ano_inicio, mes_inicio) <= (ano, mes) <= (ano_fim, mes_fim)
+    ]
+    if not valores:
+        return None
+    acumulado = Decimal('1')
+    for valor in valores:
+        acumulado *= (1 + valor / 100)
+    return (acumulado - 1) * 100
+
+
+class TestSerieIndice:
+
+    def test_acumulado_igual_ao_produto_mes_a_mes(self):
+        aleatorio = random.Random(7)
+        registros = []
+        for ordinal in range(2015 * 12, 2025 * 12):
+            if aleatorio.random() < 0.1:
+                continue  # lacuna
+            valor = Decimal(aleatorio.randint(-150, 250)) / 100
+            registros.append((ordinal // 12, ordinal % 12 + 1, valor, None))
+        serie = SerieIndice('IPCA', registros)
+
+        for _ in range(300):
+            inicio = aleatorio.randint(2014 * 12, 2025 * 12)
+            fim = inicio + aleatorio.randint(0, 40)
+            periodo = (inicio // 12, inicio % 12 + 1, fim // 12, fim % 12 + 1)
+            esperado = _acumulado_mes_a_mes(registros, *periodo)
+            obtido = serie.acumulado(*periodo)
+            if esperado is None:
+                assert obtido is None
+            else:
+                assert abs(obtido - esperado) < Decimal('1e-20'), periodo
+
+    def test_meses_faltantes(self):
+        serie = SerieIndice('IGPM', [
+            (2024, 11, Decimal('0.50'), None),
+            (2025, 1, Decimal('0.30'), None),
+            (2025, 2, Decimal('0.20'), None),
+        ])
+
+        assert serie.meses_faltantes(2025, 1, 2025, 2) == []
+        assert serie.meses_faltantes(2024, 11, 2025, 3) == [(2024, 12), (2025, 3)]
+        assert serie.meses_faltantes(2030, 1, 2030, 2) == [(2030, 1), (2030, 2)]
+        assert SerieIndice('TR', []).meses_faltantes(2025, 1, 2025, 1) == [(2025, 1)]
+
+    def test_numero_indice_tem_prioridade(self):
+        serie = SerieIndice('IPCA', [
+            (2024, 12, Decimal('0.50'), Decimal('1000.0000')),
+            (2025, 1, Decimal('0.10'), None),
+            (2025, 2, Decimal('0.10'), Decimal('1050.0000')),
+        ])
+
+        assert serie.acumulado(2025, 1, 2025, 2) == Decimal('5.0000')
+        # Sem C(fim): produto das variações
+        assert serie.acumulado(2025, 1, 2025, 1) == Decimal('0.100')
+
+
+@pytest.mark.django_db
+class TestSerieIndiceCache:
+
+    def test_serie_reaproveitada_ate_gravar_indice(self, django_assert_num_queries):
+        from contratos.models import IndiceReajuste
+
+        IndiceReajuste.objects.create(tipo_indice='INCC', ano=2025, mes=1, valor=Decimal('1.00'))
+        IndiceReajuste.objects.create(tipo_indice='INCC', ano=2025, mes=2, valor=Decimal('1.00'))
+
+        with django_assert_num_queries(1):
+            assert IndiceReajuste.get_acumulado_periodo('INCC', 2025, 1, 2025, 2) == Decimal('2.0100')
+            IndiceReajuste.get_acumulado_periodo('INCC', 2025, 1, 2025, 1)
+
+        IndiceReajuste.objects.filter(mes=2).first().delete()
+        assert IndiceReajuste.get_acumulado_periodo('INCC', 2025, 1, 2025, 2) == Decimal('1.00')
+
+        IndiceReajuste.objects.update_or_create(
+            tipo_indice='INCC', ano=2025, mes=1, defaults={'valor': Decimal('2.00')},
+        )
+        assert IndiceReajuste.get_acumulado_periodo('INCC', 2025, 1, 2025, 2) == Decimal('2.00')
+
+    def test_importacao_em_lote_invalida(self):
+        from contratos.models import IndiceReajuste
+
+        assert serie_indice('INPC').acumulado(2025, 1, 2025, 1) is None
+
+        IndiceReajuste.objects.bulk_create([
+            IndiceReajuste(tipo_indice='INPC', ano=2025, mes=1, valor=Decimal('0.40')),
+        ])
+        # bulk_create não dispara signal: a série antiga continua valendo...
+        assert serie_indice('INPC').acumulado(2025, 1, 2025, 1) is None
+        # ...até a importação invalidar
+        invalidar_serie_indice('INPC')
+        assert serie_indice('INPC').acumulado(2025, 1, 2025, 1) == Decimal('0.40')
+
+    def test_reajustes_pendentes_sem_consulta_por_mes(self):
+        from contratos.models import IndiceReajuste
+        from financeiro.services.reajuste_service import ReajusteService
+
+        for mes in range(1, 13):
+            IndiceReajuste.objects.create(tipo_indice='IPCA', ano=2024, mes=mes, valor=Decimal('0.40'))
+
+        service = ReajusteService()
+        with CaptureQueriesContext(connection) as consultas:
+            for _ in range(20):
+                ok, faltantes = service.verificar_indices_disponiveis(
+                    'IPCA', date(2024, 1, 15), date(2025, 2, 15)
+                )
+
+        assert not ok
+        assert faltantes == ['01/2025', '02/2025']
+        assert len(consultas) == 1
+        assert service.verificar_indices_disponiveis('IPCA', date(2024, 1, 1), date(2024, 12, 1)) == (True, [])
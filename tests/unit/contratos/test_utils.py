@@ -0,0 +1,110 @@
+"""
+Testes do calendario de dias uteis (contratos.utils)
+
+Testa:
+- Feriados nacionais e locais (DD/MM, AAAA-MM-DD, (dia, mes))
+- eh_dia_util / proximo_dia_util
+- dias_uteis_entre pelo acumulado x contagem dia a dia
+- ajustar_data_vencimento com o calendario
+"""
+import random
+from datetime import date, timedelta
+
+from contratos.utils import (
+    CalendarioDiasUteis, ajustar_data_vencimento, calendario_padrao,
+    dias_uteis_entre, obter_feriados_ano, proximo_dia_util,
+)
+
+
+def _contar_dia_a_dia(calendario, inicio, fim):
+    dias = 0
+    data = inicio
+    while data <= fim:
+        dias += calendario.eh_dia_util(data)
+        data += timedelta(days=1)
+    return dias
+
+
+class TestCalendarioDiasUteis:
+
+    def test_feriados_nacionais(self):
+        calendario = CalendarioDiasUteis()
+        feriados = calendario.feriados(2026)
+
+        assert set(obter_feriados_ano(2026)) == feriados
+        assert date(2026, 4, 3) in feriados  # Sexta-feira Santa
+        assert not calendario.eh_dia_util(date(2026, 4, 21))  # Tiradentes (terca)
+        assert not calendario.eh_dia_util(date(2026, 6, 13))  # sabado
+        assert calendario.eh_dia_util(date(2026, 6, 12))
+
+    def test_feriados_locais(self):
+        calendario = CalendarioDiasUteis(['20/11', '2026-01-20', (29, 2)])
+
+        assert calendario.eh_feriado(date(2026, 11, 20))
+        assert calendario.eh_feriado(date(2027, 11, 20))
+        assert calendario.eh_feriado(date(2026, 1, 20))
+        assert not calendario.eh_feriado(date(2027, 1, 20))
+        assert calendario.eh_feriado(date(2028, 2, 29))
+        # 29/02 em ano nao bissexto e ignorado
+        assert len(calendario.feriados(2027)) == len(obter_feriados_ano(2027)) + 1
+
+    def test_proximo_dia_util(self):
+        calendario = CalendarioDiasUteis()
+
+        # Quinta (Corpus Christi 2026-06-04) -> sexta
+        assert calendario.proximo_dia_util(date(2026, 6, 4)) == date(2026, 6, 5)
+        # Sabado 2026-12-26 -> segunda 28
+        assert calendario.proximo_dia_util(date(2026, 12, 26)) == date(2026, 12, 28)
+        # Virada de ano: 2027-01-01 (sexta, feriado) -> segunda 04
+        assert calendario.proximo_dia_util(date(2026, 12, 31)) == date(2026, 12, 31)
+        assert proximo_dia_util(date(2027, 1, 1)) == date(2027, 1, 4)
+
+    def test_dias_uteis_entre_igual_a_contagem_dia_a_dia(self):
+        calendario = CalendarioDiasUteis(['20/11'])
+        aleatorio = random.Random(42)
+
+        for _ in range(500):
+            inicio = date(2024, 1, 1) + timedelta(days=aleatorio.randint(0, 1500))
+            fim = inicio + timedelta(days=aleatorio.randint(0, 800))
+            assert calendario.dias_uteis_entre(inicio, fim) == _contar_dia_a_dia(calendario, inicio, fim)
+
+        assert calendario.dias_uteis_entre(date(2026, 6, 15), date(2026, 6, 12)) == 0
+
+    def test_funcoes_de_modulo_usam_feriados_locais(self, settings):
+        settings.FERIADOS_LOCAIS = ['20/11']
+
+        assert calendario_padrao() is calendario_padrao()
+        # 2026-11-20 e sexta
+        assert dias_uteis_entre(date(2026, 11, 19), date(2026, 11, 20)) == 1
+
+        settings.FERIADOS_LOCAIS = []
+        assert dias_uteis_entre(date(2026, 11, 19), date(2026, 11, 20)) == 2
+
+
+class TestAjustarDataVencimento:
+
+    def test_feriado_empurra_para_o_dia_seguinte(self):
+        data, motivo = ajustar_data_vencimento(21, 4, 2026, ajustar_fim_semana=False)
+
+        assert data == date(2026, 4, 22)
+        assert 'feriado' in motivo
+
+    def test_feriado_local_do_calendario(self):
+        calendario = CalendarioDiasUteis(['20/11'])
+
+        data, _ = ajustar_data_vencimento(20, 11, 2026, calendario=calendario)
+
+        # Sexta feriado -> sabado/domingo pulados -> segunda
+        assert data == date(2026, 11, 23)
+
+    def test_mes_curto_e_virada_de_ano(self):
+        data, motivo = ajustar_data_vencimento(31, 2, 2026)
+        assert data == date(2026, 3, 2)  # 28/02 e sabado
+        assert 'ultimo dia do mes' in motivo
+
+        data, _ = ajustar_data_vencimento(25, 12, 2026, ajustar_fim_semana=False)
+        assert data == date(2026, 12, 26)
+
+        data, motivo = ajustar_data_vencimento(15, 6, 2026)
+        assert data == date(2026, 6, 15)
+        assert motivo is None
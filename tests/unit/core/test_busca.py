@@ -0,0 +1,163 @@
+"""
+Testes do índice da busca global (core.busca) e de api_busca_global
+
+Testa:
+- Manutenção do índice pelos signals (criação, edição, remoção)
+- Busca sem acento, por dígitos de CPF/CNPJ e número de contrato
+- Ranking (título igual > começa com > palavra > demais)
+- Mesmos resultados do icontains anterior em termos sem acento
+- Comando reconstruir_indice_busca e preenchimento da migração 0025
+- Formato do JSON de api_busca_global
+
+Desenvolvedor: Maxwell da Silva Oliveira <maxwbh@gmail.com>
+"""
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from contratos.models import Contrato
+from core import busca
+from core.models import Comprador, Imovel, IndiceBusca, TrigramaBusca
+
+
+def _indice():
+    return sorted(IndiceBusca.objects.values_list('tipo', 'objeto_id', 'titulo', 'texto', 'data'))
+
+
+@pytest.mark.django_db
+class TestManutencaoIndice:
+
+    def test_criacao_indexa_os_tres_tipos(self, contrato_factory):
+        contrato = contrato_factory(comprador__nome='João Conceição')
+
+        assert busca.buscar(busca.CONTRATO, contrato.numero_contrato, 8) == [contrato.pk]
+        assert busca.buscar(busca.COMPRADOR, 'joao conceicao', 6) == [contrato.comprador_id]
+        assert busca.buscar(busca.IMOVEL, contrato.imovel.identificacao, 6) == [contrato.imovel_id]
+        assert TrigramaBusca.objects.exists()
+
+    def test_edicao_do_comprador_reindexa_os_contratos(self, contrato_factory):
+        contrato = contrato_factory(comprador__nome='Maria Souza')
+        comprador = contrato.comprador
+
+        comprador.nome = 'Mariana Ávila'
+        comprador.save()
+
+        assert busca.buscar(busca.CONTRATO, 'avila', 8) == [contrato.pk]
+        assert busca.buscar(busca.CONTRATO, 'souza', 8) == []
+        assert busca.buscar(busca.COMPRADOR, 'Ávila', 6) == [comprador.pk]
+
+    def test_gravacao_sem_campos_indexados_nao_reindexa(self, contrato_factory):
+        contrato = contrato_factory()
+        with CaptureQueriesContext(connection) as ctx:
+            contrato.save(update_fields=['observacoes'])
+        assert not any('core_indicebusca' in q['sql'] for q in ctx.captured_queries)
+
+    def test_remocao(self, comprador_factory):
+        comprador = comprador_factory(nome='Remover Depois')
+        comprador.delete()
+        assert busca.buscar(busca.COMPRADOR, 'remover', 6) == []
+        assert not IndiceBusca.objects.exists()
+        assert not TrigramaBusca.objects.exists()
+
+    def test_comando_reconstruir(self, contrato_factory, capsys):
+        contrato_factory.create_batch(3)
+        mantido = _indice()
+        IndiceBusca.objects.all().delete()
+
+        call_command('reconstruir_indice_busca')
+
+        assert _indice() == mantido
+        assert 'reconstruído' in capsys.readouterr().out
+
+    def test_preenchimento_da_migracao_igual_ao_indice(self, contrato_factory):
+        """A cópia congelada em 0025 gera o mesmo índice que core.busca."""
+        from importlib import import_module
+        from types import SimpleNamespace
+        from django.apps import apps
+
+        contrato_factory.create_batch(3, comprador__nome='José Ávila')
+        mantido = _indice()
+        trigramas = sorted(TrigramaBusca.objects.values_list('entrada__tipo', 'entrada__objeto_id', 'trigrama'))
+        TrigramaBusca.objects.all().delete()
+        IndiceBusca.objects.all().delete()
+
+        migracao = import_module('core.migrations.0025_indice_busca')
+        migracao._preencher_indice(apps, SimpleNamespace(connection=connection))
+
+        assert _indice() == mantido
+        assert sorted(TrigramaBusca.objects.values_list('entrada__tipo', 'entrada__objeto_id', 'trigrama')) == trigramas
+
+
+@pytest.mark.django_db
+class TestBuscar:
+
+    def test_cpf_e_numero_do_contrato_por_digitos(self, contrato_factory):
+        contrato = contrato_factory(numero_contrato='001/2024', comprador__cpf='123.456.789-09')
+
+        assert busca.buscar(busca.COMPRADOR, '12345678909', 6) == [contrato.comprador_id]
+        assert busca.buscar(busca.COMPRADOR, '456.789', 6) == [contrato.comprador_id]
+        assert busca.buscar(busca.CONTRATO, '0012024', 8) == [contrato.pk]
+        assert busca.buscar(busca.CONTRATO, '001/2024', 8) == [contrato.pk]
+
+    def test_ranking(self, comprador_factory):
+        email = 'cliente@exemplo.com'
+        outros = comprador_factory(nome='Ana Paula Silva', email=email)
+        palavra = comprador_factory(nome='Beatriz Silva', email=email)
+        prefixo = comprador_factory(nome='Silvana Rocha', email=email)
+        igual = comprador_factory(nome='Silva', email=email)
+
+        assert busca.buscar(busca.COMPRADOR, 'silva', 6) == [igual.pk, prefixo.pk, outros.pk, palavra.pk]
+        assert busca.buscar(busca.COMPRADOR, 'ilva', 6) == [outros.pk, palavra.pk, igual.pk, prefixo.pk]
+
+    def test_termo_de_dois_caracteres(self, comprador_factory):
+        comprador = comprador_factory(nome='Zé Xu')
+        assert busca.buscar(busca.COMPRADOR, 'xu', 6) == [comprador.pk]
+
+    def test_mesmos_resultados_do_icontains(self, contrato_factory):
+        # Sem acentos: aí o icontains e o índice normalizado concordam
+        nomes = ['Maria Araujo', 'Jose Carvalho', 'Ana Lima', 'Carlos Arantes', 'Paula Ramos']
+        cidades = ['Uberlandia', 'Araxa', 'Patos de Minas']
+        for n in range(25):
+            contrato_factory(
+                comprador__nome=f'{nomes[n % 5]} {n}', comprador__email=f'cliente{n}@exemplo.com',
+                imovel__cidade=cidades[n % 3],
+            )
+        filtros = {
+            busca.CONTRATO: (Contrato, ['numero_contrato', 'comprador__nome',
+                                        'imovel__identificacao', 'imovel__loteamento']),
+            busca.COMPRADOR: (Comprador, ['nome', 'cpf', 'cnpj', 'email']),
+            busca.IMOVEL: (Imovel, ['identificacao', 'loteamento', 'cidade']),
+        }
+        for termo in ('ctr-2023', 'lote 1', 'loteamento', '325.513', 'ar', 'quadra 1, lote', '@'):
+            for tipo, (modelo, campos) in filtros.items():
+                filtro = Q()
+                for campo in campos:
+                    filtro |= Q(**{f'{campo}__icontains': termo})
+                esperado = set(modelo.objects.filter(filtro).values_list('pk', flat=True))
+                assert set(busca.buscar(tipo, termo, 1000)) == esperado, (tipo, termo)
+
+
+@pytest.mark.django_db
+class TestApiBuscaGlobal:
+
+    def test_formato_da_resposta(self, client, user_factory, contrato_factory):
+        contrato = contrato_factory(comprador__nome='Cláudia Araújo', imovel__cidade='Araújos')
+        client.force_login(user_factory())
+
+        data = client.get(reverse('core:api_busca_global'), {'q': 'araujo'}).json()
+
+        assert data['q'] == 'araujo'
+        assert data['total'] == 3
+        assert [r['tipo'] for r in data['results']] == ['contrato', 'comprador', 'imovel']
+        assert data['results'][0] == {
+            'tipo': 'contrato',
+            'icon': 'description',
+            'titulo': contrato.numero_contrato,
+            'subtitulo': f'Cláudia Araújo · {contrato.imovel.identificacao}',
+            'status': contrato.get_status_display(),
+            'url': f'/contratos/{contrato.pk}/',
+        }
+        assert data['results'][1]['subtitulo'] == contrato.comprador.cpf
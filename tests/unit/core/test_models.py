@@ -145,3 +145,66 @@ class TestContaBancariaModel:
         conta1.refresh_from_db()
         assert conta2.principal is True
         assert conta1.principal is False
+
+    def test_reservar_nossos_numeros_bloco_contiguo(self):
+        conta = ContaBancariaFactory.create(nosso_numero_atual=10)
+        assert list(conta.reservar_nossos_numeros(3)) == [11, 12, 13]
+        assert list(conta.reservar_nossos_numeros()) == [14]
+        assert conta.nosso_numero_atual == 14
+        conta.refresh_from_db()
+        assert conta.nosso_numero_atual == 14
+
+    def test_reservar_nossos_numeros_quantidade_invalida(self):
+        conta = ContaBancariaFactory.create()
+        with pytest.raises(ValueError):
+            conta.reservar_nossos_numeros(0)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reservar_nossos_numeros_concorrente_sem_duplicatas_nem_lacunas():
+    """Vários alocadores simultâneos na mesma conta: sequência exata 1..N."""
+    import random
+    import threading
+    import time
+    from django.db import OperationalError, connections
+    from core.models import ContaBancaria
+
+    conta = ContaBancariaFactory.create(nosso_numero_atual=0)
+    reservados, erros = [], []
+    trava = threading.Lock()
+    largada = threading.Barrier(8)
+
+    def reservar(instancia, quantidade):
+        # O banco de teste (SQLite em memória compartilhada) devolve "table is
+        # locked" em vez de esperar o lock; o UPDATE falho não aplica nada.
+        while True:
+            try:
+                return list(instancia.reservar_nossos_numeros(quantidade))
+            except OperationalError as exc:
+                if 'locked' not in str(exc):
+                    raise
+                time.sleep(0.001)
+
+    def alocador(semente):
+        rnd = random.Random(semente)
+        instancia = ContaBancaria.objects.get(pk=conta.pk)
+        try:
+            largada.wait()
+            for _ in range(25):
+                bloco = reservar(instancia, rnd.randint(1, 5))
+                with trava:
+                    reservados.extend(bloco)
+        except Exception as exc:  # pragma: no cover - falha reportada abaixo
+            erros.append(exc)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=alocador, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not erros
+    conta.refresh_from_db()
+    assert sorted(reservados) == list(range(1, conta.nosso_numero_atual + 1))
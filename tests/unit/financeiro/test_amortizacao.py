@@ -0,0 +1,137 @@
+"""
+Testes do motor de amortização em centavos (financeiro.services.amortizacao)
+
+Testa:
+- Equivalência centavo a centavo com a implementação Decimal (Price e SAC),
+  com entradas aleatórias (saldo, taxa, prazo)
+- Casos de borda: taxa zero, taxa negativa, n = 1, saldo fracionado
+- Tabelas em lote
+- Benchmark contra a implementação Decimal
+"""
+import random
+import time
+from decimal import Decimal
+
+import pytest
+
+from financeiro.services.amortizacao import (
+    PRICE, SAC, tabela_price, tabela_price_decimal, tabela_sac,
+    tabela_sac_decimal, tabelas_em_lote,
+)
+
+
+def _entradas_aleatorias(semente, quantidade):
+    aleatorio = random.Random(semente)
+    for _ in range(quantidade):
+        pv = Decimal(aleatorio.randint(1, 500_000_000)) / 100
+        casas = aleatorio.choice([0, 2, 4, 6])
+        taxa = Decimal(aleatorio.randint(0, 300 * 10 ** casas)) / 10 ** casas / 100
+        n = aleatorio.choice([1, 2, 12, aleatorio.randint(1, 420)])
+        yield pv, taxa, n
+
+
+class TestEquivalenciaDecimal:
+
+    def test_price_igual_a_referencia(self):
+        for pv, taxa, n in _entradas_aleatorias(13, 400):
+            assert tabela_price(pv, taxa, n) == tabela_price_decimal(pv, taxa, n), (pv, taxa, n)
+
+    def test_sac_igual_a_referencia(self):
+        for pv, taxa, n in _entradas_aleatorias(31, 400):
+            assert tabela_sac(pv, taxa, n) == tabela_sac_decimal(pv, taxa, n), (pv, taxa, n)
+
+    @pytest.mark.parametrize('gerar, referencia', [
+        (tabela_price, tabela_price_decimal),
+        (tabela_sac, tabela_sac_decimal),
+    ])
+    @pytest.mark.parametrize('pv, taxa, n', [
+        (Decimal('100000.00'), Decimal('0'), 360),
+        (Decimal('100000.00'), Decimal('-0.5'), 24),
+        (Decimal('1234.56'), Decimal('1.2345'), 1),
+        (Decimal('0.05'), Decimal('0.5'), 12),
+        (Decimal('98765.4321'), Decimal('0.99'), 36),  # saldo fracionado: usa a referência
+        (Decimal('250000.00'), Decimal('0.0000000000000001234567'), 120),
+    ])
+    def test_casos_de_borda(self, gerar, referencia, pv, taxa, n):
+        assert gerar(pv, taxa, n) == referencia(pv, taxa, n)
+
+    def test_fecha_o_saldo(self):
+        tabela = tabela_price(Decimal('180000.00'), Decimal('0.85'), 360)
+
+        assert sum(amort for _, amort, _ in tabela) == Decimal('180000.00')
+        assert all(str(valor).split('.')[1].__len__() == 2 for linha in tabela for valor in linha)
+
+    def test_prazo_zero(self):
+        assert tabela_price(Decimal('1000.00'), Decimal('1'), 0) == []
+        assert tabela_sac(Decimal('1000.00'), Decimal('1'), 0) == []
+
+
+class TestTabelasEmLote:
+
+    def test_lote_igual_a_tabelas_individuais(self):
+        itens = list(_entradas_aleatorias(5, 30))
+
+        assert tabelas_em_lote(itens, PRICE) == [tabela_price_decimal(*item) for item in itens]
+        assert tabelas_em_lote(itens, SAC) == [tabela_sac_decimal(*item) for item in itens]
+
+    def test_lote_em_centavos(self):
+        itens = list(_entradas_aleatorias(8, 30)) + [(Decimal('98765.4321'), Decimal('0.99'), 36)]
+
+        for sistema, referencia in ((PRICE, tabela_price_decimal), (SAC, tabela_sac_decimal)):
+            for item, colunas in zip(itens, tabelas_em_lote(itens, sistema, em_centavos=True)):
+                linhas = referencia(*item)
+                esperado = tuple([linha[c] * 100 for linha in linhas] for c in range(3))
+                assert tuple(list(coluna) for coluna in colunas) == esperado, item
+
+
+@pytest.mark.django_db
+def test_preview_do_wizard_sac_em_centavos(client_logged_in):
+    """O preview SAC do wizard (tabela em centavos) bate com a tabela Decimal."""
+    from django.urls import reverse
+
+    resposta = client_logged_in.post(
+        reverse('contratos:wizard_preview_parcelas'),
+        data={
+            'valor_total': '250000.00', 'valor_entrada': '50000.00', 'numero_parcelas': 360,
+            'tipo_amortizacao': 'SAC', 'data_primeiro_vencimento': '2026-01-10', 'dia_vencimento': 10,
+            'juros': [{'ciclo_inicio': 1, 'juros_mensal': '0.79'}],
+        },
+        content_type='application/json',
+    )
+
+    dados = resposta.json()
+    esperado = tabela_sac_decimal(Decimal('200000.00'), Decimal('0.79'), 360)[:24]
+    assert dados['pmt'] == float(esperado[0][0])
+    assert [
+        (p['valor'], p['amortizacao'], p['juros_embutido']) for p in dados['parcelas']
+    ] == [tuple(float(v) for v in linha) for linha in esperado]
+
+
+@pytest.mark.slow
+class TestBenchmarkAmortizacao:
+
+    def test_mais_rapido_que_decimal(self):
+        itens = [(Decimal('350000.00'), Decimal('0.79'), 360)] * 40
+
+        def cronometrar(funcao):
+            melhor = None
+            for _ in range(5):
+                inicio = time.perf_counter()
+                funcao()
+                decorrido = time.perf_counter() - inicio
+                melhor = decorrido if melhor is None else min(melhor, decorrido)
+            return melhor
+
+        for sistema, gerar, referencia in (
+            (PRICE, tabela_price, tabela_price_decimal),
+            (SAC, tabela_sac, tabela_sac_decimal),
+        ):
+            tempo_referencia = cronometrar(lambda: [referencia(*item) for item in itens])
+            tempo_linhas = cronometrar(lambda: [gerar(*item) for item in itens])
+            tempo_centavos = cronometrar(lambda: tabelas_em_lote(itens, sistema, em_centavos=True))
+            # Margens folgadas: o ganho típico é de várias vezes, e o teste só
+            # deve falhar numa regressão clara, não por ruído da máquina
+            assert tempo_centavos < tempo_referencia, sistema
+            # Montar as linhas em Decimal custa uma conversão por célula, mas
+            # não pode ficar muito atrás do laço Decimal original
+            assert tempo_linhas < tempo_referencia * 3, sistema
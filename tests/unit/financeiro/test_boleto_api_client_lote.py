@@ -0,0 +1,161 @@
+"""
+BoletoApiClient — session compartilhada, fan-out e circuit breaker
+
+Testa contra um servidor HTTP local (stub do Boleto-API):
+- Conexões keep-alive reaproveitadas pela session do pool
+- consultar_cobrancas_lote: resultados na ordem, concorrência por tenant limitada
+- Circuito: abre após falhas seguidas, não chama mais o gateway, isola o
+  provider e fecha após a chamada de teste bem-sucedida
+
+Desenvolvedor: Maxwell da Silva Oliveira <maxwbh@gmail.com>
+"""
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from financeiro.services import boleto_api_client as bapi
+from financeiro.services.boleto_api_client import BoletoApiClient
+
+
+class _Gateway(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        srv = self.server
+        url = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        tenant = query.get('tenant_id', '')
+        with srv.lock:
+            srv.chamadas[query.get('provider', '')] += 1
+            srv.conexoes.add(self.client_address)
+            srv.em_voo[tenant] += 1
+            srv.pico[tenant] = max(srv.pico[tenant], srv.em_voo[tenant])
+        time.sleep(srv.atraso)
+        with srv.lock:
+            srv.em_voo[tenant] -= 1
+        if query.get('provider') in srv.fora_do_ar:
+            status, corpo = 503, {'detail': 'unavailable'}
+        else:
+            status = 200
+            corpo = {'id': url.path.rsplit('/', 1)[-1], 'status': 'registrado', 'valor': 1.0}
+        dados = json.dumps(corpo).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def gateway(settings):
+    srv = ThreadingHTTPServer(('127.0.0.1', 0), _Gateway)
+    srv.daemon_threads = True
+    srv.lock = threading.Lock()
+    srv.chamadas, srv.em_voo, srv.pico = Counter(), Counter(), Counter()
+    srv.conexoes = set()
+    srv.atraso = 0
+    srv.fora_do_ar = set()
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+
+    settings.BOLETO_API_URL = f'http://127.0.0.1:{srv.server_port}'
+    settings.BOLETO_API_MAX_TENTATIVAS = 1
+    settings.BOLETO_API_POOL_MAXSIZE = 4
+    settings.BOLETO_API_CONCORRENCIA = 4
+    settings.BOLETO_API_CONCORRENCIA_POR_TENANT = 4
+    for compartilhado in (bapi._sessoes_http, bapi._circuitos, bapi._limites_tenant):
+        compartilhado.clear()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+    for sessao in bapi._sessoes_http.values():
+        sessao.close()
+    for compartilhado in (bapi._sessoes_http, bapi._circuitos, bapi._limites_tenant):
+        compartilhado.clear()
+
+
+def _cobrancas(n, tenants=('t1',), provider='sicoob'):
+    return [
+        {'cobranca_id': f'C{i}', 'tenant_id': tenants[i % len(tenants)],
+         'provider': provider, 'bapi_token': 'bapi_x'}
+        for i in range(n)
+    ]
+
+
+class TestSessaoELote:
+
+    def test_resultados_na_ordem_com_conexoes_reaproveitadas(self, gateway):
+        resultados = BoletoApiClient().consultar_cobrancas_lote(_cobrancas(40))
+
+        assert [r['cobranca_id'] for r in resultados] == [f'C{i}' for i in range(40)]
+        assert all(r['sucesso'] for r in resultados)
+        assert gateway.chamadas['sicoob'] == 40
+        assert len(gateway.conexoes) <= 4
+
+    def test_concorrencia_limitada_por_tenant(self, gateway, settings):
+        settings.BOLETO_API_CONCORRENCIA = 8
+        settings.BOLETO_API_POOL_MAXSIZE = 8
+        settings.BOLETO_API_CONCORRENCIA_POR_TENANT = 2
+        gateway.atraso = 0.05
+
+        resultados = BoletoApiClient().consultar_cobrancas_lote(_cobrancas(24, tenants=('t1', 't2')))
+
+        assert all(r['sucesso'] for r in resultados)
+        assert gateway.pico['t1'] <= 2 and gateway.pico['t2'] <= 2
+        assert gateway.pico['t1'] + gateway.pico['t2'] > 2
+
+    def test_concorrencia_1_e_sequencial(self, gateway, settings):
+        settings.BOLETO_API_CONCORRENCIA = 1
+        gateway.atraso = 0.01
+        BoletoApiClient().consultar_cobrancas_lote(_cobrancas(5))
+        assert gateway.pico['t1'] == 1
+
+
+class TestCircuito:
+
+    def test_abre_e_para_de_chamar_o_gateway(self, gateway, settings):
+        settings.BOLETO_API_CIRCUITO_FALHAS = 3
+        gateway.fora_do_ar.add('sicoob')
+        client = BoletoApiClient()
+
+        resultados = [client.consultar_cobranca(f'C{i}', 't1', 'sicoob') for i in range(10)]
+
+        assert gateway.chamadas['sicoob'] == 3
+        assert all(not r['sucesso'] for r in resultados)
+        assert 'circuito' in resultados[-1]['erro']
+        # Outro provider no mesmo gateway segue com o circuito fechado
+        assert client.consultar_cobranca('C1', 't1', 'c6')['sucesso']
+
+    def test_retry_para_quando_o_circuito_abre(self, gateway, settings):
+        settings.BOLETO_API_CIRCUITO_FALHAS = 2
+        settings.BOLETO_API_MAX_TENTATIVAS = 5
+        settings.BOLETO_API_DELAY_INICIAL = 0
+        gateway.fora_do_ar.add('sicoob')
+
+        r = BoletoApiClient().consultar_cobranca('C1', 't1', 'sicoob')
+
+        assert r['sucesso'] is False and r['codigo'] == 503
+        assert gateway.chamadas['sicoob'] == 2
+
+    def test_meio_aberto_fecha_apos_chamada_de_teste(self, gateway, settings):
+        settings.BOLETO_API_CIRCUITO_FALHAS = 1
+        settings.BOLETO_API_CIRCUITO_ABERTO_SEGUNDOS = 0.2
+        gateway.fora_do_ar.add('sicoob')
+        client = BoletoApiClient()
+        client.consultar_cobranca('C1', 't1', 'sicoob')
+        assert 'circuito' in client.consultar_cobranca('C2', 't1', 'sicoob')['erro']
+
+        gateway.fora_do_ar.clear()
+        time.sleep(0.25)
+
+        assert client.consultar_cobranca('C3', 't1', 'sicoob')['sucesso']
+        assert not bapi._circuitos[(f'127.0.0.1:{gateway.server_port}', 'sicoob')].aberto
+        assert client.consultar_cobranca('C4', 't1', 'sicoob')['sucesso']
@@ -48,6 +48,12 @@ def contrato_sicoob(db):
 
 @pytest.mark.django_db
 class TestPollingSicoob:
+    @pytest.fixture(autouse=True)
+    def _sem_conciliacao(self):
+        # Gateway sem GET /conciliacao: o polling consulta parcela a parcela
+        with patch(f'{CLIENT}.consultar_conciliacao', return_value={'sucesso': False, 'erro': '404'}):
+            yield
+
     def test_baixa_quando_liquidado(self, contrato_sicoob):
         _, contrato = contrato_sicoob
         p = contrato.parcelas.first()
@@ -95,6 +101,39 @@ class TestConciliacaoPix:
             r = tasks.conciliar_pix_recebidos()
         assert r['baixadas'] == 0
 
+    def test_contagens_e_idempotencia(self):
+        from tests.fixtures.factories import ContaBancariaApiFactory, ParcelaFactory
+        for provider in ('c6', 'sicoob'):
+            conta = ContaBancariaApiFactory(banco='336', provider=provider, tenant_id=provider, ativo=True)
+            conta.set_bapi_token('b'); conta.save()
+        aberta = ParcelaFactory(pix_txid='TXA', pago=False, valor_boleto=Decimal('50'))
+        ParcelaFactory(pix_txid='TXB', pago=True, valor_pago=Decimal('50'))
+        itens = [{'txid': 'TXA', 'valor': 50}, {'txid': 'TXB', 'valor': 50},
+                 {'txid': 'TXZ', 'valor': 1}, {'txid': ''}]
+        with patch(f'{CLIENT}.listar_pix_recebidos', return_value={'sucesso': True, 'itens': itens}):
+            r = tasks.conciliar_pix_recebidos()
+            again = tasks.conciliar_pix_recebidos()
+
+        # As duas contas devolvem os mesmos txids: cada um conta uma vez
+        assert (r['recebidos'], r['casados'], r['sem_parcela']) == (3, 2, 1)
+        assert (r['baixadas'], r['ja_pagas']) == (1, 1)
+        assert (again['baixadas'], again['ja_pagas']) == (0, 2)
+        aberta.refresh_from_db()
+        assert aberta.pago
+
+    def test_txids_resolvidos_numa_consulta(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from tests.fixtures.factories import ContaBancariaApiFactory
+        conta = ContaBancariaApiFactory(banco='336', provider='c6', tenant_id='t', ativo=True)
+        conta.set_bapi_token('b'); conta.save()
+        itens = [{'txid': f'TX{n}', 'valor': 1} for n in range(300)]
+        with patch(f'{CLIENT}.listar_pix_recebidos', return_value={'sucesso': True, 'itens': itens}), \
+             CaptureQueriesContext(connection) as ctx:
+            r = tasks.conciliar_pix_recebidos()
+        assert r['sem_parcela'] == 300
+        assert sum('financeiro_parcela' in q['sql'] for q in ctx.captured_queries) == 1
+
 
 @pytest.mark.django_db
 class TestReprocessarCip:
@@ -123,7 +123,7 @@ class TestBoletoApiClient:
         assert 'Falha de conexão' in resultado['erro']
 
     def test_retry_em_5xx(self):
-        """_request deve retentar requests.request em 5xx até max_tentativas."""
+        """_request deve retentar (session compartilhada) em 5xx até max_tentativas."""
         import requests as _req
         client = self._client()
         client.max_tentativas = 3
@@ -143,7 +143,7 @@ class TestBoletoApiClient:
                 return resp_5xx
             return resp_ok
 
-        with patch('financeiro.services.boleto_api_client.requests.request',
+        with patch('financeiro.services.boleto_api_client.requests.Session.request',
                    side_effect=fake_http), \
              patch('financeiro.services.boleto_api_client.time.sleep'):
             resultado = client.registrar_cobranca('t', 'sicoob', {}, {'valor': 1.0})
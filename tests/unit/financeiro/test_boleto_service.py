@@ -200,6 +200,45 @@ class TestBoletoServiceIntegracao:
         assert mock_brcobranca_error.call_count == 3
 
 
+class TestBoletoServiceLote:
+    """Testes de gerar_boletos_lote"""
+
+    @pytest.mark.django_db
+    def test_parcela_invalida_nao_consome_nosso_numero(
+        self, contrato_factory, conta_bancaria_factory
+    ):
+        """Nossos números são reservados só para os boletos válidos do lote"""
+        import base64
+        import json
+        from unittest.mock import patch
+
+        contrato = contrato_factory()
+        conta = conta_bancaria_factory(
+            imobiliaria=contrato.imobiliaria, banco='756', convenio='1234567',
+            nosso_numero_atual=10,
+        )
+        primeira, invalida, terceira = contrato.parcelas.order_by('numero_parcela')[:3]
+        validas = [primeira, terceira]
+        invalida.valor_atual = Decimal('0')
+        invalida.save(update_fields=['valor_atual'])
+        resposta = Mock(status_code=200)
+        resposta.json.return_value = {'content_base64': base64.b64encode(b'%PDF').decode(), 'boletos': []}
+
+        service = BoletoService()
+        with patch('financeiro.services.boleto_service.requests.post', return_value=resposta) as post:
+            resultado = service.gerar_boletos_lote(
+                [(p, conta) for p in (validas[0], invalida, validas[1])]
+            )
+
+        assert resultado['gerados'] == 2
+        assert len(resultado['erros']) == 1
+        assert f'pk={invalida.pk}' in resultado['erros'][0]
+        conta.refresh_from_db()
+        assert conta.nosso_numero_atual == 12
+        enviados = json.loads(post.call_args.kwargs['files']['data'][1])
+        assert [b['nosso_numero'] for b in enviados] == ['0000011', '0000012']
+
+
 class TestBoletoServiceFormatacao:
     """Testes de formatação de dados"""
 
@@ -1,8 +1,9 @@
 """
 Throttle compartilhado da BRCobrança — cooldown boletos → remessa.
 
-Cobre o marcador de uso via cache e o cálculo do tempo restante de cooldown,
-sem dormir de verdade (time.sleep é mockado).
+Cobre o marcador de uso via cache, o cálculo do tempo restante de cooldown,
+a pausa global após 429 e a concorrência adaptativa, sem dormir de verdade
+(time.sleep é mockado).
 
 Desenvolvedor: Maxwell da Silva Oliveira
 """
@@ -16,9 +17,9 @@ from financeiro.services import brcobranca_throttle as throttle
 
 @pytest.fixture(autouse=True)
 def _limpar_cache():
-    cache.delete(throttle._CACHE_KEY)
+    cache.delete_many([throttle._CACHE_KEY, throttle._CACHE_KEY_PAUSA])
     yield
-    cache.delete(throttle._CACHE_KEY)
+    cache.delete_many([throttle._CACHE_KEY, throttle._CACHE_KEY_PAUSA])
 
 
 def test_sem_marcador_nao_aguarda(settings):
@@ -73,3 +74,65 @@ def test_espera_limitada_ao_cooldown(settings):
         aguardado = throttle.aguardar_cooldown_remessa()
     assert aguardado <= 5.0
     mock_sleep.assert_called_once()
+
+
+def test_rate_limit_pausa_as_proximas_chamadas():
+    throttle.registrar_rate_limit(30)
+    with patch.object(throttle.time, 'sleep') as mock_sleep:
+        aguardado = throttle.aguardar_rate_limit()
+    assert 29 <= aguardado <= 30
+    mock_sleep.assert_called_once()
+
+
+def test_rate_limit_so_estende_a_pausa():
+    throttle.registrar_rate_limit(30)
+    throttle.registrar_rate_limit(5)
+    with patch.object(throttle.time, 'sleep'):
+        assert throttle.aguardar_rate_limit() > 5
+
+
+def test_sem_rate_limit_nao_aguarda():
+    with patch.object(throttle.time, 'sleep') as mock_sleep:
+        assert throttle.aguardar_rate_limit() == 0.0
+    mock_sleep.assert_not_called()
+
+
+def test_concorrencia_adaptativa_reduz_e_recupera():
+    limite = throttle.ConcorrenciaAdaptativa(8, janela=2)
+
+    with limite.vaga() as vaga:
+        vaga.rate_limited = True
+    assert limite.limite == 4
+    with limite.vaga() as vaga:
+        vaga.rate_limited = True
+    assert limite.limite == 2
+
+    for _ in range(4):
+        with limite.vaga():
+            pass
+    assert limite.limite == 4
+
+
+def test_concorrencia_adaptativa_respeita_o_limite():
+    import threading
+    import time
+
+    limite = throttle.ConcorrenciaAdaptativa(3)
+    simultaneas, pico = [0], [0]
+    trava = threading.Lock()
+
+    def chamada():
+        with limite.vaga():
+            with trava:
+                simultaneas[0] += 1
+                pico[0] = max(pico[0], simultaneas[0])
+            time.sleep(0.01)
+            with trava:
+                simultaneas[0] -= 1
+
+    threads = [threading.Thread(target=chamada) for _ in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert pico[0] <= 3
@@ -21,6 +21,7 @@ from datetime import date
 from unittest.mock import patch, MagicMock
 
 from django.core.files.base import ContentFile
+from django.db import transaction
 from django.test import Client
 from django.urls import reverse
 
@@ -492,3 +493,171 @@ class TestFluxoCompletoCNAB:
         # ── Passo 7: contrato permanece ATIVO ────────────────────────────
         contrato.refresh_from_db()
         assert contrato.status == StatusContrato.ATIVO
+
+
+# ---------------------------------------------------------------------------
+# TestResolucaoNossoNumeroLote
+# ---------------------------------------------------------------------------
+
+@pytest.mark.django_db
+class TestResolucaoNossoNumeroLote:
+    """Resolução em lote nosso_numero → Parcela pela chave normalizada."""
+
+    def test_chave_gerada_sem_zeros_a_esquerda(self, contrato_cnab):
+        contrato, conta = contrato_cnab
+        parcela4 = contrato.parcelas.get(numero_parcela=4)
+        assert parcela4.nosso_numero == '000004'
+        assert parcela4.nosso_numero_chave == '4'
+
+    def test_resolve_zero_padded_em_no_maximo_duas_queries(
+        self, contrato_cnab, django_assert_max_num_queries
+    ):
+        from financeiro.services.cnab_service import CNABService
+        contrato, conta = contrato_cnab
+        recebidos = ['00000000000004', '000005', '6']
+        with django_assert_max_num_queries(2):
+            resolvidas = CNABService().resolver_parcelas_por_nosso_numero(recebidos, conta)
+        assert {nn: p.numero_parcela for nn, p in resolvidas.items()} == {
+            '00000000000004': 4, '000005': 5, '6': 6,
+        }
+
+    def test_vazio_e_desconhecido_nao_resolvem(self, contrato_cnab):
+        from financeiro.services.cnab_service import CNABService
+        contrato, conta = contrato_cnab
+        resolvidas = CNABService().resolver_parcelas_por_nosso_numero(['', '999999'], conta)
+        assert resolvidas == {}
+
+    def test_fallback_por_sufixo_em_lote(
+        self, contrato_cnab, django_assert_max_num_queries
+    ):
+        """Prefixados e desconhecidos: queries fixas, sem uma por registro."""
+        from financeiro.services.cnab_service import CNABService
+        contrato, conta = contrato_cnab
+        parcela7 = contrato.parcelas.get(numero_parcela=7)
+        parcela7.nosso_numero = '3128557000077'
+        parcela7.save(update_fields=['nosso_numero'])
+        recebidos = ['000077'] + [str(900000 + i) for i in range(20)]
+        with django_assert_max_num_queries(4):
+            resolvidas = CNABService().resolver_parcelas_por_nosso_numero(recebidos, conta)
+        assert list(resolvidas) == ['000077']
+        assert resolvidas['000077'].pk == parcela7.pk
+        assert 'boleto_pdf_db' in resolvidas['000077'].get_deferred_fields()
+
+    def test_busca_unitaria_delegada(self, contrato_cnab):
+        from financeiro.services.cnab_service import CNABService
+        contrato, conta = contrato_cnab
+        parcela = CNABService()._buscar_parcela_por_nosso_numero('0000000005', conta)
+        assert parcela.numero_parcela == 5
+
+    def test_liquidacao_com_nosso_numero_zero_padded(self, contrato_cnab):
+        from financeiro.services.cnab_service import CNABService
+        contrato, conta = contrato_cnab
+        parcela6 = contrato.parcelas.get(numero_parcela=6)
+        ret = _criar_arquivo_retorno(conta)
+        mock_api = _mock_retorno('00000000000006', '06', str(parcela6.valor_atual))
+        with patch('financeiro.services.cnab_service.requests.post', return_value=mock_api):
+            result = CNABService().processar_retorno(ret)
+        assert result['registros_processados'] == 1
+        parcela6.refresh_from_db()
+        assert parcela6.pago is True
+
+
+# ---------------------------------------------------------------------------
+# TestProcessarRetornoEmLote
+# ---------------------------------------------------------------------------
+
+def _mock_retorno_lote(registros):
+    """Mock de requests.post com vários registros: [(nosso_numero, codigo, valor)]."""
+    mock = MagicMock()
+    mock.status_code = 200
+    mock.json.return_value = {
+        'retornos': [{
+            'nosso_numero': nn,
+            'codigo_ocorrencia': codigo,
+            'valor_titulo': valor,
+            'valor_pago': valor if codigo in ('06', '17') else '0.00',
+            'data_ocorrencia': '2025-06-15',  # após o vencimento → juros/multa
+            'data_credito': '2025-06-15',
+        } for nn, codigo, valor in registros]
+    }
+    return mock
+
+
+@pytest.mark.django_db
+class TestProcessarRetornoEmLote:
+    """Pipeline em lote (em_lote=True) — mesma semântica do laço unitário."""
+
+    REGISTROS = [
+        ('000004', '06', '8333.33'),   # liquidação
+        ('000005', '02', '8333.33'),   # entrada
+        ('000006', '09', '8333.33'),   # baixa
+        ('999999', '06', '100.00'),    # parcela inexistente → erro
+    ]
+
+    def _processar(self, conta, em_lote):
+        from financeiro.services.cnab_service import CNABService
+        ret = _criar_arquivo_retorno(conta)
+        with patch('financeiro.services.cnab_service.requests.post',
+                   return_value=_mock_retorno_lote(self.REGISTROS)):
+            return ret, CNABService().processar_retorno(ret, em_lote=em_lote)
+
+    def _estado(self, contrato):
+        return list(
+            contrato.parcelas.filter(numero_parcela__in=[4, 5, 6])
+            .order_by('numero_parcela')
+            .values_list('pago', 'valor_pago', 'status_boleto', 'data_pagamento',
+                         'valor_juros', 'valor_multa', 'motivo_rejeicao')
+        )
+
+    def test_resultado_e_estado_iguais_ao_laco_unitario(self, contrato_cnab):
+        from financeiro.models import HistoricoPagamento, ItemRetorno
+        contrato, conta = contrato_cnab
+
+        with transaction.atomic():
+            _, r_unitario = self._processar(conta, em_lote=False)
+            estado_unitario = self._estado(contrato)
+            transaction.set_rollback(True)
+
+        ret, r_lote = self._processar(conta, em_lote=True)
+
+        for chave in ('total_registros', 'registros_processados', 'registros_erro',
+                      'valor_total_pago'):
+            assert r_lote[chave] == r_unitario[chave]
+        assert r_lote['registros_processados'] == 3
+        assert r_lote['registros_erro'] == 1
+        assert self._estado(contrato) == estado_unitario
+        assert estado_unitario[0][5] > 0  # multa calculada na liquidação em atraso
+
+        itens = ItemRetorno.objects.filter(arquivo_retorno=ret)
+        assert itens.count() == 4
+        assert itens.get(nosso_numero='999999').erro_processamento == 'Parcela não encontrada'
+        hist = HistoricoPagamento.objects.get(item_retorno__arquivo_retorno=ret)
+        assert hist.parcela.numero_parcela == 4
+        assert hist.origem_pagamento == 'CNAB'
+
+    def test_reprocessar_mesmo_arquivo_nao_duplica(self, contrato_cnab):
+        from financeiro.models import HistoricoPagamento
+        from financeiro.services.cnab_service import CNABService
+        contrato, conta = contrato_cnab
+        ret, _ = self._processar(conta, em_lote=True)
+        with patch('financeiro.services.cnab_service.requests.post',
+                   return_value=_mock_retorno_lote(self.REGISTROS)):
+            r2 = CNABService().processar_retorno(ret, em_lote=True)
+        assert r2['registros_processados'] == 3
+        assert HistoricoPagamento.objects.filter(item_retorno__arquivo_retorno=ret).count() == 1
+
+    def test_liquidacao_de_parcela_ja_paga_reporta_erro_sem_abortar(self, contrato_cnab):
+        contrato, conta = contrato_cnab
+        contrato.parcelas.filter(numero_parcela=4).update(pago=True)
+        _, resultado = self._processar(conta, em_lote=True)
+        assert resultado['sucesso'] is True
+        assert resultado['registros_processados'] == 2
+        assert resultado['registros_erro'] == 2
+        assert contrato.parcelas.get(numero_parcela=5).status_boleto == 'REGISTRADO'
+
+    def test_numero_de_queries_nao_cresce_com_registros(
+        self, contrato_cnab, django_assert_max_num_queries
+    ):
+        contrato, conta = contrato_cnab
+        with django_assert_max_num_queries(20):
+            self._processar(conta, em_lote=True)
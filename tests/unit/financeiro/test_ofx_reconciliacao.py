@@ -0,0 +1,188 @@
+"""
+Reconciliação OFX indexada (financeiro.services.ofx_service._IndiceParcelas)
+
+Testa:
+- Mesmo resultado da varredura linear (P1a, P1b, P2, P3, P4, tolerância de valor)
+- Parcela usada não é casada de novo
+- FITIDs já quitados lidos numa consulta só (sem consulta por transação)
+- 2.000 transações × 50 mil parcelas em aberto em menos de um segundo
+
+Desenvolvedor: Maxwell da Silva Oliveira <maxwbh@gmail.com>
+"""
+import random
+import time
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from financeiro.models import HistoricoPagamento
+from financeiro.services.ofx_service import OFXService, OFXTransaction, _IndiceParcelas
+
+
+def _parcela(pk, nosso_numero, contrato, valor, vencimento):
+    return SimpleNamespace(
+        pk=pk, nosso_numero=nosso_numero, valor_atual=valor, data_vencimento=vencimento,
+        contrato=SimpleNamespace(numero_contrato=contrato),
+    )
+
+
+def _tx(valor, data=None, memo='', nosso_numero=None):
+    tx = OFXTransaction()
+    tx.valor, tx.data, tx.memo, tx.nosso_numero_extraido = valor, data, memo, nosso_numero
+    return tx
+
+
+def _linear(tx, parcelas, usadas, tolerancia=OFXService.TOLERANCIA_VALOR):
+    """Varredura linear original — referência para o índice."""
+    disponiveis = [p for p in parcelas if p.pk not in usadas]
+    if tx.nosso_numero_extraido:
+        for p in disponiveis:
+            if p.nosso_numero and p.nosso_numero == tx.nosso_numero_extraido:
+                return p, 'ALTA'
+    if tx.memo:
+        for p in disponiveis:
+            if p.nosso_numero and p.nosso_numero in tx.memo:
+                return p, 'ALTA'
+        for p in disponiveis:
+            num = p.contrato.numero_contrato
+            if num and num.upper() in tx.memo.upper():
+                return p, 'ALTA'
+    if tx.data:
+        for p in disponiveis:
+            if (abs(tx.valor - p.valor_atual) <= tolerancia and p.data_vencimento
+                    and (p.data_vencimento.year, p.data_vencimento.month)
+                    == (tx.data.year, tx.data.month)):
+                return p, 'MEDIA'
+    for p in disponiveis:
+        if abs(tx.valor - p.valor_atual) <= tolerancia:
+            return p, 'BAIXA'
+    return None, 'NAO_ENCONTRADA'
+
+
+def _massa(rng, n_parcelas, n_transacoes):
+    """Parcelas e transações com muitas colisões de valor, mês, nosso_número e contrato."""
+    parcelas = [
+        _parcela(
+            pk, rng.choice(['', f'{rng.randrange(300):07d}', f'NN{rng.randrange(50)}']),
+            rng.choice(['', f'ctr-{rng.randrange(40)}', f'C{rng.randrange(400)}']),
+            Decimal(rng.randrange(9900, 10100)) / 100,
+            rng.choice([None, date(2026, rng.randint(1, 3), 10)]),
+        )
+        for pk in range(1, n_parcelas + 1)
+    ]
+    transacoes = [
+        _tx(
+            Decimal(rng.randrange(989000, 1011000)) / 10000,
+            rng.choice([None, date(2026, rng.randint(1, 3), 5)]),
+            rng.choice(['', f'PIX CTR-{rng.randrange(60)} REF', f'BOLETO {rng.randrange(300):07d}',
+                        f'TED NN{rng.randrange(80)}X', 'TRANSFERENCIA']),
+            rng.choice([None, f'{rng.randrange(400):07d}']),
+        )
+        for _ in range(n_transacoes)
+    ]
+    return parcelas, transacoes
+
+
+class TestEquivalenciaComVarreduraLinear:
+
+    @pytest.mark.parametrize('semente', range(5))
+    def test_mesmas_parcelas_e_confianca(self, semente):
+        rng = random.Random(semente)
+        parcelas, transacoes = _massa(rng, 600, 400)
+        service = OFXService(brcobranca_url='http://brcobranca')
+        indice = _IndiceParcelas(parcelas)
+        usadas = set()
+
+        for tx in transacoes:
+            esperado, confianca = _linear(tx, parcelas, usadas)
+            rec = service._reconciliar(tx, indice)
+            assert (rec.parcela, rec.confianca) == (esperado, confianca), tx
+            if rec.reconciliada:
+                usadas.add(rec.parcela.pk)
+                indice.usar(rec.parcela)
+
+    def test_tolerancia_de_valor_nas_bordas(self):
+        parcelas = [_parcela(1, '', '', Decimal('100.00'), None)]
+        service = OFXService(brcobranca_url='http://brcobranca')
+
+        assert service._reconciliar(_tx(Decimal('100.10')), _IndiceParcelas(parcelas)).reconciliada
+        assert service._reconciliar(_tx(Decimal('99.9')), _IndiceParcelas(parcelas)).reconciliada
+        assert not service._reconciliar(_tx(Decimal('100.101')), _IndiceParcelas(parcelas)).reconciliada
+        assert not service._reconciliar(_tx(Decimal('99.899')), _IndiceParcelas(parcelas)).reconciliada
+
+    def test_parcela_usada_nao_casa_de_novo(self):
+        parcelas = [_parcela(1, '0001', 'A-1', Decimal('50.00'), None),
+                    _parcela(2, '0001', 'A-1', Decimal('50.00'), None)]
+        indice = _IndiceParcelas(parcelas)
+        service = OFXService(brcobranca_url='http://brcobranca')
+
+        casadas = []
+        for _ in range(3):
+            rec = service._reconciliar(_tx(Decimal('1.00'), memo='PAG 0001'), indice)
+            if rec.reconciliada:
+                indice.usar(rec.parcela)
+            casadas.append(rec.parcela and rec.parcela.pk)
+
+        assert casadas == [1, 2, None]
+
+
+@pytest.mark.django_db
+def test_fitids_carregados_numa_consulta(contrato_factory):
+    contrato = contrato_factory(numero_parcelas=3)
+    parcela = contrato.parcelas.order_by('numero_parcela').first()
+    HistoricoPagamento.objects.create(
+        parcela=parcela, data_pagamento=date(2026, 1, 5), valor_pago=parcela.valor_atual,
+        valor_parcela=parcela.valor_atual, forma_pagamento='TRANSFERENCIA',
+        origem_pagamento='OFX', fitid_ofx='FIT-JA',
+    )
+    resposta = MagicMock(status_code=200)
+    resposta.json.return_value = {'transacoes': [
+        {'fitid': f'FIT-{i}', 'tipo': 'CREDIT', 'data': '2026-01-05', 'valor': 1.0, 'memo': 'X'}
+        for i in range(50)
+    ] + [{'fitid': 'FIT-JA', 'tipo': 'CREDIT', 'data': '2026-01-05',
+          'valor': float(parcela.valor_atual), 'memo': 'X'}]}
+
+    service = OFXService(contrato=contrato)
+    with patch('financeiro.services.ofx_service.requests.post', return_value=resposta), \
+         CaptureQueriesContext(connection) as consultas:
+        resultado = service.processar(b'<OFX></OFX>')
+
+    assert resultado['reconciliadas'] == 1
+    assert sum('fitid_ofx' in q['sql'] for q in consultas.captured_queries) == 1
+    # FITID já quitado não gera novo histórico nem baixa
+    assert HistoricoPagamento.objects.filter(fitid_ofx='FIT-JA').count() == 1
+    parcela.refresh_from_db()
+    assert not parcela.pago
+
+
+@pytest.mark.slow
+def test_escala_2000_transacoes_50_mil_parcelas():
+    rng = random.Random(7)
+    parcelas = [
+        _parcela(pk, f'{pk:010d}', f'CTR-{pk // 60:05d}',
+                 Decimal(rng.randrange(50000, 500000)) / 100, date(2026, rng.randint(1, 12), 10))
+        for pk in range(1, 50001)
+    ]
+    memos = ['PIX RECEBIDO {}', 'BOLETO {}', 'TED CTR-{} PARCELA', 'DEPOSITO']
+    transacoes = [
+        _tx(Decimal(rng.randrange(50000, 500000)) / 100, date(2026, rng.randint(1, 12), 8),
+            rng.choice(memos).format(rng.randrange(1, 60000)))
+        for _ in range(2000)
+    ]
+    service = OFXService(brcobranca_url='http://brcobranca')
+
+    # Tempo de CPU do processo: não conta a disputa com outros workers do xdist.
+    # Limite folgado (o índice leva bem menos de 1 s): só pega a volta da busca
+    # linear por transação (2000 × 50 mil comparações)
+    inicio = time.process_time()
+    indice = _IndiceParcelas(parcelas)
+    for tx in transacoes:
+        rec = service._reconciliar(tx, indice)
+        if rec.reconciliada:
+            indice.usar(rec.parcela)
+    assert time.process_time() - inicio < 10.0
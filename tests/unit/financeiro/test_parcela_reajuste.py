@@ -5,10 +5,12 @@ Testa:
 - Modelo Parcela (tipo, ciclo, cálculos)
 - Modelo Reajuste (criação, aplicação, ciclos)
 - Bloqueio de boleto por reajuste
+- Preview em lote (preview_reajuste_lote) e aplicação reaproveitando o preview
 """
 import pytest
 from decimal import Decimal
 from datetime import date, timedelta
+from unittest.mock import patch
 from django.utils import timezone
 from financeiro.models import TipoParcela
 
@@ -378,6 +380,162 @@ class TestCalcularCicloPendenteAntecipacao:
             assert ciclo_antecipado == ciclo_sem_antecipacao
 
 
+# ---------------------------------------------------------------------------
+# preview_reajuste_lote — preview de vários contratos em consultas constantes
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def contratos_reajuste_lote(contrato_factory, indice_factory):
+    """Contratos com ciclo 2 pendente nos modos SIMPLES, PRICE e SAC, com fallback e sem índice."""
+    from dateutil.relativedelta import relativedelta
+    from contratos.models import PrestacaoIntermediaria, TabelaJurosContrato
+
+    hoje = date.today()
+    for meses in range(1, 30):
+        ref = hoje - relativedelta(months=meses)
+        indice_factory(tipo_indice='IPCA', ano=ref.year, mes=ref.month, valor=Decimal('0.37'))
+
+    base = {
+        'numero_parcelas': 36,
+        'data_contrato': hoje - relativedelta(months=13),
+        'data_primeiro_vencimento': hoje - relativedelta(months=12),
+    }
+    simples = contrato_factory(spread_reajuste=Decimal('0.5'), intermediarias_reajustadas=True, **base)
+    PrestacaoIntermediaria.objects.create(
+        contrato=simples, numero_sequencial=1, mes_vencimento=14, valor=Decimal('5000.00'),
+    )
+    price = contrato_factory(reajuste_teto=Decimal('3'), **base)
+    sac = contrato_factory(tipo_amortizacao='SAC', **base)
+    for contrato in (price, sac):
+        TabelaJurosContrato.objects.create(contrato=contrato, ciclo_inicio=1, juros_mensal=Decimal('0.6'))
+    fallback = contrato_factory(tipo_correcao='IGPM', tipo_correcao_fallback='IPCA', **base)
+    sem_indice = contrato_factory(tipo_correcao='INCC', **base)
+    return [simples, price, sac, fallback, sem_indice]
+
+
+@pytest.mark.django_db
+class TestPreviewReajusteLote:
+
+    def test_igual_ao_preview_individual(self, contratos_reajuste_lote):
+        from financeiro.models import Reajuste
+
+        ciclos = Reajuste.ciclos_pendentes(contratos_reajuste_lote)
+        assert set(ciclos.values()) == {2}
+
+        for descontos in ({}, {'desconto_percentual': '0.25', 'desconto_valor': '10'}):
+            previews = Reajuste.preview_reajuste_lote(contratos_reajuste_lote, ciclos, **descontos)
+            for contrato in contratos_reajuste_lote:
+                assert previews[contrato.pk] == Reajuste.preview_reajuste(contrato, 2, **descontos)
+
+        tipos = [previews[c.pk].get('tipo_calculo') for c in contratos_reajuste_lote]
+        assert tipos == ['SIMPLES', 'TABELA_PRICE', 'SAC', 'SIMPLES', 'SIMPLES']
+        assert previews[contratos_reajuste_lote[0].pk]['total_intermediarias'] == 1
+        assert previews[contratos_reajuste_lote[3].pk]['indice_tipo'] == 'IPCA'
+        assert 'erro' in previews[contratos_reajuste_lote[4].pk]
+
+    def test_consultas_nao_crescem_com_o_lote(self, contratos_reajuste_lote, contrato_factory):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from financeiro.models import Reajuste
+
+        ciclos = Reajuste.ciclos_pendentes(contratos_reajuste_lote)
+        Reajuste.preview_reajuste_lote(contratos_reajuste_lote, ciclos)  # aquece as séries de índices
+
+        with CaptureQueriesContext(connection) as poucos:
+            Reajuste.preview_reajuste_lote(contratos_reajuste_lote[:2], ciclos)
+        with CaptureQueriesContext(connection) as todos:
+            Reajuste.preview_reajuste_lote(contratos_reajuste_lote, ciclos)
+
+        assert len(todos) == len(poucos) <= 3
+
+    def test_aplicar_reaproveita_preview(self, contratos_reajuste_lote):
+        from financeiro.models import Reajuste
+
+        contratos = contratos_reajuste_lote[:3]
+        previews = Reajuste.preview_reajuste_lote(contratos, Reajuste.ciclos_pendentes(contratos))
+
+        for contrato in contratos:
+            preview = previews[contrato.pk]
+            reajuste = Reajuste.objects.create(
+                contrato=contrato, data_reajuste=date.today(), indice_tipo=preview['indice_tipo'],
+                percentual=preview['percentual_final'], ciclo=2,
+                parcela_inicial=preview['parcela_inicial'], parcela_final=preview['parcela_final'],
+            )
+            with patch.object(Reajuste, '_calcular_sac_tabela', side_effect=AssertionError):
+                resultado = reajuste.aplicar_reajuste(preview=preview)
+
+            assert resultado['parcelas_reajustadas'] == preview['total_parcelas']
+            assert resultado['valor_novo_total'] == preview['valor_novo_total']
+            valores = dict(contrato.parcelas.filter(pago=False).values_list('numero_parcela', 'valor_atual'))
+            for linha in preview['parcelas']:
+                assert valores[linha['numero_parcela']] == linha['valor_novo']
+            contrato.refresh_from_db()
+            assert contrato.ciclo_reajuste_atual == 2
+
+    def test_preview_desatualizado_recalcula(self, contratos_reajuste_lote):
+        from financeiro.models import Reajuste
+
+        contrato = contratos_reajuste_lote[0]
+        preview = Reajuste.preview_reajuste(contrato, 2)
+        contrato.parcelas.filter(numero_parcela=20).update(valor_atual=Decimal('1.00'))
+
+        reajuste = Reajuste.objects.create(
+            contrato=contrato, data_reajuste=date.today(), indice_tipo='IPCA',
+            percentual=preview['percentual_final'], ciclo=2,
+            parcela_inicial=preview['parcela_inicial'], parcela_final=preview['parcela_final'],
+        )
+        reajuste.aplicar_reajuste(preview=preview)
+
+        esperado = (Decimal('1.00') * (1 + preview['percentual_final'] / 100)).quantize(Decimal('0.01'))
+        assert contrato.parcelas.get(numero_parcela=20).valor_atual == esperado
+
+    def test_parcela_criada_apos_preview_recalcula(self, contratos_reajuste_lote):
+        """Parcela fora do preview (criada depois dele) força o cálculo completo."""
+        import uuid
+        from financeiro.models import Reajuste
+
+        contrato = contratos_reajuste_lote[0]
+        preview = Reajuste.preview_reajuste(contrato, 2)
+        nova = contrato.parcelas.order_by('numero_parcela').last()
+        valor_original = nova.valor_atual
+        nova.pk = None
+        nova.numero_parcela += 1
+        nova.token_publico = uuid.uuid4()
+        nova.save()
+
+        reajuste = Reajuste.objects.create(
+            contrato=contrato, data_reajuste=date.today(), indice_tipo='IPCA',
+            percentual=preview['percentual_final'], ciclo=2,
+            parcela_inicial=preview['parcela_inicial'], parcela_final=preview['parcela_final'],
+        )
+        resultado = reajuste.aplicar_reajuste(preview=preview)
+
+        assert resultado['parcelas_reajustadas'] == preview['total_parcelas'] + 1
+        nova.refresh_from_db()
+        assert nova.valor_atual != valor_original
+
+    @pytest.mark.parametrize('usar_preview', [True, False])
+    def test_desconto_aplicado_uma_vez(self, contratos_reajuste_lote, usar_preview):
+        """Com preview ou recalculando, o desconto em p.p. sai uma vez só (percentual já é líquido)."""
+        from financeiro.models import Reajuste
+
+        descontos = {'desconto_percentual': Decimal('0.25'), 'desconto_valor': Decimal('10')}
+        for contrato in contratos_reajuste_lote[:3]:
+            preview = Reajuste.preview_reajuste(contrato, 2, **descontos)
+            reajuste = Reajuste.objects.create(
+                contrato=contrato, data_reajuste=date.today(), indice_tipo=preview['indice_tipo'],
+                percentual=preview['percentual_final'], percentual_bruto=preview['percentual_bruto'],
+                piso_aplicado=preview['piso'], teto_aplicado=preview['teto'], ciclo=2,
+                parcela_inicial=preview['parcela_inicial'], parcela_final=preview['parcela_final'],
+                **descontos,
+            )
+            reajuste.aplicar_reajuste(preview=preview if usar_preview else None)
+
+            valores = dict(contrato.parcelas.filter(pago=False).values_list('numero_parcela', 'valor_atual'))
+            for linha in preview['parcelas']:
+                assert valores[linha['numero_parcela']] == linha['valor_novo'], (contrato.pk, linha)
+
+
 # Fixtures
 @pytest.fixture
 def contrato_factory(db, imobiliaria_factory, comprador_factory, imovel_factory):
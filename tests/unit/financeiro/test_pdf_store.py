@@ -0,0 +1,184 @@
+"""
+Store de PDFs de boleto por conteúdo (financeiro.services.pdf_store).
+
+Cobre deduplicação por SHA-256, leitura unificada (store → banco), resposta
+em streaming e o comando migrar_pdfs_boleto. O storage aponta para tmp_path.
+
+Desenvolvedor: Maxwell da Silva Oliveira
+"""
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.http import FileResponse
+
+from financeiro.services import pdf_store
+
+
+@pytest.fixture(autouse=True)
+def _storage_temporario(settings, tmp_path):
+    settings.STORAGES = {
+        **settings.STORAGES,
+        pdf_store.STORAGE_ALIAS: {
+            'BACKEND': 'django.core.files.storage.FileSystemStorage',
+            'OPTIONS': {'location': str(tmp_path)},
+        },
+    }
+    return tmp_path
+
+
+@pytest.fixture
+def parcelas(db):
+    from tests.fixtures.factories import ContratoFactory, ParcelaFactory
+    contrato = ContratoFactory()
+    return [ParcelaFactory(contrato=contrato) for _ in range(3)]
+
+
+PDF_A = b'%PDF-1.4 carne lote A' * 100
+PDF_B = b'%PDF-1.4 boleto B' * 50
+
+
+@pytest.mark.django_db
+def test_mesmo_conteudo_grava_um_arquivo(_storage_temporario):
+    from financeiro.models import ArquivoPdf
+
+    a1 = pdf_store.guardar_pdf(PDF_A)
+    a2 = pdf_store.guardar_pdf(PDF_A)
+    b = pdf_store.guardar_pdf(PDF_B)
+
+    assert a1.pk == a2.pk != b.pk
+    assert ArquivoPdf.objects.count() == 2
+    assert a1.tamanho == len(PDF_A)
+    assert len(list(_storage_temporario.rglob('*.pdf'))) == 2
+
+
+def test_anexar_respeita_a_flag(settings, parcelas):
+    parcela = parcelas[0]
+
+    settings.BOLETO_PDF_BLOB_STORE = False
+    pdf_store.anexar_pdf_parcela(parcela, PDF_B)
+    assert parcela.boleto_pdf_db == PDF_B and parcela.boleto_pdf_blob_id is None
+
+    settings.BOLETO_PDF_BLOB_STORE = True
+    pdf_store.anexar_pdf_parcela(parcela, PDF_B)
+    assert parcela.boleto_pdf_db is None and parcela.boleto_pdf_blob_id
+    assert pdf_store.pdf_da_parcela(parcela) == PDF_B
+
+
+def test_resposta_do_store_e_streaming(parcelas):
+    parcela = parcelas[0]
+    parcela.boleto_pdf_blob = pdf_store.guardar_pdf(PDF_A)
+
+    response = pdf_store.resposta_pdf_parcela(parcela, 'b.pdf', disposition='inline')
+
+    assert isinstance(response, FileResponse)
+    assert response['Content-Disposition'] == 'inline; filename="b.pdf"'
+    assert b''.join(response.streaming_content) == PDF_A
+    response.close()
+
+
+def test_resposta_cai_para_copia_em_banco(parcelas):
+    parcela = parcelas[0]
+    assert pdf_store.resposta_pdf_parcela(parcela, 'b.pdf') is None
+
+    parcela.boleto_pdf_db = PDF_B
+    response = pdf_store.resposta_pdf_parcela(parcela, 'b.pdf')
+    assert response.content == PDF_B
+
+
+def test_comando_migra_e_deduplica(parcelas):
+    from financeiro.models import ArquivoPdf, Parcela
+
+    for p in parcelas:
+        p.boleto_pdf_db = PDF_A  # carnê de lote copiado em cada parcela
+        p.save(update_fields=['boleto_pdf_db'])
+
+    out = StringIO()
+    call_command('migrar_pdfs_boleto', '--lote', '2', stdout=out)
+
+    assert ArquivoPdf.objects.count() == 1
+    for p in Parcela.objects.filter(pk__in=[p.pk for p in parcelas]):
+        assert p.boleto_pdf_db is None
+        assert pdf_store.pdf_da_parcela(p) == PDF_A
+    saida = out.getvalue()
+    assert 'Parcelas migradas: 3' in saida
+    assert 'PDFs distintos: 1' in saida
+    assert 'Espaço liberado: 4.1 KB' in saida  # 2 das 3 cópias de 2100 bytes
+
+
+def test_comando_dry_run_nao_altera(parcelas):
+    from financeiro.models import ArquivoPdf, Parcela
+
+    parcela = parcelas[0]
+    parcela.boleto_pdf_db = PDF_B
+    parcela.save(update_fields=['boleto_pdf_db'])
+
+    out = StringIO()
+    call_command('migrar_pdfs_boleto', '--dry-run', stdout=out)
+
+    assert ArquivoPdf.objects.count() == 0
+    assert bytes(Parcela.objects.get(pk=parcela.pk).boleto_pdf_db) == PDF_B
+    assert '[DRY-RUN] Parcelas migradas: 1' in out.getvalue()
+
+
+def test_lote_grava_um_unico_pdf_para_todas_as_parcelas(settings, parcelas):
+    import base64
+    from unittest.mock import MagicMock, patch
+    from financeiro.models import ArquivoPdf, Parcela
+    from financeiro.services.boleto_service import BoletoService
+    from tests.fixtures.factories import ContaBancariaFactory
+
+    settings.BOLETO_PDF_BLOB_STORE = True
+    conta = ContaBancariaFactory(banco='756')
+    resposta = MagicMock(status_code=200)
+    resposta.json.return_value = {'content_base64': base64.b64encode(PDF_A).decode(), 'boletos': []}
+
+    service = BoletoService()
+    with patch('financeiro.services.boleto_service.requests.post', return_value=resposta), \
+            patch.object(service, '_montar_dados_boleto', side_effect=lambda p, c, **kw: ({}, None)), \
+            patch.object(service, '_validar_dados_boleto', return_value={'valido': True, 'erros': []}):
+        resultado = service.gerar_boletos_lote([(p, conta) for p in parcelas])
+
+    assert resultado['gerados'] == 3
+    assert ArquivoPdf.objects.count() == 1
+    atualizadas = Parcela.objects.filter(pk__in=[p.pk for p in parcelas])
+    assert {p.boleto_pdf_blob_id for p in atualizadas} == {ArquivoPdf.objects.get().pk}
+    assert all(p.boleto_pdf_db is None for p in atualizadas)
+
+
+def test_regerar_sem_store_nao_serve_pdf_migrado(settings, parcelas):
+    """Flag desligada após migrar: o boleto regerado substitui o blob antigo."""
+    import base64
+    from unittest.mock import MagicMock, patch
+    from financeiro.models import Parcela
+    from financeiro.services.boleto_service import BoletoService
+    from tests.fixtures.factories import ContaBancariaFactory
+
+    for p in parcelas:
+        p.boleto_pdf_db = PDF_A
+        p.save(update_fields=['boleto_pdf_db'])
+    call_command('migrar_pdfs_boleto', stdout=StringIO())
+    settings.BOLETO_PDF_BLOB_STORE = False
+
+    # Geração individual
+    avulsa = Parcela.objects.get(pk=parcelas[0].pk)
+    pdf_store.anexar_pdf_parcela(avulsa, PDF_B)
+    avulsa.save(update_fields=['boleto_pdf_db', 'boleto_pdf_blob'])
+    avulsa = Parcela.objects.get(pk=avulsa.pk)
+    assert pdf_store.pdf_da_parcela(avulsa) == PDF_B
+    assert pdf_store.resposta_pdf_parcela(avulsa, 'b.pdf').content == PDF_B
+
+    # Geração em lote
+    resposta = MagicMock(status_code=200)
+    resposta.json.return_value = {'content_base64': base64.b64encode(PDF_B).decode(), 'boletos': []}
+    service = BoletoService()
+    conta = ContaBancariaFactory(banco='756')
+    lote = list(Parcela.objects.filter(pk__in=[p.pk for p in parcelas[1:]]))
+    with patch('financeiro.services.boleto_service.requests.post', return_value=resposta), \
+            patch.object(service, '_montar_dados_boleto', side_effect=lambda p, c, **kw: ({}, None)), \
+            patch.object(service, '_validar_dados_boleto', return_value={'valido': True, 'erros': []}):
+        assert service.gerar_boletos_lote([(p, conta) for p in lote])['gerados'] == 2
+
+    for p in Parcela.objects.filter(pk__in=[p.pk for p in lote]):
+        assert p.boleto_pdf_blob_id is None
+        assert pdf_store.pdf_da_parcela(p) == PDF_B
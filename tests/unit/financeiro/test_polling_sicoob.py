@@ -0,0 +1,230 @@
+"""
+Polling Sicoob agendado (financeiro.services.boleto_api_conciliacao.polling_sicoob)
+
+Testa:
+- proxima_consulta_sicoob: diária perto/depois do vencimento, espaçada longe dele
+- Conciliação em lote baixa as liquidadas e dispensa a consulta individual
+- Parcelas consultadas recentemente são puladas até proxima_consulta_em
+- Cobrança baixada no banco sai do polling
+- SICOOB_POLLING_MAX_CONSULTAS prioriza as próximas do vencimento
+- Baixa que falha não interrompe o polling nem avança o cursor da conta
+- Contas cobertas pela conciliação têm revisão individual espaçada
+
+Desenvolvedor: Maxwell da Silva Oliveira <maxwbh@gmail.com>
+"""
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from dateutil.relativedelta import relativedelta
+from django.utils import timezone
+
+from financeiro.models import Parcela, StatusCobranca
+from financeiro.services.boleto_api_conciliacao import polling_sicoob, proxima_consulta_sicoob
+from tests.fixtures.factories import ContaBancariaApiFactory
+
+CLIENT = 'financeiro.services.boleto_api_client.BoletoApiClient'
+BAIXAR = 'financeiro.services.boleto_api_conciliacao.baixar_por_conciliacao'
+SEM_CONCILIACAO = {'sucesso': False, 'erro': 'Boleto-API retornou 404'}
+
+
+@pytest.fixture
+def parcelas(contrato_factory, imobiliaria_factory):
+    """Parcelas Sicoob registradas: vencida há 3 dias, vence em 2 e em 60 dias."""
+    hoje = timezone.localdate()
+    imob = imobiliaria_factory()
+    conta = ContaBancariaApiFactory(imobiliaria=imob, ativo=True, tenant_id='ten-s')
+    inicio = (hoje - relativedelta(months=1)).replace(day=1)
+    contrato = contrato_factory(
+        imovel__imobiliaria=imob, numero_parcelas=3, dia_vencimento=10,
+        data_contrato=inicio, data_primeiro_vencimento=inicio.replace(day=10),
+    )
+    criadas = list(contrato.parcelas.order_by('numero_parcela'))
+    for p, dias in zip(criadas, (-3, 2, 60)):
+        Parcela.objects.filter(pk=p.pk).update(
+            data_vencimento=hoje + timedelta(days=dias), provider='sicoob',
+            cobranca_id=f'SC{p.numero_parcela}', conta_bancaria=conta,
+            status_cobranca=StatusCobranca.REGISTRADA, valor_boleto=Decimal('100.00'),
+        )
+    return conta, [Parcela.objects.get(pk=p.pk) for p in criadas]
+
+
+def _consulta(status_por_id):
+    def consultar(self, cobranca_id, tenant_id, provider, bapi_token=None):
+        return {'sucesso': True, 'cobranca_id': cobranca_id,
+                'status': status_por_id.get(cobranca_id, 'registrado')}
+    return consultar
+
+
+def test_proxima_consulta():
+    hoje = timezone.localdate()
+    amanha = hoje + timedelta(days=1)
+    assert proxima_consulta_sicoob(hoje - timedelta(days=30), hoje) == amanha
+    assert proxima_consulta_sicoob(hoje + timedelta(days=5), hoje) == amanha
+    assert proxima_consulta_sicoob(hoje + timedelta(days=9), hoje) == hoje + timedelta(days=4)
+    assert proxima_consulta_sicoob(hoje + timedelta(days=90), hoje) == hoje + timedelta(days=7)
+
+
+@pytest.mark.django_db
+class TestConciliacaoEmLote:
+
+    def test_baixa_e_dispensa_consultas_individuais(self, parcelas):
+        conta, (vencida, proxima, distante) = parcelas
+        liquidados = {'sucesso': True, 'itens': [{'cobranca_id': 'SC2', 'valor': 100.0}]}
+        with patch(f'{CLIENT}.consultar_conciliacao', return_value=liquidados) as conciliacao, \
+             patch(f'{CLIENT}.consultar_cobranca') as consulta:
+            r = polling_sicoob()
+
+        assert not consulta.called
+        assert r['baixadas'] == r['baixadas_conciliacao'] == 1
+        assert r['consultadas'] == 0
+        assert r['evitadas'] == 2  # 3 em aberto − 1 chamada de conciliação
+        proxima.refresh_from_db()
+        assert proxima.pago and proxima.status_cobranca == StatusCobranca.LIQUIDADA
+        assert conciliacao.call_args.args[2] == 'ten-s'
+
+        conta.refresh_from_db()
+        hoje = timezone.localdate()
+        assert conta.polling_conciliado_ate == hoje
+        # Próxima execução lê a partir do cursor, com um dia de sobreposição
+        with patch(f'{CLIENT}.consultar_conciliacao', return_value=liquidados) as conciliacao:
+            polling_sicoob()
+        assert conciliacao.call_args.args[0] == (hoje - timedelta(days=1)).isoformat()
+
+    def test_falha_na_baixa_nao_avanca_o_cursor(self, parcelas):
+        from financeiro.services.boleto_api_conciliacao import baixar_por_conciliacao
+
+        conta, (vencida, proxima, _) = parcelas
+        liquidados = {'sucesso': True, 'itens': [{'cobranca_id': 'SC1', 'valor': 100.0},
+                                                 {'cobranca_id': 'SC2', 'valor': 100.0}]}
+
+        def baixar(parcela, **kwargs):
+            if parcela.cobranca_id == 'SC1':
+                raise RuntimeError('falha simulada')
+            return baixar_por_conciliacao(parcela, **kwargs)
+
+        with patch(f'{CLIENT}.consultar_conciliacao', return_value=liquidados), \
+             patch(BAIXAR, side_effect=baixar):
+            r = polling_sicoob()
+
+        assert r['baixadas_conciliacao'] == 1
+        vencida.refresh_from_db()
+        proxima.refresh_from_db()
+        assert not vencida.pago and vencida.status_cobranca == StatusCobranca.REGISTRADA
+        assert proxima.pago
+        conta.refresh_from_db()
+        assert conta.polling_conciliado_ate is None
+
+        # Próxima execução relê o período e baixa a que faltou
+        with patch(f'{CLIENT}.consultar_conciliacao', return_value=liquidados):
+            r = polling_sicoob()
+        assert r['baixadas_conciliacao'] == 1
+        vencida.refresh_from_db()
+        assert vencida.pago
+        conta.refresh_from_db()
+        assert conta.polling_conciliado_ate == timezone.localdate()
+
+    def test_contas_cobertas_tem_revisao_espacada(self, parcelas, settings):
+        settings.SICOOB_POLLING_REVISAO_DIAS = 10
+        _, (vencida, proxima, distante) = parcelas
+        hoje = timezone.localdate()
+        vazio = {'sucesso': True, 'itens': []}
+        with patch(f'{CLIENT}.consultar_conciliacao', return_value=vazio), \
+             patch(f'{CLIENT}.consultar_cobranca') as consulta:
+            polling_sicoob()
+        assert not consulta.called
+        for p in (vencida, proxima, distante):
+            p.refresh_from_db()
+            assert hoje < p.proxima_consulta_em.date() <= hoje + timedelta(days=10)
+
+        # Na data da revisão a parcela é consultada: cancelada no banco sai do polling,
+        # as demais voltam a ser revistas dali a SICOOB_POLLING_REVISAO_DIAS
+        Parcela.objects.filter(pk__in=[vencida.pk, proxima.pk]).update(
+            proxima_consulta_em=timezone.now() - timedelta(hours=1))
+        with patch(f'{CLIENT}.consultar_conciliacao', return_value=vazio), \
+             patch(f'{CLIENT}.consultar_cobranca', _consulta({'SC1': 'cancelado'})):
+            r = polling_sicoob()
+        assert r['consultadas'] == 2
+        vencida.refresh_from_db()
+        proxima.refresh_from_db()
+        assert vencida.status_cobranca == StatusCobranca.BAIXADA
+        assert proxima.proxima_consulta_em.date() == hoje + timedelta(days=10)
+
+    def test_conciliacao_indisponivel_consulta_parcela_a_parcela(self, parcelas):
+        _, (vencida, _, _) = parcelas
+        with patch(f'{CLIENT}.consultar_conciliacao', return_value=SEM_CONCILIACAO), \
+             patch(f'{CLIENT}.consultar_cobranca', _consulta({'SC1': 'liquidado'})):
+            r = polling_sicoob()
+
+        assert r['consultadas'] == 3 and r['baixadas'] == 1
+        vencida.refresh_from_db()
+        assert vencida.pago
+
+
+@pytest.mark.django_db
+class TestAgenda:
+
+    def test_pula_as_consultadas_recentemente(self, parcelas):
+        _, (vencida, proxima, distante) = parcelas
+        hoje = timezone.localdate()
+        with patch(f'{CLIENT}.consultar_conciliacao', return_value=SEM_CONCILIACAO), \
+             patch(f'{CLIENT}.consultar_cobranca', _consulta({})):
+            assert polling_sicoob()['consultadas'] == 3
+
+        distante.refresh_from_db()
+        assert distante.proxima_consulta_em.date() == hoje + timedelta(days=7)
+        proxima.refresh_from_db()
+        assert proxima.proxima_consulta_em.date() == hoje + timedelta(days=1)
+
+        # Mesmo dia: ninguém é consultado de novo
+        with patch(f'{CLIENT}.consultar_conciliacao', return_value=SEM_CONCILIACAO), \
+             patch(f'{CLIENT}.consultar_cobranca', _consulta({})) as consulta:
+            r = polling_sicoob()
+        assert r['consultadas'] == 0 and r['evitadas'] == 2
+
+        # Dia seguinte: só as vencidas/próximas do vencimento
+        amanha = timezone.now() + timedelta(days=1)
+        with patch(f'{CLIENT}.consultar_conciliacao', return_value=SEM_CONCILIACAO), \
+             patch(f'{CLIENT}.consultar_cobranca', autospec=True,
+                   side_effect=_consulta({})) as consulta, \
+             patch('django.utils.timezone.now', return_value=amanha):
+            r = polling_sicoob(hoje=hoje + timedelta(days=1))
+        assert sorted(c.args[1] for c in consulta.call_args_list) == ['SC1', 'SC2']
+        assert r['evitadas'] == 0  # 3 em aberto − 2 consultas − 1 conciliação
+
+    def test_baixada_no_banco_sai_do_polling(self, parcelas):
+        _, (vencida, _, _) = parcelas
+        with patch(f'{CLIENT}.consultar_conciliacao', return_value=SEM_CONCILIACAO), \
+             patch(f'{CLIENT}.consultar_cobranca', _consulta({'SC1': 'baixado'})):
+            polling_sicoob()
+        vencida.refresh_from_db()
+        assert vencida.status_cobranca == StatusCobranca.BAIXADA and not vencida.pago
+
+        with patch(f'{CLIENT}.consultar_conciliacao', return_value=SEM_CONCILIACAO), \
+             patch(f'{CLIENT}.consultar_cobranca', _consulta({})):
+            assert polling_sicoob()['em_aberto'] == 2
+
+    def test_limite_prioriza_proximas_do_vencimento(self, parcelas, settings):
+        settings.SICOOB_POLLING_MAX_CONSULTAS = 2
+        with patch(f'{CLIENT}.consultar_conciliacao', return_value=SEM_CONCILIACAO), \
+             patch(f'{CLIENT}.consultar_cobranca', autospec=True,
+                   side_effect=_consulta({})) as consulta:
+            r = polling_sicoob()
+        assert [c.args[1] for c in consulta.call_args_list] == ['SC1', 'SC2']
+        assert r['consultadas'] == 2
+
+    def test_falha_na_baixa_individual_reagenda_e_segue(self, parcelas):
+        _, (vencida, proxima, distante) = parcelas
+        hoje = timezone.localdate()
+        with patch(f'{CLIENT}.consultar_conciliacao', return_value=SEM_CONCILIACAO), \
+             patch(f'{CLIENT}.consultar_cobranca', _consulta({'SC1': 'liquidado'})), \
+             patch(BAIXAR, side_effect=RuntimeError('falha simulada')):
+            r = polling_sicoob()
+
+        assert r['consultadas'] == 3 and r['baixadas'] == 0
+        vencida.refresh_from_db()
+        assert not vencida.pago and vencida.status_cobranca == StatusCobranca.REGISTRADA
+        assert vencida.proxima_consulta_em.date() == hoje + timedelta(days=1)
+        distante.refresh_from_db()
+        assert distante.proxima_consulta_em.date() == hoje + timedelta(days=7)
@@ -28,6 +28,26 @@ def contrato(db):
     return ContratoFactory()
 
 
+@pytest.fixture
+def contratos_pendentes(db):
+    """Dois contratos com ciclo 2 pendente: um IPCA (com índices) e um INCC (sem índices)"""
+    from datetime import date
+    from decimal import Decimal
+    from dateutil.relativedelta import relativedelta
+    from contratos.models import IndiceReajuste
+
+    hoje = date.today()
+    for meses in range(1, 26):
+        ref = hoje - relativedelta(months=meses)
+        IndiceReajuste.objects.create(tipo_indice='IPCA', ano=ref.year, mes=ref.month, valor=Decimal('0.40'))
+    datas = {
+        'data_contrato': hoje - relativedelta(months=13),
+        'data_primeiro_vencimento': hoje - relativedelta(months=12),
+        'numero_parcelas': 24,
+    }
+    return ContratoFactory(**datas), ContratoFactory(tipo_correcao='INCC', **datas)
+
+
 @pytest.mark.django_db
 class TestListarReajustes:
     """Testes da view listar_reajustes"""
@@ -76,6 +96,20 @@ class TestReajustesPendentes:
         assert response.status_code == 200
         assert 'total_pendentes' in response.context
 
+    def test_lista_pendentes_com_percentual(self, client_logado, contratos_pendentes):
+        com_indice, sem_indice = contratos_pendentes
+        response = client_logado.get(reverse('financeiro:reajustes_pendentes'))
+
+        assert response.context['total_pendentes'] == 2
+        itens = {
+            item['contrato'].pk: item
+            for grupo in response.context['pendentes_agrupados'] for item in grupo['contratos']
+        }
+        assert itens[com_indice.pk]['dados_disponiveis']
+        assert itens[com_indice.pk]['ciclo'] == 2
+        assert itens[com_indice.pk]['prestacao_nova'] > itens[com_indice.pk]['prestacao_atual']
+        assert not itens[sem_indice.pk]['dados_disponiveis']
+
 
 @pytest.mark.django_db
 class TestPreviewReajusteContrato:
@@ -140,6 +174,24 @@ class TestAplicarReajusteLote:
             data = response.json()
             assert 'sucesso' in data or 'resultados' in data
 
+    def test_aplica_lote_com_previews_em_lote(self, client_logado, contratos_pendentes):
+        """Contratos pendentes são reajustados; o sem índice é relatado como erro"""
+        import json
+        from financeiro.models import Reajuste
+
+        com_indice, sem_indice = contratos_pendentes
+        url = reverse('financeiro:aplicar_reajuste_lote')
+        response = client_logado.post(
+            url, json.dumps({'contrato_ids': [com_indice.pk, sem_indice.pk]}),
+            content_type='application/json',
+        )
+
+        data = response.json()
+        assert data['total_ok'] == 1
+        assert data['total_erro'] == 1
+        assert data['resultados'][0]['parcelas_reajustadas'] > 0
+        assert Reajuste.objects.filter(contrato=com_indice, ciclo=2, aplicado=True).exists()
+
 
 # ---------------------------------------------------------------------------
 # Section 25.4 — aplicar_reajuste_informado_lote (J-09)
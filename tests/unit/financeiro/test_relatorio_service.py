@@ -239,6 +239,141 @@ class TestExportacao:
         assert 'totalizador' in data
 
 
+@pytest.mark.django_db
+class TestExportacaoStreaming:
+    """Exportação em streaming: gerador de itens, totais acumulados, write-only/página a página"""
+
+    def test_streaming_equivale_ao_relatorio_completo(self, contrato_com_parcelas_vencidas):
+        from financeiro.services import RelatorioService, FiltroRelatorio
+
+        service = RelatorioService()
+        filtro = FiltroRelatorio(contrato_id=contrato_com_parcelas_vencidas.id)
+
+        completo = service.gerar_relatorio_prestacoes_a_pagar(filtro)
+        streaming = service.gerar_relatorio_prestacoes_streaming(filtro, pago=False)
+
+        assert not isinstance(streaming['itens'], list)
+        assert ''.join(service.iterar_csv(streaming)) == service.exportar_para_csv(completo)
+        # Totalizador completo só depois de consumir os itens
+        assert streaming['totalizador'] == completo['totalizador']
+        assert completo['totalizador'].parcelas_vencidas > 0
+
+    def test_iterar_prestacoes_em_lotes_pequenos(self, contrato_com_pagamentos):
+        from financeiro.services import RelatorioService, FiltroRelatorio
+
+        service = RelatorioService()
+        filtro = FiltroRelatorio(contrato_id=contrato_com_pagamentos.id)
+
+        completo = service.gerar_relatorio_prestacoes_pagas(filtro)
+        itens = list(service.iterar_prestacoes(filtro, pago=True, chunk_size=1))
+
+        assert itens == completo['itens']
+        assert len(itens) == 3
+
+    def test_excel_write_only_com_totalizadores(self, contrato_com_parcelas_vencidas):
+        from io import BytesIO
+        from openpyxl import load_workbook
+        from financeiro.services import RelatorioService, FiltroRelatorio
+
+        service = RelatorioService()
+        filtro = FiltroRelatorio(contrato_id=contrato_com_parcelas_vencidas.id)
+        relatorio = service.gerar_relatorio_prestacoes_streaming(filtro, pago=False)
+
+        destino = BytesIO()
+        assert service.exportar_para_excel(relatorio, destino=destino) is None
+
+        ws = load_workbook(BytesIO(destino.getvalue())).active
+        valores = [row for row in ws.iter_rows(values_only=True)]
+        assert valores[3][0] == 'Contrato'
+        assert sum(1 for row in valores if row[0] == contrato_com_parcelas_vencidas.numero_contrato) == 24
+        assert ('Total de Parcelas:', 24) in [tuple(row[:2]) for row in valores]
+        assert ws.column_dimensions['B'].width == 35
+
+    def test_pdf_pagina_a_pagina(self, contrato_com_parcelas_vencidas):
+        from financeiro.services import RelatorioService, FiltroRelatorio
+
+        service = RelatorioService()
+        filtro = FiltroRelatorio(contrato_id=contrato_com_parcelas_vencidas.id)
+        relatorio = service.gerar_relatorio_prestacoes_streaming(filtro, pago=False)
+
+        pdf = service.exportar_para_pdf(relatorio)
+
+        assert pdf.startswith(b'%PDF')
+        # 24 parcelas a 20 por página
+        assert b'/Count 2' in pdf
+
+    def test_lotes_marca_o_ultimo(self):
+        from financeiro.services.relatorio_service import _lotes
+
+        assert list(_lotes(range(5), 2)) == [([0, 1], False), ([2, 3], False), ([4], True)]
+        assert list(_lotes(range(4), 2)) == [([0, 1], False), ([2, 3], True)]
+        assert list(_lotes([], 2)) == [([], True)]
+
+
+@pytest.mark.django_db
+class TestTotalizarPrestacoes:
+    """Totalizadores só por aggregate(), equivalentes aos do relatório completo"""
+
+    def test_a_pagar_equivale_ao_relatorio(self, contrato_com_parcelas_vencidas, contrato_com_parcelas):
+        from financeiro.services import RelatorioService, FiltroRelatorio
+
+        service = RelatorioService()
+        filtro = FiltroRelatorio()
+
+        esperado = service.gerar_relatorio_prestacoes_a_pagar(filtro)['totalizador']
+        totais = service.totalizar_prestacoes(filtro, pago=False)
+
+        assert totais == esperado
+        assert totais.parcelas_vencidas > 0
+        assert totais.valor_juros > 0
+
+    def test_pagas_equivale_ao_relatorio(self, contrato_com_pagamentos):
+        from financeiro.services import RelatorioService, FiltroRelatorio
+
+        service = RelatorioService()
+        filtro = FiltroRelatorio(contrato_id=contrato_com_pagamentos.id)
+
+        esperado = service.gerar_relatorio_prestacoes_pagas(filtro)['totalizador']
+        totais = service.totalizar_prestacoes(filtro, pago=True)
+
+        assert totais == esperado
+        assert totais.total_parcelas == 3
+
+    def test_respeita_filtro_de_status(self, contrato_com_parcelas_vencidas):
+        from financeiro.services import RelatorioService, FiltroRelatorio
+        from financeiro.services.relatorio_service import StatusParcela
+
+        service = RelatorioService()
+        filtro = FiltroRelatorio(
+            contrato_id=contrato_com_parcelas_vencidas.id, status=StatusParcela.A_VENCER
+        )
+
+        totais = service.totalizar_prestacoes(filtro)
+
+        assert totais == service.gerar_relatorio_prestacoes_a_pagar(filtro)['totalizador']
+        assert totais.parcelas_vencidas == 0
+        assert totais.parcelas_a_vencer == totais.total_parcelas > 0
+
+    def test_cache_por_filtro(self, contrato_com_parcelas, django_assert_num_queries):
+        from django.core.cache import cache
+        from financeiro.services import RelatorioService, FiltroRelatorio
+
+        cache.clear()
+        service = RelatorioService()
+        filtro = FiltroRelatorio(contrato_id=contrato_com_parcelas.id)
+
+        with django_assert_num_queries(1):
+            primeiro = service.totalizar_prestacoes(filtro, usar_cache=True)
+        with django_assert_num_queries(0):
+            assert service.totalizar_prestacoes(filtro, usar_cache=True) == primeiro
+        # Outro filtro, outra chave
+        with django_assert_num_queries(1):
+            service.totalizar_prestacoes(FiltroRelatorio(contrato_id=-1), usar_cache=True)
+        # Sem cache, sempre consulta
+        with django_assert_num_queries(1):
+            service.totalizar_prestacoes(filtro)
+
+
 # Fixtures
 @pytest.fixture
 def contrato_factory(db, imobiliaria_factory, comprador_factory, imovel_factory):
@@ -0,0 +1,213 @@
+"""
+Testes do resumo mensal de recebíveis (financeiro.models.ResumoRecebiveisMensal)
+
+Testa:
+- Manutenção incremental: criação, pagamento, estorno, mudança de vencimento,
+  reajuste em lote, remoção de parcelas/contratos e troca de imobiliária
+- Recálculo trava as linhas do resumo antes de agregar as parcelas
+- serie() e totais() iguais ao aggregate direto sobre as parcelas
+- Comando reconstruir_resumo_recebiveis
+
+Desenvolvedor: Maxwell da Silva Oliveira <maxwbh@gmail.com>
+"""
+from decimal import Decimal
+
+import pytest
+from dateutil.relativedelta import relativedelta
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, Q, Sum
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from financeiro.models import Parcela, Reajuste, ResumoRecebiveisMensal
+
+
+def _resumo():
+    return sorted(
+        ResumoRecebiveisMensal.objects.values_list(
+            'imobiliaria_id', 'mes', 'qtd_parcelas', 'qtd_pagas',
+            'valor_previsto', 'valor_realizado', 'valor_aberto',
+        )
+    )
+
+
+def _confere_com_reconstrucao():
+    """O resumo mantido incrementalmente é igual ao reconstruído do zero."""
+    mantido = _resumo()
+    ResumoRecebiveisMensal.reconstruir()
+    assert mantido == _resumo()
+    return mantido
+
+
+def _direto(parcelas, hoje):
+    zero = Decimal('0.00')
+    agg = parcelas.aggregate(
+        qtd_parcelas=Count('id'),
+        qtd_pagas=Count('id', filter=Q(pago=True)),
+        qtd_vencidas=Count('id', filter=Q(pago=False, data_vencimento__lt=hoje)),
+        valor_previsto=Sum('valor_atual'),
+        valor_realizado=Sum('valor_pago', filter=Q(pago=True)),
+        valor_aberto=Sum('valor_atual', filter=Q(pago=False)),
+        valor_vencido=Sum('valor_atual', filter=Q(pago=False, data_vencimento__lt=hoje)),
+    )
+    return {
+        **{k: v or 0 for k, v in agg.items() if k.startswith('qtd_')},
+        **{k: v or zero for k, v in agg.items() if k.startswith('valor_')},
+        'qtd_abertas': agg['qtd_parcelas'] - agg['qtd_pagas'],
+    }
+
+
+@pytest.fixture
+def contratos(contrato_factory, imobiliaria_factory):
+    """Dois contratos numa imobiliária e um em outra, começando há 8 meses."""
+    hoje = timezone.now().date()
+    inicio = (hoje - relativedelta(months=8)).replace(day=1)
+    imob_a, imob_b = imobiliaria_factory(), imobiliaria_factory()
+    criados = []
+    for imob, dia in ((imob_a, 5), (imob_a, 20), (imob_b, 10)):
+        criados.append(contrato_factory(
+            imovel__imobiliaria=imob, numero_parcelas=24, dia_vencimento=dia,
+            data_contrato=inicio, data_primeiro_vencimento=inicio.replace(day=dia),
+        ))
+    return criados
+
+
+@pytest.mark.django_db
+class TestManutencaoIncremental:
+
+    def test_criacao_do_contrato_preenche_o_resumo(self, contratos):
+        linhas = _confere_com_reconstrucao()
+        assert linhas
+        assert sum(linha[2] for linha in linhas) == Parcela.objects.count()
+
+    def test_pagamento_e_estorno(self, contratos):
+        parcela = contratos[0].parcelas.order_by('numero_parcela').first()
+        mes = parcela.data_vencimento.replace(day=1)
+
+        parcela.registrar_pagamento(parcela.valor_atual - Decimal('10.00'))
+        linha = ResumoRecebiveisMensal.objects.get(imobiliaria=contratos[0].imobiliaria, mes=mes)
+        assert linha.qtd_pagas == 1
+        assert linha.valor_realizado == parcela.valor_atual - Decimal('10.00')
+        _confere_com_reconstrucao()
+
+        parcela.cancelar_pagamento()
+        linha = ResumoRecebiveisMensal.objects.get(imobiliaria=contratos[0].imobiliaria, mes=mes)
+        assert linha.qtd_pagas == 0
+        assert linha.valor_realizado == 0
+        _confere_com_reconstrucao()
+
+    def test_mudanca_de_vencimento_recalcula_o_mes_antigo(self, contratos):
+        parcela = contratos[2].parcelas.order_by('numero_parcela').first()
+        mes_antigo = parcela.data_vencimento.replace(day=1)
+
+        parcela.data_vencimento = parcela.data_vencimento - relativedelta(months=3)
+        parcela.save()
+
+        assert not ResumoRecebiveisMensal.objects.filter(
+            imobiliaria=contratos[2].imobiliaria, mes=mes_antigo).exists()
+        _confere_com_reconstrucao()
+
+    def test_gravacao_sem_campos_do_resumo_nao_consulta(self, contratos, django_assert_num_queries):
+        parcela = contratos[0].parcelas.first()
+        parcela.observacoes = 'Sem efeito no resumo'
+        with django_assert_num_queries(1):
+            parcela.save(update_fields=['observacoes'])
+
+    def test_reajuste_em_lote(self, contratos):
+        reajuste = Reajuste.objects.create(
+            contrato=contratos[0], ciclo=2, percentual=Decimal('10.0000'),
+            parcela_inicial=13, parcela_final=24,
+        )
+        assert reajuste.aplicar_reajuste()['sucesso']
+        _confere_com_reconstrucao()
+
+    def test_remocoes(self, contratos):
+        contratos[0].parcelas.filter(numero_parcela__gt=20).delete()
+        _confere_com_reconstrucao()
+
+        imob_b = contratos[2].imobiliaria
+        contratos[2].delete()
+        assert not ResumoRecebiveisMensal.objects.filter(imobiliaria=imob_b).exists()
+        _confere_com_reconstrucao()
+
+    def test_troca_de_imobiliaria_recalcula_as_duas(self, contratos):
+        imob_a, imob_b = contratos[0].imobiliaria, contratos[2].imobiliaria
+        contrato = contratos[2]
+        contrato.imovel.imobiliaria = imob_a
+        contrato.imovel.save()
+        contrato.imobiliaria = imob_a
+        contrato.save()
+
+        assert not ResumoRecebiveisMensal.objects.filter(imobiliaria=imob_b).exists()
+        assert sum(ResumoRecebiveisMensal.objects.filter(imobiliaria=imob_a)
+                   .values_list('qtd_parcelas', flat=True)) == Parcela.objects.count()
+        _confere_com_reconstrucao()
+
+    def test_recalculo_trava_o_resumo_antes_de_agregar(self, contratos):
+        """Baixas concorrentes no mesmo mês recalculam em série (linha travada primeiro)."""
+        parcela = contratos[0].parcelas.order_by('numero_parcela').first()
+        tabela_resumo = ResumoRecebiveisMensal._meta.db_table
+        with CaptureQueriesContext(connection) as consultas:
+            parcela.registrar_pagamento(parcela.valor_atual)
+
+        sqls = [q['sql'] for q in consultas.captured_queries]
+        agregacao = next(i for i, sql in enumerate(sqls) if 'COUNT(' in sql.upper())
+        assert any(tabela_resumo in sql for sql in sqls[:agregacao])
+        _confere_com_reconstrucao()
+
+
+@pytest.mark.django_db
+class TestLeitura:
+
+    def test_serie_igual_ao_aggregate(self, contratos):
+        hoje = timezone.now().date()
+        for parcela in Parcela.objects.filter(data_vencimento__lt=hoje).order_by('id')[::2]:
+            parcela.registrar_pagamento(parcela.valor_atual)
+
+        imob = contratos[0].imobiliaria_id
+        inicio, fim = hoje - relativedelta(months=10), hoje + relativedelta(months=6)
+        serie = ResumoRecebiveisMensal.serie([imob], inicio, fim, hoje=hoje)
+
+        mes = inicio.replace(day=1)
+        while mes <= fim:
+            parcelas = Parcela.objects.filter(
+                contrato__imobiliaria_id=imob,
+                data_vencimento__gte=mes, data_vencimento__lt=mes + relativedelta(months=1),
+            )
+            esperado = _direto(parcelas, hoje)
+            assert serie.get(mes, _direto(Parcela.objects.none(), hoje)) == esperado, mes
+            mes += relativedelta(months=1)
+
+        ate_hoje = ResumoRecebiveisMensal.serie(None, hoje, hoje, hoje=hoje, ate_hoje=True)
+        esperado = _direto(Parcela.objects.filter(
+            data_vencimento__gte=hoje.replace(day=1), data_vencimento__lte=hoje), hoje)
+        assert ate_hoje.get(hoje.replace(day=1), _direto(Parcela.objects.none(), hoje)) == esperado
+
+    def test_totais_iguais_ao_aggregate(self, contratos):
+        hoje = timezone.now().date()
+        for parcela in Parcela.objects.filter(data_vencimento__lt=hoje).order_by('id')[::3]:
+            parcela.registrar_pagamento(parcela.valor_atual)
+
+        assert ResumoRecebiveisMensal.totais(hoje=hoje) == _direto(Parcela.objects.all(), hoje)
+
+        por_imob = ResumoRecebiveisMensal.totais(hoje=hoje, por_imobiliaria=True)
+        for contrato in contratos:
+            imob = contrato.imobiliaria_id
+            assert por_imob[imob] == _direto(
+                Parcela.objects.filter(contrato__imobiliaria_id=imob), hoje)
+
+
+@pytest.mark.django_db
+class TestComandoReconstruir:
+
+    def test_reconstroi(self, contratos, capsys):
+        esperado = _resumo()
+        Parcela.objects.filter(contrato=contratos[0]).update(valor_atual=Decimal('1.00'))
+        ResumoRecebiveisMensal.objects.all().delete()
+
+        call_command('reconstruir_resumo_recebiveis')
+
+        assert _resumo() != esperado  # o update() direto agora aparece
+        assert 'reconstruído' in capsys.readouterr().out
+        _confere_com_reconstrucao()
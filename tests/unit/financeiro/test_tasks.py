@@ -309,6 +309,46 @@ class TestTasksGeracao(TestCase):
         self.assertIn('erros', resultado)
         self.assertIn('detalhes', resultado)
 
+    @patch('financeiro.models.Parcela.gerar_boleto')
+    def test_gerar_boletos_automaticos_concorrente(self, mock_gerar):
+        """Pool de threads gera o mesmo resultado do modo sequencial"""
+        from financeiro.tasks import gerar_boletos_automaticos, progresso_boletos_automaticos
+
+        mock_gerar.return_value = {'sucesso': True, 'nosso_numero': '123'}
+
+        sequencial = gerar_boletos_automaticos(workers=1)
+        concorrente = gerar_boletos_automaticos(workers=4)
+
+        self.assertGreater(concorrente['total'], 0)
+        for chave in ('total', 'gerados', 'bloqueados', 'erros'):
+            self.assertEqual(concorrente[chave], sequencial[chave])
+        self.assertEqual(
+            sorted(d['parcela'] for d in concorrente['detalhes']),
+            sorted(d['parcela'] for d in sequencial['detalhes']),
+        )
+
+        competencia = (date.today().replace(day=1) + timedelta(days=32)).strftime('%Y-%m')
+        progresso = progresso_boletos_automaticos(competencia)
+        self.assertTrue(progresso['concluido'])
+        self.assertEqual(progresso['processadas'], concorrente['total'])
+
+    @patch('financeiro.models.Parcela.gerar_boleto')
+    def test_gerar_boletos_automaticos_ignora_execucao_simultanea(self, mock_gerar):
+        """Uma segunda execução da mesma competência não emite nada"""
+        from django.core.cache import cache
+        from financeiro.tasks import gerar_boletos_automaticos
+
+        competencia = (date.today().replace(day=1) + timedelta(days=32)).strftime('%Y-%m')
+        chave = f'boletos_automaticos:lock:{competencia}'
+        cache.set(chave, 'outra execução')
+        try:
+            resultado = gerar_boletos_automaticos()
+        finally:
+            cache.delete(chave)
+
+        self.assertTrue(resultado['em_execucao'])
+        mock_gerar.assert_not_called()
+
 
 class TestEnvioEmail(TestCase):
     """Testes para tasks de envio de email"""
@@ -516,3 +556,315 @@ class TestAtualizarIndicesTask(TestCase):
         response = c.post('/api/tasks/atualizar-indices/')
         # 401/403 = token ausente/inválido; 503 = TASK_TOKEN not configured
         assert response.status_code in (401, 403, 503)
+
+
+class TestMotorJurosMulta(TestCase):
+    """Equivalência entre o motor SQL de juros/multa e a referência em Python"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from tests.fixtures.factories import ContratoFactory, ParcelaFactory
+
+        cls.hoje = date(2026, 3, 20)
+        taxas = [
+            (Decimal('1.00'), Decimal('2.00')),
+            (Decimal('0.33'), Decimal('1.75')),
+            (Decimal('1.87'), Decimal('0.00')),
+        ]
+        valores = [Decimal('1234.57'), Decimal('2000.00'), Decimal('15000.01'), Decimal('73.19')]
+        atrasos = [1, 7, 29, 31, 95, 400]
+        for juros, multa in taxas:
+            contrato = ContratoFactory(percentual_juros_mora=juros, percentual_multa=multa)
+            for i, dias in enumerate(atrasos):
+                valor = valores[i % len(valores)]
+                ParcelaFactory(
+                    contrato=contrato,
+                    data_vencimento=cls.hoje - timedelta(days=dias),
+                    valor_original=valor,
+                    valor_atual=valor,
+                )
+            # Não vencida e paga: não entram na atualização
+            ParcelaFactory(contrato=contrato, data_vencimento=cls.hoje)
+            ParcelaFactory(
+                contrato=contrato, data_vencimento=cls.hoje - timedelta(days=10), pago=True
+            )
+
+    def _snapshot(self):
+        from financeiro.models import Parcela
+        return dict(Parcela.objects.values_list('id', 'valor_juros')), \
+            dict(Parcela.objects.values_list('id', 'valor_multa'))
+
+    def _zerar(self):
+        from financeiro.models import Parcela
+        Parcela.objects.update(valor_juros=Decimal('0.00'), valor_multa=Decimal('0.00'))
+
+    def test_sql_equivale_a_referencia_python(self):
+        from financeiro.services.encargos_service import (
+            atualizar_juros_multa_python, atualizar_juros_multa_sql,
+        )
+
+        self._zerar()
+        n_python = atualizar_juros_multa_python(self.hoje)
+        referencia = self._snapshot()
+
+        self._zerar()
+        n_sql = atualizar_juros_multa_sql(self.hoje, chunk_size=4)
+
+        self.assertEqual(n_sql, n_python)
+        self.assertEqual(self._snapshot(), referencia)
+        self.assertTrue(any(v > 0 for v in referencia[0].values()))
+
+    def test_nao_altera_parcelas_pagas_ou_a_vencer(self):
+        from financeiro.models import Parcela
+        from financeiro.services.encargos_service import atualizar_juros_multa_sql
+
+        self._zerar()
+        atualizar_juros_multa_sql(self.hoje)
+        intocadas = Parcela.objects.filter(pago=True) | Parcela.objects.filter(
+            data_vencimento__gte=self.hoje
+        )
+        self.assertFalse(intocadas.exclude(valor_juros=0, valor_multa=0).exists())
+
+    @patch('financeiro.services.encargos_service.atualizar_juros_multa_sql', return_value=7)
+    def test_task_usa_motor_configurado(self, mock_sql):
+        from financeiro.tasks import atualizar_juros_multa_parcelas_vencidas
+
+        with override_settings(JUROS_MULTA_MOTOR='sql'):
+            self.assertEqual(atualizar_juros_multa_parcelas_vencidas(), 7)
+        mock_sql.assert_called_once()
+
+        self.assertGreater(atualizar_juros_multa_parcelas_vencidas(motor='python'), 0)
+        mock_sql.assert_called_once()
+
+
+class TestValoresHojeAnotados(TestCase):
+    """Parcela.objects.com_valores_hoje() equivale a Parcela.calcular_valores_hoje()"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from tests.fixtures.factories import ContratoFactory, ParcelaFactory
+
+        hoje = date.today()
+        proprio_percentual = ContratoFactory(
+            usar_config_boleto_imobiliaria=False,
+            percentual_juros_mora=Decimal('1.00'), percentual_multa=Decimal('2.00'),
+            tipo_valor_desconto='PERCENTUAL', valor_desconto_boleto=Decimal('5.00'),
+            dias_desconto_boleto=10,
+        )
+        proprio_fixo = ContratoFactory(
+            usar_config_boleto_imobiliaria=False,
+            percentual_juros_mora=Decimal('0.33'), percentual_multa=Decimal('1.75'),
+            tipo_valor_desconto='VALOR', valor_desconto_boleto=Decimal('25.00'),
+            dias_desconto_boleto=3,
+        )
+        via_imobiliaria = ContratoFactory(usar_config_boleto_imobiliaria=True)
+        imob = via_imobiliaria.imobiliaria
+        imob.tipo_valor_desconto = 'PERCENTUAL'
+        imob.percentual_desconto_padrao = Decimal('3.00')
+        imob.dias_para_desconto_padrao = 5
+        imob.save()
+
+        deslocamentos = [-45, -31, -7, -1, 0, 2, 3, 5, 11, 40]
+        for contrato in (proprio_percentual, proprio_fixo, via_imobiliaria):
+            for i, dias in enumerate(deslocamentos):
+                ParcelaFactory(
+                    contrato=contrato,
+                    data_vencimento=hoje + timedelta(days=dias),
+                    valor_original=Decimal('1234.57'),
+                    valor_atual=Decimal('1234.57') if i % 2 else Decimal('2000.00'),
+                    pago=(i == 2),
+                )
+
+    def test_anotacoes_equivalem_ao_calculo_por_parcela(self):
+        from financeiro.models import Parcela
+
+        centavos = Decimal('0.01')
+        dinheiro = ('multa_hoje', 'juros_hoje', 'desconto_hoje', 'valor_total_hoje')
+        anotadas = {p.pk: p for p in Parcela.objects.com_valores_hoje()}
+        self.assertTrue(any(p.desconto_hoje > 0 for p in anotadas.values()))
+        self.assertTrue(any(p.juros_hoje > 0 for p in anotadas.values()))
+
+        for parcela in Parcela.objects.select_related('contrato__imobiliaria'):
+            esperado = parcela.calcular_valores_hoje()
+            obtido = anotadas[parcela.pk].calcular_valores_hoje()
+            for chave, valor in esperado.items():
+                if chave in dinheiro:
+                    valor = Decimal(valor).quantize(centavos)
+                    if chave == 'valor_total_hoje':
+                        # soma das parcelas já arredondadas
+                        valor = (parcela.valor_atual + esperado['juros_hoje'].quantize(centavos)
+                                 + esperado['multa_hoje'].quantize(centavos)
+                                 - Decimal(esperado['desconto_hoje']).quantize(centavos))
+                self.assertEqual(obtido[chave], valor, f'parcela {parcela.pk}: {chave}')
+
+    def test_uma_consulta_para_a_listagem(self):
+        from financeiro.models import Parcela
+
+        with self.assertNumQueries(1):
+            parcelas = list(Parcela.objects.com_valores_hoje())
+            for parcela in parcelas:
+                parcela.calcular_valores_hoje()
+
+    def test_data_diferente_recalcula(self):
+        from financeiro.models import Parcela
+
+        parcela = Parcela.objects.com_valores_hoje(date.today() + timedelta(days=60)).filter(
+            pago=False).order_by('data_vencimento').first()
+        self.assertGreater(parcela.dias_atraso_hoje, 0)
+        self.assertEqual(
+            parcela.calcular_valores_hoje()['dias_atraso'],
+            (date.today() - parcela.data_vencimento).days,
+        )
+
+
+class TestReajustesDistribuidos(TestCase):
+    """Coordenador de reajustes: pendentes em lote, chord de lotes e retomada"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from core.models import Contabilidade, Imobiliaria, Comprador, Imovel
+        from contratos.models import Contrato, IndiceReajuste, TipoCorrecao, StatusContrato
+
+        contabilidade = Contabilidade.objects.create(
+            nome='Contabilidade Reajustes', razao_social='Contabilidade Reajustes LTDA',
+            cnpj='12121212000100', endereco='Rua Reajuste, 1', telefone='(31) 3333-0050',
+            email='reajustes@contabilidade.com', responsavel='Responsável Reajustes',
+        )
+        imobiliaria = Imobiliaria.objects.create(
+            contabilidade=contabilidade, nome='Imobiliária Reajustes', cnpj='13131313000100',
+            telefone='(31) 3333-0051', email='reajustes@imobiliaria.com',
+            responsavel_financeiro='Financeiro Reajustes',
+        )
+        comprador = Comprador.objects.create(
+            nome='Comprador Reajustes', tipo_pessoa='PF', cpf='121.121.121-21',
+            telefone='(31) 3333-0052', celular='(31) 99999-0052', email='reajustes@comprador.com',
+        )
+
+        hoje = date.today()
+        inicio = date(hoje.year - 1, hoje.month, 1)
+        cls.contratos = []
+        for i, tipo in enumerate([TipoCorrecao.IPCA] * 3 + [TipoCorrecao.FIXO]):
+            imovel = Imovel.objects.create(
+                imobiliaria=imobiliaria, identificacao=f'LOTE-REAJ-{i}', area='360.00',
+            )
+            cls.contratos.append(Contrato.objects.create(
+                imobiliaria=imobiliaria, comprador=comprador, imovel=imovel,
+                numero_contrato=f'CONT-REAJ-{i}', data_contrato=inicio,
+                data_primeiro_vencimento=inicio + timedelta(days=30),
+                valor_total=Decimal('24000.00'), valor_entrada=Decimal('0.00'),
+                numero_parcelas=24, dia_vencimento=10, tipo_correcao=tipo,
+                prazo_reajuste_meses=12, status=StatusContrato.ATIVO,
+            ))
+
+        for meses_atras in range(1, 30):
+            ordinal = hoje.year * 12 + hoje.month - 1 - meses_atras
+            IndiceReajuste.objects.create(
+                tipo_indice='IPCA', ano=ordinal // 12, mes=ordinal % 12 + 1, valor=Decimal('0.40'),
+            )
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_ciclos_pendentes_igual_ao_calculo_por_contrato(self):
+        from contratos.models import Contrato
+        from financeiro.models import Reajuste
+
+        contratos = list(Contrato.objects.all())
+        esperado = {
+            c.pk: Reajuste.calcular_ciclo_pendente(c) for c in contratos
+            if Reajuste.calcular_ciclo_pendente(c) is not None
+        }
+
+        with self.assertNumQueries(2):
+            pendentes = Reajuste.ciclos_pendentes(Contrato.objects.all())
+
+        self.assertEqual(pendentes, esperado)
+        self.assertEqual(set(pendentes), {c.pk for c in self.contratos[:3]})
+
+    def test_coordenador_processa_em_lotes_e_retoma(self):
+        from financeiro.tasks import processar_reajustes_pendentes, resumo_reajustes
+
+        resultado = processar_reajustes_pendentes(distribuir=False, chunk_size=2)
+
+        self.assertEqual(resultado['processados'], 4)
+        self.assertEqual(resultado['lotes'], 2)
+        self.assertEqual(resultado['reajustados'], 3)
+        self.assertEqual(resultado['erros'], 0)
+        self.assertGreater(resultado['contratos_por_segundo'], 0)
+        self.assertLessEqual(resultado['latencia_ms']['p50'], resultado['latencia_ms']['p95'])
+        self.assertEqual(resumo_reajustes(resultado['execucao']), resultado)
+
+        # Reexecução: os ciclos aplicados saem dos pendentes
+        resultado = processar_reajustes_pendentes(distribuir=False)
+        self.assertEqual(resultado['pendentes'], 0)
+        self.assertEqual(resultado['reajustados'], 0)
+
+    def test_lote_idempotente(self):
+        from financeiro.models import Reajuste
+        from financeiro.tasks import processar_reajustes_lote
+
+        contrato = self.contratos[0]
+        primeiro = processar_reajustes_lote([(contrato.pk, 2)])
+        segundo = processar_reajustes_lote([(contrato.pk, 2)])
+
+        self.assertEqual(primeiro[0]['status'], 'reajustado')
+        self.assertEqual(segundo[0]['status'], 'ignorado')
+        self.assertEqual(Reajuste.objects.filter(contrato=contrato, ciclo=2).count(), 1)
+
+    def test_alerta_enviado_so_apos_commit_do_lote(self):
+        from financeiro.tasks import processar_reajustes_lote
+
+        contrato = self.contratos[0]
+        with patch('financeiro.tasks.enviar_alerta_reajuste.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                processar_reajustes_lote([(contrato.pk, 2)])
+                delay.assert_not_called()
+
+        delay.assert_called_once_with(
+            contrato_id=contrato.pk, dias_restantes=0, urgente=False, bloqueado=False,
+        )
+
+    def test_falha_de_um_contrato_nao_interrompe_o_lote(self):
+        from financeiro.models import Reajuste
+        from financeiro.tasks import aplicar_reajuste_automatico, processar_reajustes_pendentes
+
+        com_erro = self.contratos[1].pk
+
+        def aplicar(contrato_id, ciclo=None):
+            if contrato_id == com_erro:
+                raise RuntimeError('falha simulada')
+            return aplicar_reajuste_automatico(contrato_id, ciclo)
+
+        with patch('financeiro.tasks.aplicar_reajuste_automatico', side_effect=aplicar):
+            resultado = processar_reajustes_pendentes(distribuir=False)
+
+        self.assertEqual(resultado['reajustados'], 2)
+        self.assertEqual(resultado['erros'], 1)
+        self.assertEqual(resultado['contratos_com_erro'], [com_erro])
+        self.assertFalse(Reajuste.objects.filter(contrato_id=com_erro).exists())
+
+    def test_distribuido_publica_resumo_e_libera_lock(self):
+        from django.core.cache import cache
+        from financeiro.tasks import processar_reajustes_pendentes, resumo_reajustes
+
+        resultado = processar_reajustes_pendentes()
+
+        self.assertEqual(resultado['pendentes'], 3)
+        self.assertIn('chord_id', resultado)
+        self.assertEqual(resumo_reajustes(resultado['execucao'])['reajustados'], 3)
+        self.assertIsNone(cache.get(f"reajustes:lock:{resultado['execucao']}"))
+
+    def test_falha_do_chord_libera_lock(self):
+        from django.core.cache import cache
+        from financeiro.tasks import processar_reajustes_pendentes, resumo_reajustes
+
+        # Sem propagar, como num worker: a falha da callback não chega ao coordenador
+        with self.settings(CELERY_TASK_EAGER_PROPAGATES=False), \
+                patch('financeiro.tasks._chave_resumo_reajustes', side_effect=RuntimeError('falha simulada')):
+            resultado = processar_reajustes_pendentes()
+
+        self.assertIsNone(resumo_reajustes(resultado['execucao']))
+        self.assertIsNone(cache.get(f"reajustes:lock:{resultado['execucao']}"))
+        # Próxima execução do dia não fica bloqueada
+        self.assertNotIn('em_execucao', processar_reajustes_pendentes())
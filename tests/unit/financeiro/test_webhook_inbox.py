@@ -0,0 +1,223 @@
+"""
+Caixa de entrada dos webhooks (financeiro.services.webhook_inbox) — modo fast-ack
+
+Testa:
+- webhook_boleto_api / webhook_pix respondem 202 e só gravam o evento
+- Reentrega do mesmo evento não duplica a entrada
+- Worker aplica os eventos (baixa), em ordem por cobrança (chave = parcela casada)
+- Falha reagenda com backoff, segura a fila da cobrança e desiste após o máximo
+- Baixa que devolve status 'erro' é retentada (log do evento desfeito)
+- Reserva tomada por outro worker: o evento não é processado nem gravado
+- Métricas de lag e comando processar_webhook_inbox
+
+Desenvolvedor: Maxwell da Silva Oliveira <maxwbh@gmail.com>
+"""
+import hashlib
+import hmac
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from financeiro.models import EventoCobrancaApi, EventoPIX, Parcela, StatusCobranca, WebhookInbox
+from financeiro.services import webhook_inbox
+from tests.fixtures.factories import ParcelaFactory
+
+SECRET = 'inbox-secret'
+TOKEN = 'inbox-token'
+
+
+@pytest.fixture(autouse=True)
+def _fast_ack(settings):
+    settings.WEBHOOK_INBOX = True
+    settings.EVENT_WEBHOOK_SECRET = SECRET
+    settings.PIX_WEBHOOK_TOKEN = TOKEN
+    settings.WEBHOOK_INBOX_MAX_TENTATIVAS = 2
+
+
+def _post_boleto(client, payload):
+    body = json.dumps(payload).encode()
+    sig = 'sha256=' + hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return client.post(reverse('financeiro:webhook_boleto_api'), data=body,
+                       content_type='application/json', HTTP_X_SIGNATURE=sig)
+
+
+def _evento(cobranca_id, status, n):
+    return {'id': cobranca_id, 'event': 'payment.status', 'event_id': f'ev-{cobranca_id}-{n}',
+            'status': status, 'valor': '100.00', 'paid_at': '2026-10-01T10:00:00'}
+
+
+@pytest.mark.django_db
+class TestFastAck:
+
+    def test_boleto_grava_e_responde_202(self, client):
+        parcela = ParcelaFactory(cobranca_id='COB1', pago=False, valor_boleto=Decimal('100.00'))
+
+        resp = _post_boleto(client, _evento('COB1', 'liquidado', 1))
+        again = _post_boleto(client, _evento('COB1', 'liquidado', 1))
+
+        assert resp.status_code == again.status_code == 202
+        assert resp.json()['status'] == 'enfileirado'
+        assert again.json() == {'status': 'duplicado', 'inbox_id': resp.json()['inbox_id']}
+        assert WebhookInbox.objects.count() == 1
+        parcela.refresh_from_db()
+        assert not parcela.pago
+
+        r = webhook_inbox.consumir()
+
+        assert r['processados'] == 1 and r['pendentes'] == 0
+        assert r['lag_max_s'] >= 0
+        parcela.refresh_from_db()
+        assert parcela.pago
+        entrada = WebhookInbox.objects.get()
+        assert (entrada.status, entrada.resultado) == (WebhookInbox.STATUS_PROCESSADO, 'baixado')
+
+    def test_evento_sem_event_id_deduplica_pelo_corpo(self, client):
+        payload = {'id': 'COB9', 'event': 'payment.status', 'status': 'registrado'}
+        _post_boleto(client, payload)
+        _post_boleto(client, payload)
+        assert WebhookInbox.objects.get().event_id.startswith('sha256:')
+
+    def test_pix(self, client):
+        parcela = ParcelaFactory(pix_txid='TXIN', pago=False, valor_boleto=Decimal('50.00'))
+        body = {'pix': [{'endToEndId': 'E1', 'txid': 'TXIN', 'valor': '50.00',
+                         'horario': '2026-10-01T10:00:00Z'}, {'txid': 'SEM-E2E'}]}
+
+        resp = client.post(reverse('financeiro:webhook_pix'), data=json.dumps(body),
+                           content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {TOKEN}')
+
+        assert resp.status_code == 202
+        assert resp.json()['enfileirados'][1] == {'erro': 'endToEndId ausente no evento'}
+        webhook_inbox.consumir()
+        parcela.refresh_from_db()
+        assert parcela.pago
+        assert EventoPIX.objects.get(end_to_end_id='E1').status == EventoPIX.STATUS_BAIXADO
+
+
+@pytest.mark.django_db
+class TestWorker:
+
+    def test_ordem_por_cobranca(self, client):
+        parcela = ParcelaFactory(cobranca_id='COB2', pago=False, valor_boleto=Decimal('100.00'))
+        _post_boleto(client, _evento('COB2', 'registrado', 1))
+        _post_boleto(client, _evento('COB2', 'liquidado', 2))
+        _post_boleto(client, _evento('COB3', 'registrado', 1))
+
+        # Um lote leva só o evento mais antigo de cada cobrança
+        lote = webhook_inbox.reservar_lote('w1')
+        assert [e.event_id for e in lote] == ['ev-COB2-1', 'ev-COB3-1']
+        assert webhook_inbox.reservar_lote('w2') == []
+
+        WebhookInbox.objects.update(reservada_ate=None)
+        r = webhook_inbox.consumir()
+
+        assert r['processados'] == 3 and r['lotes'] == 2
+        parcela.refresh_from_db()
+        assert parcela.pago and parcela.status_cobranca == StatusCobranca.LIQUIDADA
+
+    def test_ordem_pela_parcela_com_identificadores_diferentes(self, client):
+        """id num evento, só txid noutro (e o PIX): todos na fila da mesma parcela."""
+        parcela = ParcelaFactory(cobranca_id='COB4', pix_txid='TX4', pago=False,
+                                 valor_boleto=Decimal('100.00'))
+        _post_boleto(client, _evento('COB4', 'registrado', 1))
+        _post_boleto(client, {'txid': 'TX4', 'event': 'payment.status', 'event_id': 'ev-TX4-2',
+                              'status': 'liquidado', 'valor': '100.00'})
+        client.post(reverse('financeiro:webhook_pix'),
+                    data=json.dumps({'pix': [{'endToEndId': 'E4', 'txid': 'TX4', 'valor': '100.00'}]}),
+                    content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {TOKEN}')
+
+        assert set(WebhookInbox.objects.values_list('chave', flat=True)) == {f'parcela:{parcela.pk}'}
+        assert [e.event_id for e in webhook_inbox.reservar_lote('w1')] == ['ev-COB4-1']
+
+    def test_falha_reagenda_e_segura_a_cobranca(self, client):
+        ParcelaFactory(cobranca_id='COB4', pago=False, valor_boleto=Decimal('100.00'))
+        _post_boleto(client, _evento('COB4', 'registrado', 1))
+        _post_boleto(client, _evento('COB4', 'liquidado', 2))
+
+        with patch('financeiro.views._processar_evento_cobranca', side_effect=RuntimeError('db fora')):
+            r = webhook_inbox.consumir()
+        assert (r['reagendados'], r['processados']) == (1, 0)
+        primeiro = WebhookInbox.objects.get(event_id='ev-COB4-1')
+        assert primeiro.tentativas == 1 and primeiro.proxima_tentativa_em
+        # O segundo evento da cobrança espera o primeiro
+        assert webhook_inbox.reservar_lote('w') == []
+
+        WebhookInbox.objects.update(proxima_tentativa_em=None)
+        with patch('financeiro.views._processar_evento_cobranca', side_effect=RuntimeError('db fora')):
+            r = webhook_inbox.consumir(max_lotes=1)
+        assert r['erros'] == 1
+        primeiro.refresh_from_db()
+        assert primeiro.status == WebhookInbox.STATUS_ERRO and 'db fora' in primeiro.erro
+
+        # Esgotado o primeiro, a fila da cobrança anda
+        r = webhook_inbox.consumir()
+        assert r['processados'] == 1 and r['com_erro'] == 1
+
+    def test_baixa_com_erro_e_retentada(self, client):
+        pix = ParcelaFactory(pix_txid='TXERR', pago=False, valor_boleto=Decimal('50.00'))
+        boleto = ParcelaFactory(cobranca_id='COB7', pago=False, valor_boleto=Decimal('100.00'))
+        client.post(reverse('financeiro:webhook_pix'), content_type='application/json',
+                    data=json.dumps({'pix': [{'endToEndId': 'E9', 'txid': 'TXERR', 'valor': '50.00'}]}),
+                    HTTP_AUTHORIZATION=f'Bearer {TOKEN}')
+        _post_boleto(client, _evento('COB7', 'liquidado', 1))
+
+        with patch.object(Parcela, 'registrar_pagamento', side_effect=RuntimeError('lock timeout')):
+            r = webhook_inbox.consumir()
+
+        assert (r['reagendados'], r['processados']) == (2, 0)
+        assert all('lock timeout' in e.erro for e in WebhookInbox.objects.all())
+        # O log do evento foi desfeito: a reentrega não vira "duplicado"
+        assert not EventoPIX.objects.exists() and not EventoCobrancaApi.objects.exists()
+        boleto.refresh_from_db()
+        assert boleto.status_cobranca != StatusCobranca.LIQUIDADA
+
+        WebhookInbox.objects.update(proxima_tentativa_em=None)
+        assert webhook_inbox.consumir()['processados'] == 2
+        for parcela in (pix, boleto):
+            parcela.refresh_from_db()
+            assert parcela.pago
+        assert EventoPIX.objects.get().status == EventoPIX.STATUS_BAIXADO
+
+    def test_reserva_tomada_nao_processa(self, client):
+        parcela = ParcelaFactory(cobranca_id='COB8', pago=False, valor_boleto=Decimal('100.00'))
+        _post_boleto(client, _evento('COB8', 'liquidado', 1))
+        [evento] = webhook_inbox.reservar_lote('w1')
+
+        # Reserva venceu e outro worker pegou o evento
+        WebhookInbox.objects.update(reservada_por='w2')
+        assert webhook_inbox._processar(evento) is None
+        parcela.refresh_from_db()
+        assert not parcela.pago
+
+        # Tomada no meio do processamento: a baixa é desfeita
+        WebhookInbox.objects.update(reservada_por='w1')
+        from financeiro import views
+        original = views._processar_evento_cobranca
+
+        def roubada(**kwargs):
+            WebhookInbox.objects.update(reservada_por='w2')
+            return original(**kwargs)
+
+        with patch('financeiro.views._processar_evento_cobranca', side_effect=roubada):
+            assert webhook_inbox._processar(evento) is None
+        parcela.refresh_from_db()
+        assert not parcela.pago
+        assert WebhookInbox.objects.get().status == WebhookInbox.STATUS_PENDENTE
+
+    def test_comando(self, client, capsys):
+        _post_boleto(client, _evento('COB5', 'registrado', 1))
+        call_command('processar_webhook_inbox')
+        assert '1 processado(s)' in capsys.readouterr().out
+        assert webhook_inbox.metricas()['pendentes'] == 0
+
+
+@pytest.mark.django_db
+def test_modo_sincrono_continua_200(client, settings):
+    settings.WEBHOOK_INBOX = False
+    ParcelaFactory(cobranca_id='COB6', pago=False, valor_boleto=Decimal('100.00'))
+    resp = _post_boleto(client, _evento('COB6', 'liquidado', 1))
+    assert resp.status_code == 200 and resp.json()['status'] == 'baixado'
+    assert not WebhookInbox.objects.exists()
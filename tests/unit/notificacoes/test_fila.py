@@ -0,0 +1,206 @@
+"""
+Testes do consumidor da fila de notificações (notificacoes.fila)
+
+Testa:
+- Reserva exclusiva de lotes por worker e retomada de reserva vencida
+- Backoff exponencial das retentativas até ERRO definitivo
+- Lote mais lento que o lease: reserva renovada a cada envio; reserva tomada
+  não é enviada nem tem o desfecho gravado
+- Concorrência por canal
+- processar_fila_notificacoes (core.tasks) sobre o consumidor
+
+Desenvolvedor: Maxwell da Silva Oliveira <maxwbh@gmail.com>
+"""
+import threading
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+
+from notificacoes.fila import atraso_retentativa, consumir_fila, reservar_lote
+from notificacoes.models import Notificacao, StatusNotificacao, TipoNotificacao
+
+
+def _criar(quantidade, tipo=TipoNotificacao.EMAIL, **kwargs):
+    return [
+        Notificacao.objects.create(
+            tipo=tipo, destinatario=f'cliente{n}@exemplo.com', assunto='Assunto',
+            mensagem='Mensagem', **kwargs,
+        )
+        for n in range(quantidade)
+    ]
+
+
+@pytest.mark.django_db
+class TestReservaLote:
+
+    def test_workers_reservam_lotes_disjuntos(self):
+        _criar(5)
+
+        lote_a = reservar_lote('worker-a', tamanho=3)
+        lote_b = reservar_lote('worker-b', tamanho=3)
+
+        assert len(lote_a) == 3
+        assert len(lote_b) == 2
+        assert not {n.id for n in lote_a} & {n.id for n in lote_b}
+        assert reservar_lote('worker-c') == []
+
+    def test_reserva_vencida_volta_para_a_fila(self):
+        _criar(2)
+        lote = reservar_lote('worker-a')
+        Notificacao.objects.filter(id=lote[0].id).update(
+            reservada_ate=timezone.now() - timedelta(seconds=1)
+        )
+
+        retomadas = reservar_lote('worker-b')
+        assert [n.id for n in retomadas] == [lote[0].id]
+
+    def test_ignora_agendadas_e_em_espera(self):
+        futura, em_espera, pronta = _criar(3)
+        Notificacao.objects.filter(id=futura.id).update(
+            data_agendamento=timezone.now() + timedelta(hours=1)
+        )
+        Notificacao.objects.filter(id=em_espera.id).update(
+            proxima_tentativa_em=timezone.now() + timedelta(minutes=5)
+        )
+
+        assert [n.id for n in reservar_lote('worker-a')] == [pronta.id]
+
+
+@pytest.mark.django_db
+class TestConsumirFila:
+
+    def test_backoff_exponencial_ate_erro(self, settings):
+        settings.NOTIFICACOES_MAX_TENTATIVAS = 3
+        settings.NOTIFICACOES_RETRY_BASE_SEGUNDOS = 60
+        (notif,) = _criar(1)
+
+        def falhar(_):
+            raise ConnectionError('SMTP fora do ar')
+
+        antes = timezone.now()
+        assert consumir_fila(falhar)['reagendadas'] == 1
+        notif.refresh_from_db()
+        assert notif.status == StatusNotificacao.PENDENTE
+        assert notif.tentativas == 1
+        assert notif.reservada_ate is None
+        assert notif.proxima_tentativa_em >= antes + timedelta(seconds=60)
+        # Ainda em espera: nada a consumir
+        assert consumir_fila(falhar)['lotes'] == 0
+
+        Notificacao.objects.filter(id=notif.id).update(proxima_tentativa_em=timezone.now())
+        consumir_fila(falhar)
+        notif.refresh_from_db()
+        assert notif.tentativas == 2
+        assert notif.proxima_tentativa_em >= timezone.now() + timedelta(seconds=110)
+
+        Notificacao.objects.filter(id=notif.id).update(proxima_tentativa_em=timezone.now())
+        estatisticas = consumir_fila(falhar)
+        notif.refresh_from_db()
+        assert estatisticas['erros'] == 1
+        assert estatisticas['falhas'][0][3] is True
+        assert notif.status == StatusNotificacao.ERRO
+        assert notif.tentativas == 3
+
+    def test_atraso_com_teto(self, settings):
+        settings.NOTIFICACOES_RETRY_BASE_SEGUNDOS = 60
+        settings.NOTIFICACOES_RETRY_MAX_SEGUNDOS = 600
+        assert [atraso_retentativa(t).total_seconds() for t in range(1, 6)] == [60, 120, 240, 480, 600]
+
+    def test_lotes_ate_esvaziar(self):
+        _criar(7)
+        enviadas = []
+
+        estatisticas = consumir_fila(enviadas.append, tamanho_lote=3)
+
+        assert estatisticas['enviadas'] == 7
+        assert estatisticas['lotes'] == 3
+        assert len({n.id for n in enviadas}) == 7
+        assert not Notificacao.objects.filter(status=StatusNotificacao.PENDENTE).exists()
+        assert not Notificacao.objects.exclude(reservada_por='').exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_concorrencia_limitada_por_canal(self, settings):
+        """As threads de envio renovam a reserva: precisa das linhas commitadas."""
+        settings.NOTIFICACOES_CONCORRENCIA_EMAIL = 3
+        settings.NOTIFICACOES_CONCORRENCIA_SMS = 1
+        _criar(9)
+        _criar(4, tipo=TipoNotificacao.SMS)
+
+        trava = threading.Lock()
+        simultaneos = {TipoNotificacao.EMAIL: 0, TipoNotificacao.SMS: 0}
+        picos = dict(simultaneos)
+        barreira = threading.Barrier(3, timeout=5)
+
+        def enviar(notif):
+            with trava:
+                simultaneos[notif.tipo] += 1
+                picos[notif.tipo] = max(picos[notif.tipo], simultaneos[notif.tipo])
+            if notif.tipo == TipoNotificacao.EMAIL:
+                try:
+                    barreira.wait()  # as 3 threads de e-mail ao mesmo tempo
+                except threading.BrokenBarrierError:
+                    pass
+            with trava:
+                simultaneos[notif.tipo] -= 1
+
+        estatisticas = consumir_fila(enviar)
+
+        assert estatisticas['enviadas'] == 13
+        assert picos == {TipoNotificacao.EMAIL: 3, TipoNotificacao.SMS: 1}
+
+    def test_lote_lento_renova_a_reserva(self, settings):
+        settings.NOTIFICACOES_LEASE_SEGUNDOS = 300
+        _criar(3)
+        prazos = []
+
+        def enviar(notif):
+            # Cada envio "demora" 200 s: sem renovar, a 2ª já estaria vencida
+            prazos.append(Notificacao.objects.get(id=notif.id).reservada_ate)
+            Notificacao.objects.filter(reservada_por=notif.reservada_por).update(
+                reservada_ate=timezone.now() + timedelta(seconds=100)
+            )
+
+        estatisticas = consumir_fila(enviar)
+
+        assert estatisticas['enviadas'] == 3 and estatisticas['perdidas'] == 0
+        assert all(p >= timezone.now() + timedelta(seconds=250) for p in prazos)
+
+    def test_reserva_tomada_nao_envia_nem_grava(self):
+        primeira, segunda = _criar(2)
+        enviadas = []
+
+        def enviar(notif):
+            enviadas.append(notif.id)
+            # Reserva venceu durante o envio e worker-b tomou as duas
+            Notificacao.objects.update(reservada_por='worker-b')
+
+        estatisticas = consumir_fila(enviar, worker='worker-a')
+
+        assert enviadas == [primeira.id]
+        assert (estatisticas['enviadas'], estatisticas['perdidas']) == (0, 2)
+        # O desfecho fica para quem detém a reserva
+        assert set(Notificacao.objects.values_list('status', 'reservada_por')) == {
+            (StatusNotificacao.PENDENTE, 'worker-b')}
+
+
+@pytest.mark.django_db
+class TestProcessarFilaNotificacoes:
+
+    def test_envia_e_reagenda(self, mailoutbox):
+        from core.tasks import processar_fila_notificacoes
+
+        _criar(2)
+        (sms,) = _criar(1, tipo=TipoNotificacao.SMS)
+
+        with patch('notificacoes.services.ServicoSMS.enviar', side_effect=RuntimeError('Twilio 503')):
+            result = processar_fila_notificacoes()
+
+        assert result.success
+        assert result.items_processed == 2
+        assert len(mailoutbox) == 2
+        sms.refresh_from_db()
+        assert sms.status == StatusNotificacao.PENDENTE
+        assert sms.tentativas == 1
+        assert sms.proxima_tentativa_em is not None
@@ -0,0 +1,159 @@
+"""
+Testes do envio de e-mail em lote (notificacoes.services)
+
+Testa:
+- Uma conexão SMTP autenticada para várias mensagens do lote
+- Reconexão transparente quando o servidor derruba a conexão
+- Reabertura a cada EMAIL_MENSAGENS_POR_CONEXAO mensagens
+- Configuração ativa em cache, invalidada ao gravar ConfiguracaoEmail
+
+Desenvolvedor: Maxwell da Silva Oliveira <maxwbh@gmail.com>
+"""
+import smtplib
+from unittest.mock import patch
+
+import pytest
+
+from notificacoes.models import ConfiguracaoEmail
+from notificacoes.services import DespachanteEmail, ServicoEmail, configuracao_email_ativa
+
+
+class SMTPFalso:
+    """smtplib.SMTP de mentira: registra conexões, logins e mensagens."""
+
+    conexoes = []
+    chamadas = 0
+    derrubar_em = set()  # chamadas de sendmail em que o servidor derruba a conexão
+
+    def __init__(self, host, port, **kwargs):
+        self.host, self.port = host, port
+        self.logins = []
+        self.mensagens = []
+        self.fechada = False
+        SMTPFalso.conexoes.append(self)
+
+    @classmethod
+    def enviadas(cls):
+        return [m for c in cls.conexoes for m in c.mensagens]
+
+    def starttls(self, context=None):
+        pass
+
+    def login(self, usuario, senha):
+        self.logins.append(usuario)
+
+    def sendmail(self, de, para, mensagem):
+        chamada = SMTPFalso.chamadas
+        SMTPFalso.chamadas += 1
+        if chamada in SMTPFalso.derrubar_em:
+            self.fechada = True
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        self.mensagens.append((de, tuple(para)))
+
+    def quit(self):
+        if self.fechada:
+            raise smtplib.SMTPServerDisconnected('already closed')
+        self.fechada = True
+
+    def close(self):
+        self.fechada = True
+
+
+@pytest.fixture
+def smtp_falso(db):
+    SMTPFalso.conexoes = []
+    SMTPFalso.chamadas = 0
+    SMTPFalso.derrubar_em = set()
+    ConfiguracaoEmail.objects.create(
+        nome='SMTP', host='smtp.exemplo.com', porta=587, usuario='envio@exemplo.com',
+        senha='segredo', usar_tls=True, email_remetente='envio@exemplo.com',
+        nome_remetente='Gestão', ativo=True,
+    )
+    with patch('smtplib.SMTP', SMTPFalso):
+        yield SMTPFalso
+
+
+@pytest.mark.django_db
+class TestDespachanteEmail:
+
+    def test_lote_usa_uma_conexao(self, smtp_falso, settings):
+        settings.TEST_MODE = False
+        with DespachanteEmail() as lote:
+            for n in range(5):
+                ok, message_id = ServicoEmail.enviar(f'cliente{n}@exemplo.com', 'Assunto', 'Corpo')
+                assert ok and message_id.endswith('@gestao-contrato>')
+
+        assert len(smtp_falso.conexoes) == 1
+        assert smtp_falso.conexoes[0].logins == ['envio@exemplo.com']
+        assert [para for _, para in smtp_falso.enviadas()] == [
+            (f'cliente{n}@exemplo.com',) for n in range(5)
+        ]
+        assert smtp_falso.conexoes[0].fechada
+        assert lote.enviadas == 5
+        assert lote.resumo()['conexoes'] == 1
+        assert lote.mensagens_por_segundo > 0
+
+    def test_fora_do_lote_conexao_por_mensagem(self, smtp_falso):
+        ServicoEmail.enviar('a@exemplo.com', 'Assunto', 'Corpo')
+        ServicoEmail.enviar('b@exemplo.com', 'Assunto', 'Corpo', html_message='<p>Corpo</p>')
+
+        assert len(smtp_falso.conexoes) == 2
+        assert all(c.fechada for c in smtp_falso.conexoes)
+
+    def test_reconecta_quando_servidor_derruba(self, smtp_falso):
+        smtp_falso.derrubar_em = {2}
+        with DespachanteEmail() as lote:
+            for n in range(4):
+                lote.enviar(f'cliente{n}@exemplo.com', 'Assunto', 'Corpo')
+
+        assert len(smtp_falso.enviadas()) == 4
+        assert len(smtp_falso.conexoes) == 2
+        assert lote.reconexoes == 1
+        assert lote.erros == 0
+
+    def test_reabre_a_cada_n_mensagens(self, smtp_falso):
+        with DespachanteEmail(mensagens_por_conexao=2) as lote:
+            for n in range(5):
+                lote.enviar(f'cliente{n}@exemplo.com', 'Assunto', 'Corpo')
+
+        assert [len(c.mensagens) for c in smtp_falso.conexoes] == [2, 2, 1]
+        assert all(c.fechada for c in smtp_falso.conexoes)
+
+    def test_erro_que_nao_e_de_conexao_propaga(self, smtp_falso):
+        with patch.object(SMTPFalso, 'sendmail', side_effect=smtplib.SMTPRecipientsRefused({})):
+            with DespachanteEmail() as lote:
+                with pytest.raises(smtplib.SMTPRecipientsRefused):
+                    lote.enviar('x@exemplo.com', 'Assunto', 'Corpo')
+        assert lote.erros == 1
+        assert lote.reconexoes == 0
+
+    def test_sem_configuracao_usa_backend_do_settings(self, mailoutbox):
+        with DespachanteEmail() as lote:
+            lote.enviar('a@exemplo.com', 'Assunto', 'Corpo')
+            lote.enviar('b@exemplo.com', 'Assunto', 'Corpo')
+
+        assert [m.to for m in mailoutbox] == [['a@exemplo.com'], ['b@exemplo.com']]
+        assert lote.conexoes == 1
+
+
+@pytest.mark.django_db
+class TestConfiguracaoEmailCache:
+
+    def test_cache_invalidado_ao_gravar(self, django_assert_num_queries):
+        assert configuracao_email_ativa() is None
+        config = ConfiguracaoEmail.objects.create(
+            nome='SMTP', host='smtp.exemplo.com', porta=587, usuario='u', senha='s',
+            email_remetente='envio@exemplo.com', ativo=True,
+        )
+
+        assert configuracao_email_ativa().host == 'smtp.exemplo.com'
+        with django_assert_num_queries(0):
+            for _ in range(10):
+                configuracao_email_ativa()
+
+        config.host = 'smtp2.exemplo.com'
+        config.save()
+        assert configuracao_email_ativa().host == 'smtp2.exemplo.com'
+
+        config.delete()
+        assert configuracao_email_ativa() is None
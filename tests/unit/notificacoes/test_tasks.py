@@ -48,7 +48,7 @@ class TestProcessarNotificacoesPendentes:
 
     @patch('notificacoes.tasks.enviar_notificacao')
     def test_processar_notificacoes_pendentes_erro(self, mock_enviar):
-        """Marca notificação com erro quando envio falha"""
+        """Falha de envio reagenda com backoff em vez de marcar erro na primeira tentativa"""
         mock_enviar.return_value = (False, '')
 
         notif = Notificacao.objects.create(
@@ -62,13 +62,20 @@ class TestProcessarNotificacoesPendentes:
         resultado = processar_notificacoes_pendentes()
 
         notif.refresh_from_db()
-        assert notif.status == StatusNotificacao.ERRO
+        assert notif.status == StatusNotificacao.PENDENTE
+        assert notif.tentativas == 1
+        assert notif.proxima_tentativa_em > timezone.now()
         assert resultado['enviadas'] == 0
-        assert resultado['erros'] == 1
+        assert resultado['reagendadas'] == 1
+
+        # Ainda no backoff: não é tentada de novo
+        assert processar_notificacoes_pendentes()['reagendadas'] == 0
+        assert mock_enviar.call_count == 1
 
     @patch('notificacoes.tasks.enviar_notificacao')
-    def test_processar_notificacoes_pendentes_excecao(self, mock_enviar):
-        """Trata exceção durante envio"""
+    def test_processar_notificacoes_pendentes_excecao(self, mock_enviar, settings):
+        """Na última tentativa a notificação fica com ERRO"""
+        settings.NOTIFICACOES_MAX_TENTATIVAS = 1
         mock_enviar.side_effect = Exception('Erro de conexão')
 
         notif = Notificacao.objects.create(
@@ -79,11 +86,44 @@ class TestProcessarNotificacoesPendentes:
             data_agendamento=timezone.now() - timedelta(minutes=5)
         )
 
-        processar_notificacoes_pendentes()
+        resultado = processar_notificacoes_pendentes()
 
         notif.refresh_from_db()
         assert notif.status == StatusNotificacao.ERRO
         assert 'Erro de conexão' in notif.erro_mensagem
+        assert resultado['erros'] == 1
+
+    @patch('notificacoes.tasks.enviar_notificacao')
+    def test_nao_envia_notificacao_reservada_por_outro_worker(self, mock_enviar):
+        """Notificação com reserva vigente de outro consumidor da fila não é enviada de novo"""
+        mock_enviar.return_value = (True, 'SM123')
+
+        reservada = Notificacao.objects.create(
+            tipo=TipoNotificacao.SMS,
+            destinatario='+5531999999999',
+            mensagem='Mensagem teste',
+            status=StatusNotificacao.PENDENTE,
+            data_agendamento=timezone.now() - timedelta(minutes=5),
+            reservada_por='outro-worker',
+            reservada_ate=timezone.now() + timedelta(minutes=5),
+        )
+        livre = Notificacao.objects.create(
+            tipo=TipoNotificacao.SMS,
+            destinatario='+5531988888888',
+            mensagem='Mensagem teste',
+            status=StatusNotificacao.PENDENTE,
+            data_agendamento=timezone.now() - timedelta(minutes=5),
+        )
+
+        resultado = processar_notificacoes_pendentes()
+
+        assert resultado['enviadas'] == 1
+        assert mock_enviar.call_count == 1
+        reservada.refresh_from_db()
+        livre.refresh_from_db()
+        assert reservada.status == StatusNotificacao.PENDENTE
+        assert livre.status == StatusNotificacao.ENVIADA
+        assert livre.external_id == 'SM123'
 
     def test_processar_sem_notificacoes_pendentes(self):
         """Retorna zeros quando não há notificações pendentes"""
@@ -0,0 +1,142 @@
+"""
+Testes da renderização compilada de templates (notificacoes.template_compilado)
+
+Testa:
+- Mesma saída da renderização anterior (regex + str.replace por TAG)
+- Blocos condicionais %%SE_TAG%%...%%FIM_TAG%%
+- Cache por (id, atualizado_em) e recompilação ao editar o template
+- WhatsApp interativo sem deepcopy e sem alterar o template
+- Equivalência em escala: 100 mil contextos
+
+Desenvolvedor: Maxwell da Silva Oliveira <maxwbh@gmail.com>
+"""
+import re
+
+import pytest
+
+from notificacoes import template_compilado
+from notificacoes.models import TemplateNotificacao, TipoTemplate
+
+
+def _renderizar_legado(template, contexto):
+    """Algoritmo anterior de TemplateNotificacao.renderizar (referência)."""
+    def processar_condicionais(texto):
+        if not texto or '%%SE_' not in texto:
+            return texto
+
+        def repl(m):
+            tag, conteudo = m.group(1), m.group(2)
+            return conteudo if str(contexto.get(tag) or '').strip() else ''
+
+        return re.sub(r'%%SE_(\w+)%%(.*?)%%FIM_\1%%', repl, texto, flags=re.DOTALL)
+
+    campos = [processar_condicionais(getattr(template, c) or '') for c in template_compilado.CAMPOS]
+    for tag, valor in contexto.items():
+        placeholder = f"%%{tag}%%"
+        valor_str = str(valor) if valor is not None else ''
+        campos = [c.replace(placeholder, valor_str) for c in campos]
+    return tuple(campos)
+
+
+def _template(**kwargs):
+    campos = dict(
+        nome='Boleto', codigo=TipoTemplate.BOLETO_CRIADO,
+        assunto='Boleto da parcela %%PARCELA%% — %%NOMECOMPRADOR%%',
+        corpo='Ola %%NOMECOMPRADOR%%, parcela %%PARCELA%% vence %%DATAVENCIMENTO%%.%%SE_PIXCOPIACOLA%% PIX: %%PIXCOPIACOLA%%%%FIM_PIXCOPIACOLA%%',
+        corpo_html=(
+            '<style>p {margin: 0} .x{{}}</style>\n<p>Prezado(a) %%NOMECOMPRADOR%%,</p>\n<p>Valor: %%VALORPARCELA%% — %%TAGDESCONHECIDA%%</p>\n'
+            '%%SE_LINHADIGITAVEL%%<p>Linha: %%LINHADIGITAVEL%%</p>\n%%FIM_LINHADIGITAVEL%%'
+            '%%SE_PIXCOPIACOLA%%<p>PIX: %%PIXCOPIACOLA%%</p>%%FIM_PIXCOPIACOLA%%<p>%%NOMEIMOBILIARIA%%</p>'
+        ),
+        corpo_whatsapp='',
+    )
+    campos.update(kwargs)
+    return TemplateNotificacao.objects.create(**campos)
+
+
+def _contexto(n):
+    return {
+        'NOMECOMPRADOR': f'Comprador {n}',
+        'PARCELA': f'{n % 120 + 1}/120',
+        'DATAVENCIMENTO': '10/05/2026',
+        'VALORPARCELA': f'R$ {1000 + n},00',
+        'LINHADIGITAVEL': '' if n % 3 else f'34191.79001 {n:05d}',
+        'PIXCOPIACOLA': None if n % 2 else f'00020126PIX{n}',
+        'NOMEIMOBILIARIA': 'Imobiliária Exemplo',
+        'DIASATRASO': 0,
+        # Demais TAGs de BoletoNotificacaoService.montar_contexto, não usadas no template
+        **{tag: f'{tag.lower()} {n}' for tag in (
+            'CPFCOMPRADOR', 'EMAILCOMPRADOR', 'TELEFONECOMPRADOR', 'CELULARCOMPRADOR',
+            'CNPJIMOBILIARIA', 'TELEFONEIMOBILIARIA', 'EMAILIMOBILIARIA', 'NUMEROCONTRATO',
+            'DATACONTRATO', 'VALORTOTAL', 'TOTALPARCELAS', 'IMOVEL', 'LOTEAMENTO',
+            'NUMEROPARCELA', 'NOSSONUMERO', 'CODIGOBARRAS', 'VALORBOLETO', 'DATAATUAL',
+        )},
+    }
+
+
+@pytest.mark.django_db
+class TestTemplateCompilado:
+
+    def setup_method(self):
+        template_compilado.limpar_cache()
+
+    def test_mesma_saida_do_algoritmo_anterior(self):
+        template = _template()
+        for n in range(12):
+            contexto = _contexto(n)
+            assert template.renderizar(contexto) == _renderizar_legado(template, contexto)
+
+    def test_condicionais(self):
+        template = _template()
+        com_pix = template.renderizar({'NOMECOMPRADOR': 'Ana', 'PIXCOPIACOLA': 'abc'})
+        sem_pix = template.renderizar({'NOMECOMPRADOR': 'Ana', 'PIXCOPIACOLA': '  '})
+
+        assert com_pix[1].endswith(' PIX: abc')
+        assert 'PIX' not in sem_pix[1]
+        assert '%%TAGDESCONHECIDA%%' in sem_pix[2]
+        assert '%%PARCELA%%' in sem_pix[0]
+
+    def test_cache_por_id_e_atualizado_em(self):
+        template = _template()
+        assert template_compilado.compilar(template) is template_compilado.compilar(template)
+
+        template.assunto = 'Novo assunto %%NOMECOMPRADOR%%'
+        # Alterado em memória, ainda não salvo: recompila
+        assert template.renderizar({'NOMECOMPRADOR': 'Ana'})[0] == 'Novo assunto Ana'
+
+        template.save()
+        outra_instancia = TemplateNotificacao.objects.get(pk=template.pk)
+        compilado = template_compilado.compilar(outra_instancia)
+        assert compilado is template_compilado.compilar(outra_instancia)
+        assert outra_instancia.renderizar({'NOMECOMPRADOR': 'Bia'})[0] == 'Novo assunto Bia'
+
+    def test_interativo_nao_altera_o_template(self):
+        interativo = {
+            'title': 'Parcela %%PARCELA%%', 'body': 'Olá %%NOMECOMPRADOR%%', 'footer': 'Rodapé',
+            'buttons': [{'id': 'pagar', 'title': 'Pagar'}],
+        }
+        template = _template(corpo_whatsapp_interativo=interativo)
+
+        payload = template.renderizar_interativo({'PARCELA': '3/10', 'NOMECOMPRADOR': None})
+        payload['buttons'][0]['title'] = 'Alterado'
+
+        assert payload['title'] == 'Parcela 3/10'
+        assert payload['body'] == 'Olá '
+        assert template.corpo_whatsapp_interativo['buttons'][0]['title'] == 'Pagar'
+        assert template.renderizar_interativo({})['buttons'][0]['title'] == 'Pagar'
+        assert _template(codigo=TipoTemplate.CUSTOM).renderizar_interativo({}) is None
+
+
+@pytest.mark.slow
+@pytest.mark.django_db
+class TestBenchmarkTemplateCompilado:
+
+    def test_100_mil_contextos(self):
+        template = _template()
+        contextos = [_contexto(n) for n in range(100_000)]
+
+        renderizados = [template.renderizar(c) for c in contextos]
+
+        # Referência numa amostra de 10 mil
+        legado = [_renderizar_legado(template, c) for c in contextos[:10_000]]
+        assert renderizados[:10_000] == legado
@@ -253,7 +253,7 @@ class TestFluxoCompletoNotificacao:
         assert resultado['enviadas'] >= 1
 
     def test_notificacao_sms_falha_twilio(self, mock_twilio_error, settings):
-        """Notificação deve ser marcada como ERRO quando Twilio lança exceção"""
+        """Notificação deve ser marcada como ERRO quando Twilio lança exceção na última tentativa"""
         from notificacoes.models import Notificacao, TipoNotificacao, StatusNotificacao
         from notificacoes.tasks import processar_notificacoes_pendentes
         from django.utils import timezone
@@ -262,6 +262,7 @@ class TestFluxoCompletoNotificacao:
         settings.TWILIO_ACCOUNT_SID = 'ACtest000000000000000000000000000000'
         settings.TWILIO_AUTH_TOKEN = 'test_auth_token_000000000000000000'
         settings.TWILIO_PHONE_NUMBER = '+16067334990'
+        settings.NOTIFICACOES_MAX_TENTATIVAS = 1
 
         notif = Notificacao.objects.create(
             tipo=TipoNotificacao.SMS,
@@ -227,6 +227,32 @@ class TestRelatoriosAvancados:
         assert response.status_code == 200
         assert response['Content-Type'] == 'text/csv'
 
+    def test_exportar_relatorio_csv_em_streaming(self, client_autenticado):
+        """CSV de prestações é servido em streaming"""
+        url = reverse('financeiro:exportar_relatorio', kwargs={'tipo': 'prestacoes_pagas'})
+        url += '?formato=csv'
+
+        response = client_autenticado.get(url)
+
+        assert response.streaming
+        assert b''.join(response.streaming_content).startswith(b'Contrato,Comprador')
+
+    @pytest.mark.parametrize('formato, content_type', [
+        ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+        ('pdf', 'application/pdf'),
+    ])
+    def test_exportar_relatorio_arquivo(self, client_autenticado, formato, content_type):
+        """Excel e PDF são gravados em arquivo temporário e servidos por FileResponse"""
+        url = reverse('financeiro:exportar_relatorio', kwargs={'tipo': 'prestacoes_a_pagar'})
+        url += f'?formato={formato}'
+
+        response = client_autenticado.get(url)
+
+        assert response.status_code == 200
+        assert response['Content-Type'] == content_type
+        assert f'.{formato}"' in response['Content-Disposition']
+        assert len(b''.join(response.streaming_content)) > 0
+
     def test_exportar_relatorio_json(self, client_autenticado):
         """Testa exportação de relatório para JSON"""
         url = reverse('financeiro:exportar_relatorio', kwargs={'tipo': 'prestacoes_a_pagar'})